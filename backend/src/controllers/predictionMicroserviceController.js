@@ -83,6 +83,32 @@ export const getCombinedPrediction = async (req, res) => {
   }
 };
 
+// Streaming forecast - relays NDJSON rows to the client as they arrive
+export const streamForecast = async (req, res) => {
+  let started = false;
+  try {
+    const summary = await predictionService.streamForecast(req.body, (row) => {
+      if (!started) {
+        res.status(200).type("application/x-ndjson");
+        started = true;
+      }
+      res.write(JSON.stringify(row) + "\n");
+    });
+    if (!started) {
+      res.status(200).type("application/x-ndjson");
+    }
+    res.end(JSON.stringify(summary) + "\n");
+  } catch (error) {
+    console.error("Forecast stream error:", error.message);
+    if (started) {
+      // Headers are already sent; report the failure in-band and close
+      res.end(JSON.stringify({ type: "error", detail: error.message }) + "\n");
+    } else {
+      handlePredictionError(error, res);
+    }
+  }
+};
+
 // Health check for prediction service
 export const checkPredictionServiceHealth = async (req, res) => {
   try {
@@ -4,6 +4,7 @@ import {
   predictPollutionSurge,
   forecastStaff,
   getCombinedPrediction,
+  streamForecast,
   checkPredictionServiceHealth
 } from "../controllers/predictionMicroserviceController.js";
 
@@ -17,6 +18,7 @@ router.post("/festival", predictFestivalSurge);
 router.post("/pollution", predictPollutionSurge);
 router.post("/staff", forecastStaff);
 router.get("/combined", getCombinedPrediction);
+router.post("/stream", streamForecast);
 
 // Hospital-specific predictions
 router.post("/:hospitalId/festival", predictFestivalSurge);
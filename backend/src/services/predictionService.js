@@ -24,6 +24,19 @@ const isConnectionError = (error) => {
   );
 };
 
+// Streamed requests get error bodies as a stream; read them so callers see JSON
+const readErrorBody = async (stream) => {
+  let body = "";
+  for await (const chunk of stream) {
+    body += chunk;
+  }
+  try {
+    return JSON.parse(body);
+  } catch {
+    return body;
+  }
+};
+
 class PredictionService {
   async predictFestivalSurge(data) {
     try {
@@ -96,6 +109,58 @@ class PredictionService {
     }
   }
 
+  // Streams NDJSON forecast rows, calling onRow for each one as it arrives.
+  // The 5 s timeout is a socket idle timeout here, so long streams stay alive
+  // as long as rows keep flowing.
+  async streamForecast(data, onRow) {
+    try {
+      const response = await axios.post(
+        `${PREDICTION_SERVICE_URL}/api/predict/stream`,
+        data,
+        { responseType: "stream", timeout: 5000 }
+      );
+
+      const stream = response.data;
+      stream.setEncoding("utf8");
+      let buffered = "";
+      let summary = null;
+
+      for await (const chunk of stream) {
+        buffered += chunk;
+        let newline;
+        while ((newline = buffered.indexOf("\n")) !== -1) {
+          const line = buffered.slice(0, newline);
+          buffered = buffered.slice(newline + 1);
+          if (!line.trim()) continue;
+
+          const message = JSON.parse(line);
+          if (message.type === "row") {
+            await onRow(message);
+          } else if (message.type === "error") {
+            throw new Error(`Forecast stream failed after ${message.rows} rows: ${message.detail}`);
+          } else if (message.type === "end") {
+            summary = message;
+          }
+        }
+      }
+
+      if (!summary) {
+        throw new Error("Forecast stream ended without a summary line");
+      }
+      return summary;
+    } catch (error) {
+      if (isConnectionError(error)) {
+        console.error(`[Prediction Service] Connection failed. Is the service running on ${PREDICTION_SERVICE_URL}?`);
+        throw createServiceUnavailableError("Forecast stream");
+      }
+      if (typeof error.response?.data?.pipe === "function") {
+        error.response.data = await readErrorBody(error.response.data);
+      }
+      console.error("Forecast stream error:", error.message);
+      throw error;
+    }
+  }
+
   async healthCheck() {
     try {
       const response = await axios.get(`${PREDICTION_SERVICE_URL}/health`);
@@ -0,0 +1 @@
+# Prediction service application package
@@ -1,37 +1,304 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime, date
-import sys
 import os
 
-# Add app directory to path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Started before anything else is imported, so the report covers the whole import
+from .services.startup import StartupReport, WaitUntilReady
+
+startup_report = StartupReport()
+
+from fastapi import APIRouter, Depends, FastAPI, File, Header, HTTPException, Query, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Annotated, Dict, Optional, List, Tuple, Type, Union
+from contextlib import asynccontextmanager
+from datetime import datetime, date, timedelta
+import anyio
+import asyncio
+import functools
+import json
+import logging
+import secrets
 
-from services.festival_predictor import FestivalPredictor
-from services.pollution_predictor import PollutionPredictor
-from services.staff_forecaster import StaffForecaster
+import numpy as np
 
-app = FastAPI(
-    title="Hospital Prediction Service",
-    description="Microservice for predicting patient inflow, surge risks, and staff requirements",
-    version="1.0.0"
+# Heavy libraries (pandas, SciPy, scikit-learn, PyArrow, httpx, joblib) are
+# imported by the services on first use, so importing this module stays cheap
+from .services.lazy import lazy_import
+from .services.executor import ExecutorSaturated
+from .services.metrics import MetricsRegistry, ServiceMetrics, instrumented_route
+from .services.profiler import ProfileRequests, profiler_from_env
+from .services.festival_calendar import FestivalCalendar
+from .services.surge_simulator import SurgeSimulator
+from .services.coverage import CoverageEngine
+from .services.staffing_optimizer import StaffingOptimizer
+from .services.resource_allocator import ResourceAllocator
+from .services.aqi_forecaster import AQIForecaster
+from .services.geo_index import PollutionGrid
+from .services.subscriptions import Subscriber, SubscriptionHub
+from .services.columnar import MEDIA_TYPES, SchemaError, columnar_format, write_table
+from .services.forecast_store import ForecastMaterializer, ForecastStore
+from .services.baseline_store import BaselineStore, IngestError
+from .services.forecast_stream import (
+    forecast_rows,
+    to_ndjson,
+    with_festival_surge,
+    with_pollution_surge,
+    with_staff_requirements
 )
+from .services.prediction_cache import (
+    MISSING,
+    PredictionCache,
+    TTLCache,
+    canonical_aqi,
+    combined_key,
+    festival_key,
+    pollution_key,
+    staff_key,
+    with_combined_festival_name,
+    with_festival_name
+)
+
+pa = lazy_import("pyarrow")
+logger = logging.getLogger(__name__)
+
+# Per-route and per-predictor latency, counters and payload sizes, scraped
+# from /metrics in Prometheus text format
+METRICS_ENABLED = os.getenv("PREDICTION_METRICS_ENABLED", "true").lower() == "true"
+service_metrics = ServiceMetrics()
+
+# Opt-in per-request profiles (PROFILE_TOKEN header or PROFILE_SAMPLE_RATE),
+# kept in a bounded ring of files under PROFILE_DIR
+request_profiler = profiler_from_env(exempt=("/api/profiles", "/metrics", "/health"))
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify allowed origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# Model activation and rule reloads change every answer the service gives:
+# they need X-Admin-Token: <PREDICTION_ADMIN_TOKEN> and are off when it is unset
+ADMIN_TOKEN = os.getenv("PREDICTION_ADMIN_TOKEN") or None
+
+
+def require_admin(x_admin_token: Annotated[Optional[str], Header()] = None) -> None:
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (PREDICTION_ADMIN_TOKEN)")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token")
+
+
+# Routes are registered on this router and mounted by create_app()
+router = APIRouter(route_class=instrumented_route(service_metrics) if METRICS_ENABLED else APIRoute)
+
+# Initialize predictors ("rules" or "precompiled" lookup tables). Models
+# published under PREDICTION_MODEL_DIR take over per predictor; the mode's
+# predictors remain the fallback.
+PREDICTION_MODE = os.getenv("PREDICTION_MODE", "rules")
+PREDICTION_MODEL_DIR = os.getenv(
+    "PREDICTION_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+)
+# Hospital, ward and monitoring station coordinates for pollution grids
+GEO_SITES_PATH = os.getenv(
+    "GEO_SITES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "geo_sites.json")
+)
+# Per-location rule tables (<location>.json, default.json), reloaded when
+# they change; empty to use only the tables defined in the predictors
+PREDICTION_RULES_DIR = os.getenv(
+    "PREDICTION_RULES_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "rules")
+)
+# Festival season used for timeline queries when a request brings no windows
+FESTIVAL_CALENDAR_PATH = os.getenv(
+    "FESTIVAL_CALENDAR_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "festival_calendar.json")
 )
+# Admissions history uploaded via /api/history/ingest; festival predictions
+# use it for base_patients when a request brings no historical_data
+BASELINE_STORE_PATH = os.getenv(
+    "BASELINE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "baselines")
+)
+# Requests arriving while the service warms up wait this long before a 503
+STARTUP_WAIT_TIMEOUT = float(os.getenv("STARTUP_WAIT_TIMEOUT", "30"))
+
+# Predictors and the stores around them are built by _build_services() in
+# the background at startup, while /health already answers; no other route
+# runs before they are assigned (see WaitUntilReady)
+predictors: Dict[str, object] = {}
+festival_predictor = None
+pollution_predictor = None
+staff_forecaster = None
+model_registry = None
+rule_tables = None
+# Predictor calls run off the event loop ("inline", "thread" or "process")
+prediction_executor = None
+festival_calendar = None
+baseline_store = None
+# Latest AQI per location, polled in the background from AQI_FEED_PROVIDER
+# (off by default); pollution requests without aqi are answered from it.
+# Hospitals and wards without a reading of their own are interpolated from
+# the stations' readings. The fake provider defaults to the geo stations.
+geo_grid = None
+aqi_feed = None
+_geo_stations: Dict[str, str] = {}
+
+# Upper bound on items accepted by a single batch request
+MAX_BATCH_SIZE = int(os.getenv("PREDICTION_MAX_BATCH_SIZE", "5000"))
+# Arrow/Parquet batches are scored as columns, so they may be much larger
+MAX_COLUMNAR_ROWS = int(os.getenv("PREDICTION_MAX_COLUMNAR_ROWS", "5000000"))
+
+# Result cache in front of the predictors (TTLs in seconds)
+prediction_cache = PredictionCache(
+    ttls={
+        "festival": float(os.getenv("PREDICTION_CACHE_TTL_FESTIVAL", "3600")),
+        "pollution": float(os.getenv("PREDICTION_CACHE_TTL_POLLUTION", "300")),
+        "staff": float(os.getenv("PREDICTION_CACHE_TTL_STAFF", "3600")),
+        "combined": float(os.getenv("PREDICTION_CACHE_TTL_COMBINED", "300"))
+    },
+    maxsize=int(os.getenv("PREDICTION_CACHE_MAXSIZE", "1024")),
+    enabled=os.getenv("PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+)
+
+# Results computed by a replaced model must not outlive it
+def _on_model_swap(name: str, artifact) -> None:
+    prediction_cache.invalidate()
+    subscription_hub.invalidate()
+    forecast_materializer.request()
+
+
+def _on_rules_swap(book) -> None:
+    # Same as a model swap: answers from replaced rule tables must not be served
+    prediction_cache.invalidate()
+    subscription_hub.invalidate()
+    forecast_materializer.request()
+
+
+async def _run_cached(namespace: str, key, target: str, method: str, **kwargs) -> dict:
+    """Answer from the cache on the event loop; only misses go to the executor"""
+    value = prediction_cache.get(namespace, key)
+    if value is MISSING:
+        # A swap while the miss runs invalidates the cache; the stale answer is then not stored
+        generation = prediction_cache.generation(namespace)
+        value = await prediction_executor.run(target, method, **kwargs)
+        prediction_cache.set(namespace, key, value, generation)
+    return value
+
+
+async def predict_festival_cached(**kwargs) -> dict:
+    if not kwargs.get("historical_data"):
+        kwargs["historical_data"] = _stored_history(
+            kwargs["festival_name"], kwargs["start_date"], kwargs["end_date"], kwargs.get("location")
+        )
+    result = await _run_cached("festival", festival_key(**kwargs), "festival", "predict", **kwargs)
+    return with_festival_name(result, kwargs["festival_name"])
+
+
+def _stored_history(
+    festival_name: str,
+    start_date: str,
+    end_date: str,
+    location: Optional[str]
+) -> Optional[dict]:
+    """historical_data for a festival window from the baseline store, if it has the location"""
+    if not location:
+        return None
+    try:
+        start = datetime.fromisoformat(start_date.replace('Z', '+00:00')).date()
+        previous = festival_calendar.window_for(festival_name, start.year - 1)
+        return baseline_store.festival_history(
+            location,
+            start,
+            end_date,
+            (previous.start, previous.end) if previous else None
+        )
+    except (ValueError, AttributeError):
+        # Malformed dates are reported by the predictor itself
+        return None
+
+
+async def current_aqi(location: Optional[str]) -> Optional[dict]:
+    """The feed's reading for a location, never fetched on the request path"""
+    if aqi_feed is None or not location:
+        return None
+    reading = aqi_feed.latest(location)
+    if reading is None:
+        return await _interpolated_aqi(location.strip().lower())
+    return {
+        "aqi": reading.aqi,
+        "pm25": reading.pm25,
+        "pm10": reading.pm10,
+        "aqi_source": "feed",
+        "aqi_observed_at": reading.observed_at,
+        "aqi_stale": aqi_feed.is_stale(reading)
+    }
+
+
+def _station_readings() -> List:
+    """The feed's unexpired readings for geo stations"""
+    return [reading for reading in aqi_feed.readings() if reading.location.lower() in _geo_stations]
 
-# Initialize predictors
-festival_predictor = FestivalPredictor()
-pollution_predictor = PollutionPredictor()
-staff_forecaster = StaffForecaster()
+
+# Interpolated readings per (site, feed version, stations still unexpired):
+# within a version readings only expire, so the count tells the sets apart
+_interpolations = TTLCache(maxsize=1024, ttl=float("inf"))
+
+
+async def _interpolated_aqi(location: str) -> Optional[dict]:
+    if geo_grid is None or geo_grid.geo.site(location) is None:
+        return None
+    # Expiry and staleness are checked on every read; only the interpolation is cached
+    readings = _station_readings()
+    if not readings:
+        return None
+    key = (location, aqi_feed.version, len(readings))
+    exposure = _interpolations.get(key)
+    if exposure is MISSING:
+        exposure = await prediction_executor.run("geo", "exposure", location, [
+            {
+                "station": _geo_stations[reading.location.lower()],
+                "aqi": reading.aqi,
+                "pm25": reading.pm25,
+                "pm10": reading.pm10
+            }
+            for reading in readings
+        ])
+        _interpolations.set(key, exposure)
+    if exposure is None:
+        return None
+    return {
+        "aqi": exposure["aqi"],
+        "pm25": exposure.get("pm25"),
+        "pm10": exposure.get("pm10"),
+        "aqi_source": "interpolated",
+        "aqi_observed_at": max((reading.observed_at or "" for reading in readings), default="") or None,
+        "aqi_stale": any(aqi_feed.is_stale(reading) for reading in readings)
+    }
+
+
+def _with_feed_factors(result: dict, current: dict) -> dict:
+    # Cached results are shared, so annotate a copy
+    return {
+        **result,
+        "factors": {
+            **result["factors"],
+            "aqi_source": current["aqi_source"],
+            "aqi_observed_at": current["aqi_observed_at"],
+            "aqi_stale": current["aqi_stale"]
+        }
+    }
+
+
+NO_CURRENT_AQI = "aqi is required: no current reading for this location"
+
+
+async def predict_pollution_cached(aqi: float, **kwargs) -> dict:
+    return await _run_cached(
+        "pollution", pollution_key(canonical_aqi(aqi), **kwargs), "pollution", "predict", aqi=aqi, **kwargs
+    )
+
+
+async def forecast_staff_cached(**kwargs) -> dict:
+    return await _run_cached("staff", staff_key(**kwargs), "staff", "forecast", **kwargs)
 
 
 # Request/Response Models
@@ -45,7 +312,7 @@ class FestivalPredictionRequest(BaseModel):
 
 
 class PollutionPredictionRequest(BaseModel):
-    aqi: float = Field(..., ge=0, le=500)
+    aqi: Optional[float] = Field(None, ge=0, le=500)  # defaults to the AQI feed's reading
     pm25: Optional[float] = None
     pm10: Optional[float] = None
     location: Optional[str] = None
@@ -57,6 +324,7 @@ class StaffForecastRequest(BaseModel):
     current_staff_count: Optional[int] = None
     department: Optional[str] = None
     shift_type: Optional[str] = None
+    location: Optional[str] = None  # selects the location's rule tables
 
 
 class PredictionResponse(BaseModel):
@@ -78,35 +346,469 @@ class StaffForecastResponse(BaseModel):
     required_support_staff: int
     current_gap: Optional[dict] = None
     recommendations: List[str]
+    factors: Optional[dict] = None
 
 
-@app.get("/")
+class FestivalWindowModel(BaseModel):
+    festival_name: str
+    start_date: str  # ISO format date string
+    end_date: str  # ISO format date string
+    festival_intensity: str = Field(..., pattern="^(low|medium|high)$")
+
+
+class FestivalTimelineRequest(BaseModel):
+    start_date: str  # ISO format date string
+    end_date: str  # ISO format date string
+    festivals: Optional[List[FestivalWindowModel]] = None  # defaults to the loaded calendar
+    base_daily_patients: Optional[float] = Field(None, gt=0)
+    location: Optional[str] = None
+
+
+class ForecastStreamRequest(BaseModel):
+    start_date: str  # ISO format date string
+    horizon_days: int = Field(..., ge=1, le=FestivalCalendar.MAX_TIMELINE_DAYS)
+    locations: List[str] = Field(..., min_length=1)
+    departments: List[Optional[str]] = Field(default_factory=lambda: [None])
+    aqi: Dict[str, Annotated[float, Field(ge=0, le=500)]] = Field(default_factory=dict)  # per location
+    festivals: Optional[List[FestivalWindowModel]] = None  # defaults to the loaded calendar
+    base_daily_patients: Optional[float] = Field(None, gt=0)
+    shift_type: Optional[str] = None
+
+
+class FestivalSimulationRequest(FestivalPredictionRequest):
+    samples: int = Field(SurgeSimulator.DEFAULT_SAMPLES, ge=1, le=SurgeSimulator.MAX_SAMPLES)
+    seed: Optional[int] = Field(None, ge=0)  # drawn and returned when omitted
+    multiplier_sigma: float = Field(SurgeSimulator.MULTIPLIER_SIGMA, ge=0, le=2)
+    base_patients_cv: float = Field(SurgeSimulator.BASE_PATIENTS_CV, ge=0, le=2)
+
+
+class PollutionSimulationRequest(BaseModel):
+    aqi: float = Field(..., ge=0, le=500)
+    location: Optional[str] = None
+    samples: int = Field(SurgeSimulator.DEFAULT_SAMPLES, ge=1, le=SurgeSimulator.MAX_SAMPLES)
+    seed: Optional[int] = Field(None, ge=0)
+    aqi_sigma: float = Field(SurgeSimulator.AQI_SIGMA, ge=0, le=2)
+
+
+class CombinedSimulationRequest(BaseModel):
+    festival: Optional[FestivalWindowModel] = None
+    historical_data: Optional[dict] = None
+    aqi: Optional[float] = Field(None, ge=0, le=500)
+    location: Optional[str] = None
+    samples: int = Field(SurgeSimulator.DEFAULT_SAMPLES, ge=1, le=SurgeSimulator.MAX_SAMPLES)
+    seed: Optional[int] = Field(None, ge=0)
+    multiplier_sigma: float = Field(SurgeSimulator.MULTIPLIER_SIGMA, ge=0, le=2)
+    base_patients_cv: float = Field(SurgeSimulator.BASE_PATIENTS_CV, ge=0, le=2)
+    aqi_sigma: float = Field(SurgeSimulator.AQI_SIGMA, ge=0, le=2)
+    correlation: float = Field(0.0, ge=-1, le=1)  # between festival multiplier and AQI draws
+
+
+class CoverageDemandModel(BaseModel):
+    location: Optional[str] = None
+    department: Optional[str] = None
+    # Daily predicted patients: one value for every day, or one per day
+    predicted_patients: Union[
+        Annotated[float, Field(ge=0)], List[Annotated[float, Field(ge=0)]]
+    ]
+
+
+class StaffCoverageRequest(BaseModel):
+    start_date: str  # ISO format date string
+    days: int = Field(7, ge=1, le=CoverageEngine.MAX_DAYS)
+    # Plain dicts: rosters run to thousands of shifts, so fields are read
+    # (with the backend's DoctorShift names as aliases) off the event loop
+    shifts: List[dict]
+    demand: List[CoverageDemandModel] = Field(..., min_length=1)
+    include_hourly: bool = True
+
+
+class StationHistoryModel(BaseModel):
+    station: str
+    location: Optional[str] = None
+    start: str  # ISO timestamp of the first reading
+    interval_hours: float = Field(1.0, gt=0)  # readings are equally spaced
+    aqi: List[Optional[float]] = Field(..., min_length=1)  # null = missing reading
+    pm25: Optional[List[Optional[float]]] = None
+    pm10: Optional[List[Optional[float]]] = None
+
+
+class PollutionForecastRequest(BaseModel):
+    stations: List[StationHistoryModel] = Field(..., min_length=1)
+    horizon_days: int = Field(7, ge=1, le=AQIForecaster.MAX_HORIZON_DAYS)
+    model: str = Field("auto", pattern="^(auto|ets|ar)$")
+
+
+class CombinedInterest(BaseModel):
+    location: Optional[str] = None
+    department: Optional[str] = None
+    festival_name: Optional[str] = None
+    festival_start: Optional[str] = None
+    festival_end: Optional[str] = None
+    festival_intensity: Optional[str] = Field(None, pattern="^(low|medium|high)$")
+    aqi: Optional[float] = Field(None, ge=0, le=500)  # pinned; otherwise the AQI feed's reading
+
+
+class StationReadingModel(BaseModel):
+    station: str
+    aqi: float = Field(..., ge=0)
+    pm25: Optional[float] = Field(None, ge=0)
+    pm10: Optional[float] = Field(None, ge=0)
+
+
+class GridPointModel(BaseModel):
+    id: Optional[str] = None
+    name: Optional[str] = None
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
+
+
+class PollutionGridRequest(BaseModel):
+    readings: List[StationReadingModel] = Field(..., min_length=1)
+    targets: str = Field("hospitals", pattern="^(hospitals|wards|all|points)$")
+    points: Optional[List[GridPointModel]] = None  # with targets="points"
+    neighbours: int = Field(PollutionGrid.DEFAULT_NEIGHBOURS, ge=1, le=32)
+    power: float = Field(PollutionGrid.DEFAULT_POWER, gt=0, le=8)
+    max_distance_km: Optional[float] = Field(None, gt=0)
+
+
+# One value for every day and shift, one per day, or a days x shifts matrix
+ShiftMatrix = Union[
+    Annotated[float, Field(ge=0)],
+    List[Annotated[float, Field(ge=0)]],
+    List[List[Annotated[float, Field(ge=0)]]]
+]
+
+
+class OptimizerDemandModel(BaseModel):
+    location: str
+    department: Optional[str] = None
+    predicted_patients: ShiftMatrix  # as /api/predict/staff takes it, per shift
+
+
+class StaffAvailabilityModel(BaseModel):
+    location: str
+    role: str  # doctors, nurses or support
+    available: ShiftMatrix  # staff on hand per shift
+
+
+class StaffingOptimizationRequest(BaseModel):
+    start_date: str  # ISO format date string
+    days: int = Field(7, ge=1, le=StaffingOptimizer.MAX_DAYS)
+    demand: List[OptimizerDemandModel] = Field(..., min_length=1)
+    availability: List[StaffAvailabilityModel]
+    transfer_cost: float = Field(StaffingOptimizer.TRANSFER_COST, ge=0)  # per staff-shift moved
+    transfer_costs: Optional[Dict[str, Dict[str, Optional[float]]]] = None  # {from: {to: cost or null}}
+    unmet_cost: float = Field(StaffingOptimizer.UNMET_COST, ge=0)  # per staff-shift left uncovered
+
+
+ResourceUnits = Dict[str, Annotated[int, Field(ge=0)]]
+
+
+class AllocationHospitalModel(BaseModel):
+    location: str
+    stock: ResourceUnits = Field(default_factory=dict)  # units on hand per resource
+    demand: ResourceUnits = Field(default_factory=dict)  # known demand per resource
+    reserve: ResourceUnits = Field(default_factory=dict)  # units never sent away
+    predictions: List[dict] = Field(default_factory=list)  # prediction results; their estimated_resources add demand
+    aqi: Optional[float] = Field(None, ge=0, le=500)  # adds a pollution prediction's resources
+    lat: Optional[float] = Field(None, ge=-90, le=90)  # defaults to the geo site's coordinates
+    lng: Optional[float] = Field(None, ge=-180, le=180)
+
+
+class ResourceAllocationRequest(BaseModel):
+    hospitals: List[AllocationHospitalModel] = Field(
+        ..., min_length=1, max_length=ResourceAllocator.MAX_HOSPITALS
+    )
+    resources: Optional[List[str]] = None  # default: every resource in a stock or demand
+    transfer_cost: float = Field(ResourceAllocator.TRANSFER_COST, ge=0)  # per unit moved
+    cost_per_km: float = Field(0.0, ge=0)  # per unit and km between hospitals
+    transfer_costs: Optional[Dict[str, Dict[str, Optional[float]]]] = None  # {from: {to: cost or null}}
+    resource_costs: Optional[Dict[str, float]] = None  # transfer cost multiplier per resource
+    unmet_cost: float = Field(ResourceAllocator.UNMET_COST, ge=0)  # per unit left short
+    unmet_costs: Optional[Dict[str, float]] = None  # per resource
+    use_current_aqi: bool = False  # hospitals without aqi take the AQI feed's reading
+
+
+class BatchPredictionRequest(BaseModel):
+    # Items are validated one by one so a bad item only fails its own slot
+    requests: List[dict] = Field(..., max_length=MAX_BATCH_SIZE)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    success: bool
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    success: bool
+    prediction_type: str
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'request'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def _validate_batch(
+    items: List[dict],
+    model: Type[BaseModel]
+) -> Tuple[List[Tuple[int, BaseModel]], dict]:
+    """Validate batch items individually, collecting per-index errors"""
+    valid = []
+    errors = {}
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            errors[index] = _format_validation_error(e)
+    return valid, errors
+
+
+def _fill_from_feed(item: PollutionPredictionRequest, current: dict) -> PollutionPredictionRequest:
+    return item.model_copy(update={
+        "aqi": current["aqi"],
+        "pm25": item.pm25 if item.pm25 is not None else current["pm25"],
+        "pm10": item.pm10 if item.pm10 is not None else current["pm10"]
+    })
+
+
+async def _fill_batch_aqi(
+    valid: List[Tuple[int, PollutionPredictionRequest]],
+    errors: dict
+) -> List[Tuple[int, PollutionPredictionRequest]]:
+    """Take missing aqi from the feed; items it has no reading for become errors"""
+    filled = []
+    for index, item in valid:
+        if item.aqi is None:
+            current = await current_aqi(item.location)
+            if current is None:
+                errors[index] = NO_CURRENT_AQI
+                continue
+            item = _fill_from_feed(item, current)
+        filled.append((index, item))
+    return filled
+
+
+def _build_batch_response(
+    prediction_type: str,
+    total: int,
+    valid: List[Tuple[int, BaseModel]],
+    results: List[dict],
+    errors: dict,
+    result_fields: dict
+) -> BatchPredictionResponse:
+    """Merge predictor output back into request order"""
+    slots = [None] * total
+    for index, message in errors.items():
+        slots[index] = BatchItemResult(index=index, success=False, error=message)
+    for (index, _), result in zip(valid, results):
+        if "error" in result:
+            slots[index] = BatchItemResult(index=index, success=False, error=result["error"])
+        else:
+            slots[index] = BatchItemResult(
+                index=index,
+                success=True,
+                result={"success": True, **result_fields, **result}
+            )
+    
+    failed = sum(1 for slot in slots if not slot.success)
+    return BatchPredictionResponse(
+        success=failed == 0,
+        prediction_type=prediction_type,
+        total=total,
+        succeeded=total - failed,
+        failed=failed,
+        results=slots
+    )
+
+
+# Batch endpoints read their own body so it can be JSON, Arrow IPC or Parquet
+BATCH_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": BatchPredictionRequest.model_json_schema()},
+            **{
+                media_type: {"schema": {"type": "string", "format": "binary"}}
+                for media_type in MEDIA_TYPES.values()
+            }
+        }
+    }
+}
+
+
+async def _negotiated_batch(request: Request, kind: str) -> Union[BatchPredictionRequest, Response]:
+    """
+    The JSON batch body, or the finished response when either side of the
+    exchange is columnar. Arrow IPC / Parquet bodies (by Content-Type) are
+    checked per column and scored as columns, answering in the Accept format
+    (the request's format by default; ``application/json`` gives columns as
+    lists). A JSON body with an Arrow/Parquet Accept is scored the same way.
+    """
+    input_format = columnar_format(request.headers.get("content-type"))
+    output_format = columnar_format(request.headers.get("accept"))
+    body = await request.body()
+    if input_format is None and output_format is None:
+        try:
+            return await run_in_threadpool(BatchPredictionRequest.model_validate_json, body)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors()]
+            )
+    
+    if input_format is None:
+        try:
+            body = await run_in_threadpool(_json_batch_to_arrow, body)
+        except (ValueError, TypeError, pa.ArrowException) as e:
+            raise HTTPException(status_code=422, detail=f"requests: {e}")
+        input_format = "arrow"
+    if output_format is None:
+        accept = request.headers.get("accept") or ""
+        output_format = "json" if "application/json" in accept else input_format
+    try:
+        content, rows = await prediction_executor.run(
+            "columnar", "score", kind, body, input_format, output_format, MAX_COLUMNAR_ROWS
+        )
+    except ExecutorSaturated:
+        raise
+    except SchemaError as e:
+        raise HTTPException(status_code=422, detail={"message": "invalid columns", "columns": e.problems})
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(
+        content,
+        media_type=MEDIA_TYPES.get(output_format, "application/json"),
+        headers={"X-Row-Count": str(rows)}
+    )
+
+
+def _json_batch_to_arrow(body: bytes) -> bytes:
+    data = json.loads(body)
+    if not isinstance(data, dict) or "requests" not in data:
+        raise ValueError("field required in a JSON object body")
+    requests = data["requests"]
+    if not isinstance(requests, list) or not all(isinstance(item, dict) for item in requests):
+        raise ValueError("expected a list of objects")
+    return write_table(pa.Table.from_pylist(requests), "arrow")
+
+
+def _render_batch_response(*args) -> Response:
+    """
+    Build and serialize a batch response. Called through the threadpool so
+    large batches are encoded off the event loop.
+    """
+    return Response(
+        _build_batch_response(*args).model_dump_json(),
+        media_type="application/json"
+    )
+
+
+@router.get("/")
 async def root():
     return {
         "service": "Hospital Prediction Service",
         "status": "running",
         "version": "1.0.0",
+        "prediction_mode": PREDICTION_MODE,
         "endpoints": {
             "festival_prediction": "/api/predict/festival",
             "pollution_prediction": "/api/predict/pollution",
             "staff_forecast": "/api/predict/staff",
-            "health": "/health"
+            "festival_batch": "/api/predict/festival/batch",
+            "pollution_batch": "/api/predict/pollution/batch",
+            "staff_batch": "/api/predict/staff/batch",
+            "festival_timeline": "/api/predict/festival/timeline",
+            "forecast_stream": "/api/predict/stream",
+            "materialized_forecast": "/api/predict/materialized",
+            "staff_coverage": "/api/predict/staff/coverage",
+            "staff_optimization": "/api/predict/staff/optimize",
+            "resource_allocation": "/api/resources/allocate",
+            "pollution_forecast": "/api/predict/pollution/forecast",
+            "pollution_forecast_upload": "/api/predict/pollution/forecast/upload",
+            "pollution_grid": "/api/predict/pollution/grid",
+            "geo_sites": "/api/geo/sites",
+            "festival_simulation": "/api/predict/festival/simulate",
+            "pollution_simulation": "/api/predict/pollution/simulate",
+            "combined_simulation": "/api/predict/combined/simulate",
+            "aqi_current": "/api/aqi/current",
+            "combined_subscription": "/api/subscribe/combined (WebSocket)",
+            "combined_subscription_sse": "/api/subscribe/combined/sse",
+            "subscription_stats": "/api/subscribe/stats",
+            "cache_stats": "/api/cache/stats",
+            "executor_stats": "/api/executor/stats",
+            "metrics": "/metrics",
+            "models": "/api/models",
+            "rules": "/api/rules",
+            "profiles": "/api/profiles",
+            "history_ingest": "/api/history/ingest",
+            "history_baselines": "/api/history/baselines",
+            "startup": "/api/startup",
+            "health": "/health",
+            "readiness": "/health/ready"
         }
     }
 
 
-@app.get("/health")
+@router.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    # Answered on the event loop; predictor work never blocks it. Live while
+    # warming up ("starting"); 503 only when startup failed
+    if startup_report.status == "failed":
+        return JSONResponse(
+            status_code=503,
+            content={"status": "failed", "error": startup_report.error, "timestamp": datetime.now().isoformat()}
+        )
+    health = {
+        "status": "healthy" if startup_report.ready else "starting",
+        "timestamp": datetime.now().isoformat()
+    }
+    if startup_report.ready:
+        executor_stats = prediction_executor.stats()
+        health["executor"] = {
+            "mode": executor_stats["mode"],
+            "queue_depth": executor_stats["queue_depth"],
+            "running": executor_stats["running"]
+        }
+    return health
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """
+    200 once predictors are built and warmed up, 503 before (for load
+    balancer / autoscaler readiness probes)
+    """
+    if not startup_report.ready:
+        return JSONResponse(status_code=503, content={"status": startup_report.status, "error": startup_report.error})
+    return {"status": "ready", "ready_ms": startup_report.describe()["ready_ms"]}
+
+
+@router.get("/api/startup")
+async def get_startup_report():
+    """
+    Time from process start to import, each startup step, lazily imported
+    libraries, readiness and the first request served
+    """
+    return startup_report.describe()
 
 
-@app.post("/api/predict/festival", response_model=PredictionResponse)
+@router.post("/api/predict/festival", response_model=PredictionResponse)
 async def predict_festival_surge(request: FestivalPredictionRequest):
     """
     Predict patient inflow during festivals
     """
     try:
-        result = festival_predictor.predict(
+        result = await predict_festival_cached(
             festival_name=request.festival_name,
             start_date=request.start_date,
             end_date=request.end_date,
@@ -120,44 +822,57 @@ async def predict_festival_surge(request: FestivalPredictionRequest):
             prediction_type="festival_surge",
             **result
         )
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/predict/pollution", response_model=PredictionResponse)
+@router.post("/api/predict/pollution", response_model=PredictionResponse)
 async def predict_pollution_surge(request: PollutionPredictionRequest):
     """
     Predict surge risk based on pollution levels (AQI)
     """
+    current = None
+    if request.aqi is None:
+        current = await current_aqi(request.location)
+        if current is None:
+            raise HTTPException(status_code=422, detail=NO_CURRENT_AQI)
+        request = _fill_from_feed(request, current)
     try:
-        result = pollution_predictor.predict(
+        result = await predict_pollution_cached(
             aqi=request.aqi,
             pm25=request.pm25,
             pm10=request.pm10,
             location=request.location,
             date=request.date
         )
+        if current is not None:
+            result = _with_feed_factors(result, current)
         
         return PredictionResponse(
             success=True,
             prediction_type="pollution_surge",
             **result
         )
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/predict/staff", response_model=StaffForecastResponse)
+@router.post("/api/predict/staff", response_model=StaffForecastResponse)
 async def forecast_staff_requirements(request: StaffForecastRequest):
     """
     Forecast staff requirements based on predicted patient inflow
     """
     try:
-        result = staff_forecaster.forecast(
+        result = await forecast_staff_cached(
             predicted_patients=request.predicted_patient_inflow,
             current_staff=request.current_staff_count,
             department=request.department,
-            shift_type=request.shift_type
+            shift_type=request.shift_type,
+            location=request.location
         )
         
         return StaffForecastResponse(
@@ -165,11 +880,541 @@ async def forecast_staff_requirements(request: StaffForecastRequest):
             forecast_type="staff_requirement",
             **result
         )
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post(
+    "/api/predict/festival/batch",
+    response_model=BatchPredictionResponse,
+    openapi_extra=BATCH_OPENAPI
+)
+async def predict_festival_surge_batch(http_request: Request):
+    """
+    Predict patient inflow for a list of festival windows
+    """
+    request = await _negotiated_batch(http_request, "festival")
+    if isinstance(request, Response):
+        return request
+    try:
+        prediction_executor.admit()
+        valid, errors = await run_in_threadpool(
+            _validate_batch, request.requests, FestivalPredictionRequest
+        )
+        results = await prediction_executor.run("festival", "predict_many", [
+            {
+                "festival_name": item.festival_name,
+                "start_date": item.start_date,
+                "end_date": item.end_date,
+                "intensity": item.festival_intensity,
+                "historical_data": item.historical_data or _stored_history(
+                    item.festival_name, item.start_date, item.end_date, item.location
+                ),
+                "location": item.location
+            }
+            for _, item in valid
+        ])
+        
+        return await run_in_threadpool(
+            _render_batch_response,
+            "festival_surge", len(request.requests), valid, results, errors,
+            {"prediction_type": "festival_surge"}
+        )
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post(
+    "/api/predict/pollution/batch",
+    response_model=BatchPredictionResponse,
+    openapi_extra=BATCH_OPENAPI
+)
+async def predict_pollution_surge_batch(http_request: Request):
+    """
+    Predict surge risk for a list of AQI readings
+    """
+    request = await _negotiated_batch(http_request, "pollution")
+    if isinstance(request, Response):
+        return request
+    try:
+        prediction_executor.admit()
+        valid, errors = await run_in_threadpool(
+            _validate_batch, request.requests, PollutionPredictionRequest
+        )
+        valid = await _fill_batch_aqi(valid, errors)
+        results = await prediction_executor.run("pollution", "predict_many", [
+            {
+                "aqi": item.aqi,
+                "pm25": item.pm25,
+                "pm10": item.pm10,
+                "location": item.location,
+                "date": item.date
+            }
+            for _, item in valid
+        ])
+        
+        return await run_in_threadpool(
+            _render_batch_response,
+            "pollution_surge", len(request.requests), valid, results, errors,
+            {"prediction_type": "pollution_surge"}
+        )
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/predict/combined")
+@router.post(
+    "/api/predict/staff/batch",
+    response_model=BatchPredictionResponse,
+    openapi_extra=BATCH_OPENAPI
+)
+async def forecast_staff_requirements_batch(http_request: Request):
+    """
+    Forecast staff requirements for a list of departments/shifts
+    """
+    request = await _negotiated_batch(http_request, "staff")
+    if isinstance(request, Response):
+        return request
+    try:
+        prediction_executor.admit()
+        valid, errors = await run_in_threadpool(
+            _validate_batch, request.requests, StaffForecastRequest
+        )
+        results = await prediction_executor.run("staff", "forecast_many", [
+            {
+                "predicted_patients": item.predicted_patient_inflow,
+                "current_staff": item.current_staff_count,
+                "department": item.department,
+                "shift_type": item.shift_type,
+                "location": item.location
+            }
+            for _, item in valid
+        ])
+        
+        return await run_in_threadpool(
+            _render_batch_response,
+            "staff_requirement", len(request.requests), valid, results, errors,
+            {"forecast_type": "staff_requirement"}
+        )
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/predict/festival/timeline")
+async def predict_festival_timeline(request: FestivalTimelineRequest):
+    """
+    Daily festival surge series across overlapping festival windows
+    """
+    try:
+        tables, rules_version = festival_predictor.rules_for(request.location)
+        calendar = festival_calendar
+        if request.festivals is not None:
+            calendar = FestivalCalendar(
+                [window.model_dump() for window in request.festivals],
+                festival_predictor.surge_multiplier
+            )
+        timeline = calendar.timeline(request.start_date, request.end_date, tables.surge_multiplier)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        base_patients = request.base_daily_patients
+        if base_patients is None and request.location:
+            baselines = baseline_store.baselines(request.location, as_of=request.start_date)
+            if baselines:
+                base_patients = baselines[f"mean_{baseline_store.window_days}d"]
+        base_patients = base_patients or tables.BASE_DAILY_PATIENTS
+        multipliers = timeline["surge_multiplier"]
+        predicted = (base_patients * multipliers).astype(np.int64)
+        risk_index = np.searchsorted(tables.RISK_BREAKPOINTS, multipliers, side="right")
+        
+        active_festivals = [[] for _ in range(len(multipliers))]
+        for window, first, stop, _ in timeline["active_windows"]:
+            for offset in range(first, stop):
+                active_festivals[offset].append(window.festival_name)
+        
+        peak = int(np.argmax(multipliers))
+        dates = timeline["dates"].astype(str).tolist()
+        return {
+            "success": True,
+            "prediction_type": "festival_timeline",
+            "start_date": dates[0],
+            "end_date": dates[-1],
+            "base_daily_patients": base_patients,
+            "total_predicted_inflow": int(predicted.sum()),
+            "peak": {"date": dates[peak], "surge_multiplier": float(multipliers[peak])},
+            "festivals": [
+                {
+                    "festival_name": window.festival_name,
+                    "start_date": window.start.isoformat(),
+                    "end_date": window.end.isoformat(),
+                    "intensity": window.intensity,
+                    "surge_multiplier": multiplier
+                }
+                for window, _, _, multiplier in timeline["active_windows"]
+            ],
+            "days": [
+                {
+                    "date": day,
+                    "surge_multiplier": multiplier,
+                    "predicted_inflow": inflow,
+                    "risk_level": tables.RISK_LEVELS[risk],
+                    "active_festivals": names
+                }
+                for day, multiplier, inflow, risk, names in zip(
+                    dates,
+                    multipliers.tolist(),
+                    predicted.tolist(),
+                    risk_index.tolist(),
+                    active_festivals
+                )
+            ],
+            "location": request.location,
+            **({"rules_version": rules_version} if rules_version is not None else {})
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/predict/staff/coverage")
+async def staff_coverage(request: StaffCoverageRequest):
+    """
+    Hour-by-hour roster coverage and staffing gaps per department and role
+    """
+    try:
+        result = await prediction_executor.run(
+            "coverage",
+            "coverage",
+            shifts=request.shifts,
+            demand=[item.model_dump() for item in request.demand],
+            start_date=request.start_date,
+            days=request.days,
+            include_hourly=request.include_hourly
+        )
+        # Large plain-JSON results skip the field-by-field response encoder
+        return await run_in_threadpool(JSONResponse, result)
+    except ExecutorSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/predict/staff/optimize")
+async def optimize_staffing(request: StaffingOptimizationRequest):
+    """
+    Minimum-cost staff allocation across departments, shifts and hospitals
+    """
+    try:
+        result = await prediction_executor.run(
+            "optimizer",
+            "optimize",
+            demand=[item.model_dump() for item in request.demand],
+            availability=[item.model_dump() for item in request.availability],
+            start_date=request.start_date,
+            days=request.days,
+            transfer_cost=request.transfer_cost,
+            transfer_costs=request.transfer_costs,
+            unmet_cost=request.unmet_cost
+        )
+        # Large plain-JSON results skip the field-by-field response encoder
+        return await run_in_threadpool(JSONResponse, result)
+    except ExecutorSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/resources/allocate")
+async def allocate_resources(request: ResourceAllocationRequest):
+    """
+    Minimum-cost redistribution of beds, oxygen, nebulizers, ventilators and
+    ambulances between hospitals, given stock and predicted demand
+    """
+    hospitals = [item.model_dump() for item in request.hospitals]
+    if request.use_current_aqi:
+        for item in hospitals:
+            if item["aqi"] is None:
+                current = await current_aqi(item["location"])
+                if current is not None:
+                    item["aqi"] = current["aqi"]
+    try:
+        result = await prediction_executor.run(
+            "allocator",
+            "allocate",
+            hospitals=hospitals,
+            **request.model_dump(exclude={"hospitals", "use_current_aqi"})
+        )
+        return await run_in_threadpool(JSONResponse, result)
+    except ExecutorSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/predict/pollution/forecast")
+async def forecast_pollution(request: PollutionForecastRequest):
+    """
+    Per-station, per-day AQI and inflow forecasts from station history
+    """
+    try:
+        result = await prediction_executor.run(
+            "air_quality",
+            "forecast",
+            stations=[station.model_dump() for station in request.stations],
+            horizon_days=request.horizon_days,
+            model=request.model
+        )
+        return await run_in_threadpool(JSONResponse, result)
+    except ExecutorSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/predict/pollution/forecast/upload")
+async def forecast_pollution_upload(
+    file: UploadFile = File(...),
+    horizon_days: int = 7,
+    model: str = "auto",
+    format: Optional[str] = None
+):
+    """
+    AQI and inflow forecasts from a CSV or Parquet file of station readings
+    """
+    file_format = format
+    if file_format is None:
+        filename = (file.filename or "").lower()
+        if filename.endswith((".parquet", ".pq")) or "parquet" in (file.content_type or ""):
+            file_format = "parquet"
+        else:
+            file_format = "csv"
+    try:
+        # Parsed from the spooled upload in chunks, so it runs here rather than in a worker process
+        result = await run_in_threadpool(
+            predictors["air_quality"].forecast_upload,
+            file.file,
+            file_format.lower(),
+            horizon_days,
+            model
+        )
+        return await run_in_threadpool(JSONResponse, result)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await file.close()
+
+
+GEO_NOT_CONFIGURED = "Geo sites are not configured (GEO_SITES_PATH)"
+
+
+@router.post("/api/predict/pollution/grid")
+async def predict_pollution_grid(request: PollutionGridRequest):
+    """
+    Pollution surge for every hospital, ward or given point, interpolated
+    from the nearest monitoring stations' readings
+    """
+    if geo_grid is None:
+        raise HTTPException(status_code=404, detail=GEO_NOT_CONFIGURED)
+    try:
+        result = await prediction_executor.run(
+            "geo",
+            "score",
+            readings=[reading.model_dump() for reading in request.readings],
+            targets=request.targets,
+            points=[point.model_dump() for point in request.points or []],
+            k=request.neighbours,
+            power=request.power,
+            max_distance_km=request.max_distance_km
+        )
+        return await run_in_threadpool(JSONResponse, result)
+    except ExecutorSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/api/geo/sites")
+async def get_geo_sites(neighbours: int = 3):
+    """Hospitals, wards and stations with each hospital's nearest stations"""
+    if geo_grid is None:
+        raise HTTPException(status_code=404, detail=GEO_NOT_CONFIGURED)
+    return geo_grid.geo.describe(max(1, min(neighbours, 32)))
+
+
+@router.post("/api/predict/festival/simulate")
+async def simulate_festival_surge(request: FestivalSimulationRequest):
+    """
+    Monte Carlo festival inflow: p50/p90/p99 instead of a point estimate
+    """
+    try:
+        return await prediction_executor.run(
+            "simulator",
+            "festival",
+            festival_name=request.festival_name,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            intensity=request.festival_intensity,
+            historical_data=request.historical_data or _stored_history(
+                request.festival_name, request.start_date, request.end_date, request.location
+            ),
+            location=request.location,
+            samples=request.samples,
+            seed=request.seed,
+            multiplier_sigma=request.multiplier_sigma,
+            base_patients_cv=request.base_patients_cv
+        )
+    except ExecutorSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/predict/pollution/simulate")
+async def simulate_pollution_surge(request: PollutionSimulationRequest):
+    """
+    Monte Carlo pollution inflow around an uncertain AQI reading
+    """
+    try:
+        return await prediction_executor.run(
+            "simulator",
+            "pollution",
+            aqi=request.aqi,
+            location=request.location,
+            samples=request.samples,
+            seed=request.seed,
+            aqi_sigma=request.aqi_sigma
+        )
+    except ExecutorSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/predict/combined/simulate")
+async def simulate_combined_surge(request: CombinedSimulationRequest):
+    """
+    Monte Carlo combined inflow, with optionally correlated festival and AQI draws
+    """
+    try:
+        festival = None
+        if request.festival is not None:
+            window = request.festival
+            festival = {
+                "festival_name": window.festival_name,
+                "start_date": window.start_date,
+                "end_date": window.end_date,
+                "intensity": window.festival_intensity,
+                "historical_data": request.historical_data or _stored_history(
+                    window.festival_name, window.start_date, window.end_date, request.location
+                )
+            }
+        return await prediction_executor.run(
+            "simulator",
+            "combined",
+            festival=festival,
+            aqi=request.aqi,
+            location=request.location,
+            samples=request.samples,
+            seed=request.seed,
+            multiplier_sigma=request.multiplier_sigma,
+            base_patients_cv=request.base_patients_cv,
+            aqi_sigma=request.aqi_sigma,
+            correlation=request.correlation
+        )
+    except ExecutorSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/predict/stream")
+async def stream_forecast(request: ForecastStreamRequest):
+    """
+    Stream combined forecasts per (date, location, department) as NDJSON
+    """
+    try:
+        calendar = festival_calendar
+        if request.festivals is not None:
+            calendar = FestivalCalendar(
+                [window.model_dump() for window in request.festivals],
+                festival_predictor.surge_multiplier
+            )
+        start = datetime.fromisoformat(request.start_date.replace('Z', '+00:00')).date()
+        end = start + timedelta(days=request.horizon_days - 1)
+        # One timeline per set of festival rules among the locations
+        timelines, by_tables, base_daily_patients = {}, {}, {}
+        for location in request.locations:
+            tables, _ = festival_predictor.rules_for(location)
+            if tables not in by_tables:
+                by_tables[tables] = calendar.timeline(start.isoformat(), end.isoformat(), tables.surge_multiplier)
+            timelines[location] = by_tables[tables]
+            base_daily_patients[location] = request.base_daily_patients or tables.BASE_DAILY_PATIENTS
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    # festival -> pollution -> staff, one row at a time
+    rows = forecast_rows(
+        start.isoformat(), request.horizon_days, request.locations, request.departments
+    )
+    rows = with_festival_surge(rows, timelines, base_daily_patients)
+    # Locations without an aqi take the feed's current reading
+    aqi_by_location = dict(request.aqi)
+    for location in request.locations:
+        if location not in aqi_by_location:
+            current = await current_aqi(location)
+            if current is not None:
+                aqi_by_location[location] = current["aqi"]
+    # One pollution prediction per location, made before the first row is sent
+    polluted = [location for location in request.locations if location in aqi_by_location]
+    results = await prediction_executor.run("pollution", "predict_many", [
+        {"aqi": aqi_by_location[location], "location": location}
+        for location in polluted
+    ]) if polluted else []
+    predictions = {}
+    for location, result in zip(polluted, results):
+        if "error" in result:
+            raise HTTPException(status_code=422, detail=f"{location}: {result['error']}")
+        predictions[location] = result
+    rows = with_pollution_surge(rows, predictions)
+    # The pipeline is iterated in Starlette's threadpool; each staff chunk is
+    # handed back to the event loop so it goes through the prediction executor
+    rows = with_staff_requirements(
+        rows,
+        lambda requests: anyio.from_thread.run(
+            prediction_executor.run, "staff", "forecast_many", requests
+        ),
+        request.shift_type
+    )
+    
+    return StreamingResponse(to_ndjson(rows), media_type="application/x-ndjson")
+
+
+@router.get("/api/predict/combined")
 async def get_combined_prediction(
     festival_name: Optional[str] = None,
     festival_start: Optional[str] = None,
@@ -182,53 +1427,762 @@ async def get_combined_prediction(
     Get combined prediction considering both festival and pollution factors
     """
     try:
-        predictions = {}
-        total_predicted_inflow = 0
-        all_recommendations = []
-        
-        # Festival prediction
-        if festival_name and festival_start and festival_end and festival_intensity:
-            festival_result = festival_predictor.predict(
-                festival_name=festival_name,
-                start_date=festival_start,
-                end_date=festival_end,
-                intensity=festival_intensity,
-                location=location
-            )
-            predictions["festival"] = festival_result
-            total_predicted_inflow += festival_result["predicted_inflow"]
-            all_recommendations.extend(festival_result.get("recommendations", []))
-        
-        # Pollution prediction
-        if aqi is not None:
-            pollution_result = pollution_predictor.predict(
-                aqi=aqi,
-                location=location
-            )
-            predictions["pollution"] = pollution_result
-            total_predicted_inflow += pollution_result["predicted_inflow"]
-            all_recommendations.extend(pollution_result.get("recommendations", []))
-        
-        # Staff forecast based on combined inflow
-        staff_result = None
-        if total_predicted_inflow > 0:
-            staff_result = staff_forecaster.forecast(
-                predicted_patients=total_predicted_inflow
+        current = await current_aqi(location) if aqi is None else None
+        if current is not None:
+            aqi = current["aqi"]
+        key = combined_key(
+            festival_name, festival_start, festival_end,
+            festival_intensity, canonical_aqi(aqi) if aqi is not None else None, location
+        )
+        result = prediction_cache.get("combined", key)
+        if result is MISSING:
+            generation = prediction_cache.generation("combined")
+            result = await _compute_combined_prediction(
+                festival_name, festival_start, festival_end,
+                festival_intensity, aqi, location
             )
-            predictions["staff"] = staff_result
-            all_recommendations.extend(staff_result.get("recommendations", []))
-        
-        return {
-            "success": True,
-            "combined_predicted_inflow": total_predicted_inflow,
-            "predictions": predictions,
-            "all_recommendations": list(set(all_recommendations))  # Remove duplicates
+            prediction_cache.set("combined", key, result, generation)
+        result = with_combined_festival_name(result, festival_name)
+        if current is not None:
+            result = {
+                **result,
+                "aqi_source": {
+                    field: current[field] for field in ("aqi_source", "aqi_observed_at", "aqi_stale")
+                }
+            }
+        return result
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _compute_combined_prediction(
+    festival_name: Optional[str],
+    festival_start: Optional[str],
+    festival_end: Optional[str],
+    festival_intensity: Optional[str],
+    aqi: Optional[float],
+    location: Optional[str],
+    department: Optional[str] = None
+) -> dict:
+    predictions = {}
+    total_predicted_inflow = 0
+    all_recommendations = []
+    
+    # Festival prediction
+    if festival_name and festival_start and festival_end and festival_intensity:
+        festival_result = await predict_festival_cached(
+            festival_name=festival_name,
+            start_date=festival_start,
+            end_date=festival_end,
+            intensity=festival_intensity,
+            location=location
+        )
+        predictions["festival"] = festival_result
+        total_predicted_inflow += festival_result["predicted_inflow"]
+        all_recommendations.extend(festival_result.get("recommendations", []))
+    
+    # Pollution prediction
+    if aqi is not None:
+        pollution_result = await predict_pollution_cached(
+            aqi=aqi,
+            location=location
+        )
+        predictions["pollution"] = pollution_result
+        total_predicted_inflow += pollution_result["predicted_inflow"]
+        all_recommendations.extend(pollution_result.get("recommendations", []))
+    
+    # Staff forecast based on combined inflow
+    staff_result = None
+    if total_predicted_inflow > 0:
+        staff_result = await forecast_staff_cached(
+            predicted_patients=total_predicted_inflow,
+            department=department,
+            location=location
+        )
+        predictions["staff"] = staff_result
+        all_recommendations.extend(staff_result.get("recommendations", []))
+    
+    return {
+        "success": True,
+        "combined_predicted_inflow": total_predicted_inflow,
+        "predictions": predictions,
+        "all_recommendations": list(set(all_recommendations))  # Remove duplicates
+    }
+
+
+@router.get("/api/aqi/current")
+async def get_current_aqi(location: Optional[str] = None):
+    """
+    The AQI feed's status and readings, or the reading used for one location
+    """
+    if aqi_feed is None:
+        raise HTTPException(status_code=404, detail="AQI feed is not configured")
+    if location is not None:
+        current = await current_aqi(location)
+        if current is None:
+            raise HTTPException(status_code=404, detail=f"No current AQI for {location!r}")
+        return {"location": location, **current}
+    return {
+        "feed": aqi_feed.stats(),
+        "readings": [
+            {
+                "location": reading.location,
+                "aqi": reading.aqi,
+                "pm25": reading.pm25,
+                "pm10": reading.pm10,
+                "observed_at": reading.observed_at,
+                "stale": aqi_feed.is_stale(reading)
+            }
+            for reading in aqi_feed.readings()
+        ]
+    }
+
+
+def _interest_inputs(interest: CombinedInterest) -> Optional[float]:
+    # The only input that moves on its own; the rest is the interest itself
+    if interest.aqi is not None:
+        return canonical_aqi(interest.aqi)
+    if aqi_feed is None or not interest.location:
+        return None
+    reading = aqi_feed.latest(interest.location)
+    if reading is not None:
+        return canonical_aqi(reading.aqi)
+    if geo_grid is None:
+        return None
+    # Interpolated in _interest_state; a refresh or an expiry may move it
+    return aqi_feed.version, len(_station_readings())
+
+
+async def _interest_state(interest: CombinedInterest) -> dict:
+    current = await current_aqi(interest.location) if interest.aqi is None else None
+    aqi = current["aqi"] if current is not None else interest.aqi
+    result = await _compute_combined_prediction(
+        interest.festival_name, interest.festival_start, interest.festival_end,
+        interest.festival_intensity, aqi,
+        interest.location, interest.department
+    )
+    if current is not None:
+        result["aqi_source"] = {
+            field: current[field] for field in ("aqi_source", "aqi_observed_at", "aqi_stale")
         }
+    return result
+
+
+def _interest_key(interest: CombinedInterest) -> tuple:
+    return tuple(interest.model_dump().values())
+
+
+# Combined predictions pushed to subscribers; one computation per distinct
+# interest, redone only when its AQI changes or predictors/history do
+subscription_hub = SubscriptionHub(
+    _interest_state,
+    _interest_inputs,
+    check_interval=float(os.getenv("SUBSCRIPTION_CHECK_INTERVAL", "60"))
+)
+SSE_KEEPALIVE = float(os.getenv("SUBSCRIPTION_SSE_KEEPALIVE", "15"))
+
+# Combined forecasts precomputed per (date, location, department) into a
+# memory-mapped file that every worker shares; rebuilt every
+# FORECAST_STORE_INTERVAL seconds (0 leaves it to
+# scripts/materialize_forecasts.py) and after model swaps or history ingest
+forecast_store = ForecastStore(
+    os.getenv(
+        "FORECAST_STORE_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "forecast_store.bin")
+    ),
+    check_interval=float(os.getenv("FORECAST_STORE_CHECK_INTERVAL", "5"))
+)
+
+
+async def _current_aqi_value(location: str) -> Optional[float]:
+    current = await current_aqi(location)
+    return current["aqi"] if current is not None else None
+
+
+# Built with the predictors in _build_services()
+forecast_materializer = None
+
+
+def _on_first_aqi_refresh() -> None:
+    # A build at startup usually runs before the feed's first readings arrive
+    if aqi_feed.refreshes == 1:
+        forecast_materializer.request()
+
+
+@router.websocket("/api/subscribe/combined")
+async def subscribe_combined_ws(websocket: WebSocket):
+    """
+    Combined predictions pushed as they change. Send an interest as JSON
+    (again to change it); the first message back is a snapshot, then deltas.
+    """
+    await websocket.accept()
+    subscriber = Subscriber()
+    
+    async def receive():
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                await subscriber.queue.put({"type": "error", "detail": "request: Input should be a valid dictionary"})
+                continue
+            if message.get("action") == "unsubscribe":
+                subscription_hub.unsubscribe(subscriber)
+                continue
+            try:
+                interest = CombinedInterest.model_validate(message.get("interest", message))
+            except ValidationError as e:
+                await subscriber.queue.put({"type": "error", "detail": _format_validation_error(e)})
+                continue
+            await subscription_hub.subscribe(subscriber, _interest_key(interest), interest)
+    
+    async def send():
+        while True:
+            await websocket.send_json(await subscriber.queue.get())
+    
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            try:
+                task.result()
+            except (WebSocketDisconnect, RuntimeError, ValueError):
+                # Closed by the client, or it sent something that is not JSON
+                pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        subscription_hub.unsubscribe(subscriber)
+
+
+@router.get("/api/subscribe/combined/sse")
+async def subscribe_combined_sse(
+    location: Optional[str] = None,
+    department: Optional[str] = None,
+    festival_name: Optional[str] = None,
+    festival_start: Optional[str] = None,
+    festival_end: Optional[str] = None,
+    festival_intensity: Optional[str] = None,
+    aqi: Optional[float] = None
+):
+    """
+    Combined predictions as Server-Sent Events: a snapshot event, then deltas
+    """
+    try:
+        interest = CombinedInterest(
+            location=location,
+            department=department,
+            festival_name=festival_name,
+            festival_start=festival_start,
+            festival_end=festival_end,
+            festival_intensity=festival_intensity,
+            aqi=aqi
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=_format_validation_error(e))
+    subscriber = Subscriber()
+    await subscription_hub.subscribe(subscriber, _interest_key(interest), interest)
+    
+    async def events():
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            subscription_hub.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/api/subscribe/stats")
+async def get_subscription_stats():
+    """Topics, subscribers and how many recomputations were pushed or skipped"""
+    return subscription_hub.stats()
+
+
+@router.get("/api/predict/materialized")
+async def get_materialized_forecast(
+    location: str,
+    day: str = Query(..., alias="date"),
+    department: Optional[str] = None
+):
+    """
+    Precomputed combined forecast for one date, location and department
+    """
+    try:
+        result = forecast_store.lookup(day, location, department)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="No forecasts have been materialized yet")
+    return result
+
+
+@router.get("/api/predict/materialized/stats")
+async def get_materialized_stats():
+    """
+    Key space and age of the forecast store, and the rebuild schedule
+    """
+    return {"store": forecast_store.describe(), "schedule": forecast_materializer.stats()}
+
+
+@router.get("/api/cache/stats")
+async def get_cache_stats():
+    """
+    Hit/miss/eviction counters for every prediction cache
+    """
+    return prediction_cache.stats()
+
+
+@router.post("/api/cache/invalidate")
+async def invalidate_cache(namespace: Optional[str] = None):
+    """
+    Drop cached predictions for one namespace, or for all of them
+    """
+    try:
+        dropped = prediction_cache.invalidate(namespace)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown cache namespace '{namespace}'. "
+                   f"Expected one of: {', '.join(prediction_cache.namespaces)}"
+        )
+    return {"success": True, "invalidated": dropped}
+
+
+def _collect_service_metrics():
+    """Counters the executor, cache and startup report already keep, read at scrape time"""
+    yield "prediction_ready", "gauge", "1 once predictors are built and warmed up", [
+        ({}, 1 if startup_report.ready else 0)
+    ]
+    if prediction_executor is not None:
+        stats = prediction_executor.stats()
+        yield "prediction_executor_queue_depth", "gauge", "Predictor calls waiting for a worker", [
+            ({}, stats["queue_depth"])
+        ]
+        yield "prediction_executor_running", "gauge", "Predictor calls running", [({}, stats["running"])]
+        for name in ("completed", "failed", "rejected", "timed_out"):
+            yield f"prediction_executor_{name}_total", "counter", f"Predictor calls {name.replace('_', ' ')}", [
+                ({}, stats[name])
+            ]
+    caches = prediction_cache.stats()["caches"]
+    for name in ("hits", "misses", "evictions", "expirations"):
+        yield f"prediction_cache_{name}_total", "counter", f"Prediction cache {name} by namespace", [
+            ({"namespace": namespace}, cache[name]) for namespace, cache in caches.items()
+        ]
+    yield "prediction_cache_size", "gauge", "Cached predictions by namespace", [
+        ({"namespace": namespace}, cache["size"]) for namespace, cache in caches.items()
+    ]
+
+
+service_metrics.registry.add_collector(_collect_service_metrics)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Route and predictor latency histograms, request/error counters,
+    in-flight gauges and payload sizes in Prometheus text format
+    """
+    return Response(service_metrics.render(), media_type=MetricsRegistry.CONTENT_TYPE)
+
+
+@router.get("/api/executor/stats")
+async def get_executor_stats():
+    """
+    Queue depth, wait times and rejection counters for the prediction executor
+    """
+    return prediction_executor.stats()
+
+
+@router.post("/api/history/ingest")
+async def ingest_history(file: UploadFile = File(...), format: Optional[str] = None):
+    """
+    Load daily admissions (CSV or Parquet) into the baseline store
+    """
+    file_format = format
+    if file_format is None:
+        filename = (file.filename or "").lower()
+        if filename.endswith((".parquet", ".pq")) or "parquet" in (file.content_type or ""):
+            file_format = "parquet"
+        else:
+            file_format = "csv"
+    try:
+        summary = await run_in_threadpool(baseline_store.ingest, file.file, file_format.lower())
+    except IngestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await file.close()
+    # Combined results embed festival baselines but are keyed without them
+    prediction_cache.invalidate("combined")
+    subscription_hub.invalidate()
+    forecast_materializer.request()
+    return {"success": True, **summary}
+
+
+@router.get("/api/history/baselines")
+async def get_history_baselines(
+    location: str,
+    department: Optional[str] = None,
+    as_of: Optional[str] = None
+):
+    """
+    Rolling 7/28/365-day mean daily admissions for a location (and department)
+    """
+    try:
+        baselines = baseline_store.baselines(location, department, as_of)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if baselines is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No admissions history for location '{location}'"
+                   + (f", department '{department}'" if department else "")
+        )
+    return {
+        "success": True,
+        "location": location,
+        "department": department,
+        "window_days": baseline_store.window_days,
+        **baselines
+    }
+
+
+@router.get("/api/history")
+async def get_history_summary():
+    """
+    Date range, series and locations held by the baseline store
+    """
+    return baseline_store.describe()
+
+
+@router.get("/api/profiles")
+async def list_profiles():
+    """
+    Profiler settings and the stored request profiles, newest first
+    """
+    return {"profiler": request_profiler.describe(), "profiles": request_profiler.store.list()}
+
 
+@router.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """
+    One profile's request, duration and hotspots
+    """
+    try:
+        return request_profiler.store.get(profile_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No profile '{profile_id}'")
+
+
+@router.get("/api/profiles/{profile_id}/download")
+async def download_profile(profile_id: str):
+    """
+    The profile's data file: collapsed stacks (sample mode) or pstats (cprofile mode)
+    """
+    try:
+        path, mode = request_profiler.store.data_path(profile_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No profile '{profile_id}'")
+    return FileResponse(
+        path,
+        media_type="text/plain" if mode == "sample" else "application/octet-stream",
+        filename=os.path.basename(path)
+    )
+
+
+@router.get("/api/profiles/{profile_id}/collapsed")
+async def get_profile_collapsed(profile_id: str):
+    """
+    Collapsed stacks (``frame;frame;frame count``) for flamegraph.pl,
+    speedscope or inferno
+    """
+    try:
+        return PlainTextResponse(await run_in_threadpool(request_profiler.store.collapsed, profile_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No profile '{profile_id}'")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/api/models")
+async def get_models():
+    """
+    Published model versions and the version each predictor has loaded
+    """
+    if model_registry is None:
+        raise HTTPException(status_code=404, detail="Models are not configured (PREDICTION_MODEL_DIR)")
+    return model_registry.describe()
+
+
+@router.post("/api/models/{name}/activate", dependencies=[Depends(require_admin)])
+async def activate_model(name: str, version: str):
+    """
+    Promote or roll back a model to an already published version
+    """
+    if model_registry is None:
+        raise HTTPException(status_code=404, detail="Models are not configured (PREDICTION_MODEL_DIR)")
+    try:
+        model_registry.activate(name, version)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Model '{name}' has no version '{version}'. "
+                   f"Published: {', '.join(model_registry.versions(name)) or 'none'}"
+        )
+    await run_in_threadpool(model_registry.reload, name)
+    return {"success": True, "name": name, "active_version": version}
+
+
+@router.get("/api/rules")
+async def get_rules():
+    """
+    Rule table files, the version each location answers with and load errors
+    """
+    if rule_tables is None:
+        raise HTTPException(status_code=404, detail="Rule tables are not configured (PREDICTION_RULES_DIR)")
+    return rule_tables.describe()
+
+
+@router.post("/api/rules/reload", dependencies=[Depends(require_admin)])
+async def reload_rules():
+    """
+    Re-read the rule table files now instead of waiting for the check interval
+    """
+    if rule_tables is None:
+        raise HTTPException(status_code=404, detail="Rule tables are not configured (PREDICTION_RULES_DIR)")
+    reloaded = await run_in_threadpool(rule_tables.reload)
+    return {"success": True, "reloaded": reloaded, **rule_tables.describe()}
+
+
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+async def _watch_models():
+    # Cached answers never reach the registry, so poll it here to notice swaps
+    while True:
+        await asyncio.sleep(model_registry.check_interval)
+        try:
+            await run_in_threadpool(model_registry.reload)
+        except Exception:
+            pass
+
+
+async def _watch_rules():
+    # Like _watch_models: cached answers never reach the rule tables
+    while True:
+        await asyncio.sleep(rule_tables.check_interval)
+        try:
+            await run_in_threadpool(rule_tables.reload)
+        except Exception:
+            pass
+
+
+def _build_services() -> None:
+    """
+    Build the predictors and everything that depends on them. Runs in a
+    worker thread at startup: this is where the heavy libraries get
+    imported and the precompiled tables, geo index and stores are built.
+    """
+    global predictors, festival_predictor, pollution_predictor, staff_forecaster, model_registry, rule_tables
+    global prediction_executor, festival_calendar, baseline_store, geo_grid, aqi_feed, _geo_stations
+    global forecast_materializer
+    from .services.aqi_feed import feed_from_env
+    from .services.executor import executor_from_env
+    from .services.targets import build_predictor_targets
+    
+    predictor_factory = functools.partial(
+        build_predictor_targets,
+        PREDICTION_MODE,
+        float(os.getenv("PRECOMPILED_CHECK_INTERVAL", "5")),
+        PREDICTION_MODEL_DIR,
+        float(os.getenv("PREDICTION_MODEL_CHECK_INTERVAL", "5")),
+        GEO_SITES_PATH,
+        PREDICTION_RULES_DIR,
+        float(os.getenv("PREDICTION_RULES_CHECK_INTERVAL", "5"))
+    )
+    with startup_report.step("predictors"):
+        targets = predictor_factory()
+    with startup_report.step("executor"):
+        prediction_executor = executor_from_env(predictor_factory, targets=targets)
+    if METRICS_ENABLED:
+        prediction_executor.observer = service_metrics.observe_predictor
+    festival_predictor = targets["festival"]
+    pollution_predictor = targets["pollution"]
+    staff_forecaster = targets["staff"]
+    model_registry = targets.get("models")
+    if model_registry is not None:
+        model_registry.on_swap = _on_model_swap
+    rule_tables = targets.get("rules")
+    if rule_tables is not None:
+        rule_tables.on_swap = _on_rules_swap
+    geo_grid = targets.get("geo")
+    station_ids = geo_grid.geo.station_ids if geo_grid is not None else []
+    _geo_stations = {station.lower(): station for station in station_ids}
+    
+    with startup_report.step("festival_calendar"):
+        festival_calendar = FestivalCalendar.from_file(
+            FESTIVAL_CALENDAR_PATH, festival_predictor.surge_multiplier
+        )
+    with startup_report.step("baseline_store"):
+        baseline_store = BaselineStore(
+            BASELINE_STORE_PATH,
+            window_days=int(os.getenv("BASELINE_WINDOW_DAYS", "28")),
+            check_interval=float(os.getenv("BASELINE_CHECK_INTERVAL", "5")),
+            date_window_years=int(os.getenv("BASELINE_DATE_WINDOW_YEARS", str(BaselineStore.DATE_WINDOW_YEARS)))
+        )
+    feed = feed_from_env(station_ids)
+    forecast_materializer = ForecastMaterializer(
+        forecast_store,
+        festival_calendar,
+        pollution_predictor,
+        staff_forecaster,
+        festival_predictor.rules_for(None)[0].BASE_DAILY_PATIENTS,
+        baseline_store=baseline_store,
+        locations=[
+            location.strip() for location in os.getenv("FORECAST_STORE_LOCATIONS", "").split(",") if location.strip()
+        ] or ([site.id for site in geo_grid.geo.sites["hospital"]] if geo_grid is not None else []),
+        departments=[
+            department.strip()
+            for department in os.getenv("FORECAST_STORE_DEPARTMENTS", "emergency,general,icu,opd").split(",")
+            if department.strip()
+        ],
+        horizon_days=int(os.getenv("FORECAST_STORE_HORIZON_DAYS", "90")),
+        interval=float(os.getenv("FORECAST_STORE_INTERVAL", "3600")),
+        aqi_source=_current_aqi_value,
+        festival_predictor=festival_predictor
+    )
+    if feed is not None:
+        feed.listeners.append(subscription_hub.notify)
+        feed.listeners.append(_on_first_aqi_refresh)
+    aqi_feed = feed
+    predictors = targets
+
+
+# One call per predictor before traffic arrives: first-call costs are paid
+# here, and process-mode workers are started and build their predictors
+WARMUP_CALLS = [
+    ("festival", "predict", {
+        "festival_name": "Diwali", "start_date": "2025-10-20", "end_date": "2025-10-24", "intensity": "high"
+    }),
+    ("pollution", "predict", {"aqi": 180.0}),
+    ("staff", "forecast", {"predicted_patients": 120, "department": "emergency", "shift_type": "night"})
+]
+
+
+async def _start_services(application: FastAPI) -> None:
+    """Build the services off the event loop, start their background tasks and warm up"""
+    await run_in_threadpool(_build_services)
+    with startup_report.step("background_tasks"):
+        if model_registry is not None:
+            application.state.model_watch = asyncio.create_task(_watch_models())
+        if rule_tables is not None:
+            application.state.rules_watch = asyncio.create_task(_watch_rules())
+        await subscription_hub.start()
+        if aqi_feed is not None:
+            await aqi_feed.start()
+        if forecast_materializer.interval > 0:
+            await forecast_materializer.start()
+    with startup_report.step("warmup"):
+        await prediction_executor.warm_up(WARMUP_CALLS)
+
+
+async def _stop_services(application: FastAPI) -> None:
+    for watch in ("model_watch", "rules_watch"):
+        task = getattr(application.state, watch, None)
+        if task is not None:
+            task.cancel()
+    await subscription_hub.stop()
+    if aqi_feed is not None:
+        await aqi_feed.stop()
+    if forecast_materializer is not None:
+        await forecast_materializer.stop()
+    if prediction_executor is not None:
+        prediction_executor.shutdown()
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    """
+    Start serving immediately and warm up in the background. /health,
+    /health/ready and /api/startup answer throughout; other requests wait
+    for the warm-up (see WaitUntilReady).
+    """
+    async def warm_up():
+        try:
+            await _start_services(application)
+        except Exception as e:
+            logger.exception("Prediction service failed to start")
+            startup_report.mark_failed(e)
+        else:
+            startup_report.mark_ready()
+            logger.info("Prediction service ready in %.0f ms", startup_report.describe()["ready_ms"])
+    
+    startup_report.begin()
+    task = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await _stop_services(application)
+
+
+def create_app() -> FastAPI:
+    """
+    The FastAPI application. Only FastAPI and the service modules are
+    imported up front; predictors are built by the lifespan hook, so the
+    server accepts connections (and answers /health) before they are ready.
+    """
+    application = FastAPI(
+        title="Hospital Prediction Service",
+        description="Microservice for predicting patient inflow, surge risks, and staff requirements",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    application.include_router(router)
+    application.add_exception_handler(ExecutorSaturated, executor_saturated_handler)
+    application.add_middleware(ProfileRequests, profiler=request_profiler)
+    application.add_middleware(
+        WaitUntilReady,
+        report=startup_report,
+        exempt=("/health", "/health/ready", "/api/startup", "/metrics"),
+        timeout=STARTUP_WAIT_TIMEOUT
+    )
+    # CORS middleware
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, specify allowed origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return application
+
+
+app = create_app()
+startup_report.mark_imported()
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
-
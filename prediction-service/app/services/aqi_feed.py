@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import math
+import os
+import random
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from .aqi_forecaster import AQI_COLUMN_ALIASES
+from .lazy import lazy_import
+
+httpx = lazy_import("httpx")
+
+
+class AQIReading(NamedTuple):
+    location: str
+    aqi: float
+    pm25: Optional[float]
+    pm10: Optional[float]
+    observed_at: Optional[str]
+    fetched_at: float  # time.time() of the refresh that brought it
+
+
+class AQIProvider(abc.ABC):
+    """A source of current readings: ``fetch`` returns dicts with a location and aqi"""
+    
+    name = "provider"
+    
+    @abc.abstractmethod
+    async def fetch(self, client: httpx.AsyncClient) -> List[Dict]:
+        """Current readings, fetched through the feed's pooled client"""
+
+
+class HTTPAQIProvider(AQIProvider):
+    """
+    GETs ``url`` through the feed's pooled client. The response is a JSON
+    list of readings, or an object with them under ``readings`` or ``data``.
+    """
+    
+    name = "http"
+    
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, str]] = None):
+        self.url = url
+        self.headers = headers or {}
+        self.params = params or {}
+    
+    async def fetch(self, client: httpx.AsyncClient) -> List[Dict]:
+        response = await client.get(self.url, headers=self.headers, params=self.params)
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data, dict):
+            data = data.get("readings", data.get("data", []))
+        return data
+
+
+class FakeAQIProvider(AQIProvider):
+    """
+    Local provider for tests and development: each fetch moves every
+    location's AQI by a seeded random walk around its base value. With
+    ``fail_every`` every n-th fetch raises, to exercise the backoff.
+    """
+    
+    name = "fake"
+    
+    def __init__(
+        self,
+        locations: Dict[str, float],
+        drift: float = 10.0,
+        latency: float = 0.0,
+        fail_every: int = 0,
+        seed: Optional[int] = 0
+    ):
+        self.current = dict(locations)
+        self.drift = drift
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = 0
+        self._random = random.Random(seed)
+    
+    async def fetch(self, client: httpx.AsyncClient) -> List[Dict]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise ConnectionError("fake AQI provider failure")
+        observed_at = datetime.now(timezone.utc).isoformat()
+        readings = []
+        for location, aqi in self.current.items():
+            aqi = min(max(aqi + self._random.uniform(-self.drift, self.drift), 0.0), 500.0)
+            self.current[location] = aqi
+            readings.append({
+                "location": location,
+                "aqi": round(aqi, 1),
+                "pm25": round(aqi * 0.45, 1),
+                "pm10": round(aqi * 0.8, 1),
+                "timestamp": observed_at
+            })
+        return readings
+
+
+def _field(row: Dict, field: str):
+    for alias in AQI_COLUMN_ALIASES[field]:
+        if row.get(alias) is not None:
+            return row[alias]
+    return None
+
+
+def _number(value) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) and number >= 0 else None
+
+
+class AQIFeed:
+    """
+    Latest AQI per location, refreshed in the background from a provider.
+    
+    A task on the event loop polls the provider every ``refresh_interval``
+    seconds (jittered by ``jitter``) through one pooled ``httpx.AsyncClient``.
+    Failed refreshes retry with exponential backoff and equal jitter, capped
+    at ``backoff_max``. Lookups never fetch: they answer from memory,
+    serving readings past ``refresh_interval`` as stale while a refresh is
+    brought forward, and dropping them once older than ``max_age``.
+    ``latest`` must be called on the event loop. ``listeners`` are called
+    after every successful refresh.
+    """
+    
+    def __init__(
+        self,
+        provider: AQIProvider,
+        refresh_interval: float = 300.0,
+        max_age: float = 3600.0,
+        timeout: float = 10.0,
+        max_connections: int = 10,
+        backoff_base: float = 1.0,
+        backoff_max: float = 300.0,
+        jitter: float = 0.1,
+        seed: Optional[int] = None
+    ):
+        self.provider = provider
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        
+        # Replaced whole on every refresh, so readers never see a partial update
+        self._readings: Dict[str, AQIReading] = {}
+        self.version = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.listeners: List[Callable[[], None]] = []
+    
+    async def start(self) -> None:
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+        )
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def refresh(self) -> int:
+        """Fetch once and swap in the readings; returns how many arrived"""
+        rows = await asyncio.wait_for(self.provider.fetch(self._client), self.timeout)
+        fetched_at = time.time()
+        readings = dict(self._readings)
+        count = 0
+        for row in rows:
+            location = _field(row, "location") or _field(row, "station")
+            aqi = _number(_field(row, "aqi"))
+            if not location or aqi is None:
+                continue
+            observed_at = _field(row, "timestamp")
+            readings[str(location).strip().lower()] = AQIReading(
+                str(location).strip(),
+                min(aqi, 500.0),
+                _number(_field(row, "pm25")),
+                _number(_field(row, "pm10")),
+                str(observed_at) if observed_at is not None else None,
+                fetched_at
+            )
+            count += 1
+        # Locations missing from this round are kept until they expire
+        self._readings = {
+            key: reading for key, reading in readings.items() if fetched_at - reading.fetched_at <= self.max_age
+        }
+        self.version += 1
+        self.refreshes += 1
+        self.consecutive_failures = 0
+        self.last_success = fetched_at
+        for listener in self.listeners:
+            listener()
+        return count
+    
+    def latest(self, location: Optional[str]) -> Optional[AQIReading]:
+        """The current reading for ``location``, possibly stale; None if unknown or expired"""
+        reading = self._readings.get((location or "").strip().lower())
+        if reading is None:
+            return None
+        age = time.time() - reading.fetched_at
+        if age > self.max_age:
+            return None
+        if age > self.refresh_interval and not self.consecutive_failures and self._wake is not None:
+            # Serve it now and refresh early; during backoff the retry schedule stands
+            self._wake.set()
+        return reading
+    
+    def readings(self) -> List[AQIReading]:
+        """All readings that have not expired"""
+        now = time.time()
+        return [reading for reading in self._readings.values() if now - reading.fetched_at <= self.max_age]
+    
+    def is_stale(self, reading: AQIReading) -> bool:
+        return time.time() - reading.fetched_at > self.refresh_interval
+    
+    def stats(self) -> Dict:
+        return {
+            "provider": self.provider.name,
+            "running": self._task is not None and not self._task.done(),
+            "locations": len(self._readings),
+            "version": self.version,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_success": datetime.fromtimestamp(self.last_success, timezone.utc).isoformat()
+            if self.last_success else None,
+            "last_error": self.last_error,
+            "refresh_interval": self.refresh_interval,
+            "max_age": self.max_age
+        }
+    
+    def _backoff(self) -> float:
+        cap = min(self.backoff_max, self.backoff_base * 2 ** (self.consecutive_failures - 1))
+        return self._random.uniform(cap / 2, cap)
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+                delay = self.refresh_interval * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                delay = self._backoff()
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+def feed_from_env(
+    default_locations: Iterable[str] = (),
+    environ: Optional[Dict[str, str]] = None
+) -> Optional[AQIFeed]:
+    """
+    Build an AQIFeed from AQI_FEED_* settings, or None when
+    AQI_FEED_PROVIDER is unset or "none". The fake provider covers
+    AQI_FEED_FAKE_LOCATIONS (comma-separated), else ``default_locations``.
+    """
+    env = os.environ if environ is None else environ
+    kind = env.get("AQI_FEED_PROVIDER", "none").lower()
+    if kind == "none":
+        return None
+    if kind == "http":
+        url = env.get("AQI_FEED_URL")
+        if not url:
+            raise ValueError("AQI_FEED_URL is required for the http AQI provider")
+        api_key = env.get("AQI_FEED_API_KEY")
+        headers = {env.get("AQI_FEED_API_KEY_HEADER", "X-API-Key"): api_key} if api_key else {}
+        provider = HTTPAQIProvider(url, headers=headers)
+    elif kind == "fake":
+        locations = [
+            location.strip() for location in env.get("AQI_FEED_FAKE_LOCATIONS", "").split(",") if location.strip()
+        ] or list(default_locations)
+        provider = FakeAQIProvider(
+            {location: float(env.get("AQI_FEED_FAKE_AQI", "120")) for location in locations},
+            fail_every=int(env.get("AQI_FEED_FAKE_FAIL_EVERY", "0"))
+        )
+    else:
+        raise ValueError(f"unknown AQI_FEED_PROVIDER {kind!r}")
+    return AQIFeed(
+        provider,
+        refresh_interval=float(env.get("AQI_FEED_INTERVAL", "300")),
+        max_age=float(env.get("AQI_FEED_MAX_AGE", "3600")),
+        timeout=float(env.get("AQI_FEED_TIMEOUT", "10")),
+        max_connections=int(env.get("AQI_FEED_MAX_CONNECTIONS", "10")),
+        backoff_max=float(env.get("AQI_FEED_BACKOFF_MAX", "300"))
+    )
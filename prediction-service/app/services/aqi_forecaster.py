@@ -0,0 +1,429 @@
+from __future__ import annotations
+
+import time
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .baseline_store import IngestError, read_chunks
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+# Accepted column names per field for station history uploads
+AQI_COLUMN_ALIASES = {
+    "station": ("station", "station_id", "station_name", "monitor"),
+    "location": ("location", "city", "hospital"),
+    "timestamp": ("timestamp", "datetime", "time", "date"),
+    "aqi": ("aqi",),
+    "pm25": ("pm25", "pm2_5", "pm2.5"),
+    "pm10": ("pm10",)
+}
+
+
+class AQIForecaster:
+    """
+    Daily AQI (and PM2.5/PM10) forecasts for many monitoring stations at once.
+    
+    Readings at any resolution are averaged into a stations x days matrix;
+    only these daily sums and counts are kept while an upload is parsed, so
+    memory follows stations x days rather than the raw row count. Models
+    are fitted to whole blocks of stations at a time:
+    
+    - ``ets``: damped-trend exponential smoothing; every (alpha, beta) pair
+      on a small grid runs side by side and each station keeps the pair
+      with the lowest one-step error
+    - ``ar``: AR(``AR_LAGS``) by batched least squares
+    - ``auto``: whichever of the two forecasts the last ``HOLDOUT_DAYS`` of
+      each station's history better
+    
+    Each projected day goes through the pollution predictor's AQI rules
+    (``score``), giving a per-station, per-day inflow curve with an 80% band
+    from the one-step residuals.
+    """
+    
+    POLLUTANTS = ("aqi", "pm25", "pm10")
+    MODELS = ("auto", "ets", "ar")
+    
+    MAX_HORIZON_DAYS = 30
+    MAX_HISTORY_DAYS = 730  # older days are dropped before fitting
+    CHUNK_STATIONS = 256
+    CHUNK_ROWS = 500_000
+    
+    ETS_ALPHAS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+    ETS_BETAS = (0.0, 0.05, 0.1, 0.2)
+    ETS_DAMPING = 0.9
+    AR_LAGS = 7
+    AR_RIDGE = 1e-6
+    HOLDOUT_DAYS = 14
+    
+    BAND_Z = 1.2816  # 80% central interval
+    
+    def __init__(self, pollution_predictor):
+        self._pollution = pollution_predictor
+    
+    def forecast(
+        self,
+        stations: List[Dict],
+        horizon_days: int = 7,
+        model: str = "auto"
+    ) -> Dict:
+        """
+        Forecast from in-request series. Each station holds ``station``,
+        optional ``location``, ``start`` (ISO timestamp of the first reading),
+        ``interval_hours`` between readings and equally spaced ``aqi`` (and
+        optionally ``pm25``/``pm10``) values; None marks a missing reading.
+        """
+        started = time.perf_counter()
+        self._check(horizon_days, model)
+        names, locations, day_numbers, readings = [], [], [], {p: [] for p in self.POLLUTANTS}
+        for i, station in enumerate(stations):
+            values = np.array(
+                [np.nan if value is None else value for value in station["aqi"]], dtype=np.float64
+            )
+            start = np.datetime64(station["start"].replace("Z", ""), "s")
+            step = int(round(float(station.get("interval_hours") or 24) * 3600))
+            if step <= 0:
+                raise ValueError("interval_hours must be positive")
+            offsets = start + np.arange(len(values)) * np.timedelta64(step, "s")
+            names.append(str(station.get("station", i)))
+            locations.append(station.get("location"))
+            day_numbers.append(offsets.astype("datetime64[D]").astype(np.int64))
+            for pollutant in self.POLLUTANTS:
+                series = station.get(pollutant)
+                if series is None:
+                    readings[pollutant].append(np.full(len(values), np.nan))
+                    continue
+                if len(series) != len(values):
+                    raise ValueError(f"{pollutant} for {names[-1]} must have as many values as aqi")
+                readings[pollutant].append(
+                    np.array([np.nan if value is None else value for value in series], dtype=np.float64)
+                )
+        if not names:
+            raise ValueError("stations is empty")
+        
+        station_codes = np.concatenate([np.full(len(days), i) for i, days in enumerate(day_numbers)])
+        frame = pd.DataFrame({
+            "station": station_codes,
+            "day": np.concatenate(day_numbers),
+            **{pollutant: np.concatenate(readings[pollutant]) for pollutant in self.POLLUTANTS}
+        })
+        sums, counts = self._daily_aggregates(frame)
+        return self._forecast_daily(
+            names, locations, sums, counts, horizon_days, model, started, rows=len(frame)
+        )
+    
+    def forecast_upload(
+        self,
+        source: BinaryIO,
+        file_format: str,
+        horizon_days: int = 7,
+        model: str = "auto",
+        chunk_rows: Optional[int] = None
+    ) -> Dict:
+        """
+        Forecast from a CSV or Parquet file of station readings (one row per
+        station and timestamp). The file is parsed in chunks and reduced to
+        daily sums and counts as it goes.
+        """
+        started = time.perf_counter()
+        self._check(horizon_days, model)
+        station_codes: Dict[str, int] = {}
+        station_locations: Dict[int, Optional[str]] = {}
+        sum_parts, count_parts = [], []
+        rows = 0
+        for chunk in read_chunks(
+            source,
+            file_format,
+            chunk_rows or self.CHUNK_ROWS,
+            aliases=AQI_COLUMN_ALIASES,
+            required=("station", "timestamp", "aqi"),
+            numeric=self.POLLUTANTS
+        ):
+            rows += len(chunk)
+            timestamps = pd.to_datetime(chunk["timestamp"], errors="coerce", utc=True, format="ISO8601")
+            valid = timestamps.notna() & chunk["station"].notna()
+            if not valid.any():
+                continue
+            chunk = chunk[valid]
+            # Factorize raw values; only the distinct station names are cleaned up
+            codes, uniques = pd.factorize(chunk["station"])
+            mapping = np.array([
+                station_codes.setdefault(str(name).strip(), len(station_codes)) for name in uniques
+            ])
+            if "location" in chunk:
+                _, first_rows = np.unique(codes, return_index=True)
+                for code, location in zip(mapping, chunk["location"].to_numpy()[first_rows]):
+                    station_locations.setdefault(code, None if pd.isna(location) else str(location))
+            frame = pd.DataFrame({
+                "station": mapping[codes],
+                "day": timestamps[valid].dt.tz_localize(None).values.astype("datetime64[D]").astype(np.int64),
+                **{
+                    pollutant: pd.to_numeric(chunk[pollutant], errors="coerce").to_numpy(np.float64)
+                    if pollutant in chunk else np.nan
+                    for pollutant in self.POLLUTANTS
+                }
+            })
+            grouped = frame.groupby(["station", "day"], sort=False)[list(self.POLLUTANTS)]
+            sum_parts.append(grouped.sum(min_count=1))
+            count_parts.append(grouped.count())
+        if not sum_parts:
+            raise IngestError("No valid station readings found")
+        
+        sums = pd.concat(sum_parts).groupby(level=[0, 1]).sum(min_count=1)
+        counts = pd.concat(count_parts).groupby(level=[0, 1]).sum()
+        names = [None] * len(station_codes)
+        for name, code in station_codes.items():
+            names[code] = name
+        locations = [station_locations.get(code) for code in range(len(names))]
+        return self._forecast_daily(
+            names, locations, sums, counts, horizon_days, model, started, rows=rows
+        )
+    
+    def _daily_aggregates(self, frame: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        grouped = frame.groupby(["station", "day"], sort=False)[list(self.POLLUTANTS)]
+        return grouped.sum(min_count=1), grouped.count()
+    
+    def _forecast_daily(
+        self,
+        names: List[str],
+        locations: List[Optional[str]],
+        sums: pd.DataFrame,
+        counts: pd.DataFrame,
+        horizon_days: int,
+        model: str,
+        started: float,
+        rows: int
+    ) -> Dict:
+        """Fit and project every pollutant from per-(station, day) sums and counts"""
+        station_index = sums.index.get_level_values(0).to_numpy()
+        day_index = sums.index.get_level_values(1).to_numpy()
+        last_day = int(day_index.max())
+        first_day = max(int(day_index.min()), last_day - self.MAX_HISTORY_DAYS + 1)
+        keep = day_index >= first_day
+        n_days = last_day - first_day + 1
+        
+        fitted_at = time.perf_counter()
+        forecasts = {}
+        chosen_model = None
+        for pollutant in self.POLLUTANTS:
+            daily = np.full((len(names), n_days), np.nan)
+            means = (sums[pollutant] / counts[pollutant].where(counts[pollutant] > 0)).to_numpy()
+            daily[station_index[keep], day_index[keep] - first_day] = means[keep]
+            if pollutant != "aqi" and np.isnan(daily).all():
+                continue
+            forecasts[pollutant] = self._project(daily, horizon_days, model)
+            if pollutant == "aqi":
+                chosen_model = forecasts[pollutant][3]
+                last_observed = self._last_observed(daily, first_day)
+        fit_ms = (time.perf_counter() - fitted_at) * 1000
+        
+        aqi, low, high, _ = forecasts["aqi"]
+        aqi, low, high = (np.clip(values, 0.0, 500.0) for values in (aqi, low, high))
+        missing = np.isnan(aqi).any(axis=1)
+        # NaN rows are scored as 0 and reported as skipped, with the default rules
+        tables, _ = self._pollution.rules_for(None)
+        scores = tables.score(np.where(np.isnan(aqi), 0.0, aqi))
+        inflow_low = tables.score(np.where(np.isnan(low), 0.0, low))["predicted_inflow"]
+        inflow_high = tables.score(np.where(np.isnan(high), 0.0, high))["predicted_inflow"]
+        categories = np.array(self._categories(tables))[scores["category_index"]]
+        dates = (np.datetime64(last_day + 1, "D") + np.arange(horizon_days)).astype(str).tolist()
+        
+        def rounded(values: np.ndarray) -> List[List[Optional[float]]]:
+            return np.round(values, 1).tolist()
+        
+        series = {
+            "aqi": rounded(aqi),
+            "aqi_low": rounded(low),
+            "aqi_high": rounded(high),
+            "predicted_inflow": scores["predicted_inflow"].tolist(),
+            "inflow_low": inflow_low.tolist(),
+            "inflow_high": inflow_high.tolist(),
+            "risk_level": scores["risk_level"].tolist(),
+            "aqi_category": categories.tolist()
+        }
+        for pollutant in ("pm25", "pm10"):
+            if pollutant in forecasts:
+                series[pollutant] = rounded(np.maximum(forecasts[pollutant][0], 0.0))
+        
+        model_names = np.array(["ets", "ar"])[chosen_model].tolist()
+        results, skipped = [], []
+        for i, name in enumerate(names):
+            if missing[i]:
+                skipped.append({"station": name, "reason": "no AQI readings"})
+                continue
+            days = [
+                {
+                    "date": day,
+                    **{key: values[i][d] for key, values in series.items()},
+                }
+                for d, day in enumerate(dates)
+            ]
+            peak = int(np.argmax(aqi[i]))
+            results.append({
+                "station": name,
+                "location": locations[i],
+                "model": model_names[i],
+                "last_observed": last_observed[i],
+                "total_predicted_inflow": int(scores["predicted_inflow"][i].sum()),
+                "peak": {
+                    "date": dates[peak],
+                    "aqi": series["aqi"][i][peak],
+                    "risk_level": series["risk_level"][i][peak]
+                },
+                "days": days
+            })
+        
+        return {
+            "prediction_type": "pollution_forecast",
+            "model": model,
+            "horizon_days": horizon_days,
+            "start_date": dates[0],
+            "end_date": dates[-1],
+            "history": {
+                "rows": rows,
+                "stations": len(names),
+                "first_date": str(np.datetime64(first_day, "D")),
+                "last_date": str(np.datetime64(last_day, "D")),
+                "days": n_days
+            },
+            "stations": results,
+            "skipped": skipped,
+            "fit_ms": round(fit_ms, 2),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    
+    def _project(self, daily: np.ndarray, horizon: int, model: str):
+        """
+        Forecast, lower and upper band (stations x horizon) and the model
+        chosen per station (0 = ets, 1 = ar), fitted in blocks of stations.
+        """
+        forecast = np.full((len(daily), horizon), np.nan)
+        spread = np.full((len(daily), horizon), np.nan)
+        chosen = np.zeros(len(daily), dtype=np.int64)
+        for start in range(0, len(daily), self.CHUNK_STATIONS):
+            block = slice(start, start + self.CHUNK_STATIONS)
+            values = self._fill_gaps(daily[block])
+            observed = ~np.isnan(values).all(axis=1)
+            if not observed.any():
+                continue
+            f, s, c = self._fit_block(values[observed], horizon, model)
+            rows = np.arange(start, min(start + self.CHUNK_STATIONS, len(daily)))[observed]
+            forecast[rows], spread[rows], chosen[rows] = f, s, c
+        band = self.BAND_Z * spread
+        return forecast, forecast - band, forecast + band, chosen
+    
+    def _fit_block(self, values: np.ndarray, horizon: int, model: str):
+        use_ar = model in ("ar", "auto") and values.shape[1] >= 3 * self.AR_LAGS
+        if model == "ar" and not use_ar:
+            raise ValueError(f"AR forecasts need at least {3 * self.AR_LAGS} days of history")
+        
+        ets_forecast, ets_sigma = self._ets(values, horizon)
+        if not use_ar:
+            return ets_forecast, ets_sigma, np.zeros(len(values), dtype=np.int64)
+        ar_forecast, ar_sigma = self._ar(values, horizon)
+        if model == "ar":
+            return ar_forecast, ar_sigma, np.ones(len(values), dtype=np.int64)
+        
+        # auto: score both on a holdout at the end of the history
+        holdout = min(self.HOLDOUT_DAYS, values.shape[1] // 4)
+        train, actual = values[:, :-holdout], values[:, -holdout:]
+        ets_error = np.abs(self._ets(train, holdout)[0] - actual).mean(axis=1)
+        if train.shape[1] >= 3 * self.AR_LAGS:
+            ar_error = np.abs(self._ar(train, holdout)[0] - actual).mean(axis=1)
+        else:
+            ar_error = np.full(len(values), np.inf)
+        chosen = (ar_error < ets_error).astype(np.int64)
+        pick = chosen[:, None].astype(bool)
+        return (
+            np.where(pick, ar_forecast, ets_forecast),
+            np.where(pick, ar_sigma, ets_sigma),
+            chosen
+        )
+    
+    def _ets(self, values: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Damped-trend exponential smoothing. All grid points run as extra
+        columns of one recursion over time; each station keeps its best one.
+        """
+        alphas, betas = np.meshgrid(self.ETS_ALPHAS, self.ETS_BETAS, indexing="ij")
+        alphas, betas = alphas.ravel()[None, :], betas.ravel()[None, :]
+        phi = self.ETS_DAMPING
+        n_days = values.shape[1]
+        
+        level = np.repeat(values[:, :1], alphas.shape[1], axis=1)
+        trend = np.zeros_like(level)
+        if n_days > 1:
+            trend += (values[:, 1:2] - values[:, :1])
+        squared_error = np.zeros_like(level)
+        for t in range(1, n_days):
+            predicted = level + phi * trend
+            error = values[:, t:t + 1] - predicted
+            squared_error += error * error
+            previous_level = level
+            level = predicted + alphas * error
+            trend = phi * trend + betas * (level - previous_level - phi * trend)
+        
+        best = np.argmin(squared_error, axis=1)
+        rows = np.arange(len(values))
+        level, trend = level[rows, best], trend[rows, best]
+        sigma = np.sqrt(squared_error[rows, best] / max(n_days - 1, 1))
+        
+        steps = np.arange(1, horizon + 1)
+        damped = np.cumsum(phi ** steps)
+        forecast = level[:, None] + damped[None, :] * trend[:, None]
+        return forecast, sigma[:, None] * np.sqrt(steps)[None, :]
+    
+    def _ar(self, values: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+        """AR(p) with intercept per station, solved as a batch of small ridge systems"""
+        lags = self.AR_LAGS
+        windows = np.lib.stride_tricks.sliding_window_view(values, lags + 1, axis=1)
+        design = np.concatenate(
+            [np.ones(windows.shape[:2] + (1,)), windows[:, :, :lags]], axis=2
+        )
+        target = windows[:, :, lags]
+        gram = np.einsum("sti,stj->sij", design, design)
+        gram += self.AR_RIDGE * np.eye(lags + 1) * np.trace(gram, axis1=1, axis2=2)[:, None, None]
+        coefficients = np.linalg.solve(gram, np.einsum("sti,st->si", design, target)[:, :, None])[:, :, 0]
+        residual = target - np.einsum("sti,si->st", design, coefficients)
+        sigma = np.sqrt((residual ** 2).mean(axis=1))
+        
+        history = values[:, -lags:].copy()
+        forecast = np.empty((len(values), horizon))
+        for h in range(horizon):
+            step = coefficients[:, 0] + np.einsum("si,si->s", coefficients[:, 1:], history)
+            forecast[:, h] = step
+            history = np.concatenate([history[:, 1:], step[:, None]], axis=1)
+        return forecast, sigma[:, None] * np.sqrt(np.arange(1, horizon + 1))[None, :]
+    
+    @staticmethod
+    def _fill_gaps(values: np.ndarray) -> np.ndarray:
+        """Carry the last reading forward over missing days (and the first one back)"""
+        observed = ~np.isnan(values)
+        index = np.where(observed, np.arange(values.shape[1])[None, :], 0)
+        np.maximum.accumulate(index, axis=1, out=index)
+        filled = np.take_along_axis(values, index, axis=1)
+        first = np.argmax(observed, axis=1)
+        leading = np.arange(values.shape[1])[None, :] < first[:, None]
+        return np.where(leading, values[np.arange(len(values)), first][:, None], filled)
+    
+    @staticmethod
+    def _last_observed(daily: np.ndarray, first_day: int) -> List[Optional[str]]:
+        observed = ~np.isnan(daily)
+        last = daily.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+        return [
+            str(np.datetime64(first_day + int(day), "D")) if any_observed else None
+            for day, any_observed in zip(last, observed.any(axis=1))
+        ]
+    
+    @staticmethod
+    def _categories(tables) -> Tuple[str, ...]:
+        ordered = sorted(tables.AQI_THRESHOLDS.items(), key=lambda item: item[1]["max"])
+        return tuple(name for name, _ in ordered)
+    
+    def _check(self, horizon_days: int, model: str) -> None:
+        if not 1 <= horizon_days <= self.MAX_HORIZON_DAYS:
+            raise ValueError(f"horizon_days must be between 1 and {self.MAX_HORIZON_DAYS}")
+        if model not in self.MODELS:
+            raise ValueError(f"model must be one of {', '.join(self.MODELS)}")
@@ -0,0 +1,495 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+# Accepted column names per field, matched case-insensitively
+COLUMN_ALIASES = {
+    "date": ("date", "day", "admission_date"),
+    "location": ("location", "hospital", "site"),
+    "department": ("department", "dept"),
+    "admissions": ("admissions", "patients", "patient_count", "count", "admitted")
+}
+
+# Department key holding each location's total across departments
+ALL_DEPARTMENTS = "*"
+
+
+class IngestError(ValueError):
+    """Raised when an upload cannot be read (missing columns, bad format, no valid rows)"""
+
+
+class _Snapshot(NamedTuple):
+    name: str
+    index: Dict[Tuple[str, str], int]
+    first_day: int
+    n_days: int
+    admissions: np.ndarray    # (series, days), NaN where no data
+    prefix_sum: np.ndarray    # (series, days + 1), running admissions total
+    prefix_count: np.ndarray  # (series, days + 1), running count of observed days
+    meta: Dict
+
+
+def _day_number(value) -> int:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+    if isinstance(value, datetime):
+        value = value.date()
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def _day_iso(day: int) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def _normalize(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+
+class BaselineStore:
+    """
+    Daily admissions per (location, department), stored column-wise on disk.
+    
+    Each snapshot is a directory of ``.npy`` columns: a dense admissions
+    matrix (series x days, NaN for days without data) plus running sums and
+    running counts of observed days. Any window total or rolling mean (7, 28
+    or 365 days as of any date) is then two array reads, so resolving
+    ``base_patients`` is O(1) however much history is stored. Arrays are
+    memory-mapped, so every worker process shares one copy.
+    
+    Ingest upserts by day: within an upload, rows for the same location,
+    department and day are summed; across uploads, a day's value replaces the
+    stored one. Each ingest writes a new snapshot and moves the ``CURRENT``
+    pointer, so readers switch with a single reference assignment. Other
+    worker processes pick up the pointer within ``check_interval`` seconds.
+    Ingests hold a lock file in ``root`` from merge to publish, so uploads to
+    different workers are applied one after the other and none is lost.
+    
+    The matrices are dense over the stored date range, so one mistyped date
+    would size them for every later ingest: rows dated more than
+    ``date_window_years`` from today are rejected, and a merge spanning more
+    than ``MAX_DAYS`` days fails with an IngestError.
+    """
+    
+    POINTER = "CURRENT"
+    LOCK = ".ingest.lock"
+    ROLLING_WINDOWS = (7, 28, 365)
+    CHUNK_ROWS = 200_000
+    KEEP_SNAPSHOTS = 2
+    DATE_WINDOW_YEARS = 10
+    MAX_DAYS = 40 * 366
+    
+    def __init__(
+        self,
+        root: str,
+        window_days: int = 28,
+        check_interval: float = 5.0,
+        date_window_years: int = DATE_WINDOW_YEARS
+    ):
+        if window_days not in self.ROLLING_WINDOWS:
+            raise ValueError(
+                f"window_days must be one of {', '.join(map(str, self.ROLLING_WINDOWS))}"
+            )
+        if date_window_years < 1:
+            raise ValueError("date_window_years must be at least 1")
+        self.root = root
+        self.window_days = window_days
+        self.check_interval = check_interval
+        self.date_window_years = date_window_years
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+        self._write_lock = threading.Lock()
+    
+    # ----- reads -----
+    
+    def _current(self) -> Optional[_Snapshot]:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            try:
+                with open(os.path.join(self.root, self.POINTER)) as f:
+                    name = f.read().strip()
+            except FileNotFoundError:
+                name = None
+            if name and (self._snapshot is None or self._snapshot.name != name):
+                try:
+                    self._snapshot = self._load(name)
+                except FileNotFoundError:
+                    pass  # pruned by a concurrent ingest; retry on the next check
+        return self._snapshot
+    
+    def _load(self, name: str) -> _Snapshot:
+        directory = os.path.join(self.root, name)
+        with open(os.path.join(directory, "series.json")) as f:
+            series = json.load(f)
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        return _Snapshot(
+            name=name,
+            index={(location, department): row for row, (location, department) in enumerate(series)},
+            first_day=meta["first_day"],
+            n_days=meta["n_days"],
+            admissions=np.load(os.path.join(directory, "admissions.npy"), mmap_mode="r"),
+            prefix_sum=np.load(os.path.join(directory, "prefix_sum.npy"), mmap_mode="r"),
+            prefix_count=np.load(os.path.join(directory, "prefix_count.npy"), mmap_mode="r"),
+            meta=meta
+        )
+    
+    def _window(
+        self,
+        snapshot: _Snapshot,
+        row: int,
+        first_day: int,
+        last_day: int
+    ) -> Tuple[float, int]:
+        """Admissions total and observed-day count over [first_day, last_day]"""
+        lo = min(max(first_day - snapshot.first_day, 0), snapshot.n_days)
+        hi = min(max(last_day - snapshot.first_day + 1, 0), snapshot.n_days)
+        if hi <= lo:
+            return 0.0, 0
+        total = float(snapshot.prefix_sum[row, hi] - snapshot.prefix_sum[row, lo])
+        observed = int(snapshot.prefix_count[row, hi] - snapshot.prefix_count[row, lo])
+        return total, observed
+    
+    def baselines(
+        self,
+        location: str,
+        department: Optional[str] = None,
+        as_of=None
+    ) -> Optional[Dict]:
+        """
+        Rolling mean daily admissions over each of ``ROLLING_WINDOWS`` days,
+        ending at ``as_of`` (default: the last stored day). None when the
+        series is unknown or has no data on or before ``as_of``.
+        """
+        snapshot = self._current()
+        if snapshot is None:
+            return None
+        row = snapshot.index.get((_normalize(location), _normalize(department) or ALL_DEPARTMENTS))
+        if row is None:
+            return None
+        
+        last_stored = snapshot.first_day + snapshot.n_days - 1
+        day = last_stored if as_of is None else min(_day_number(as_of), last_stored)
+        means = {}
+        for window in self.ROLLING_WINDOWS:
+            total, observed = self._window(snapshot, row, day - window + 1, day)
+            means[f"mean_{window}d"] = round(total / observed, 2) if observed else None
+        if means[f"mean_{self.ROLLING_WINDOWS[-1]}d"] is None:
+            return None
+        return {"as_of": _day_iso(day), **means}
+    
+    def window_total(
+        self,
+        location: str,
+        start,
+        end,
+        department: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Admissions over the inclusive date range, or None without data"""
+        snapshot = self._current()
+        if snapshot is None:
+            return None
+        row = snapshot.index.get((_normalize(location), _normalize(department) or ALL_DEPARTMENTS))
+        if row is None:
+            return None
+        total, observed = self._window(snapshot, row, _day_number(start), _day_number(end))
+        if not observed:
+            return None
+        return {"total": total, "observed_days": observed}
+    
+    def festival_history(
+        self,
+        location: str,
+        start,
+        end,
+        previous_window: Optional[Tuple[date, date]] = None
+    ) -> Optional[Dict]:
+        """
+        ``historical_data`` for a festival window at ``location``, in the shape
+        FestivalPredictor accepts: the configured rolling mean as of the day
+        before the window, and the admissions total over the same festival's
+        window last year (``previous_window``, else the same dates shifted
+        back a year). None when the store has nothing for the location.
+        """
+        start_day = _day_number(start)
+        baselines = self.baselines(location, as_of=_day_iso(start_day - 1))
+        history = {}
+        if baselines and baselines[f"mean_{self.window_days}d"] is not None:
+            history["average_daily_patients"] = baselines[f"mean_{self.window_days}d"]
+        if previous_window is None:
+            start_date = datetime.fromisoformat(_day_iso(start_day)).date()
+            end_date = datetime.fromisoformat(_day_iso(_day_number(end))).date()
+            previous_window = (_previous_year(start_date), _previous_year(end_date))
+        last_year = self.window_total(location, *previous_window)
+        if last_year is not None:
+            previous_days = (previous_window[1] - previous_window[0]).days + 1
+            # Only a fully covered window is comparable with this year's
+            if last_year["observed_days"] == previous_days:
+                history["previous_year_cases"] = int(last_year["total"])
+        return history or None
+    
+    def describe(self) -> Dict:
+        snapshot = self._current()
+        if snapshot is None:
+            return {"root": self.root, "snapshot": None, "series": 0}
+        locations = sorted({location for location, _ in snapshot.index})
+        return {
+            "root": self.root,
+            "snapshot": snapshot.name,
+            "window_days": self.window_days,
+            "series": len(snapshot.index),
+            "locations": locations,
+            "first_date": _day_iso(snapshot.first_day),
+            "last_date": _day_iso(snapshot.first_day + snapshot.n_days - 1),
+            **{key: value for key, value in snapshot.meta.items() if key not in ("first_day", "n_days")}
+        }
+    
+    # ----- ingest -----
+    
+    def ingest(self, source: BinaryIO, file_format: str, chunk_rows: Optional[int] = None) -> Dict:
+        """
+        Parse a CSV or Parquet upload in chunks and publish a new snapshot.
+        Only the per-day aggregate of each chunk is kept in memory. Rows
+        dated outside ``date_window_years`` of today count as rejected.
+        """
+        started = time.perf_counter()
+        rows_read = 0
+        rows_rejected = 0
+        aggregates = []
+        today = pd.Timestamp(datetime.now(timezone.utc).date(), tz="UTC")
+        earliest = today - pd.DateOffset(years=self.date_window_years)
+        latest = today + pd.DateOffset(years=self.date_window_years)
+        for chunk in read_chunks(source, file_format, chunk_rows or self.CHUNK_ROWS):
+            rows_read += len(chunk)
+            days = pd.to_datetime(chunk["date"], errors="coerce", utc=True)
+            admissions = pd.to_numeric(chunk["admissions"], errors="coerce")
+            valid = (
+                days.notna() & (days >= earliest) & (days <= latest)
+                & admissions.notna() & (admissions >= 0) & chunk["location"].notna()
+            )
+            rows_rejected += int((~valid).sum())
+            if not valid.any():
+                continue
+            frame = pd.DataFrame({
+                "location": chunk.loc[valid, "location"].astype(str).str.strip().str.lower(),
+                "department": (
+                    chunk.loc[valid, "department"].fillna("").astype(str).str.strip().str.lower()
+                    if "department" in chunk else ""
+                ),
+                "day": days[valid].dt.tz_localize(None).values.astype("datetime64[D]").astype(np.int64),
+                "admissions": admissions[valid].astype(np.float64)
+            })
+            aggregates.append(
+                frame.groupby(["location", "department", "day"], sort=False)["admissions"].sum()
+            )
+        if not aggregates:
+            raise IngestError("No valid admissions rows found")
+        daily = pd.concat(aggregates).groupby(level=[0, 1, 2]).sum()
+        if (daily.index.get_level_values("department") == ALL_DEPARTMENTS).any():
+            raise IngestError(f"'{ALL_DEPARTMENTS}' is reserved and cannot be used as a department")
+        
+        with self._exclusive():
+            name = self._publish(daily, rows_read - rows_rejected)
+        self._checked_at = 0.0
+        
+        return {
+            "snapshot": name,
+            "rows_read": rows_read,
+            "rows_accepted": rows_read - rows_rejected,
+            "rows_rejected": rows_rejected,
+            "series_updated": int(daily.index.droplevel("day").nunique()),
+            "days_updated": int(len(daily)),
+            "first_date": _day_iso(daily.index.get_level_values("day").min()),
+            "last_date": _day_iso(daily.index.get_level_values("day").max()),
+            "took_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+    
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the ingest lock of this process and of every other worker on ``root``"""
+        os.makedirs(self.root, exist_ok=True)
+        with self._write_lock, open(os.path.join(self.root, self.LOCK), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    
+    def _publish(self, daily: pd.Series, rows_accepted: int) -> str:
+        """Merge per-day aggregates into the current snapshot and write a new one"""
+        previous = self._current_on_disk()
+        
+        new_days = daily.index.get_level_values("day")
+        first_day = int(new_days.min())
+        last_day = int(new_days.max())
+        if previous is not None:
+            first_day = min(first_day, previous.first_day)
+            last_day = max(last_day, previous.first_day + previous.n_days - 1)
+        n_days = last_day - first_day + 1
+        if n_days > self.MAX_DAYS:
+            raise IngestError(
+                f"History would span {_day_iso(first_day)} to {_day_iso(last_day)} ({n_days} days); "
+                f"at most {self.MAX_DAYS} days are stored"
+            )
+        
+        # Department-level series; location totals are derived below
+        keys = sorted(
+            {key for key in (previous.index if previous else {}) if key[1] != ALL_DEPARTMENTS}
+            | set(daily.index.droplevel("day").unique())
+        )
+        index = {key: row for row, key in enumerate(keys)}
+        matrix = np.full((len(keys), n_days), np.nan)
+        if previous is not None:
+            offset = previous.first_day - first_day
+            for key, row in previous.index.items():
+                if key[1] != ALL_DEPARTMENTS:
+                    matrix[index[key], offset:offset + previous.n_days] = previous.admissions[row]
+        rows = np.array([
+            index[(location, department)]
+            for location, department in zip(
+                daily.index.get_level_values("location"),
+                daily.index.get_level_values("department")
+            )
+        ], dtype=np.int64)
+        matrix[rows, new_days.to_numpy() - first_day] = daily.to_numpy()
+        
+        # Location totals: keys are sorted, so each location's departments are
+        # contiguous rows; NaN where no department reported that day
+        locations = []
+        starts = []
+        for row, (location, _) in enumerate(keys):
+            if not locations or locations[-1] != location:
+                locations.append(location)
+                starts.append(row)
+        totals = np.add.reduceat(np.nan_to_num(matrix), starts, axis=0)
+        totals[~np.logical_or.reduceat(~np.isnan(matrix), starts, axis=0)] = np.nan
+        
+        series = keys + [(location, ALL_DEPARTMENTS) for location in locations]
+        admissions = np.vstack([matrix, totals])
+        prefix_sum = np.zeros((len(series), n_days + 1))
+        np.cumsum(np.nan_to_num(admissions), axis=1, out=prefix_sum[:, 1:])
+        prefix_count = np.zeros((len(series), n_days + 1), dtype=np.int32)
+        np.cumsum(~np.isnan(admissions), axis=1, out=prefix_count[:, 1:])
+        
+        name = "snapshot-" + datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        directory = os.path.join(self.root, name)
+        os.makedirs(directory)
+        np.save(os.path.join(directory, "admissions.npy"), admissions)
+        np.save(os.path.join(directory, "prefix_sum.npy"), prefix_sum)
+        np.save(os.path.join(directory, "prefix_count.npy"), prefix_count)
+        with open(os.path.join(directory, "series.json"), "w") as f:
+            json.dump(series, f)
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({
+                "first_day": first_day,
+                "n_days": n_days,
+                "rows_ingested": (previous.meta.get("rows_ingested", 0) if previous else 0) + rows_accepted,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }, f)
+        
+        pointer_tmp = os.path.join(self.root, f".{self.POINTER}.tmp")
+        with open(pointer_tmp, "w") as f:
+            f.write(name)
+        os.replace(pointer_tmp, os.path.join(self.root, self.POINTER))
+        self._snapshot = self._load(name)
+        self._prune(keep=name)
+        return name
+    
+    def _current_on_disk(self) -> Optional[_Snapshot]:
+        """The latest published snapshot, even if this process has not loaded it yet"""
+        self._checked_at = 0.0
+        return self._current()
+    
+    def _prune(self, keep: str) -> None:
+        # Older snapshots stay readable for processes still mapping them (POSIX unlink)
+        snapshots = sorted(
+            entry for entry in os.listdir(self.root)
+            if entry.startswith("snapshot-") and entry != keep
+        )
+        for entry in snapshots[:max(len(snapshots) - (self.KEEP_SNAPSHOTS - 1), 0)]:
+            shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
+
+
+def _previous_year(day: date) -> date:
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:  # 29 February
+        return day.replace(year=day.year - 1, day=28)
+
+
+def resolve_columns(
+    columns: List[str],
+    aliases: Dict[str, Tuple[str, ...]] = COLUMN_ALIASES,
+    required: Tuple[str, ...] = ("date", "location", "admissions")
+) -> Dict[str, str]:
+    """Map source column names to field names"""
+    lowered = {column.strip().lower(): column for column in columns}
+    resolved = {}
+    for field, names in aliases.items():
+        for alias in names:
+            if alias in lowered:
+                resolved[lowered[alias]] = field
+                break
+    missing = set(required) - set(resolved.values())
+    if missing:
+        raise IngestError(
+            f"Missing required column(s): {', '.join(sorted(missing))}. "
+            f"Accepted names: " + "; ".join(
+                f"{field}: {', '.join(names)}" for field, names in aliases.items()
+            )
+        )
+    return resolved
+
+
+def read_chunks(
+    source: BinaryIO,
+    file_format: str,
+    chunk_rows: int,
+    aliases: Dict[str, Tuple[str, ...]] = COLUMN_ALIASES,
+    required: Tuple[str, ...] = ("date", "location", "admissions"),
+    numeric: Tuple[str, ...] = ("admissions",)
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield DataFrames of at most ``chunk_rows`` rows renamed to field names.
+    CSV columns outside ``numeric`` are read as strings.
+    """
+    if file_format == "csv":
+        header = pd.read_csv(source, nrows=0)
+        columns = resolve_columns(list(header.columns), aliases, required)
+        source.seek(0)
+        reader = pd.read_csv(
+            source,
+            usecols=list(columns),
+            dtype={column: str for column, field in columns.items() if field not in numeric},
+            chunksize=chunk_rows
+        )
+        for chunk in reader:
+            yield chunk.rename(columns=columns)
+    elif file_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise IngestError("Parquet uploads require pyarrow (pip install pyarrow)")
+        try:
+            parquet = pq.ParquetFile(source)
+        except Exception as e:
+            raise IngestError(f"Could not read Parquet file: {e}")
+        columns = resolve_columns(parquet.schema_arrow.names, aliases, required)
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=list(columns)):
+            yield batch.to_pandas().rename(columns=columns)
+    else:
+        raise IngestError(f"Unsupported format '{file_format}'. Expected 'csv' or 'parquet'")
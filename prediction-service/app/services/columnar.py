@@ -0,0 +1,464 @@
+from __future__ import annotations
+
+import io
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .lazy import lazy_import
+from .model_backed import DEPARTMENT_CODES, FESTIVAL_CODES, INTENSITY_CODES, SHIFT_CODES
+
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+pq = lazy_import("pyarrow.parquet")
+
+
+# Media types for content negotiation, by format name
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "arrow_file": "application/vnd.apache.arrow.file",
+    "parquet": "application/vnd.apache.parquet"
+}
+_FORMATS = {
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow_file",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/parquet": "parquet"
+}
+
+
+def columnar_format(media_type: Optional[str]) -> Optional[str]:
+    """Format name for a Content-Type or Accept header, or None if it asks for neither"""
+    for part in (media_type or "").split(","):
+        name = _FORMATS.get(part.split(";")[0].strip().lower())
+        if name:
+            return name
+    return None
+
+
+class SchemaError(ValueError):
+    """Raised when table columns are missing or hold invalid values; ``problems`` maps column to message"""
+    
+    def __init__(self, problems: Dict[str, str]):
+        super().__init__(problems)
+        self.problems = problems
+    
+    def __str__(self) -> str:
+        return "; ".join(f"{column}: {message}" for column, message in self.problems.items())
+
+
+class ColumnSpec(NamedTuple):
+    name: str
+    kind: str  # number, string or date
+    required: bool = False
+    aliases: Tuple[str, ...] = ()
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    choices: Optional[Tuple[str, ...]] = None
+
+
+# Columns mirror the JSON request models' fields
+SCHEMAS = {
+    "festival": (
+        ColumnSpec("festival_name", "string", required=True),
+        ColumnSpec("start_date", "date", required=True),
+        ColumnSpec("end_date", "date", required=True),
+        ColumnSpec("festival_intensity", "string", required=True, aliases=("intensity",),
+                   choices=("low", "medium", "high")),
+        ColumnSpec("base_daily_patients", "number", aliases=("average_daily_patients",), minimum=0),
+        ColumnSpec("previous_year_cases", "number", minimum=0)
+    ),
+    "pollution": (
+        ColumnSpec("aqi", "number", required=True, minimum=0, maximum=500),
+        ColumnSpec("pm25", "number"),
+        ColumnSpec("pm10", "number"),
+        ColumnSpec("date", "date")
+    ),
+    "staff": (
+        ColumnSpec("predicted_patients", "number", required=True, aliases=("predicted_patient_inflow",),
+                   minimum=0),
+        ColumnSpec("current_staff", "number", aliases=("current_staff_count",), minimum=0),
+        ColumnSpec("department", "string"),
+        ColumnSpec("shift_type", "string")
+    )
+}
+
+
+class Categorical(NamedTuple):
+    codes: np.ndarray  # int64 per row, -1 for null
+    categories: List[str]
+
+
+def read_table(data: bytes, file_format: str) -> pa.Table:
+    buffer = pa.py_buffer(data)
+    try:
+        if file_format == "arrow":
+            return pa.ipc.open_stream(buffer).read_all()
+        if file_format == "arrow_file":
+            return pa.ipc.open_file(buffer).read_all()
+        if file_format == "parquet":
+            return pq.read_table(pa.BufferReader(buffer))
+    except (pa.ArrowInvalid, OSError) as e:
+        raise ValueError(f"could not read {file_format} body: {e}")
+    raise ValueError(f"unsupported format {file_format!r}")
+
+
+def write_table(table: pa.Table, file_format: str) -> bytes:
+    """Encode as Arrow IPC, Parquet, or ``json`` (``{"columns": {name: [values]}}``)"""
+    if file_format == "json":
+        metadata = {key.decode(): value.decode() for key, value in (table.schema.metadata or {}).items()}
+        return json.dumps({**metadata, "rows": table.num_rows, "columns": table.to_pydict()}).encode()
+    sink = io.BytesIO()
+    if file_format == "parquet":
+        pq.write_table(table, sink)
+    elif file_format == "arrow_file":
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+
+def _first_bad(mask: np.ndarray) -> str:
+    return f"{int(mask.sum())} rows (first at row {int(np.argmax(mask))})"
+
+
+def _epoch_seconds(value: str) -> float:
+    # Same parsing as the JSON path; naive times are taken as UTC
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _column(spec: ColumnSpec, column: pa.ChunkedArray, problems: Dict[str, str]) -> Any:
+    """One column as numpy: float64 with NaN for numbers and dates (epoch seconds), codes for strings"""
+    kind = column.type
+    if pa.types.is_dictionary(kind):
+        column = column.cast(kind.value_type)
+        kind = kind.value_type
+    nulls = column.null_count
+    if spec.required and nulls:
+        problems[spec.name] = f"{nulls} null values"
+        return None
+    
+    if spec.kind == "number":
+        if not (pa.types.is_integer(kind) or pa.types.is_floating(kind) or pa.types.is_decimal(kind)):
+            problems[spec.name] = f"expected a numeric column, got {kind}"
+            return None
+        values = column.cast(pa.float64()).to_numpy()
+        observed = ~np.isnan(values)
+        if spec.minimum is not None and (values[observed] < spec.minimum).any():
+            problems[spec.name] = f"values below {spec.minimum:g} in " + _first_bad(observed & (values < spec.minimum))
+            return None
+        if spec.maximum is not None and (values[observed] > spec.maximum).any():
+            problems[spec.name] = f"values above {spec.maximum:g} in " + _first_bad(observed & (values > spec.maximum))
+            return None
+        return values
+    
+    if spec.kind == "date":
+        if pa.types.is_timestamp(kind):
+            if kind.tz is None:
+                column = column.cast(pa.timestamp("s"))
+            else:
+                column = column.cast(pa.timestamp("s", tz="UTC"))
+            return column.cast(pa.int64()).cast(pa.float64()).to_numpy()
+        if pa.types.is_date(kind):
+            return column.cast(pa.date32()).cast(pa.int32()).cast(pa.float64()).to_numpy() * 86400.0
+        if not (pa.types.is_string(kind) or pa.types.is_large_string(kind)):
+            problems[spec.name] = f"expected a date, timestamp or ISO string column, got {kind}"
+            return None
+        # Dates repeat, so each distinct string is parsed once
+        categorical = _categorical(column)
+        parsed = np.empty(len(categorical.categories) + 1)
+        parsed[-1] = np.nan
+        for i, value in enumerate(categorical.categories):
+            try:
+                parsed[i] = _epoch_seconds(value)
+            except ValueError:
+                problems[spec.name] = f"invalid date {value!r}"
+                return None
+        return parsed[categorical.codes]
+    
+    if not (pa.types.is_string(kind) or pa.types.is_large_string(kind)):
+        problems[spec.name] = f"expected a string column, got {kind}"
+        return None
+    categorical = _categorical(column)
+    if spec.choices is not None:
+        invalid = [value for value in categorical.categories if value not in spec.choices]
+        if invalid:
+            problems[spec.name] = f"{invalid[0]!r} is not one of {', '.join(spec.choices)}"
+            return None
+    return categorical
+
+
+def _categorical(column: pa.ChunkedArray) -> Categorical:
+    categories = pc.unique(column).drop_null()
+    codes = pc.index_in(column, value_set=categories).fill_null(-1)
+    return Categorical(codes.to_numpy().astype(np.int64), categories.to_pylist())
+
+
+def check_columns(table: pa.Table, kind: str) -> Dict[str, Any]:
+    """
+    Validate a table against ``SCHEMAS[kind]`` one column at a time and
+    convert it to numpy. Optional columns that are absent come back as None.
+    Every problem is collected before a SchemaError is raised.
+    """
+    problems: Dict[str, str] = {}
+    columns = {}
+    names = set(table.column_names)
+    for spec in SCHEMAS[kind]:
+        name = next((name for name in (spec.name,) + spec.aliases if name in names), None)
+        if name is None:
+            if spec.required:
+                problems[spec.name] = "missing column"
+            columns[spec.name] = None
+            continue
+        columns[spec.name] = _column(spec, table.column(name), problems)
+    if problems:
+        raise SchemaError(problems)
+    return columns
+
+
+def _lookup(categorical: Optional[Categorical], table: Dict[str, Any], default: Any, count: int) -> np.ndarray:
+    """Per-row values of a string column mapped through ``table`` (case-insensitive); nulls get ``default``"""
+    if categorical is None:
+        return np.full(count, default)
+    mapped = np.array(
+        [table.get(value.lower(), default) for value in categorical.categories] + [default]
+    )
+    return mapped[categorical.codes]
+
+
+def _months(seconds: Optional[np.ndarray], count: int) -> np.ndarray:
+    if seconds is None:
+        return np.full(count, np.nan)
+    observed = ~np.isnan(seconds)
+    months = np.full(count, np.nan)
+    dates = seconds[observed].astype("datetime64[s]")
+    months[observed] = dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    return months
+
+
+def _nullable(values: np.ndarray, mask: np.ndarray) -> pa.Array:
+    return pa.array(values, mask=mask)
+
+
+class ColumnarScorer:
+    """
+    Scores whole Arrow tables with the predictors' rules, one array
+    operation per quantity, without building a dict per row.
+    
+    Inputs are checked per column (``SCHEMAS``), string columns are
+    dictionary-encoded so rule lookups run once per distinct value, and
+    results are appended to the input table as columns (recommendation
+    text is left out). When a predictor is backed by a published model, the
+    model is called once per distinct feature row. The backend, model
+    version and rules version go in the schema metadata.
+    """
+    
+    def __init__(self, festival_predictor, pollution_predictor, staff_forecaster, backend: str = "rules"):
+        self._predictors = {
+            "festival": festival_predictor,
+            "pollution": pollution_predictor,
+            "staff": staff_forecaster
+        }
+        self._backend = backend
+    
+    def score(
+        self,
+        kind: str,
+        data: bytes,
+        input_format: str,
+        output_format: str,
+        max_rows: Optional[int] = None
+    ) -> Tuple[bytes, int]:
+        """Score an encoded table; returns the encoded result and its row count"""
+        table = read_table(data, input_format)
+        if max_rows is not None and table.num_rows > max_rows:
+            raise ValueError(f"at most {max_rows} rows per request")
+        result = self.score_table(kind, table)
+        return write_table(result, output_format), result.num_rows
+    
+    def score_table(self, kind: str, table: pa.Table) -> pa.Table:
+        if kind not in SCHEMAS:
+            raise ValueError(f"unknown prediction type {kind!r}")
+        columns = check_columns(table, kind)
+        count = table.num_rows
+        # Tables have no location column, so they are scored with the default rules
+        tables, rules_version = self._predictors[kind].rules_for(None)
+        outputs, model_version = getattr(self, f"_{kind}")(tables, columns, count)
+        
+        result = table.drop_columns([name for name in outputs if name in table.column_names])
+        for name, values in outputs.items():
+            result = result.append_column(name, values if isinstance(values, pa.Array) else pa.array(values))
+        metadata = {"prediction_type": kind, "backend": "model" if model_version else self._backend}
+        if model_version:
+            metadata["model_version"] = model_version
+        if rules_version is not None:
+            metadata["rules_version"] = rules_version
+        return result.replace_schema_metadata(metadata)
+    
+    def _model(self, kind: str, features: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """Model predictions per row, computed once per distinct feature row, or (None, None)"""
+        predictor = self._predictors[kind]
+        registry = getattr(predictor, "registry", None)
+        artifact = registry.get(predictor.MODEL_NAME) if registry is not None else None
+        if artifact is None or list(artifact.features) != predictor.FEATURES or not len(features):
+            return None, None
+        try:
+            # NaN rows would not deduplicate, so they are keyed by a sentinel
+            keyed = np.where(np.isnan(features), -1e300, features)
+            unique, inverse = np.unique(keyed, axis=0, return_inverse=True)
+            predictions = np.asarray(artifact.model.predict(np.where(unique == -1e300, np.nan, unique)))
+        except Exception as e:
+            registry.record_error(predictor.MODEL_NAME, f"{artifact.version}: {e}")
+            return None, None
+        return predictions[inverse.reshape(-1)], artifact.version
+    
+    def _festival(self, predictor, columns: Dict[str, Any], count: int) -> Tuple[Dict[str, Any], Optional[str]]:
+        names, intensities = columns["festival_name"], columns["festival_intensity"]
+        
+        duration = np.floor_divide(columns["end_date"] - columns["start_date"], 86400.0) + 1
+        if (duration < 1).any():
+            raise SchemaError({"end_date": "before start_date in " + _first_bad(duration < 1)})
+        duration = duration.astype(np.int64)
+        
+        # Rule multiplier for each distinct (festival, intensity) pair
+        table = np.array([
+            [predictor.surge_multiplier(name, intensity) for intensity in intensities.categories]
+            for name in names.categories
+        ]).reshape(len(names.categories), len(intensities.categories))
+        multipliers = table[names.codes, intensities.codes]
+        
+        festival_codes = np.array([
+            FESTIVAL_CODES.get(name.lower().replace(" ", "_"), FESTIVAL_CODES["default"])
+            for name in names.categories
+        ])[names.codes]
+        intensity_codes = np.array([INTENSITY_CODES.get(value, 1) for value in intensities.categories])[intensities.codes]
+        model_multipliers, version = self._model("festival", np.column_stack([
+            festival_codes, intensity_codes, duration, _months(columns["start_date"], count)
+        ]).astype(np.float64))
+        if model_multipliers is not None:
+            multipliers = np.round(np.maximum(model_multipliers.astype(np.float64), 1.0), 3)
+        
+        average = columns["base_daily_patients"]
+        previous = columns["previous_year_cases"]
+        has_average = ~np.isnan(average) if average is not None else np.zeros(count, dtype=bool)
+        has_previous = ~np.isnan(previous) if previous is not None else np.zeros(count, dtype=bool)
+        base = np.full(count, float(predictor.BASE_DAILY_PATIENTS))
+        if previous is not None:
+            base = np.where(has_previous, previous / duration, base)
+        if average is not None:
+            base = np.where(has_average, average, base)
+        
+        predicted = (base * multipliers * duration).astype(np.int64)
+        risk_index = np.searchsorted(predictor.RISK_BREAKPOINTS, multipliers, side="right")
+        return {
+            "predicted_inflow": predicted,
+            "confidence": np.where(has_average | has_previous, 85.0, 65.0),
+            "risk_level": pa.DictionaryArray.from_arrays(
+                risk_index.astype(np.int32), pa.array(predictor.RISK_LEVELS)
+            ),
+            "duration_days": duration,
+            "surge_multiplier": multipliers,
+            "base_daily_patients": base,
+            "beds": (predicted * 0.3 / duration).astype(np.int64),
+            "doctors": (predicted * 0.05 / duration).astype(np.int64),
+            "nurses": (predicted * 0.1 / duration).astype(np.int64),
+            "ambulances": (predicted * 0.02 / duration).astype(np.int64)
+        }, version
+    
+    def _pollution(self, predictor, columns: Dict[str, Any], count: int) -> Tuple[Dict[str, Any], Optional[str]]:
+        aqi = columns["aqi"]
+        missing = np.full(count, np.nan)
+        features = np.column_stack([
+            aqi,
+            columns["pm25"] if columns["pm25"] is not None else missing,
+            columns["pm10"] if columns["pm10"] is not None else missing,
+            _months(columns["date"], count)
+        ])
+        inflow, version = self._model("pollution", features)
+        scores = predictor.score(
+            aqi, predicted_inflow=np.maximum(inflow.astype(np.float64), 0.0) if inflow is not None else None
+        )
+        categories = [
+            name for name, _ in sorted(predictor.AQI_THRESHOLDS.items(), key=lambda item: item[1]["max"])
+        ]
+        risk_levels, risk_index = np.unique(
+            np.array([predictor.AQI_THRESHOLDS[name]["risk"] for name in categories]), return_inverse=True
+        )
+        category_index = scores["category_index"].astype(np.int32)
+        return {
+            "aqi_category": pa.DictionaryArray.from_arrays(category_index, pa.array(categories)),
+            "risk_level": pa.DictionaryArray.from_arrays(
+                risk_index.astype(np.int32)[category_index], pa.array(risk_levels.tolist())
+            ),
+            "predicted_inflow": scores["predicted_inflow"],
+            "confidence": scores["confidence"],
+            "surge_multiplier": scores["surge_multiplier"],
+            "respiratory_beds": scores["respiratory_beds"],
+            "oxygen_cylinders": scores["oxygen_cylinders"],
+            "nebulizers": scores["nebulizers"],
+            "ventilators": scores["ventilators"]
+        }, version
+    
+    def _staff(self, forecaster, columns: Dict[str, Any], count: int) -> Tuple[Dict[str, Any], Optional[str]]:
+        patients = columns["predicted_patients"]
+        department_ratios = {
+            name: (ratios["doctors"], ratios["nurses"], ratios["support"])
+            for name, ratios in forecaster.STAFF_RATIOS.items()
+        }
+        default_ratios = department_ratios["default"]
+        department = columns["department"]
+        if department is None:
+            ratios = np.tile(default_ratios, (count, 1))
+        else:
+            ratio_table = np.array(
+                [department_ratios.get(value.lower(), default_ratios) for value in department.categories]
+                + [default_ratios]
+            )
+            ratios = ratio_table[department.codes]
+        shift_multipliers = _lookup(columns["shift_type"], forecaster.SHIFT_MULTIPLIERS, 1.0, count)
+        
+        # Same truncation order as forecast(): ratio first, then shift multiplier
+        required = (patients[:, None] * ratios).astype(np.int64)
+        required = (required * shift_multipliers[:, None]).astype(np.int64)
+        
+        base, version = self._model("staff", np.column_stack([
+            patients,
+            _lookup(department, DEPARTMENT_CODES, DEPARTMENT_CODES["default"], count).astype(np.float64),
+            _lookup(columns["shift_type"], SHIFT_CODES, np.nan, count).astype(np.float64)
+        ]))
+        if base is not None:
+            required = np.maximum(base.astype(np.float64), 0.0).astype(np.int64).reshape(count, 3)
+        required = np.maximum(required, [
+            forecaster.MINIMUM_STAFF["doctors"],
+            forecaster.MINIMUM_STAFF["nurses"],
+            forecaster.MINIMUM_STAFF["support"]
+        ])
+        
+        current = columns["current_staff"]
+        current = np.zeros(count) if current is None else np.nan_to_num(current)
+        current = current.astype(np.int64)
+        current_split = np.stack([
+            (current * 0.3).astype(np.int64),
+            (current * 0.5).astype(np.int64),
+            (current * 0.2).astype(np.int64)
+        ], axis=1)
+        role_gaps = np.maximum(required - current_split, 0)
+        # Gaps are only reported when current staff is given (and non-zero)
+        no_staff = current == 0
+        return {
+            "required_doctors": required[:, 0],
+            "required_nurses": required[:, 1],
+            "required_support_staff": required[:, 2],
+            "gap_doctors": _nullable(role_gaps[:, 0], no_staff),
+            "gap_nurses": _nullable(role_gaps[:, 1], no_staff),
+            "gap_support": _nullable(role_gaps[:, 2], no_staff),
+            "total_gap": _nullable(np.maximum(required.sum(axis=1) - current, 0), no_staff)
+        }, version
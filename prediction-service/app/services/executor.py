@@ -0,0 +1,270 @@
+import asyncio
+import contextvars
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .profiler import active_profile
+
+
+class ExecutorSaturated(Exception):
+    """
+    Raised when prediction work cannot be admitted: the queue is full (429)
+    or a queued task waited longer than the queue timeout (503)
+    """
+    
+    def __init__(self, detail: str, status_code: int, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+# Per-process targets for process-pool workers, built by _init_worker
+_worker_targets: Dict[str, Any] = {}
+
+
+def _init_worker(target_factory: Callable[[], Dict[str, Any]]) -> None:
+    _worker_targets.update(target_factory())
+
+
+def _timed_call(function: Callable, args: tuple, kwargs: dict) -> Tuple[Any, float]:
+    """
+    ``function(*args, **kwargs)`` and the seconds it took on the worker,
+    inside the calling request's profile when it is being profiled
+    """
+    profile = active_profile.get()
+    started = time.perf_counter()
+    value = function(*args, **kwargs) if profile is None else profile.run(function, args, kwargs)
+    return value, time.perf_counter() - started
+
+
+def _invoke_worker_target(target: str, method: str, args: tuple, kwargs: dict) -> Tuple[Any, float]:
+    return _timed_call(getattr(_worker_targets[target], method), args, kwargs)
+
+
+class PredictionExecutor:
+    """
+    Runs predictor calls off the event loop behind a bounded queue.
+    
+    Work is addressed by target name and method (``run("pollution",
+    "predict_many", items)``) rather than by callable, so process-pool workers
+    can call their own copies of the predictors, built once per process by
+    ``target_factory``, instead of receiving pickled instances per call.
+    
+    Modes:
+      - ``inline``: call on the event loop (no queue; for debugging)
+      - ``thread``: a thread pool of ``max_workers`` threads
+      - ``process``: a process pool of ``max_workers`` processes
+    
+    At most ``max_workers`` calls run at once and ``max_queue`` more may wait.
+    Beyond that, calls are rejected with 429. A call that waits more than
+    ``queue_timeout`` seconds for a worker fails with 503. Both carry a
+    Retry-After estimate.
+    
+    ``observer``, when set, is called as ``observer(target, method, seconds,
+    waited, error)`` for every finished call, with the time the call took
+    on its worker (in every mode) and the time it waited for one.
+    """
+    
+    MODES = ("inline", "thread", "process")
+    
+    def __init__(
+        self,
+        target_factory: Callable[[], Dict[str, Any]],
+        mode: str = "thread",
+        max_workers: int = 4,
+        max_queue: int = 64,
+        queue_timeout: float = 5.0,
+        targets: Optional[Dict[str, Any]] = None
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown executor mode '{mode}'. Expected one of: {', '.join(self.MODES)}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._target_factory = target_factory
+        # inline/thread modes call these directly; process workers build their own
+        self._targets = targets if targets is not None else (
+            target_factory() if mode != "process" else {}
+        )
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.observer: Optional[Callable[[str, str, float, float, Optional[BaseException]], None]] = None
+        
+        self._pending = 0  # queued + running
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._service_total = 0.0
+    
+    async def run(self, target: str, method: str, *args, **kwargs) -> Any:
+        """Call ``targets[target].<method>(*args, **kwargs)`` on a worker"""
+        if self.mode == "inline":
+            return await self._record(
+                time.perf_counter(), self._call_inline(target, method, args, kwargs), target, method, 0.0
+            )
+        
+        self.admit()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        self._pending += 1
+        enqueued_at = time.perf_counter()
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise ExecutorSaturated(
+                    f"No prediction worker became free within {self.queue_timeout:g}s",
+                    503,
+                    self._retry_after()
+                )
+        finally:
+            self._pending -= 1
+        
+        waited = time.perf_counter() - enqueued_at
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        self._pending += 1
+        self._running += 1
+        
+        loop = asyncio.get_running_loop()
+        if self.mode == "process":
+            future = self._ensure_pool().submit(
+                _invoke_worker_target, target, method, args, kwargs
+            )
+        else:
+            # In the caller's context, so a profiled request's calls join its profile
+            future = self._ensure_pool().submit(
+                contextvars.copy_context().run, _timed_call, getattr(self._targets[target], method), args, kwargs
+            )
+        # Free the slot when the worker actually finishes, even if the caller
+        # went away, so the slot count never exceeds the busy workers
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._release_slot)
+        )
+        return await self._record(time.perf_counter(), asyncio.wrap_future(future), target, method, waited)
+    
+    async def warm_up(self, calls: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """
+        Run each ``(target, method, kwargs)`` call before traffic arrives, so
+        first-call costs are not paid by requests. In process mode each call
+        runs once per worker, which also starts the workers and has them
+        build their predictors.
+        """
+        rounds = self.max_workers if self.mode == "process" else 1
+        for target, method, kwargs in calls:
+            await asyncio.gather(*(self.run(target, method, **kwargs) for _ in range(rounds)))
+    
+    def admit(self) -> None:
+        """
+        Reject with 429 when every worker is busy and the queue is full. Lets
+        handlers shed load before doing their own request preparation.
+        """
+        if self.mode != "inline" and self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturated(
+                "Prediction queue is full, retry later", 429, self._retry_after()
+            )
+    
+    async def _record(self, started_at: float, awaitable, target: str, method: str, waited: float) -> Any:
+        try:
+            result, seconds = await awaitable
+        except Exception as e:
+            self.failed += 1
+            if self.observer is not None:
+                self.observer(target, method, time.perf_counter() - started_at, waited, e)
+            raise
+        self._service_total += time.perf_counter() - started_at
+        self.completed += 1
+        if self.observer is not None:
+            self.observer(target, method, seconds, waited, None)
+        return result
+    
+    async def _call_inline(self, target: str, method: str, args: tuple, kwargs: dict) -> Tuple[Any, float]:
+        return _timed_call(getattr(self._targets[target], method), args, kwargs)
+    
+    def _release_slot(self) -> None:
+        self._running -= 1
+        self._pending -= 1
+        self._slots.release()
+    
+    def _ensure_pool(self) -> Executor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    if self.mode == "process":
+                        self._pool = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            # spawn: workers never inherit the server's threads or sockets
+                            mp_context=multiprocessing.get_context("spawn"),
+                            initializer=_init_worker,
+                            initargs=(self._target_factory,)
+                        )
+                    else:
+                        self._pool = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix="prediction"
+                        )
+        return self._pool
+    
+    def _retry_after(self) -> int:
+        """Seconds until the current backlog should drain, at least 1"""
+        calls = self.completed + self.failed
+        mean_service = self._service_total / calls if calls else 0.1
+        backlog = max(self._pending - self._running, 0) + self._running
+        return max(1, math.ceil(mean_service * backlog / self.max_workers))
+    
+    def stats(self) -> Dict:
+        calls = self.completed + self.failed
+        admitted = calls + self._running
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "queue_depth": max(self._pending - self._running, 0),
+            "running": self._running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(self._wait_total / admitted * 1000, 3) if admitted else 0.0,
+            "max_wait_ms": round(self._wait_max * 1000, 3),
+            "avg_service_ms": round(self._service_total / calls * 1000, 3) if calls else 0.0
+        }
+    
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+def executor_from_env(
+    target_factory: Callable[[], Dict[str, Any]],
+    targets: Optional[Dict[str, Any]] = None,
+    environ: Optional[Dict[str, str]] = None
+) -> PredictionExecutor:
+    """Build a PredictionExecutor from PREDICTION_EXECUTOR_* settings"""
+    env = os.environ if environ is None else environ
+    mode = env.get("PREDICTION_EXECUTOR_MODE", "thread")
+    return PredictionExecutor(
+        target_factory,
+        mode=mode,
+        max_workers=int(env.get("PREDICTION_EXECUTOR_WORKERS", "4")),
+        max_queue=int(env.get("PREDICTION_EXECUTOR_QUEUE", "64")),
+        queue_timeout=float(env.get("PREDICTION_EXECUTOR_QUEUE_TIMEOUT", "5")),
+        # Process workers must build their own predictors
+        targets=targets if mode != "process" else None
+    )
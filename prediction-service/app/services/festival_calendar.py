@@ -0,0 +1,155 @@
+import json
+from datetime import date, datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+
+class FestivalWindow(NamedTuple):
+    festival_name: str
+    start: date
+    end: date
+    intensity: str
+
+
+def _parse_day(value: str) -> date:
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+
+
+def _festival_key(name: str) -> str:
+    # Same normalization FestivalPredictor applies to festival names
+    return name.lower().replace(" ", "_")
+
+
+class FestivalCalendar:
+    """
+    A season of festival windows indexed for per-day surge timelines.
+    
+    Windows are stored as day-number arrays sorted by start day, together with
+    the longest window length, so the windows overlapping any query range are
+    found with two binary searches. Per-day surge is then built with a
+    difference array: overlapping festivals add their excess over baseline
+    (multiplier - 1) instead of multiplying, so baseline patients are only
+    counted once on days where festivals overlap.
+    
+    Multipliers are not stored: each timeline looks them up for the
+    overlapping windows only, with ``surge_multiplier`` or the lookup given
+    to that call, so reloaded and per-location rule tables apply at once.
+    """
+    
+    # Longest date range a single timeline query may cover
+    MAX_TIMELINE_DAYS = 3660
+    
+    def __init__(
+        self,
+        windows: List[Dict],
+        surge_multiplier: Callable[[str, str], float]
+    ):
+        parsed = []
+        for window in windows:
+            start = _parse_day(window["start_date"])
+            end = _parse_day(window["end_date"])
+            if end < start:
+                raise ValueError(
+                    f"Festival window '{window['festival_name']}' ends before it starts"
+                )
+            parsed.append(FestivalWindow(
+                festival_name=window["festival_name"],
+                start=start,
+                end=end,
+                intensity=window["festival_intensity"]
+            ))
+        self.surge_multiplier = surge_multiplier
+        
+        self.windows = sorted(parsed, key=lambda window: (window.start, window.end))
+        self._starts = np.array(
+            [np.datetime64(window.start, "D") for window in self.windows], dtype="datetime64[D]"
+        ).astype(np.int64)
+        self._ends = np.array(
+            [np.datetime64(window.end, "D") for window in self.windows], dtype="datetime64[D]"
+        ).astype(np.int64)
+        self._max_length = int((self._ends - self._starts).max()) + 1 if self.windows else 0
+        self._by_festival_year = {}
+        for window in self.windows:
+            self._by_festival_year.setdefault(
+                (_festival_key(window.festival_name), window.start.year), window
+            )
+    
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        surge_multiplier: Callable[[str, str], float]
+    ) -> "FestivalCalendar":
+        """Load windows from a JSON file: a list, or ``{"festivals": [...]}``"""
+        with open(path) as f:
+            data = json.load(f)
+        windows = data["festivals"] if isinstance(data, dict) else data
+        return cls(windows, surge_multiplier)
+    
+    def window_for(self, festival_name: str, year: int) -> Optional[FestivalWindow]:
+        """The first window of a festival starting in ``year``, if the calendar has one"""
+        return self._by_festival_year.get((_festival_key(festival_name), year))
+    
+    def overlapping(self, first_day: int, last_day: int) -> np.ndarray:
+        """Indices of windows intersecting the day-number range [first_day, last_day]"""
+        # A window overlapping the range must start within max_length days before it
+        lo = np.searchsorted(self._starts, first_day - self._max_length + 1, side="left")
+        hi = np.searchsorted(self._starts, last_day, side="right")
+        candidates = np.arange(lo, hi)
+        return candidates[self._ends[candidates] >= first_day]
+    
+    def timeline(
+        self,
+        start_date: str,
+        end_date: str,
+        surge_multiplier: Optional[Callable[[str, str], float]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Combined surge for every day in [start_date, end_date].
+        
+        Returns column arrays: ``dates`` (datetime64[D]), ``surge_multiplier``
+        and ``active_count``, plus ``active_windows``, the overlapping windows
+        with their clipped day offsets into the range and their multiplier.
+        ``surge_multiplier`` replaces the calendar's lookup for this call
+        (e.g. the rules of one location).
+        """
+        first_day = np.datetime64(_parse_day(start_date), "D").astype(np.int64)
+        last_day = np.datetime64(_parse_day(end_date), "D").astype(np.int64)
+        if last_day < first_day:
+            raise ValueError("end_date must not be before start_date")
+        days = int(last_day - first_day) + 1
+        if days > self.MAX_TIMELINE_DAYS:
+            raise ValueError(f"Timeline ranges are limited to {self.MAX_TIMELINE_DAYS} days")
+        
+        hits = self.overlapping(first_day, last_day)
+        lookup = surge_multiplier or self.surge_multiplier
+        multipliers = np.array(
+            [lookup(self.windows[index].festival_name, self.windows[index].intensity) for index in hits],
+            dtype=np.float64
+        )
+        offsets_start = np.maximum(self._starts[hits], first_day) - first_day
+        offsets_end = np.minimum(self._ends[hits], last_day) - first_day + 1
+        
+        # Difference arrays: +value at a window's first day, -value after its last
+        excess = (
+            np.bincount(offsets_start, multipliers - 1.0, minlength=days + 1)
+            - np.bincount(offsets_end, multipliers - 1.0, minlength=days + 1)
+        )
+        active = (
+            np.bincount(offsets_start, minlength=days + 1)
+            - np.bincount(offsets_end, minlength=days + 1)
+        )
+        
+        return {
+            "dates": np.arange(first_day, last_day + 1).astype("datetime64[D]"),
+            # Rounded so float drift from the running sum never leaks into outputs
+            "surge_multiplier": np.round(1.0 + np.cumsum(excess[:-1]), 6),
+            "active_count": np.cumsum(active[:-1]),
+            "active_windows": [
+                (self.windows[index], int(offset_start), int(offset_end), float(multiplier))
+                for index, offset_start, offset_end, multiplier in zip(
+                    hits, offsets_start, offsets_end, multipliers
+                )
+            ]
+        }
@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
 
 
 class FestivalPredictor:
@@ -23,6 +25,16 @@ class FestivalPredictor:
     # Base daily patient count (can be customized based on hospital size)
     BASE_DAILY_PATIENTS = 100
     
+    # Surge multiplier breakpoints for medium and high risk
+    RISK_BREAKPOINTS = np.array([1.4, 1.8])
+    RISK_LEVELS = ("low", "medium", "high")
+    
+    FESTIVAL_EQUIPMENT = (
+        "Oxygen cylinders",
+        "Emergency medication",
+        "Monitoring devices"
+    )
+    
     def predict(
         self,
         festival_name: str,
@@ -35,29 +47,10 @@ class FestivalPredictor:
         """
         Predict patient inflow during festival period
         """
-        # Parse dates
-        start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-        duration_days = (end - start).days + 1
-        
-        # Get base surge multiplier
-        festival_key = festival_name.lower().replace(" ", "_")
-        surge_multipliers = self.FESTIVAL_BASE_SURGE.get(
-            festival_key,
-            self.FESTIVAL_BASE_SURGE["default"]
+        duration_days, multiplier, base_patients = self._resolve_inputs(
+            festival_name, start_date, end_date, intensity, historical_data
         )
         
-        multiplier = surge_multipliers.get(intensity, surge_multipliers["medium"])
-        
-        # Calculate base daily patients
-        if historical_data and "average_daily_patients" in historical_data:
-            base_patients = historical_data["average_daily_patients"]
-        elif historical_data and "previous_year_cases" in historical_data:
-            # Estimate from previous year cases
-            base_patients = historical_data["previous_year_cases"] / duration_days
-        else:
-            base_patients = self.BASE_DAILY_PATIENTS
-        
         # Calculate predicted inflow
         daily_surge = base_patients * multiplier
         predicted_inflow = int(daily_surge * duration_days)
@@ -84,11 +77,7 @@ class FestivalPredictor:
             "doctors": int(predicted_inflow * 0.05 / duration_days),
             "nurses": int(predicted_inflow * 0.1 / duration_days),
             "ambulances": int(predicted_inflow * 0.02 / duration_days),
-            "equipment": [
-                "Oxygen cylinders",
-                "Emergency medication",
-                "Monitoring devices"
-            ]
+            "equipment": list(self.FESTIVAL_EQUIPMENT)
         }
         
         return {
@@ -107,6 +96,134 @@ class FestivalPredictor:
             }
         }
     
+    def predict_many(self, requests: List[Dict]) -> List[Dict]:
+        """
+        Predict patient inflow for many festival windows in one pass.
+        
+        Each request holds the keyword arguments of ``predict``, plus an
+        optional ``surge_multiplier`` that replaces the rule-table multiplier
+        (used by model-backed predictors). Results come back in request order;
+        a request that cannot be scored gets an ``{"error": ...}`` entry in its
+        slot instead of a prediction.
+        """
+        count = len(requests)
+        durations = np.ones(count, dtype=np.int64)
+        multipliers = np.ones(count, dtype=np.float64)
+        base_patients = np.zeros(count, dtype=np.float64)
+        resolved: List[Optional[Tuple]] = [None] * count
+        errors: Dict[int, str] = {}
+        
+        for i, request in enumerate(requests):
+            try:
+                resolved[i] = self._resolve_inputs(
+                    request["festival_name"],
+                    request["start_date"],
+                    request["end_date"],
+                    request["intensity"],
+                    request.get("historical_data"),
+                    request.get("surge_multiplier")
+                )
+                durations[i], multipliers[i], base_patients[i] = resolved[i]
+                if durations[i] == 0:
+                    raise ZeroDivisionError("festival window spans zero days")
+            except Exception as e:
+                errors[i] = str(e) or type(e).__name__
+                durations[i] = 1
+        
+        # Same arithmetic as predict(), one array operation per quantity
+        predicted = (base_patients * multipliers * durations).astype(np.int64)
+        risk_index = np.searchsorted(self.RISK_BREAKPOINTS, multipliers, side="right")
+        beds = (predicted * 0.3 / durations).astype(np.int64)
+        doctors = (predicted * 0.05 / durations).astype(np.int64)
+        nurses = (predicted * 0.1 / durations).astype(np.int64)
+        ambulances = (predicted * 0.02 / durations).astype(np.int64)
+        
+        results = []
+        for i, request in enumerate(requests):
+            if i in errors:
+                results.append({"error": errors[i]})
+                continue
+            
+            duration_days, multiplier, base = resolved[i]
+            predicted_inflow = int(predicted[i])
+            festival_name = request["festival_name"]
+            intensity = request["intensity"]
+            
+            results.append({
+                "predicted_inflow": predicted_inflow,
+                "confidence": 85.0 if request.get("historical_data") else 65.0,
+                "risk_level": self.RISK_LEVELS[risk_index[i]],
+                "recommendations": self._generate_recommendations(
+                    festival_name, intensity, predicted_inflow, duration_days
+                ),
+                "estimated_resources": {
+                    "beds": int(beds[i]),
+                    "doctors": int(doctors[i]),
+                    "nurses": int(nurses[i]),
+                    "ambulances": int(ambulances[i]),
+                    "equipment": list(self.FESTIVAL_EQUIPMENT)
+                },
+                "factors": {
+                    "festival_name": festival_name,
+                    "intensity": intensity,
+                    "duration_days": duration_days,
+                    "surge_multiplier": multiplier,
+                    "base_daily_patients": base,
+                    "location": request.get("location")
+                }
+            })
+        
+        return results
+    
+    def surge_multiplier(self, festival_name: str, intensity: str) -> float:
+        """Look up the surge multiplier for a festival and intensity"""
+        festival_key = festival_name.lower().replace(" ", "_")
+        surge_multipliers = self.FESTIVAL_BASE_SURGE.get(
+            festival_key,
+            self.FESTIVAL_BASE_SURGE["default"]
+        )
+        
+        return surge_multipliers.get(intensity, surge_multipliers["medium"])
+    
+    def rules_for(self, location: Optional[str] = None) -> Tuple["FestivalPredictor", Optional[str]]:
+        """
+        The predictor holding the rule tables for ``location`` and their
+        version: None here, these tables serve every location
+        """
+        return self, None
+    
+    def _resolve_inputs(
+        self,
+        festival_name: str,
+        start_date: str,
+        end_date: str,
+        intensity: str,
+        historical_data: Optional[Dict],
+        surge_multiplier: Optional[float] = None
+    ) -> Tuple[int, float, float]:
+        """Resolve duration, surge multiplier and base daily patients"""
+        # Parse dates
+        start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+        end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        duration_days = (end - start).days + 1
+        
+        # Get base surge multiplier
+        if surge_multiplier is not None:
+            multiplier = surge_multiplier
+        else:
+            multiplier = self.surge_multiplier(festival_name, intensity)
+        
+        # Calculate base daily patients
+        if historical_data and "average_daily_patients" in historical_data:
+            base_patients = historical_data["average_daily_patients"]
+        elif historical_data and "previous_year_cases" in historical_data:
+            # Estimate from previous year cases
+            base_patients = historical_data["previous_year_cases"] / duration_days
+        else:
+            base_patients = self.BASE_DAILY_PATIENTS
+        
+        return duration_days, multiplier, base_patients
+    
     def _generate_recommendations(
         self,
         festival_name: str,
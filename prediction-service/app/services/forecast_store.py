@@ -0,0 +1,531 @@
+import asyncio
+import fcntl
+import json
+import mmap
+import os
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+
+# One fixed-width record per (date, location, department), date-major
+RECORD = np.dtype([
+    ("festival_surge_multiplier", "<f8"),
+    ("festival_inflow", "<i4"),
+    ("festival_set", "<i2"),       # index into the header's festival_sets
+    ("aqi", "<f8"),                # NaN where the location had no AQI
+    ("pollution_inflow", "<i4"),
+    ("pollution_risk", "<i1"),     # index into the header's risk_levels, -1 for none
+    ("combined_inflow", "<i4"),
+    ("required_doctors", "<i4"),
+    ("required_nurses", "<i4"),
+    ("required_support_staff", "<i4")
+])
+
+
+def _day_number(value) -> int:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+    if isinstance(value, datetime):
+        value = value.date()
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def _day_iso(day: int) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def _normalize(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+
+class _Table(NamedTuple):
+    identity: Tuple[int, int]  # (inode, mtime_ns) of the mapped file
+    header: Dict
+    records: np.ndarray        # read-only view over the mapping
+    first_day: int
+    n_days: int
+    locations: Dict[str, int]
+    departments: Dict[str, int]
+
+
+class ForecastStore:
+    """
+    Precomputed combined forecasts in one memory-mapped file.
+    
+    The file is a magic string, a JSON header (key space, label tables,
+    build metadata) and a packed array of ``RECORD`` rows ordered by date,
+    then location, then department, so a lookup is two dict reads and one
+    index computation. The file is mapped read-only: every worker process
+    reads the same pages from the page cache.
+    
+    ``publish`` writes a new file next to the old one and renames it over
+    the path, so readers see the old table or the new one, never a partial
+    write. Processes notice the new file within ``check_interval`` seconds;
+    mappings of the replaced file stay valid until they are dropped.
+    """
+    
+    MAGIC = b"HPFCST01"
+    ALIGN = 64
+    
+    def __init__(self, path: str, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._table: Optional[_Table] = None
+        self._checked_at = 0.0
+    
+    # ----- reads -----
+    
+    def _current(self) -> Optional[_Table]:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return self._table
+            if self._table is None or self._table.identity != (stat.st_ino, stat.st_mtime_ns):
+                try:
+                    self._table = self._load()
+                except FileNotFoundError:
+                    pass  # replaced between stat and open; retry on the next check
+        return self._table
+    
+    def _load(self) -> _Table:
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:len(self.MAGIC)] != self.MAGIC:
+            raise ValueError(f"{self.path} is not a forecast store file")
+        start = len(self.MAGIC) + 8
+        header_length = int.from_bytes(buffer[len(self.MAGIC):start], "little")
+        header = json.loads(buffer[start:start + header_length])
+        dtype = np.dtype([tuple(field) for field in header["dtype"]])
+        records = np.frombuffer(buffer, dtype=dtype, count=header["records"], offset=header["offset"])
+        return _Table(
+            identity=(stat.st_ino, stat.st_mtime_ns),
+            header=header,
+            records=records,
+            first_day=header["first_day"],
+            n_days=header["horizon_days"],
+            locations={_normalize(location): i for i, location in enumerate(header["locations"])},
+            departments={_normalize(department): i for i, department in enumerate(header["departments"])}
+        )
+    
+    def lookup(self, day: str, location: str, department: Optional[str] = None) -> Optional[Dict]:
+        """
+        The stored forecast for one key, or None if nothing has been
+        materialized yet. Keys outside the stored range raise KeyError.
+        """
+        table = self._current()
+        if table is None:
+            return None
+        offset = _day_number(day) - table.first_day
+        if not 0 <= offset < table.n_days:
+            raise KeyError(
+                f"{day} is outside the materialized range "
+                f"{_day_iso(table.first_day)} to {_day_iso(table.first_day + table.n_days - 1)}"
+            )
+        header = table.header
+        location_index = table.locations.get(_normalize(location))
+        if location_index is None:
+            raise KeyError(
+                f"Location {location!r} is not materialized. Stored: {', '.join(header['locations'])}"
+            )
+        department_index = table.departments.get(_normalize(department))
+        if department_index is None:
+            raise KeyError(
+                f"Department {department!r} is not materialized. "
+                f"Stored: {', '.join(str(department) for department in header['departments'])}"
+            )
+        
+        row = (offset * len(table.locations) + location_index) * len(table.departments) + department_index
+        record = dict(zip(table.records.dtype.names, table.records[row].item()))
+        aqi = record["aqi"]
+        return {
+            "date": _day_iso(table.first_day + offset),
+            "location": header["locations"][location_index],
+            "department": header["departments"][department_index],
+            "festival_surge_multiplier": record["festival_surge_multiplier"],
+            "festival_inflow": record["festival_inflow"],
+            "active_festivals": header["festival_sets"][record["festival_set"]],
+            "aqi": None if aqi != aqi else aqi,
+            "pollution_inflow": record["pollution_inflow"],
+            "pollution_risk_level": header["risk_levels"][record["pollution_risk"]]
+            if record["pollution_risk"] >= 0 else None,
+            "combined_inflow": record["combined_inflow"],
+            "required_doctors": record["required_doctors"],
+            "required_nurses": record["required_nurses"],
+            "required_support_staff": record["required_support_staff"],
+            "rules_version": header.get("rules_versions", {}).get(header["locations"][location_index]),
+            "generated_at": header["generated_at"]
+        }
+    
+    def age(self, recheck: bool = False) -> Optional[float]:
+        """
+        Seconds since the current file was generated, or None if there is
+        none; ``recheck`` looks for a newer file now rather than on schedule
+        """
+        if recheck:
+            self._checked_at = 0.0
+        table = self._current()
+        if table is None:
+            return None
+        return time.time() - table.header["generated_at_epoch"]
+    
+    def describe(self) -> Dict:
+        table = self._current()
+        if table is None:
+            return {"path": self.path, "materialized": False}
+        header = table.header
+        return {
+            "path": self.path,
+            "materialized": True,
+            "start_date": _day_iso(table.first_day),
+            "end_date": _day_iso(table.first_day + table.n_days - 1),
+            "horizon_days": table.n_days,
+            "locations": header["locations"],
+            "departments": header["departments"],
+            "records": header["records"],
+            "record_bytes": table.records.dtype.itemsize,
+            "file_bytes": header["offset"] + header["records"] * table.records.dtype.itemsize,
+            "generated_at": header["generated_at"],
+            "age_seconds": round(time.time() - header["generated_at_epoch"], 1),
+            "build_ms": header.get("build_ms"),
+            "aqi": header["aqi"],
+            "base_daily_patients": header["base_daily_patients"],
+            "shift_type": header.get("shift_type")
+        }
+    
+    # ----- writes -----
+    
+    def publish(self, records: np.ndarray, header: Dict) -> None:
+        """Write ``records`` with ``header`` to a temporary file and rename it over the path"""
+        header = {**header, "records": int(records.size), "dtype": [list(field) for field in records.dtype.descr]}
+        # The offset depends on the header's own length; it settles within two passes
+        header["offset"] = 0
+        for _ in range(2):
+            encoded = json.dumps(header, separators=(",", ":")).encode()
+            prefix = len(self.MAGIC) + 8 + len(encoded)
+            header["offset"] = -(-prefix // self.ALIGN) * self.ALIGN
+        encoded = json.dumps(header, separators=(",", ":")).encode()
+        padding = header["offset"] - (len(self.MAGIC) + 8 + len(encoded))
+        
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(self.MAGIC)
+                f.write(len(encoded).to_bytes(8, "little"))
+                f.write(encoded)
+                f.write(b"\0" * padding)
+                f.write(np.ascontiguousarray(records).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        self._table = self._load()
+        self._checked_at = time.monotonic()
+    
+    @contextmanager
+    def exclusive(self) -> Iterator[bool]:
+        """
+        Hold the store's build lock if no other process does; yields whether
+        it was acquired, so only one worker rebuilds at a time
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + ".lock", "a") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class ForecastMaterializer:
+    """
+    Builds the forecast store: festival + pollution + staff forecasts for
+    every (date, location, department) in the configured key space.
+    
+    The rows are the ones ``/api/predict/stream`` produces, computed as
+    arrays: the festival surge comes from the calendar timeline (O(days),
+    one per set of festival rules among the locations when
+    ``festival_predictor`` is given), each location's baseline from the
+    baseline store, pollution inflow from
+    one prediction per location at its current AQI, and staff requirements
+    from one forecast per distinct (combined inflow, department).
+    
+    Run once (``materialize``) or on a schedule (``start``): the loop
+    rebuilds when the store is older than ``interval`` seconds or a rebuild
+    was ``request``-ed, and skips while another process holds the build
+    lock. ``await aqi_source(location)`` gives the AQI for the scheduled builds.
+    """
+    
+    RETRY_SECONDS = 60.0
+    
+    def __init__(
+        self,
+        store: ForecastStore,
+        calendar,
+        pollution_predictor,
+        staff_forecaster,
+        default_base_patients: float,
+        baseline_store=None,
+        locations: Sequence[str] = (),
+        departments: Sequence[Optional[str]] = (None,),
+        horizon_days: int = 90,
+        interval: float = 3600.0,
+        shift_type: Optional[str] = None,
+        aqi_source: Optional[Callable[[str], Awaitable[Optional[float]]]] = None,
+        festival_predictor=None
+    ):
+        self.store = store
+        self.calendar = calendar
+        self.festival_predictor = festival_predictor
+        self.pollution_predictor = pollution_predictor
+        self.staff_forecaster = staff_forecaster
+        self.default_base_patients = default_base_patients
+        self.baseline_store = baseline_store
+        self.locations = list(locations)
+        self.departments = list(departments)
+        self.horizon_days = horizon_days
+        self.interval = interval
+        self.shift_type = shift_type
+        self.aqi_source = aqi_source
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_build_ms: Optional[float] = None
+        self._requested = False
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def build(
+        self,
+        start_date: Optional[str] = None,
+        horizon_days: Optional[int] = None,
+        locations: Optional[Sequence[str]] = None,
+        departments: Optional[Sequence[Optional[str]]] = None,
+        aqi_by_location: Optional[Dict[str, float]] = None
+    ) -> Tuple[np.ndarray, Dict]:
+        """Records and header for the key space; the arguments override the configured one"""
+        start = datetime.fromisoformat(start_date.replace('Z', '+00:00')).date() \
+            if start_date else datetime.now(timezone.utc).date()
+        horizon_days = horizon_days or self.horizon_days
+        locations = list(locations or self.locations)
+        departments = list(departments or self.departments)
+        aqi_by_location = aqi_by_location or {}
+        if not locations:
+            raise ValueError("No locations to materialize")
+        if len(set(map(_normalize, locations))) != len(locations):
+            raise ValueError("locations must be unique")
+        if len(set(map(_normalize, departments))) != len(departments):
+            raise ValueError("departments must be unique")
+        
+        end = start + timedelta(days=horizon_days - 1)
+        # Festival surge per (day, location): the windows are the same everywhere,
+        # only the multipliers follow each location's rules
+        timelines = {}
+        multipliers = np.empty((horizon_days, len(locations)), dtype=np.float64)
+        for i, location in enumerate(locations):
+            tables = self.festival_predictor.rules_for(location)[0] if self.festival_predictor is not None else None
+            if tables not in timelines:
+                timelines[tables] = self.calendar.timeline(
+                    start.isoformat(), end.isoformat(), tables.surge_multiplier if tables is not None else None
+                )
+            multipliers[:, i] = timelines[tables]["surge_multiplier"]
+        timeline = next(iter(timelines.values()))
+        
+        # Festival inflow per (day, location): each location's own baseline
+        base = np.array([self._base_patients(location, start) for location in locations], dtype=np.float64)
+        festival_inflow = (base[None, :] * multipliers).astype(np.int64)
+        active = [[] for _ in range(horizon_days)]
+        for window, first, stop, _ in timeline["active_windows"]:
+            for offset in range(first, stop):
+                active[offset].append(window.festival_name)
+        festival_sets: Dict[Tuple[str, ...], int] = {}
+        festival_set = np.array(
+            [festival_sets.setdefault(tuple(names), len(festival_sets)) for names in active], dtype=np.int16
+        )
+        
+        # Pollution: one prediction per location with an AQI
+        aqi = np.full(len(locations), np.nan)
+        pollution_inflow = np.zeros(len(locations), dtype=np.int64)
+        pollution_risk = np.full(len(locations), -1, dtype=np.int8)
+        risk_levels: List[str] = []
+        for i, location in enumerate(locations):
+            value = aqi_by_location.get(location)
+            if value is None:
+                continue
+            prediction = self.pollution_predictor.predict(aqi=value, location=location)
+            aqi[i] = prediction["factors"]["aqi"]
+            pollution_inflow[i] = prediction["predicted_inflow"]
+            if prediction["risk_level"] not in risk_levels:
+                risk_levels.append(prediction["risk_level"])
+            pollution_risk[i] = risk_levels.index(prediction["risk_level"])
+        combined = festival_inflow + pollution_inflow[None, :]
+        
+        # Staff: inflows repeat across days and locations, so forecast each value once
+        # per set of staff tables (locations whose rules share tables share forecasts)
+        required = np.empty((len(departments), 3) + combined.shape, dtype=np.int64)  # (departments, 3, days, locations)
+        staff_groups: Dict[Any, List[int]] = {}
+        rules_versions = {}
+        for i, location in enumerate(locations):
+            tables, rules_versions[location] = self.staff_forecaster.rules_for(location)
+            staff_groups.setdefault(tables, []).append(i)
+        for columns in staff_groups.values():
+            values, inverse = np.unique(combined[:, columns], return_inverse=True)
+            group = np.empty((len(departments), 3, len(values)), dtype=np.int64)
+            for p, department in enumerate(departments):
+                for j, value in enumerate(values.tolist()):
+                    staff = self.staff_forecaster.forecast(
+                        predicted_patients=value,
+                        department=department,
+                        shift_type=self.shift_type,
+                        location=locations[columns[0]]
+                    )
+                    group[p, :, j] = (
+                        staff["required_doctors"], staff["required_nurses"], staff["required_support_staff"]
+                    )
+            required[:, :, :, columns] = group[:, :, inverse.reshape(len(combined), len(columns))]
+        
+        records = np.empty((horizon_days, len(locations), len(departments)), dtype=RECORD)
+        records["festival_surge_multiplier"] = multipliers[:, :, None]
+        records["festival_inflow"] = festival_inflow[:, :, None]
+        records["festival_set"] = festival_set[:, None, None]
+        records["aqi"] = aqi[None, :, None]
+        records["pollution_inflow"] = pollution_inflow[None, :, None]
+        records["pollution_risk"] = pollution_risk[None, :, None]
+        records["combined_inflow"] = combined[:, :, None]
+        for role, field in enumerate(("required_doctors", "required_nurses", "required_support_staff")):
+            records[field] = required[:, role].transpose(1, 2, 0)
+        
+        generated_at = time.time()
+        header = {
+            "first_day": _day_number(start),
+            "horizon_days": horizon_days,
+            "locations": locations,
+            "departments": departments,
+            "festival_sets": [list(names) for names in festival_sets],
+            "risk_levels": risk_levels,
+            "aqi": {location: None if value != value else float(value) for location, value in zip(locations, aqi)},
+            "base_daily_patients": dict(zip(locations, base.tolist())),
+            "rules_versions": rules_versions,
+            "shift_type": self.shift_type,
+            "generated_at": datetime.fromtimestamp(generated_at, timezone.utc).isoformat(),
+            "generated_at_epoch": generated_at
+        }
+        return records.reshape(-1), header
+    
+    def materialize(self, **kwargs) -> Dict:
+        """Build and publish; returns a summary"""
+        started = time.perf_counter()
+        records, header = self.build(**kwargs)
+        header["build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.store.publish(records, header)
+        self.runs += 1
+        self.last_build_ms = header["build_ms"]
+        return {
+            "path": self.store.path,
+            "start_date": _day_iso(header["first_day"]),
+            "horizon_days": header["horizon_days"],
+            "locations": len(header["locations"]),
+            "departments": len(header["departments"]),
+            "records": int(records.size),
+            "bytes": os.path.getsize(self.store.path),
+            "build_ms": header["build_ms"]
+        }
+    
+    def _base_patients(self, location: str, start: date) -> float:
+        if self.baseline_store is not None:
+            baselines = self.baseline_store.baselines(location, as_of=start.isoformat())
+            if baselines and baselines.get(f"mean_{self.baseline_store.window_days}d"):
+                return float(baselines[f"mean_{self.baseline_store.window_days}d"])
+        return float(self.default_base_patients)
+    
+    # ----- schedule -----
+    
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def request(self) -> None:
+        """Rebuild as soon as possible (inputs changed); safe to call from any thread"""
+        self._requested = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+    
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval": self.interval,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_build_ms": self.last_build_ms
+        }
+    
+    async def _run(self) -> None:
+        while True:
+            age = self.store.age()
+            requested, self._requested = self._requested, False
+            if requested or age is None or age >= self.interval:
+                try:
+                    await self._build_scheduled(requested)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failures += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                age = self.store.age()
+            if age is None or age >= self.interval:
+                delay = min(self.RETRY_SECONDS, self.interval)
+            else:
+                delay = self.interval - age
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _build_scheduled(self, requested: bool) -> None:
+        # AQI is read here on the event loop; the build itself runs in a thread
+        aqi_by_location = {}
+        if self.aqi_source is not None:
+            for location in self.locations:
+                value = await self.aqi_source(location)
+                if value is not None:
+                    aqi_by_location[location] = value
+        with self.store.exclusive() as acquired:
+            age = self.store.age(recheck=True)
+            if not acquired or (not requested and age is not None and age < self.interval):
+                # Another worker is building, or just published a fresh file
+                self.skipped += 1
+                return
+            await self._loop.run_in_executor(None, lambda: self.materialize(aqi_by_location=aqi_by_location))
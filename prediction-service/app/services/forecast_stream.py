@@ -0,0 +1,151 @@
+import json
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+
+def forecast_rows(
+    start_date: str,
+    horizon_days: int,
+    locations: List[str],
+    departments: List[Optional[str]]
+) -> Iterator[Dict]:
+    """Yield one bare row per (date, location, department), date-major"""
+    start = datetime.fromisoformat(start_date.replace('Z', '+00:00')).date()
+    for offset in range(horizon_days):
+        day = (start + timedelta(days=offset)).isoformat()
+        for location in locations:
+            for department in departments:
+                yield {
+                    "day_offset": offset,
+                    "date": day,
+                    "location": location,
+                    "department": department
+                }
+
+
+def with_festival_surge(
+    rows: Iterable[Dict],
+    timelines: Dict[str, Dict],
+    base_daily_patients: Dict[str, float]
+) -> Iterator[Dict]:
+    """
+    Add the day's combined festival surge and festival-driven inflow.
+    
+    ``timelines`` holds each location's ``FestivalCalendar.timeline`` output
+    covering the whole horizon (locations with the same rules share one), so
+    festival work is O(days) per timeline rather than O(rows).
+    """
+    by_location = {}
+    columns = {}
+    for location, timeline in timelines.items():
+        key = (id(timeline), base_daily_patients[location])
+        if key not in columns:
+            active_festivals = [[] for _ in range(len(timeline["surge_multiplier"]))]
+            for window, first, stop, _ in timeline["active_windows"]:
+                for offset in range(first, stop):
+                    active_festivals[offset].append(window.festival_name)
+            columns[key] = (
+                timeline["surge_multiplier"].tolist(),
+                (base_daily_patients[location] * timeline["surge_multiplier"]).astype(np.int64).tolist(),
+                active_festivals
+            )
+        by_location[location] = columns[key]
+    
+    for row in rows:
+        offset = row["day_offset"]
+        multipliers, inflow, active_festivals = by_location[row["location"]]
+        row["festival_surge_multiplier"] = multipliers[offset]
+        row["festival_inflow"] = inflow[offset]
+        row["active_festivals"] = active_festivals[offset]
+        yield row
+
+
+def with_pollution_surge(
+    rows: Iterable[Dict],
+    predictions: Dict[str, Dict]
+) -> Iterator[Dict]:
+    """Add pollution-driven inflow for locations with a pollution prediction"""
+    for row in rows:
+        prediction = predictions.get(row["location"])
+        if prediction is None:
+            row["aqi"] = None
+            row["pollution_inflow"] = 0
+            row["pollution_risk_level"] = None
+        else:
+            row["aqi"] = prediction["factors"]["aqi"]
+            row["pollution_inflow"] = prediction["predicted_inflow"]
+            row["pollution_risk_level"] = prediction["risk_level"]
+        yield row
+
+
+def with_staff_requirements(
+    rows: Iterable[Dict],
+    forecast_staff_many: Callable[[List[Dict]], List[Dict]],
+    shift_type: Optional[str] = None,
+    chunk_rows: int = 512
+) -> Iterator[Dict]:
+    """
+    Add combined inflow and the staff needed to cover it.
+    
+    Rows are forecast ``chunk_rows`` at a time through ``forecast_staff_many``
+    (``forecast_many`` semantics), so each chunk is one predictor call.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        for row in chunk:
+            row["combined_inflow"] = row["festival_inflow"] + row["pollution_inflow"]
+        results = forecast_staff_many([
+            {
+                "predicted_patients": row["combined_inflow"],
+                "department": row["department"],
+                "shift_type": shift_type,
+                "location": row["location"]
+            }
+            for row in chunk
+        ])
+        for row, staff in zip(chunk, results):
+            if "error" in staff:
+                raise ValueError(staff["error"])
+            row["required_doctors"] = staff["required_doctors"]
+            row["required_nurses"] = staff["required_nurses"]
+            row["required_support_staff"] = staff["required_support_staff"]
+            yield row
+
+
+def to_ndjson(rows: Iterable[Dict], flush_bytes: int = 32768) -> Iterator[bytes]:
+    """
+    Serialize rows as newline-delimited JSON.
+    
+    Every data line has ``"type": "row"``. The stream ends with an ``end``
+    line carrying the row count, or an ``error`` line if the pipeline failed
+    part-way, so consumers can tell a complete stream from a truncated one.
+    The first row is flushed on its own; later rows are sent in chunks of
+    about ``flush_bytes`` to keep per-chunk overhead down.
+    """
+    count = 0
+    chunk = []
+    chunk_size = 0
+    try:
+        for row in rows:
+            row.pop("day_offset", None)
+            row["type"] = "row"
+            line = (json.dumps(row, separators=(",", ":")) + "\n").encode()
+            count += 1
+            chunk.append(line)
+            chunk_size += len(line)
+            if count == 1 or chunk_size >= flush_bytes:
+                yield b"".join(chunk)
+                chunk = []
+                chunk_size = 0
+    except Exception as e:
+        chunk.append((json.dumps({"type": "error", "rows": count, "detail": str(e)}) + "\n").encode())
+        yield b"".join(chunk)
+        return
+    chunk.append((json.dumps({"type": "end", "rows": count}) + "\n").encode())
+    yield b"".join(chunk)
@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .lazy import lazy_import
+
+spatial = lazy_import("scipy.spatial")
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class GeoSite(NamedTuple):
+    id: str
+    name: str
+    kind: str  # hospital, station or ward
+    lat: float
+    lng: float
+
+
+def _coordinates(site: Dict) -> Tuple[float, float]:
+    """(lat, lng) from ``lat``/``lng`` (or ``lon``), or a backend-style ``location`` object"""
+    source = site.get("location") if isinstance(site.get("location"), dict) else site
+    lat = source.get("lat", source.get("latitude"))
+    lng = source.get("lng", source.get("lon", source.get("longitude")))
+    if lat is None or lng is None:
+        raise ValueError(f"site {site.get('id') or site.get('name')!r} has no coordinates")
+    lat, lng = float(lat), float(lng)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError(f"site {site.get('id') or site.get('name')!r} has invalid coordinates")
+    return lat, lng
+
+
+def _unit_vectors(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Points on the unit sphere; chord length orders the same as great-circle distance"""
+    lat, lng = np.radians(lat), np.radians(lng)
+    return np.column_stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)])
+
+
+def _chord_km(chord: np.ndarray) -> np.ndarray:
+    return 2.0 * np.arcsin(np.minimum(chord / 2.0, 1.0)) * EARTH_RADIUS_KM
+
+
+def distance_matrix_km(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Great-circle distances (km) between every pair of points"""
+    vectors = _unit_vectors(lat, lng)
+    chord = np.sqrt(np.maximum(2.0 - 2.0 * (vectors @ vectors.T), 0.0))
+    return _chord_km(chord)
+
+
+class GeoIndex:
+    """
+    Hospitals, wards and AQI monitoring stations with coordinates.
+    
+    Stations are held in a ``cKDTree`` over their unit-sphere vectors, so the
+    k nearest stations to any point are found in O(log stations) with
+    great-circle distances. Interpolation only considers stations that
+    reported; a tree over each recent reporting set is kept so a feed that
+    reports the same stations every time does not rebuild it. Hospitals and
+    wards are kept as coordinate lists and looked up by id or name
+    (case-insensitive), which lets a request's ``location`` refer to a site.
+    """
+    
+    KINDS = ("hospital", "station", "ward")
+    
+    # Trees kept for partial reporting sets
+    SUBSET_TREES = 4
+    
+    def __init__(self, hospitals: List[Dict], stations: List[Dict], wards: Optional[List[Dict]] = None):
+        self.sites: Dict[str, List[GeoSite]] = {}
+        for kind, entries in (("hospital", hospitals), ("station", stations), ("ward", wards or [])):
+            parsed = []
+            for entry in entries:
+                lat, lng = _coordinates(entry)
+                site_id = str(entry.get("id") or entry.get("_id") or entry["name"])
+                parsed.append(GeoSite(site_id, str(entry.get("name") or site_id), kind, lat, lng))
+            self.sites[kind] = parsed
+        
+        self._lookup: Dict[str, GeoSite] = {}
+        for kind in ("ward", "hospital"):
+            for site in self.sites[kind]:
+                self._lookup[site.id.lower()] = site
+                self._lookup[site.name.lower()] = site
+        
+        stations = self.sites["station"]
+        self.station_ids = [site.id for site in stations]
+        self._station_index = {site_id: i for i, site_id in enumerate(self.station_ids)}
+        if len(self._station_index) != len(stations):
+            raise ValueError("station ids must be unique")
+        self._station_vectors = _unit_vectors(
+            np.array([site.lat for site in stations]), np.array([site.lng for site in stations])
+        )
+        self._tree = spatial.cKDTree(self._station_vectors) if stations else None
+        self._subset_trees: "OrderedDict[bytes, spatial.cKDTree]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_file(cls, path: str) -> "GeoIndex":
+        """Load ``{"hospitals": [...], "stations": [...], "wards": [...]}`` from JSON"""
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data.get("hospitals", []), data.get("stations", []), data.get("wards", []))
+    
+    def site(self, key: Optional[str]) -> Optional[GeoSite]:
+        """The hospital or ward with this id or name, if known"""
+        return self._lookup.get((key or "").strip().lower())
+    
+    def station_positions(self, station_ids: List[str]) -> np.ndarray:
+        """Positions of station ids in ``station_ids``; unknown ids raise ValueError"""
+        try:
+            return np.array([self._station_index[str(station)] for station in station_ids], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"unknown station {e.args[0]!r}")
+    
+    def nearest(
+        self,
+        lat: np.ndarray,
+        lng: np.ndarray,
+        k: int,
+        positions: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distances (km) and station positions of the ``k`` nearest stations to
+        each point, among ``positions`` (sorted, unique) when given
+        """
+        if self._tree is None:
+            raise ValueError("no monitoring stations are loaded")
+        tree = self._tree_for(positions)
+        candidates = len(self.station_ids) if positions is None else len(positions)
+        if candidates == 0:
+            raise ValueError("no stations to search")
+        points = _unit_vectors(lat, lng)
+        chord, index = tree.query(points, k=min(k, candidates))
+        # cKDTree drops the neighbour axis when k == 1
+        chord, index = chord.reshape(len(points), -1), index.reshape(len(points), -1)
+        if positions is not None and candidates < len(self.station_ids):
+            index = positions[index]
+        return _chord_km(chord), index
+    
+    def interpolate(
+        self,
+        values: Dict[str, np.ndarray],
+        station_ids: List[str],
+        lat: np.ndarray,
+        lng: np.ndarray,
+        k: int = 4,
+        power: float = 2.0,
+        max_distance_km: Optional[float] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Inverse-distance-weighted values at each point from the ``k`` nearest
+        stations that have a reading. ``values`` maps a field (aqi, pm25, ...)
+        to one reading per entry of ``station_ids``; NaN means no reading.
+        
+        A point on top of a station takes its reading. Stations beyond
+        ``max_distance_km`` are ignored and points with none in range get
+        NaN.
+        """
+        positions = self.station_positions(station_ids)
+        order = np.argsort(positions, kind="stable")
+        positions = positions[order]
+        if len(positions) and (np.diff(positions) == 0).any():
+            raise ValueError("each station may report once")
+        fields = {field: np.asarray(readings, dtype=np.float64)[order] for field, readings in values.items()}
+        
+        # A station reports if it has any non-NaN field
+        reporting = np.zeros(len(positions), dtype=bool)
+        for readings in fields.values():
+            reporting |= ~np.isnan(readings)
+        positions = positions[reporting]
+        fields = {field: readings[reporting] for field, readings in fields.items()}
+        
+        count = len(lat)
+        result = {field: np.full(count, np.nan) for field in fields}
+        result["nearest_station"] = np.full(count, -1, dtype=np.int64)
+        result["nearest_distance_km"] = np.full(count, np.nan)
+        result["stations_used"] = np.zeros(count, dtype=np.int64)
+        if not count or not len(positions):
+            return result
+        
+        distance, index = self.nearest(lat, lng, k, positions)
+        local = np.searchsorted(positions, index)
+        usable = np.ones(distance.shape, dtype=bool)
+        if max_distance_km is not None:
+            usable = distance <= max_distance_km
+        
+        # Within a metre counts as on top of the station
+        exact = usable & (distance < 1e-3)
+        weights = np.where(usable, 1.0 / np.maximum(distance, 1e-3) ** power, 0.0)
+        weights = np.where(exact.any(axis=1, keepdims=True), exact.astype(np.float64), weights)
+        for field, readings in fields.items():
+            neighbour_values = readings[local]
+            field_weights = np.where(np.isnan(neighbour_values), 0.0, weights)
+            weight_sum = field_weights.sum(axis=1)
+            weighted = (np.nan_to_num(neighbour_values) * field_weights).sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result[field] = np.where(weight_sum > 0, weighted / weight_sum, np.nan)
+        
+        # Neighbours come back nearest first
+        in_range = usable[:, 0]
+        result["nearest_station"] = np.where(in_range, index[:, 0], -1)
+        result["nearest_distance_km"] = np.where(in_range, distance[:, 0], np.nan)
+        result["stations_used"] = usable.sum(axis=1)
+        return result
+    
+    def _tree_for(self, positions: Optional[np.ndarray]) -> spatial.cKDTree:
+        if positions is None or len(positions) == len(self.station_ids):
+            return self._tree
+        key = positions.tobytes()
+        with self._lock:
+            tree = self._subset_trees.get(key)
+            if tree is not None:
+                self._subset_trees.move_to_end(key)
+                return tree
+        tree = spatial.cKDTree(self._station_vectors[positions])
+        with self._lock:
+            self._subset_trees[key] = tree
+            while len(self._subset_trees) > self.SUBSET_TREES:
+                self._subset_trees.popitem(last=False)
+        return tree
+    
+    def describe(self, k: int = 3) -> Dict:
+        """Site counts and each hospital's nearest stations"""
+        hospitals = self.sites["hospital"]
+        nearest = []
+        if hospitals and self._tree is not None:
+            distance, index = self.nearest(
+                np.array([site.lat for site in hospitals]), np.array([site.lng for site in hospitals]), k
+            )
+            nearest = [
+                [
+                    {"station": self.station_ids[i], "distance_km": round(float(d), 2)}
+                    for d, i in zip(row_distance, row_index)
+                ]
+                for row_distance, row_index in zip(distance, index)
+            ]
+        return {
+            "counts": {kind: len(self.sites[kind]) for kind in self.KINDS},
+            "hospitals": [
+                {
+                    "id": site.id,
+                    "name": site.name,
+                    "lat": site.lat,
+                    "lng": site.lng,
+                    "nearest_stations": nearest[i] if nearest else []
+                }
+                for i, site in enumerate(hospitals)
+            ],
+            "stations": [
+                {"id": site.id, "name": site.name, "lat": site.lat, "lng": site.lng}
+                for site in self.sites["station"]
+            ],
+            "wards": [
+                {"id": site.id, "name": site.name, "lat": site.lat, "lng": site.lng}
+                for site in self.sites["ward"]
+            ]
+        }
+
+
+class PollutionGrid:
+    """
+    Pollution surge for every hospital/ward (or ad-hoc point) from station
+    readings: readings are interpolated to each target by inverse distance
+    weighting and the whole array is scored by the pollution predictor's
+    AQI rules in one call.
+    """
+    
+    DEFAULT_NEIGHBOURS = 4
+    DEFAULT_POWER = 2.0
+    MAX_POINTS = 250_000
+    
+    def __init__(self, geo_index: GeoIndex, pollution_predictor):
+        self.geo = geo_index
+        self._pollution = pollution_predictor
+    
+    def score(
+        self,
+        readings: List[Dict],
+        targets: str = "hospitals",
+        points: Optional[List[Dict]] = None,
+        k: int = DEFAULT_NEIGHBOURS,
+        power: float = DEFAULT_POWER,
+        max_distance_km: Optional[float] = None
+    ) -> Dict:
+        """
+        ``readings`` hold ``station`` and ``aqi`` (optionally ``pm25``/``pm10``).
+        ``targets`` is ``hospitals``, ``wards``, ``all`` or ``points``, the last
+        taking ``points`` (``id``, ``lat``, ``lng``).
+        """
+        started = time.perf_counter()
+        sites = self._targets(targets, points)
+        if not sites:
+            raise ValueError(f"no {targets} to score")
+        if len(sites) > self.MAX_POINTS:
+            raise ValueError(f"at most {self.MAX_POINTS} points per request")
+        if not readings:
+            raise ValueError("readings is empty")
+        
+        station_ids = [str(reading["station"]) for reading in readings]
+        values = {
+            field: np.array(
+                [np.nan if reading.get(field) is None else float(reading[field]) for reading in readings]
+            )
+            for field in ("aqi", "pm25", "pm10")
+            if any(reading.get(field) is not None for reading in readings)
+        }
+        if "aqi" not in values:
+            raise ValueError("readings need aqi values")
+        lat = np.array([site.lat for site in sites])
+        lng = np.array([site.lng for site in sites])
+        exposure = self.geo.interpolate(values, station_ids, lat, lng, k, power, max_distance_km)
+        
+        aqi = exposure["aqi"]
+        covered = ~np.isnan(aqi)
+        tables, _ = self._pollution.rules_for(None)
+        scores = tables.score(np.where(covered, np.clip(aqi, 0.0, 500.0), 0.0))
+        categories = self._categories(tables)
+        
+        aqi_values = np.round(aqi, 1).tolist()
+        # NaN where no station in range reported the field
+        fields = {
+            field: [None if np.isnan(value) else value for value in np.round(exposure[field], 1).tolist()]
+            for field in ("pm25", "pm10")
+            if field in exposure
+        }
+        inflow = scores["predicted_inflow"].tolist()
+        risk = scores["risk_level"].tolist()
+        category_index = scores["category_index"].tolist()
+        nearest = exposure["nearest_station"].tolist()
+        nearest_distance = np.round(exposure["nearest_distance_km"], 2).tolist()
+        used = exposure["stations_used"].tolist()
+        
+        results = []
+        for i, site in enumerate(sites):
+            entry = {
+                "id": site.id,
+                "name": site.name,
+                "kind": site.kind,
+                "lat": site.lat,
+                "lng": site.lng,
+                "stations_used": used[i]
+            }
+            if covered[i]:
+                entry.update(
+                    aqi=aqi_values[i],
+                    **{field: values_[i] for field, values_ in fields.items()},
+                    aqi_category=categories[category_index[i]],
+                    risk_level=risk[i],
+                    predicted_inflow=inflow[i],
+                    nearest_station=self.geo.station_ids[nearest[i]],
+                    nearest_distance_km=nearest_distance[i]
+                )
+            else:
+                entry.update(aqi=None, risk_level=None, predicted_inflow=None)
+            results.append(entry)
+        
+        covered_risk = scores["risk_level"][covered]
+        levels, counts = np.unique(covered_risk, return_counts=True)
+        return {
+            "prediction_type": "pollution_grid",
+            "targets": targets,
+            "points": len(sites),
+            "covered_points": int(covered.sum()),
+            "stations_reporting": int((~np.isnan(values["aqi"])).sum()),
+            "method": {"neighbours": k, "power": power, "max_distance_km": max_distance_km},
+            "summary": {
+                "max_aqi": round(float(aqi[covered].max()), 1) if covered.any() else None,
+                "mean_aqi": round(float(aqi[covered].mean()), 1) if covered.any() else None,
+                "total_predicted_inflow": int(scores["predicted_inflow"][covered].sum()),
+                "risk_levels": {str(level): int(count) for level, count in zip(levels, counts)}
+            },
+            "results": results,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    
+    def exposure(self, location: Optional[str], readings: List[Dict], **kwargs) -> Optional[Dict]:
+        """Interpolated readings at a known hospital or ward, or None"""
+        site = self.geo.site(location)
+        if site is None:
+            return None
+        result = self.score(readings, "points", [site._asdict()], **kwargs)["results"][0]
+        return result if result["aqi"] is not None else None
+    
+    def _targets(self, targets: str, points: Optional[List[Dict]]) -> List[GeoSite]:
+        if targets == "hospitals":
+            return self.geo.sites["hospital"]
+        if targets == "wards":
+            return self.geo.sites["ward"]
+        if targets == "all":
+            return self.geo.sites["hospital"] + self.geo.sites["ward"]
+        if targets == "points":
+            parsed = []
+            for i, point in enumerate(points or []):
+                lat, lng = _coordinates(point)
+                site_id = str(point.get("id", i))
+                parsed.append(GeoSite(site_id, str(point.get("name") or site_id), point.get("kind") or "point", lat, lng))
+            return parsed
+        raise ValueError("targets must be hospitals, wards, all or points")
+    
+    @staticmethod
+    def _categories(tables) -> Tuple[str, ...]:
+        ordered = sorted(tables.AQI_THRESHOLDS.items(), key=lambda item: item[1]["max"])
+        return tuple(name for name, _ in ordered)
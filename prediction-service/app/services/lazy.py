@@ -0,0 +1,38 @@
+import importlib
+import threading
+import time
+import types
+from typing import Dict
+
+# First-use imports: module -> {"ms": import time, "at": epoch seconds}
+LAZY_IMPORTS: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported the first time one of its
+    attributes is read. Afterwards the module's namespace is copied in, so
+    later reads are plain attribute lookups.
+    """
+
+    def __getattr__(self, attr: str):
+        name = self.__name__
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        with _lock:
+            if name not in LAZY_IMPORTS:
+                LAZY_IMPORTS[name] = {"ms": (time.perf_counter() - started) * 1000, "at": time.time()}
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    ``pd = lazy_import("pandas")`` in place of ``import pandas as pd``: heavy
+    libraries are loaded when a code path first uses them, not when the
+    service module (and with it the app) is imported. Modules using this
+    need ``from __future__ import annotations`` when annotations name the
+    library's types.
+    """
+    return LazyModule(name)
@@ -0,0 +1,326 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+
+# Seconds; predictor calls take microseconds, batch routes up to seconds
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# (labels, value) pairs of one metric family, for collectors
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    TYPE = ""
+    
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+    
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+    
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name}_total {self.help}", f"# TYPE {self.name}_total counter"]
+    
+    def inc(self, labels: tuple = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0.0) + amount
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+        return self.header() + [
+            f"{self.name}_total{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in series
+        ]
+
+
+class Gauge(_Metric):
+    TYPE = "gauge"
+    
+    def inc(self, labels: tuple = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0.0) + amount
+    
+    def dec(self, labels: tuple = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+    
+    def set(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            self._series[labels] = value
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in series
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram. Each series keeps one count per bucket
+    (not cumulative) plus sum and count; buckets are summed when rendered
+    """
+    
+    TYPE = "histogram"
+    
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [bucket counts..., +Inf count, sum]
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        lines = self.header()
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms rendered in the Prometheus text
+    exposition format (0.0.4). Collectors are called at scrape time for
+    values other components already keep (executor, cache counters).
+    """
+    
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+    
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+    
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+    
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Samples]]]) -> None:
+        """``collector()`` yields (name, type, help, samples) per metric family"""
+        self._collectors.append(collector)
+    
+    def _add(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class ServiceMetrics:
+    """
+    The prediction service's own metrics: per-route latency, handler time,
+    status and exception counters, in-flight requests and payload sizes,
+    and per-predictor call latency from the prediction executor.
+    
+    ``handler`` is the endpoint body alone, so ``request - handler`` is
+    the time spent in request validation and response serialization.
+    """
+    
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        route = ("method", "route")
+        self.request_seconds = self.registry.histogram(
+            "prediction_http_request_duration_seconds",
+            "Request latency by route, validation and serialization included", route
+        )
+        self.handler_seconds = self.registry.histogram(
+            "prediction_http_handler_duration_seconds",
+            "Endpoint body latency by route, without validation and serialization", route
+        )
+        self.requests = self.registry.counter(
+            "prediction_http_requests", "Requests by route and status code", route + ("status",)
+        )
+        self.exceptions = self.registry.counter(
+            "prediction_http_exceptions", "Requests that raised, by route and exception type", route + ("exception",)
+        )
+        self.in_flight = self.registry.gauge(
+            "prediction_http_requests_in_flight", "Requests being handled, by route", route
+        )
+        self.request_bytes = self.registry.histogram(
+            "prediction_http_request_size_bytes", "Request body size by route (Content-Length)", route, SIZE_BUCKETS
+        )
+        self.response_bytes = self.registry.histogram(
+            "prediction_http_response_size_bytes", "Response body size by route", route, SIZE_BUCKETS
+        )
+        predictor = ("predictor", "method")
+        self.predictor_seconds = self.registry.histogram(
+            "prediction_predictor_duration_seconds",
+            "Predictor call latency on the executor worker, by predictor and method", predictor
+        )
+        self.predictor_wait_seconds = self.registry.histogram(
+            "prediction_predictor_queue_seconds",
+            "Time predictor calls waited for an executor worker", ("predictor",)
+        )
+        self.predictor_errors = self.registry.counter(
+            "prediction_predictor_errors", "Predictor calls that raised, by exception type",
+            predictor + ("exception",)
+        )
+    
+    def observe_predictor(
+        self,
+        target: str,
+        method: str,
+        seconds: float,
+        waited: float = 0.0,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """PredictionExecutor observer: one finished predictor call"""
+        self.predictor_seconds.observe((target, method), seconds)
+        self.predictor_wait_seconds.observe((target,), waited)
+        if error is not None:
+            self.predictor_errors.inc((target, method, type(error).__name__))
+    
+    def render(self) -> str:
+        return self.registry.render()
+
+
+def _exception_name(error: BaseException) -> str:
+    """The original error behind an HTTPException raised in an ``except`` block"""
+    if isinstance(error, HTTPException) and error.__context__ is not None:
+        return type(error.__context__).__name__
+    return type(error).__name__
+
+
+def instrumented_route(metrics: ServiceMetrics) -> type:
+    """
+    APIRoute subclass (for ``APIRouter(route_class=...)``) that records every
+    request of its routes in ``metrics``
+    """
+    
+    class InstrumentedRoute(APIRoute):
+        def __init__(self, path: str, endpoint: Callable, **kwargs):
+            labels = (",".join(sorted(kwargs.get("methods") or ["GET"])), path)
+            super().__init__(path, _timed_endpoint(endpoint, metrics.handler_seconds, labels), **kwargs)
+        
+        def get_route_handler(self) -> Callable:
+            handler = super().get_route_handler()
+            labels = (",".join(sorted(self.methods)), self.path)
+            
+            async def instrumented(request: Request):
+                length = request.headers.get("content-length")
+                if length and length.isdigit():
+                    metrics.request_bytes.observe(labels, int(length))
+                metrics.in_flight.inc(labels)
+                started = time.perf_counter()
+                try:
+                    response = await handler(request)
+                except Exception as e:
+                    # HTTPException and ExecutorSaturated carry their status
+                    status = 422 if isinstance(e, RequestValidationError) else getattr(e, "status_code", 500)
+                    metrics.exceptions.inc(labels + (_exception_name(e),))
+                    metrics.requests.inc(labels + (str(status),))
+                    raise
+                finally:
+                    metrics.request_seconds.observe(labels, time.perf_counter() - started)
+                    metrics.in_flight.dec(labels)
+                metrics.requests.inc(labels + (str(response.status_code),))
+                body = getattr(response, "body", None)
+                if body is not None:
+                    metrics.response_bytes.observe(labels, len(body))
+                return response
+            
+            return instrumented
+    
+    return InstrumentedRoute
+
+
+def _timed_endpoint(endpoint: Callable, histogram: Histogram, labels: tuple) -> Callable:
+    """
+    ``endpoint`` timing its own body; FastAPI reads the signature through
+    ``__wrapped__``. Routes copied by ``include_router`` re-wrap the original.
+    """
+    endpoint = getattr(endpoint, "_untimed", endpoint)
+    if not inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        def timed_sync(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                histogram.observe(labels, time.perf_counter() - started)
+        
+        timed_sync._untimed = endpoint
+        return timed_sync
+    
+    @functools.wraps(endpoint)
+    async def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            histogram.observe(labels, time.perf_counter() - started)
+    
+    timed._untimed = endpoint
+    return timed
+
@@ -0,0 +1,313 @@
+import abc
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .festival_predictor import FestivalPredictor
+from .model_registry import ModelArtifact, ModelRegistry
+from .prediction_cache import MISSING, TTLCache
+from .pollution_predictor import PollutionPredictor
+from .staff_forecaster import StaffForecaster
+
+
+# Categorical codes shared by training (scripts/train_models.py) and serving
+FESTIVAL_CODES = {name: code for code, name in enumerate(FestivalPredictor.FESTIVAL_BASE_SURGE)}
+INTENSITY_CODES = {"low": 0, "medium": 1, "high": 2}
+DEPARTMENT_CODES = {name: code for code, name in enumerate(StaffForecaster.STAFF_RATIOS)}
+SHIFT_CODES = {name: code for code, name in enumerate(StaffForecaster.SHIFT_MULTIPLIERS)}
+
+FESTIVAL_FEATURES = ["festival_code", "intensity_code", "duration_days", "start_month"]
+POLLUTION_FEATURES = ["aqi", "pm25", "pm10", "month"]
+STAFF_FEATURES = ["predicted_patients", "department_code", "shift_code"]
+
+
+def _month(value: Optional[str]) -> float:
+    if not value:
+        return np.nan
+    return float(datetime.fromisoformat(value.replace('Z', '+00:00')).month)
+
+
+def festival_features(request: Dict) -> List[float]:
+    """Feature row for a festival request (keyword arguments of ``predict``)"""
+    start = datetime.fromisoformat(request["start_date"].replace('Z', '+00:00'))
+    end = datetime.fromisoformat(request["end_date"].replace('Z', '+00:00'))
+    festival_key = request["festival_name"].lower().replace(" ", "_")
+    return [
+        FESTIVAL_CODES.get(festival_key, FESTIVAL_CODES["default"]),
+        INTENSITY_CODES.get(request["intensity"], INTENSITY_CODES["medium"]),
+        (end - start).days + 1,
+        start.month
+    ]
+
+
+def pollution_features(request: Dict) -> List[float]:
+    """Feature row for a pollution request; missing readings become NaN"""
+    return [
+        float(request["aqi"]),
+        np.nan if request.get("pm25") is None else float(request["pm25"]),
+        np.nan if request.get("pm10") is None else float(request["pm10"]),
+        _month(request.get("date"))
+    ]
+
+
+def staff_features(request: Dict) -> List[float]:
+    """Feature row for a staff request; unknown departments map to ``default``"""
+    department_key = (request.get("department") or "default").lower()
+    shift_type = request.get("shift_type")
+    return [
+        float(request["predicted_patients"]),
+        DEPARTMENT_CODES.get(department_key, DEPARTMENT_CODES["default"]),
+        SHIFT_CODES.get(shift_type.lower(), np.nan) if shift_type else np.nan
+    ]
+
+
+class _ModelBacked(abc.ABC):
+    """
+    Answers from a trained estimator when the registry has one, else from
+    the fallback predictor (rules or precompiled tables).
+    
+    The estimator only predicts the headline quantity; the rule predictor
+    turns it into the full response (risk level, resources, recommendations)
+    through the override key its ``*_many`` method accepts. Every response
+    reports the backend that produced it in ``factors["backend"]``, and the
+    model version in ``factors["model_version"]`` when a model answered.
+    The rule tables themselves come from ``rules_for``.
+    
+    Estimator outputs are memoized per feature row for the loaded version:
+    tree ensembles cost milliseconds per call regardless of batch size, and
+    request features (integer AQI, festival codes, patient counts) repeat.
+    """
+    
+    MODEL_NAME = ""
+    FEATURES: List[str] = []
+    OVERRIDE_KEY = ""
+    MEMO_SIZE = 4096
+    
+    def __init__(self, registry: ModelRegistry, fallback: Any, fallback_backend: str, rules: Any):
+        self.registry = registry
+        self._fallback = fallback
+        self._fallback_backend = fallback_backend
+        self._rules = rules
+        self._memo: Tuple[Optional[str], Optional[TTLCache]] = (None, None)
+    
+    def rules_for(self, location: Optional[str] = None) -> Tuple[Any, Optional[str]]:
+        """The tables model outputs are turned into responses with, and their version"""
+        return self._rules.rules_for(location)
+    
+    @abc.abstractmethod
+    def _features(self, request: Dict) -> List[float]:
+        """Estimator feature row for one request"""
+    
+    def _overrides(self, artifact: ModelArtifact, requests: List[Dict]) -> List[Dict]:
+        """
+        Override values for each request, with one batched estimator call for
+        the feature rows not already memoized. Requests whose features cannot
+        be built get no override and are scored (or rejected) by the rules.
+        """
+        version, memo = self._memo
+        if version != artifact.version:
+            memo = TTLCache(maxsize=self.MEMO_SIZE, ttl=float("inf"))
+            self._memo = (artifact.version, memo)
+        
+        overrides = [{} for _ in requests]
+        pending: Dict[Tuple, List[int]] = {}
+        for i, request in enumerate(requests):
+            try:
+                row = self._features(request)
+            except Exception:
+                continue
+            # NaN never equals itself, so missing readings are keyed as None
+            key = tuple(None if value != value else value for value in row)
+            value = memo.get(key)
+            if value is MISSING:
+                pending.setdefault(key, []).append(i)
+            else:
+                overrides[i] = {self.OVERRIDE_KEY: value}
+        
+        if pending:
+            rows = np.array(
+                [[np.nan if value is None else value for value in key] for key in pending],
+                dtype=np.float64
+            )
+            for key, prediction in zip(pending, artifact.model.predict(rows)):
+                value = self._override_value(prediction)
+                memo.set(key, value)
+                for i in pending[key]:
+                    overrides[i] = {self.OVERRIDE_KEY: value}
+        return overrides
+    
+    def _override_value(self, prediction) -> Any:
+        return float(prediction)
+    
+    def _run_many(self, requests: List[Dict], fallback_many) -> List[Dict]:
+        artifact = self.registry.get(self.MODEL_NAME)
+        if artifact is not None and list(artifact.features) == self.FEATURES:
+            try:
+                overrides = self._overrides(artifact, requests)
+            except Exception as e:
+                # A broken estimator degrades to the fallback instead of failing requests
+                self.registry.record_error(self.MODEL_NAME, f"{artifact.version}: {e}")
+            else:
+                results = self._rules_many([
+                    {**request, **override} for request, override in zip(requests, overrides)
+                ])
+                return self._tag(results, "model", artifact.version)
+        return self._tag(fallback_many(requests), self._fallback_backend, None)
+    
+    def _run_one(self, kwargs: Dict, fallback_one, fallback_many) -> Dict:
+        if self.registry.get(self.MODEL_NAME) is None:
+            return self._tag([fallback_one(**kwargs)], self._fallback_backend, None)[0]
+        result = self._run_many([kwargs], fallback_many)[0]
+        if "error" in result:
+            raise ValueError(result["error"])
+        return result
+    
+    @abc.abstractmethod
+    def _rules_many(self, requests: List[Dict]) -> List[Dict]:
+        """Score requests carrying override values with the rule predictor"""
+    
+    @staticmethod
+    def _tag(results: List[Dict], backend: str, version: Optional[str]) -> List[Dict]:
+        for result in results:
+            if "error" in result:
+                continue
+            factors = result.get("factors")
+            factors = dict(factors) if factors else {}
+            factors["backend"] = backend
+            if version is not None:
+                factors["model_version"] = version
+            result["factors"] = factors
+        return results
+
+
+class ModelBackedFestivalPredictor(_ModelBacked):
+    """Festival surge multiplier from the ``festival`` model"""
+    
+    MODEL_NAME = "festival"
+    FEATURES = FESTIVAL_FEATURES
+    OVERRIDE_KEY = "surge_multiplier"
+    
+    def _features(self, request: Dict) -> List[float]:
+        return festival_features(request)
+    
+    def _override_value(self, prediction) -> float:
+        # Multipliers are quoted to 3 decimals like the rule table
+        return round(max(float(prediction), 1.0), 3)
+    
+    def _rules_many(self, requests: List[Dict]) -> List[Dict]:
+        return self._rules.predict_many(requests)
+    
+    def predict(
+        self,
+        festival_name: str,
+        start_date: str,
+        end_date: str,
+        intensity: str,
+        historical_data: Optional[Dict] = None,
+        location: Optional[str] = None
+    ) -> Dict:
+        kwargs = {
+            "festival_name": festival_name,
+            "start_date": start_date,
+            "end_date": end_date,
+            "intensity": intensity,
+            "historical_data": historical_data,
+            "location": location
+        }
+        return self._run_one(kwargs, self._fallback.predict, self._fallback.predict_many)
+    
+    def predict_many(self, requests: List[Dict]) -> List[Dict]:
+        return self._run_many(requests, self._fallback.predict_many)
+    
+    def surge_multiplier(self, festival_name: str, intensity: str) -> float:
+        return self._fallback.surge_multiplier(festival_name, intensity)
+
+
+class ModelBackedPollutionPredictor(_ModelBacked):
+    """Pollution-driven inflow from the ``pollution`` model"""
+    
+    MODEL_NAME = "pollution"
+    FEATURES = POLLUTION_FEATURES
+    OVERRIDE_KEY = "predicted_inflow"
+    
+    def _features(self, request: Dict) -> List[float]:
+        return pollution_features(request)
+    
+    def _override_value(self, prediction) -> float:
+        return max(float(prediction), 0.0)
+    
+    def _rules_many(self, requests: List[Dict]) -> List[Dict]:
+        return self._rules.predict_many(requests)
+    
+    def predict(
+        self,
+        aqi: float,
+        pm25: Optional[float] = None,
+        pm10: Optional[float] = None,
+        location: Optional[str] = None,
+        date: Optional[str] = None
+    ) -> Dict:
+        kwargs = {"aqi": aqi, "pm25": pm25, "pm10": pm10, "location": location, "date": date}
+        return self._run_one(kwargs, self._fallback.predict, self._fallback.predict_many)
+    
+    def predict_many(self, requests: List[Dict]) -> List[Dict]:
+        return self._run_many(requests, self._fallback.predict_many)
+
+
+class ModelBackedStaffForecaster(_ModelBacked):
+    """Doctors, nurses and support staff (before minimums) from the ``staff`` model"""
+    
+    MODEL_NAME = "staff"
+    FEATURES = STAFF_FEATURES
+    OVERRIDE_KEY = "base_requirements"
+    
+    def _features(self, request: Dict) -> List[float]:
+        return staff_features(request)
+    
+    def _override_value(self, prediction) -> tuple:
+        return tuple(int(max(value, 0.0)) for value in prediction)
+    
+    def _rules_many(self, requests: List[Dict]) -> List[Dict]:
+        return self._rules.forecast_many(requests)
+    
+    def forecast(
+        self,
+        predicted_patients: int,
+        current_staff: Optional[int] = None,
+        department: Optional[str] = None,
+        shift_type: Optional[str] = None,
+        location: Optional[str] = None
+    ) -> Dict:
+        kwargs = {
+            "predicted_patients": predicted_patients,
+            "current_staff": current_staff,
+            "department": department,
+            "shift_type": shift_type,
+            "location": location
+        }
+        return self._run_one(kwargs, self._fallback.forecast, self._fallback.forecast_many)
+    
+    def forecast_many(self, requests: List[Dict]) -> List[Dict]:
+        return self._run_many(requests, self._fallback.forecast_many)
+
+
+def with_models(
+    registry: ModelRegistry,
+    festival: Any,
+    pollution: Any,
+    staff: Any,
+    fallback_backend: str,
+    rules: Optional[Tuple[Any, Any, Any]] = None
+):
+    """
+    Wrap (festival, pollution, staff) predictors so published models take
+    over. ``rules`` turn model outputs into responses (default: the rule
+    tables defined in code)
+    """
+    rules = rules or (FestivalPredictor(), PollutionPredictor(), StaffForecaster())
+    return (
+        ModelBackedFestivalPredictor(registry, festival, fallback_backend, rules[0]),
+        ModelBackedPollutionPredictor(registry, pollution, fallback_backend, rules[1]),
+        ModelBackedStaffForecaster(registry, staff, fallback_backend, rules[2])
+    )
@@ -0,0 +1,209 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from .lazy import lazy_import
+
+joblib = lazy_import("joblib")
+
+
+class ModelArtifact(NamedTuple):
+    name: str
+    version: str
+    model: Any
+    features: List[str]
+    metadata: Dict
+    path: str
+    loaded_at: str
+
+
+class ModelRegistry:
+    """
+    Versioned estimator artifacts on disk, loaded lazily and memory-mapped.
+    
+    Layout: ``<root>/<name>/<version>.joblib`` plus a ``CURRENT`` file naming
+    the active version. Artifacts are written uncompressed and loaded with
+    ``joblib.load(mmap_mode="r")``, so the NumPy arrays holding the weights
+    are mapped from the page cache and shared by every worker process on the
+    host instead of being copied into each one.
+    
+    ``get`` re-reads the ``CURRENT`` pointer at most every ``check_interval``
+    seconds. A new version is loaded beside the old one and installed with a
+    single dict assignment; calls already holding the old artifact finish on
+    it. If loading fails, the previous artifact (or the rule fallback) stays
+    in use and the error is reported by ``describe``.
+    """
+    
+    POINTER = "CURRENT"
+    SUFFIX = ".joblib"
+    
+    def __init__(
+        self,
+        root: str,
+        check_interval: float = 5.0,
+        mmap_mode: Optional[str] = "r",
+        on_swap: Optional[Callable[[str, ModelArtifact], None]] = None
+    ):
+        self.root = root
+        self.check_interval = check_interval
+        self.mmap_mode = mmap_mode
+        self.on_swap = on_swap
+        self._artifacts: Dict[str, ModelArtifact] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, name: str) -> Optional[ModelArtifact]:
+        """The active artifact for ``name``, or None when no model is published"""
+        checked_at = self._checked_at.get(name)
+        if checked_at is None or time.monotonic() - checked_at >= self.check_interval:
+            # Only one thread reloads; the others keep answering with what is installed
+            if self._lock.acquire(blocking=checked_at is None):
+                try:
+                    self._refresh(name)
+                finally:
+                    self._lock.release()
+        return self._artifacts.get(name)
+    
+    def _refresh(self, name: str) -> None:
+        self._checked_at[name] = time.monotonic()
+        version = self.active_version(name)
+        current = self._artifacts.get(name)
+        if version is None:
+            if current is not None:
+                del self._artifacts[name]
+            return
+        if current is not None and current.version == version:
+            return
+        
+        path = self._artifact_path(name, version)
+        try:
+            payload = joblib.load(path, mmap_mode=self.mmap_mode)
+            artifact = ModelArtifact(
+                name=name,
+                version=version,
+                model=payload["model"],
+                features=list(payload.get("features", [])),
+                metadata=payload.get("metadata", {}),
+                path=path,
+                loaded_at=datetime.now(timezone.utc).isoformat()
+            )
+        except Exception as e:
+            self._errors[name] = f"{version}: {e}"
+            return
+        
+        self._artifacts[name] = artifact
+        self._errors.pop(name, None)
+        if self.on_swap is not None:
+            self.on_swap(name, artifact)
+    
+    def reload(self, name: Optional[str] = None) -> None:
+        """Re-read the pointer now instead of waiting for the check interval"""
+        names = [name] if name else self.names()
+        with self._lock:
+            for model_name in names:
+                self._refresh(model_name)
+    
+    def record_error(self, name: str, message: str) -> None:
+        """Note a failure using a loaded model (shown by ``describe``)"""
+        self._errors[name] = message
+    
+    def active_version(self, name: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, name, self.POINTER)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def names(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            entry for entry in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, entry))
+        )
+    
+    def versions(self, name: str) -> List[str]:
+        directory = os.path.join(self.root, name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            entry[:-len(self.SUFFIX)] for entry in os.listdir(directory)
+            if entry.endswith(self.SUFFIX)
+        )
+    
+    def publish(
+        self,
+        name: str,
+        model: Any,
+        features: List[str],
+        metadata: Optional[Dict] = None,
+        version: Optional[str] = None,
+        activate: bool = True
+    ) -> str:
+        """
+        Write a new artifact version and (by default) make it the active one.
+        Both files are written to a temporary name and renamed into place, so
+        readers never see a partial artifact or pointer.
+        """
+        version = version or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        directory = os.path.join(self.root, name)
+        os.makedirs(directory, exist_ok=True)
+        payload = {"model": model, "features": list(features), "metadata": metadata or {}}
+        # Uncompressed so the arrays can be memory-mapped on load
+        self._write_atomic(
+            self._artifact_path(name, version),
+            lambda f: joblib.dump(payload, f, compress=0)
+        )
+        if activate:
+            self.activate(name, version)
+        return version
+    
+    def activate(self, name: str, version: str) -> None:
+        """Point ``name`` at an existing version (promote or roll back)"""
+        if not os.path.exists(self._artifact_path(name, version)):
+            raise KeyError(f"{name}@{version}")
+        self._write_atomic(
+            os.path.join(self.root, name, self.POINTER),
+            lambda f: f.write(version.encode())
+        )
+    
+    def describe(self) -> Dict:
+        models = {}
+        for name in sorted(set(self.names()) | set(self._artifacts)):
+            artifact = self._artifacts.get(name)
+            models[name] = {
+                "active_version": self.active_version(name),
+                "loaded_version": artifact.version if artifact else None,
+                "loaded_at": artifact.loaded_at if artifact else None,
+                "features": artifact.features if artifact else None,
+                "metadata": artifact.metadata if artifact else None,
+                "versions": self.versions(name),
+                "error": self._errors.get(name)
+            }
+        return {
+            "root": self.root,
+            "mmap_mode": self.mmap_mode,
+            "check_interval_seconds": self.check_interval,
+            "models": models
+        }
+    
+    def _artifact_path(self, name: str, version: str) -> str:
+        return os.path.join(self.root, name, version + self.SUFFIX)
+    
+    @staticmethod
+    def _write_atomic(path: str, write: Callable) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            # mkstemp creates 0600; workers may run as other users
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -1,6 +1,25 @@
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, NamedTuple, Tuple
 from datetime import datetime
 
+import numpy as np
+
+
+class AQITable(NamedTuple):
+    """AQI rule table compiled into breakpoint arrays"""
+    categories: Tuple[str, ...]
+    upper_bounds: np.ndarray  # inclusive upper bound of every category but the last
+    multipliers: np.ndarray
+    risk_levels: np.ndarray
+    # Per-category outputs; every category maps to a single inflow value
+    predicted_inflow: np.ndarray
+    respiratory_beds: np.ndarray
+    oxygen_cylinders: np.ndarray
+    nebulizers: np.ndarray
+    ventilators: np.ndarray
+    confidence_breakpoints: np.ndarray
+    confidence_levels: np.ndarray
+    recommendation_breakpoints: np.ndarray
+
 
 class PollutionPredictor:
     """
@@ -9,16 +28,45 @@ class PollutionPredictor:
     
     # AQI thresholds and corresponding surge multipliers
     AQI_THRESHOLDS = {
-        "good": {"max": 50, "multiplier": 1.0, "risk": "low"},
-        "moderate": {"max": 100, "multiplier": 1.1, "risk": "low"},
-        "unhealthy_sensitive": {"max": 150, "multiplier": 1.3, "risk": "medium"},
-        "unhealthy": {"max": 200, "multiplier": 1.6, "risk": "high"},
-        "very_unhealthy": {"max": 300, "multiplier": 2.0, "risk": "critical"},
-        "hazardous": {"max": 500, "multiplier": 2.5, "risk": "critical"}
+        "good": {"max": 50, "multiplier": 1.0, "risk": "low", "additional_patients": 0},
+        "moderate": {"max": 100, "multiplier": 1.1, "risk": "low", "additional_patients": 5},
+        "unhealthy_sensitive": {"max": 150, "multiplier": 1.3, "risk": "medium", "additional_patients": 15},
+        "unhealthy": {"max": 200, "multiplier": 1.6, "risk": "high", "additional_patients": 30},
+        "very_unhealthy": {"max": 300, "multiplier": 2.0, "risk": "critical", "additional_patients": 50},
+        "hazardous": {"max": 500, "multiplier": 2.5, "risk": "critical", "additional_patients": 80}
     }
     
     BASE_DAILY_RESPIRATORY_PATIENTS = 20
     
+    # Confidence is higher for extreme AQI values (AQI >= 150, AQI >= 200)
+    CONFIDENCE_BREAKPOINTS = (150, 200)
+    CONFIDENCE_LEVELS = (70.0, 80.0, 90.0)
+    
+    # Ventilators are only provisioned above this AQI
+    VENTILATOR_AQI = 200
+    
+    # Recommendation tiers start above these AQI values (> 100, > 150, > 200)
+    RECOMMENDATION_BREAKPOINTS = (100, 150, 200)
+    RECOMMENDATION_TIERS = (
+        (),
+        ("Moderate pollution - prepare for slight increase in respiratory cases",),
+        (
+            "High pollution levels - monitor respiratory cases closely",
+            "Ensure adequate supply of respiratory medications",
+            "Increase respiratory department staffing"
+        ),
+        (
+            "⚠️ CRITICAL: Very high pollution levels detected",
+            "Increase respiratory department capacity immediately",
+            "Stock up on oxygen cylinders and nebulizers",
+            "Alert high-risk patients (elderly, children, asthmatics)",
+            "Consider setting up temporary respiratory care unit"
+        )
+    )
+    
+    def __init__(self):
+        self._table = self._compile_table(self.AQI_THRESHOLDS)
+    
     def predict(
         self,
         aqi: float,
@@ -30,66 +78,156 @@ class PollutionPredictor:
         """
         Predict patient surge based on pollution levels
         """
-        # Determine AQI category
-        aqi_category = self._get_aqi_category(aqi)
-        threshold_data = self.AQI_THRESHOLDS[aqi_category]
+        scores = self.score(np.array([aqi], dtype=np.float64))
+        return self._build_result(scores, 0, aqi, pm25, pm10, location, date)
+    
+    def predict_many(self, requests: List[Dict]) -> List[Dict]:
+        """
+        Predict pollution surge for many AQI readings in one pass.
         
-        # Calculate surge
-        multiplier = threshold_data["multiplier"]
-        risk_level = threshold_data["risk"]
+        Each request holds the keyword arguments of ``predict``, plus an
+        optional ``predicted_inflow`` that replaces the AQI-category inflow
+        (used by model-backed predictors); resources follow the replaced
+        inflow. Results come back in request order; a request that cannot be
+        scored gets an ``{"error": ...}`` entry in its slot instead of a
+        prediction.
+        """
+        errors: Dict[int, str] = {}
+        try:
+            aqi = np.array([request["aqi"] for request in requests], dtype=np.float64)
+        except Exception:
+            # Fall back to per-item conversion to find the bad entries
+            aqi = np.zeros(len(requests), dtype=np.float64)
+            for i, request in enumerate(requests):
+                try:
+                    aqi[i] = request["aqi"]
+                except Exception as e:
+                    errors[i] = str(e) or type(e).__name__
         
-        # Base respiratory patients (typically affected by pollution)
-        base_respiratory = self.BASE_DAILY_RESPIRATORY_PATIENTS
+        scores = self.score(aqi)
+        inflow_overrides = {
+            i: request["predicted_inflow"]
+            for i, request in enumerate(requests)
+            if i not in errors and request.get("predicted_inflow") is not None
+        }
+        if inflow_overrides:
+            self._override_inflow(
+                scores,
+                np.fromiter(inflow_overrides.keys(), dtype=np.int64, count=len(inflow_overrides)),
+                np.fromiter(inflow_overrides.values(), dtype=np.float64, count=len(inflow_overrides))
+            )
         
-        # Additional patients based on AQI
-        if aqi <= 50:
-            additional_patients = 0
-        elif aqi <= 100:
-            additional_patients = 5
-        elif aqi <= 150:
-            additional_patients = 15
-        elif aqi <= 200:
-            additional_patients = 30
-        elif aqi <= 300:
-            additional_patients = 50
-        else:
-            additional_patients = 80
+        results = []
+        for i, request in enumerate(requests):
+            if i in errors:
+                results.append({"error": errors[i]})
+                continue
+            results.append(self._build_result(
+                scores,
+                i,
+                request["aqi"],
+                request.get("pm25"),
+                request.get("pm10"),
+                request.get("location"),
+                request.get("date")
+            ))
         
-        # Total predicted inflow (respiratory + general increase)
-        predicted_inflow = int(base_respiratory * multiplier + additional_patients)
+        return results
+    
+    def rules_for(self, location: Optional[str] = None) -> Tuple["PollutionPredictor", Optional[str]]:
+        """
+        The predictor holding the rule tables for ``location`` and their
+        version: None here, these tables serve every location
+        """
+        return self, None
+    
+    def score(
+        self,
+        aqi: np.ndarray,
+        table: Optional[AQITable] = None,
+        predicted_inflow: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Score an array of AQI readings of any shape.
         
-        # Calculate confidence (higher for extreme AQI values)
-        if aqi >= 200:
-            confidence = 90.0
-        elif aqi >= 150:
-            confidence = 80.0
-        else:
-            confidence = 70.0
+        Returns column arrays shaped like ``aqi``: category index, surge
+        multiplier, predicted inflow, confidence, risk level and resources.
+        ``table`` defaults to the predictor's compiled AQI table. A
+        ``predicted_inflow`` array replaces the category inflow where it is
+        not NaN, and resources follow it (as ``predict_many`` overrides do).
+        """
+        table = table or self._table
+        aqi = np.asarray(aqi, dtype=np.float64)
         
-        # Generate recommendations
-        recommendations = self._generate_recommendations(aqi, aqi_category, risk_level)
+        # Category i covers (upper_bounds[i-1], upper_bounds[i]]
+        category_index = np.searchsorted(table.upper_bounds, aqi, side="left")
         
-        # Estimate resource needs
-        estimated_resources = {
-            "respiratory_beds": int(predicted_inflow * 0.4),
-            "oxygen_cylinders": int(predicted_inflow * 0.6),
-            "nebulizers": int(predicted_inflow * 0.3),
-            "respiratory_medications": "High stock required",
-            "ventilators": int(predicted_inflow * 0.1) if aqi > 200 else 0
+        confidence = table.confidence_levels[
+            np.searchsorted(table.confidence_breakpoints, aqi, side="right")
+        ]
+        
+        scores = {
+            "aqi": aqi,
+            "category_index": category_index,
+            "surge_multiplier": table.multipliers[category_index],
+            "predicted_inflow": table.predicted_inflow[category_index],
+            "confidence": confidence,
+            "risk_level": table.risk_levels[category_index],
+            "recommendation_tier": np.searchsorted(
+                table.recommendation_breakpoints, aqi, side="left"
+            ),
+            "respiratory_beds": table.respiratory_beds[category_index],
+            "oxygen_cylinders": table.oxygen_cylinders[category_index],
+            "nebulizers": table.nebulizers[category_index],
+            "ventilators": np.where(
+                aqi > self.VENTILATOR_AQI,
+                table.ventilators[category_index],
+                0
+            )
         }
+        if predicted_inflow is not None:
+            rows = np.flatnonzero(~np.isnan(predicted_inflow))
+            self._override_inflow(scores, rows, predicted_inflow[rows])
+        return scores
+    
+    def _build_result(
+        self,
+        scores: Dict[str, np.ndarray],
+        i: int,
+        aqi: float,
+        pm25: Optional[float],
+        pm10: Optional[float],
+        location: Optional[str],
+        date: Optional[str],
+        table: Optional[AQITable] = None
+    ) -> Dict:
+        """Assemble the response dict for row ``i`` of ``score`` output"""
+        aqi_category = (table or self._table).categories[scores["category_index"][i]]
+        risk_level = str(scores["risk_level"][i])
+        
+        recommendations = list(self.RECOMMENDATION_TIERS[scores["recommendation_tier"][i]])
+        recommendations.append(f"AQI: {aqi} ({aqi_category.upper()}) - Risk Level: {risk_level.upper()}")
+        recommendations.append("Coordinate with nearby hospitals for respiratory emergencies")
+        recommendations.append("Monitor air quality forecasts for upcoming days")
         
         return {
-            "predicted_inflow": predicted_inflow,
-            "confidence": confidence,
+            "predicted_inflow": int(scores["predicted_inflow"][i]),
+            "confidence": float(scores["confidence"][i]),
             "risk_level": risk_level,
             "recommendations": recommendations,
-            "estimated_resources": estimated_resources,
+            "estimated_resources": {
+                "respiratory_beds": int(scores["respiratory_beds"][i]),
+                "oxygen_cylinders": int(scores["oxygen_cylinders"][i]),
+                "nebulizers": int(scores["nebulizers"][i]),
+                "respiratory_medications": "High stock required",
+                "ventilators": int(scores["ventilators"][i])
+            },
             "factors": {
                 "aqi": aqi,
                 "aqi_category": aqi_category,
                 "pm25": pm25,
                 "pm10": pm10,
-                "surge_multiplier": multiplier,
+                "surge_multiplier": float(scores["surge_multiplier"][i]),
                 "location": location,
                 "date": date
             }
@@ -97,44 +235,59 @@ class PollutionPredictor:
     
     def _get_aqi_category(self, aqi: float) -> str:
         """Determine AQI category based on value"""
-        if aqi <= 50:
-            return "good"
-        elif aqi <= 100:
-            return "moderate"
-        elif aqi <= 150:
-            return "unhealthy_sensitive"
-        elif aqi <= 200:
-            return "unhealthy"
-        elif aqi <= 300:
-            return "very_unhealthy"
-        else:
-            return "hazardous"
+        table = self._table
+        return table.categories[int(np.searchsorted(table.upper_bounds, aqi, side="left"))]
     
-    def _generate_recommendations(
-        self,
-        aqi: float,
-        aqi_category: str,
-        risk_level: str
-    ) -> List[str]:
-        """Generate recommendations based on pollution levels"""
-        recommendations = []
+    def _compile_table(self, thresholds: Dict[str, Dict]) -> AQITable:
+        """Compile the AQI threshold dict into sorted breakpoint arrays"""
+        ordered = sorted(thresholds.items(), key=lambda item: item[1]["max"])
         
-        if aqi > 200:
-            recommendations.append("⚠️ CRITICAL: Very high pollution levels detected")
-            recommendations.append("Increase respiratory department capacity immediately")
-            recommendations.append("Stock up on oxygen cylinders and nebulizers")
-            recommendations.append("Alert high-risk patients (elderly, children, asthmatics)")
-            recommendations.append("Consider setting up temporary respiratory care unit")
-        elif aqi > 150:
-            recommendations.append("High pollution levels - monitor respiratory cases closely")
-            recommendations.append("Ensure adequate supply of respiratory medications")
-            recommendations.append("Increase respiratory department staffing")
-        elif aqi > 100:
-            recommendations.append("Moderate pollution - prepare for slight increase in respiratory cases")
+        def frozen(values, dtype=None) -> np.ndarray:
+            array = np.array(values, dtype=dtype)
+            array.setflags(write=False)
+            return array
         
-        recommendations.append(f"AQI: {aqi} ({aqi_category.upper()}) - Risk Level: {risk_level.upper()}")
-        recommendations.append("Coordinate with nearby hospitals for respiratory emergencies")
-        recommendations.append("Monitor air quality forecasts for upcoming days")
+        multipliers = np.array([data["multiplier"] for _, data in ordered], dtype=np.float64)
+        additional_patients = np.array(
+            [data["additional_patients"] for _, data in ordered], dtype=np.float64
+        )
         
-        return recommendations
-
+        # Total predicted inflow (respiratory + general increase)
+        predicted_inflow = (
+            self.BASE_DAILY_RESPIRATORY_PATIENTS * multipliers + additional_patients
+        ).astype(np.int64)
+        resources = self._inflow_resources(predicted_inflow)
+        
+        return AQITable(
+            categories=tuple(name for name, _ in ordered),
+            upper_bounds=frozen([data["max"] for _, data in ordered[:-1]], np.float64),
+            multipliers=frozen(multipliers),
+            risk_levels=frozen([data["risk"] for _, data in ordered]),
+            predicted_inflow=frozen(predicted_inflow),
+            respiratory_beds=frozen(resources["respiratory_beds"]),
+            oxygen_cylinders=frozen(resources["oxygen_cylinders"]),
+            nebulizers=frozen(resources["nebulizers"]),
+            ventilators=frozen(resources["ventilators"]),
+            confidence_breakpoints=frozen(self.CONFIDENCE_BREAKPOINTS, np.float64),
+            confidence_levels=frozen(self.CONFIDENCE_LEVELS, np.float64),
+            recommendation_breakpoints=frozen(self.RECOMMENDATION_BREAKPOINTS, np.float64)
+        )
+    
+    def _inflow_resources(self, predicted_inflow: np.ndarray) -> Dict[str, np.ndarray]:
+        """Resource estimates for an array of predicted inflows"""
+        return {
+            "respiratory_beds": (predicted_inflow * 0.4).astype(np.int64),
+            "oxygen_cylinders": (predicted_inflow * 0.6).astype(np.int64),
+            "nebulizers": (predicted_inflow * 0.3).astype(np.int64),
+            "ventilators": (predicted_inflow * 0.1).astype(np.int64)
+        }
+    
+    def _override_inflow(self, scores: Dict[str, np.ndarray], rows: np.ndarray, inflow: np.ndarray) -> None:
+        """Replace predicted inflow (and the resources derived from it) for some rows"""
+        inflow = np.asarray(inflow, dtype=np.float64).astype(np.int64)
+        scores["predicted_inflow"][rows] = inflow
+        for name, values in self._inflow_resources(inflow).items():
+            scores[name][rows] = values
+        scores["ventilators"][rows] = np.where(
+            scores["aqi"][rows] > self.VENTILATOR_AQI, scores["ventilators"][rows], 0
+        )
@@ -0,0 +1,407 @@
+import abc
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .festival_predictor import FestivalPredictor
+from .pollution_predictor import AQITable, PollutionPredictor
+from .rule_tables import with_tables
+from .staff_forecaster import StaffForecaster
+
+
+class _RuleSnapshotMixin(abc.ABC):
+    """
+    Shared rebuild logic for the precompiled predictors.
+    
+    Lookup tables are built from the rule tables into one immutable snapshot
+    object. ``rebuild`` builds a new snapshot off to the side and swaps the
+    reference in a single assignment, so a request sees either the old or the
+    new tables, never a mix. Rule tables are re-fingerprinted at most once per
+    ``check_interval`` seconds, which keeps the hot path to a clock read.
+    """
+    
+    def _init_snapshot(self, check_interval: float) -> None:
+        self.check_interval = check_interval
+        self._rebuild_lock = threading.Lock()
+        self._fingerprint = None
+        self._next_check = 0.0
+        self.rebuild()
+    
+    @abc.abstractmethod
+    def _rule_tables(self) -> Tuple:
+        """The rule tables the snapshot is built from"""
+    
+    @abc.abstractmethod
+    def _build_snapshot(self):
+        """Lookup tables for the current rule tables"""
+    
+    def _install_snapshot(self, snapshot) -> None:
+        self._snapshot = snapshot
+    
+    def rebuild(self) -> bool:
+        """Rebuild lookup tables if the rule tables changed since the last build"""
+        with self._rebuild_lock:
+            fingerprint = repr(self._rule_tables())
+            if fingerprint == self._fingerprint:
+                return False
+            self._install_snapshot(self._build_snapshot())
+            self._fingerprint = fingerprint
+            self.built_at = time.time()
+            return True
+    
+    def _refresh_if_due(self) -> None:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.rebuild()
+
+
+@lru_cache(maxsize=4096)
+def _window_days(start_date: str, end_date: str) -> int:
+    """Festival window length in days; dashboards repeat the same windows"""
+    start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+    end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+    return (end - start).days + 1
+
+
+class _FestivalEntry(NamedTuple):
+    multiplier: float
+    risk_level: str
+    # Recommendations after the "Prepare for ..." line, which needs the request's name
+    recommendation_tail: Tuple[str, ...]
+    # (predicted_inflow, beds, doctors, nurses, ambulances) per duration at the default base
+    default_base_rows: Tuple[Tuple[int, ...], ...]
+
+
+class PrecompiledFestivalPredictor(_RuleSnapshotMixin, FestivalPredictor):
+    """
+    FestivalPredictor answering from tables precomputed per festival key,
+    intensity and festival duration
+    """
+    
+    # Festival windows up to this many days are precomputed at the default base
+    MAX_TABLE_DURATION = 31
+    
+    def __init__(self, check_interval: float = 5.0):
+        self._init_snapshot(check_interval)
+    
+    def _rule_tables(self) -> Tuple:
+        return (self.FESTIVAL_BASE_SURGE, self.BASE_DAILY_PATIENTS, self.RISK_LEVELS,
+                tuple(self.RISK_BREAKPOINTS))
+    
+    def _build_snapshot(self) -> Dict[Tuple[str, str], _FestivalEntry]:
+        durations = np.arange(self.MAX_TABLE_DURATION + 1, dtype=np.int64)
+        durations[0] = 1  # row 0 is never served; avoids a division by zero
+        entries = {}
+        for festival_key, multipliers in self.FESTIVAL_BASE_SURGE.items():
+            for intensity, multiplier in multipliers.items():
+                predicted = (self.BASE_DAILY_PATIENTS * multiplier * durations).astype(np.int64)
+                rows = np.stack([
+                    predicted,
+                    (predicted * 0.3 / durations).astype(np.int64),
+                    (predicted * 0.05 / durations).astype(np.int64),
+                    (predicted * 0.1 / durations).astype(np.int64),
+                    (predicted * 0.02 / durations).astype(np.int64)
+                ], axis=1)
+                risk_index = int(np.searchsorted(self.RISK_BREAKPOINTS, multiplier, side="right"))
+                entries[(festival_key, intensity)] = _FestivalEntry(
+                    multiplier=multiplier,
+                    risk_level=self.RISK_LEVELS[risk_index],
+                    recommendation_tail=tuple(
+                        self._generate_recommendations("", intensity, 0, 1)[1:]
+                    ),
+                    # Plain tuples: indexing them beats converting NumPy scalars per call
+                    default_base_rows=tuple(map(tuple, rows.tolist()))
+                )
+        return entries
+    
+    def predict(
+        self,
+        festival_name: str,
+        start_date: str,
+        end_date: str,
+        intensity: str,
+        historical_data: Optional[Dict] = None,
+        location: Optional[str] = None
+    ) -> Dict:
+        """
+        Predict patient inflow during festival period from precomputed tables
+        """
+        self._refresh_if_due()
+        snapshot = self._snapshot
+        
+        festival_key = festival_name.lower().replace(" ", "_")
+        if festival_key not in self.FESTIVAL_BASE_SURGE:
+            festival_key = "default"
+        entry = snapshot.get((festival_key, intensity))
+        if entry is None:
+            # Intensities outside the rule table take the rule-based fallback path
+            return super().predict(
+                festival_name, start_date, end_date, intensity, historical_data, location
+            )
+        
+        duration_days = _window_days(start_date, end_date)
+        multiplier = entry.multiplier
+        
+        if not historical_data and 1 <= duration_days <= self.MAX_TABLE_DURATION:
+            base_patients = self.BASE_DAILY_PATIENTS
+            predicted_inflow, beds, doctors, nurses, ambulances = \
+                entry.default_base_rows[duration_days]
+        else:
+            base_patients = self._resolve_inputs(
+                festival_name, start_date, end_date, intensity, historical_data
+            )[2]
+            predicted_inflow = int(base_patients * multiplier * duration_days)
+            beds = int(predicted_inflow * 0.3 / duration_days)
+            doctors = int(predicted_inflow * 0.05 / duration_days)
+            nurses = int(predicted_inflow * 0.1 / duration_days)
+            ambulances = int(predicted_inflow * 0.02 / duration_days)
+        
+        recommendations = [
+            f"Prepare for {festival_name} - Expected {predicted_inflow} patients over {duration_days} days"
+        ]
+        recommendations.extend(entry.recommendation_tail)
+        
+        return {
+            "predicted_inflow": predicted_inflow,
+            "confidence": 85.0 if historical_data else 65.0,
+            "risk_level": entry.risk_level,
+            "recommendations": recommendations,
+            "estimated_resources": {
+                "beds": beds,
+                "doctors": doctors,
+                "nurses": nurses,
+                "ambulances": ambulances,
+                "equipment": list(self.FESTIVAL_EQUIPMENT)
+            },
+            "factors": {
+                "festival_name": festival_name,
+                "intensity": intensity,
+                "duration_days": duration_days,
+                "surge_multiplier": multiplier,
+                "base_daily_patients": base_patients,
+                "location": location
+            }
+        }
+
+
+class _PollutionSnapshot(NamedTuple):
+    aqi_table: AQITable
+    # One entry per integer AQI 0-500: everything but the request echo fields
+    responses: Tuple[Dict, ...]
+
+
+class PrecompiledPollutionPredictor(_RuleSnapshotMixin, PollutionPredictor):
+    """
+    PollutionPredictor answering integer AQI readings from a response table
+    indexed by AQI
+    """
+    
+    MAX_TABLE_AQI = 500
+    
+    def __init__(self, check_interval: float = 5.0):
+        self._init_snapshot(check_interval)
+    
+    def _rule_tables(self) -> Tuple:
+        return (self.AQI_THRESHOLDS, self.BASE_DAILY_RESPIRATORY_PATIENTS,
+                self.CONFIDENCE_BREAKPOINTS, self.CONFIDENCE_LEVELS,
+                self.VENTILATOR_AQI, self.RECOMMENDATION_BREAKPOINTS,
+                self.RECOMMENDATION_TIERS)
+    
+    def _build_snapshot(self) -> _PollutionSnapshot:
+        # Score every integer AQI with a freshly compiled breakpoint table
+        table = self._compile_table(self.AQI_THRESHOLDS)
+        aqi_values = np.arange(self.MAX_TABLE_AQI + 1, dtype=np.float64)
+        scores = self.score(aqi_values, table)
+        
+        responses = []
+        for aqi in range(self.MAX_TABLE_AQI + 1):
+            result = self._build_result(scores, aqi, float(aqi), None, None, None, None, table)
+            # The "AQI: ..." line echoes the caller's value; keep the surrounding lines
+            recommendations = result.pop("recommendations")
+            line = next(i for i, text in enumerate(recommendations) if text.startswith("AQI: "))
+            result["recommendation_head"] = tuple(recommendations[:line])
+            result["recommendation_tail"] = tuple(recommendations[line + 1:])
+            responses.append(result)
+        
+        return _PollutionSnapshot(aqi_table=table, responses=tuple(responses))
+    
+    def _install_snapshot(self, snapshot: _PollutionSnapshot) -> None:
+        self._table = snapshot.aqi_table
+        self._snapshot = snapshot
+    
+    def predict(
+        self,
+        aqi: float,
+        pm25: Optional[float] = None,
+        pm10: Optional[float] = None,
+        location: Optional[str] = None,
+        date: Optional[str] = None
+    ) -> Dict:
+        """
+        Predict patient surge based on pollution levels from the AQI table
+        """
+        self._refresh_if_due()
+        snapshot = self._snapshot
+        
+        if not (0 <= aqi <= self.MAX_TABLE_AQI) or aqi != int(aqi):
+            return super().predict(aqi, pm25, pm10, location, date)
+        
+        entry = snapshot.responses[int(aqi)]
+        factors = entry["factors"]
+        recommendations = list(entry["recommendation_head"])
+        recommendations.append(
+            f"AQI: {aqi} ({factors['aqi_category'].upper()}) - Risk Level: {entry['risk_level'].upper()}"
+        )
+        recommendations.extend(entry["recommendation_tail"])
+        
+        return {
+            "predicted_inflow": entry["predicted_inflow"],
+            "confidence": entry["confidence"],
+            "risk_level": entry["risk_level"],
+            "recommendations": recommendations,
+            "estimated_resources": dict(entry["estimated_resources"]),
+            "factors": {
+                "aqi": aqi,
+                "aqi_category": factors["aqi_category"],
+                "pm25": pm25,
+                "pm10": pm10,
+                "surge_multiplier": factors["surge_multiplier"],
+                "location": location,
+                "date": date
+            }
+        }
+
+
+class _StaffSnapshot(NamedTuple):
+    # (department_key, shift_key) -> required (doctors, nurses, support) per patient count
+    required: Dict[Tuple[str, Optional[str]], Tuple[Tuple[int, int, int], ...]]
+
+
+class PrecompiledStaffForecaster(_RuleSnapshotMixin, StaffForecaster):
+    """
+    StaffForecaster answering from per-department, per-shift requirement
+    tables indexed by predicted patient count
+    """
+    
+    MAX_TABLE_PATIENTS = 5000
+    
+    def __init__(self, check_interval: float = 5.0):
+        self._init_snapshot(check_interval)
+    
+    def _rule_tables(self) -> Tuple:
+        return (self.STAFF_RATIOS, self.SHIFT_MULTIPLIERS, self.MINIMUM_STAFF)
+    
+    def _build_snapshot(self) -> _StaffSnapshot:
+        patients = np.arange(self.MAX_TABLE_PATIENTS + 1, dtype=np.float64)
+        minimums = [
+            self.MINIMUM_STAFF["doctors"],
+            self.MINIMUM_STAFF["nurses"],
+            self.MINIMUM_STAFF["support"]
+        ]
+        required = {}
+        for department_key, ratios in self.STAFF_RATIOS.items():
+            base = (patients[:, None] * [
+                ratios["doctors"], ratios["nurses"], ratios["support"]
+            ]).astype(np.int64)
+            # No shift and unknown shifts leave the base requirement unscaled
+            shifts = [(None, 1.0)] + list(self.SHIFT_MULTIPLIERS.items())
+            for shift_key, shift_mult in shifts:
+                table = np.maximum((base * shift_mult).astype(np.int64), minimums)
+                required[(department_key, shift_key)] = tuple(map(tuple, table.tolist()))
+        return _StaffSnapshot(required=required)
+    
+    def forecast(
+        self,
+        predicted_patients: int,
+        current_staff: Optional[int] = None,
+        department: Optional[str] = None,
+        shift_type: Optional[str] = None,
+        location: Optional[str] = None
+    ) -> Dict:
+        """
+        Forecast staff requirements from precomputed requirement tables.
+        These tables serve every ``location``, as in StaffForecaster.
+        """
+        self._refresh_if_due()
+        snapshot = self._snapshot
+        
+        if not (0 <= predicted_patients <= self.MAX_TABLE_PATIENTS) or \
+                predicted_patients != int(predicted_patients):
+            return super().forecast(predicted_patients, current_staff, department, shift_type)
+        
+        department_key = (department or "default").lower()
+        if department_key not in self.STAFF_RATIOS:
+            department_key = "default"
+        shift_key = shift_type.lower() if shift_type else None
+        if shift_key not in self.SHIFT_MULTIPLIERS:
+            shift_key = None
+        
+        required_doctors, required_nurses, required_support = \
+            snapshot.required[(department_key, shift_key)][int(predicted_patients)]
+        
+        # Calculate gap if current staff is provided
+        current_gap = None
+        if current_staff:
+            current_gap = {
+                "doctors": max(0, required_doctors - int(current_staff * 0.3)),
+                "nurses": max(0, required_nurses - int(current_staff * 0.5)),
+                "support": max(0, required_support - int(current_staff * 0.2)),
+                "total_gap": max(0, (required_doctors + required_nurses + required_support) - current_staff)
+            }
+        
+        return {
+            "required_doctors": required_doctors,
+            "required_nurses": required_nurses,
+            "required_support_staff": required_support,
+            "current_gap": current_gap,
+            "recommendations": self._generate_recommendations(
+                required_doctors,
+                required_nurses,
+                required_support,
+                current_gap,
+                department,
+                shift_type
+            )
+        }
+
+
+# Predictor classes per prediction mode, in (festival, pollution, staff) order
+PREDICTOR_CLASSES = {
+    "rules": (FestivalPredictor, PollutionPredictor, StaffForecaster),
+    "precompiled": (PrecompiledFestivalPredictor, PrecompiledPollutionPredictor, PrecompiledStaffForecaster)
+}
+KINDS = ("festival", "pollution", "staff")
+
+
+def build_predictor(
+    mode: str,
+    check_interval: float,
+    kind: str,
+    tables: Optional[Dict[str, Mapping]] = None
+):
+    """
+    One of the mode's predictors (``kind`` festival, pollution or staff).
+    ``tables`` (class constant name to table, see RuleTables) replaces the
+    rule tables defined in code.
+    """
+    if mode not in PREDICTOR_CLASSES:
+        raise ValueError(f"Unknown prediction mode '{mode}'. Expected 'rules' or 'precompiled'")
+    cls = PREDICTOR_CLASSES[mode][KINDS.index(kind)]
+    if tables:
+        cls = with_tables(cls, tables)
+    return cls(check_interval) if mode == "precompiled" else cls()
+
+
+def build_predictors(mode: str = "rules", check_interval: float = 5.0):
+    """
+    Build the (festival, pollution, staff) predictors for a prediction mode:
+    ``rules`` evaluates the rule tables per call, ``precompiled`` answers from
+    lookup tables built once at startup.
+    """
+    return tuple(build_predictor(mode, check_interval, kind) for kind in KINDS)
+
@@ -0,0 +1,285 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+# Sentinel distinguishing a cached None from a miss
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire a fixed time after insertion
+    """
+    
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or ``MISSING``"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, key: Optional[Hashable] = None) -> int:
+        """Drop one key, or every entry when no key is given"""
+        with self._lock:
+            if key is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            return 1 if self._entries.pop(key, None) is not None else 0
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class PredictionCache:
+    """
+    Named result caches in front of the predictors.
+    
+    Predictors are pure functions of their inputs, so results are cached under
+    canonicalized request keys (see the ``*_key`` helpers below). Cached
+    results are shared between callers and must be treated as read-only.
+    
+    Every ``invalidate`` bumps the namespace's ``generation``. A caller that
+    reads the generation before computing a miss passes it to ``set``, and
+    the result is dropped if an invalidation happened meanwhile, so answers
+    from a swapped model or rule set are never stored after the swap.
+    """
+    
+    def __init__(self, ttls: Dict[str, float], maxsize: int = 1024, enabled: bool = True):
+        self.enabled = enabled
+        self._caches = {
+            namespace: TTLCache(maxsize=maxsize, ttl=ttl)
+            for namespace, ttl in ttls.items()
+        }
+        self._generations = {namespace: 0 for namespace in ttls}
+        self._lock = threading.Lock()
+    
+    @property
+    def namespaces(self):
+        return list(self._caches)
+    
+    def get_or_compute(
+        self,
+        namespace: str,
+        key: Optional[Hashable],
+        compute: Callable[[], Any]
+    ) -> Any:
+        """Return the cached result for ``key``, computing and storing it on a miss"""
+        value = self.get(namespace, key)
+        if value is MISSING:
+            generation = self.generation(namespace)
+            value = compute()
+            self.set(namespace, key, value, generation)
+        return value
+    
+    def generation(self, namespace: str) -> int:
+        """Number of invalidations of ``namespace`` so far"""
+        return self._generations[namespace]
+    
+    def get(self, namespace: str, key: Optional[Hashable]) -> Any:
+        if not self.enabled or key is None:
+            return MISSING
+        return self._caches[namespace].get(key)
+    
+    def set(
+        self,
+        namespace: str,
+        key: Optional[Hashable],
+        value: Any,
+        generation: Optional[int] = None
+    ) -> None:
+        """Store ``value``, unless ``generation`` was read before an invalidation"""
+        if not self.enabled or key is None:
+            return
+        with self._lock:
+            if generation is None or generation == self._generations[namespace]:
+                self._caches[namespace].set(key, value)
+    
+    def invalidate(self, namespace: Optional[str] = None) -> Dict[str, int]:
+        """Drop every entry of one namespace, or of all namespaces"""
+        if namespace is not None and namespace not in self._caches:
+            raise KeyError(namespace)
+        targets = [namespace] if namespace else list(self._caches)
+        with self._lock:
+            for name in targets:
+                self._generations[name] += 1
+            return {name: self._caches[name].invalidate() for name in targets}
+    
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "caches": {name: cache.stats() for name, cache in self._caches.items()}
+        }
+
+
+def canonical_aqi(aqi: float) -> float:
+    """
+    AQI as a plain float, so 180, 180.0 and numpy readings share a key. Not
+    rounded: category bounds are inclusive, so 100.4 and 100 score differently.
+    """
+    return float(aqi)
+
+
+def _canonical_datetime(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    # Same parsing as FestivalPredictor so equal instants share a key
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).isoformat()
+
+
+def _canonical_festival(name: Optional[str]) -> Optional[str]:
+    # Same normalization FestivalPredictor applies to look up surge multipliers
+    return name.lower().replace(" ", "_") if name is not None else None
+
+
+def _renamed_recommendations(recommendations: List[str], old: str, new: str) -> List[str]:
+    old_prefix, new_prefix = f"Prepare for {old} - ", f"Prepare for {new} - "
+    return [
+        new_prefix + text[len(old_prefix):] if text.startswith(old_prefix) else text
+        for text in recommendations
+    ]
+
+
+def with_festival_name(result: Dict, festival_name: str) -> Dict:
+    """
+    A cached festival prediction as if it had been made for ``festival_name``.
+    
+    ``festival_key`` treats "Diwali" and "diwali" as one request, but the
+    prediction echoes the name it was computed for; hits re-render those fields
+    from the current request rather than serving another caller's spelling.
+    """
+    cached_name = result["factors"]["festival_name"]
+    if cached_name == festival_name:
+        return result
+    return {
+        **result,
+        "recommendations": _renamed_recommendations(result["recommendations"], cached_name, festival_name),
+        "factors": {**result["factors"], "festival_name": festival_name}
+    }
+
+
+def with_combined_festival_name(result: Dict, festival_name: Optional[str]) -> Dict:
+    """``with_festival_name`` for a cached combined prediction (see ``combined_key``)"""
+    festival = result["predictions"].get("festival")
+    if festival is None or festival_name is None:
+        return result
+    cached_name = festival["factors"]["festival_name"]
+    if cached_name == festival_name:
+        return result
+    return {
+        **result,
+        "predictions": {**result["predictions"], "festival": with_festival_name(festival, festival_name)},
+        "all_recommendations": _renamed_recommendations(result["all_recommendations"], cached_name, festival_name)
+    }
+
+
+def festival_key(
+    festival_name: str,
+    start_date: str,
+    end_date: str,
+    intensity: str,
+    historical_data: Optional[Dict] = None,
+    location: Optional[str] = None
+) -> Optional[Tuple]:
+    """Cache key for a festival prediction, or None if it cannot be canonicalized"""
+    try:
+        return (
+            _canonical_festival(festival_name),
+            _canonical_datetime(start_date),
+            _canonical_datetime(end_date),
+            intensity,
+            json.dumps(historical_data, sort_keys=True, default=str) if historical_data else None,
+            location
+        )
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def pollution_key(
+    aqi: float,
+    pm25: Optional[float] = None,
+    pm10: Optional[float] = None,
+    location: Optional[str] = None,
+    date: Optional[str] = None
+) -> Tuple:
+    """Cache key for a pollution prediction; ``aqi`` must already be canonical"""
+    return (aqi, pm25, pm10, location, date)
+
+
+def staff_key(
+    predicted_patients: int,
+    current_staff: Optional[int] = None,
+    department: Optional[str] = None,
+    shift_type: Optional[str] = None,
+    location: Optional[str] = None
+) -> Tuple:
+    """Cache key for a staff forecast"""
+    return (predicted_patients, current_staff, department, shift_type, location)
+
+
+def combined_key(
+    festival_name: Optional[str],
+    festival_start: Optional[str],
+    festival_end: Optional[str],
+    festival_intensity: Optional[str],
+    aqi: Optional[float],
+    location: Optional[str]
+) -> Optional[Tuple]:
+    """Cache key for a combined prediction; ``aqi`` must already be canonical"""
+    try:
+        return (
+            _canonical_festival(festival_name),
+            _canonical_datetime(festival_start),
+            _canonical_datetime(festival_end),
+            festival_intensity,
+            aqi,
+            location
+        )
+    except (TypeError, ValueError, AttributeError):
+        return None
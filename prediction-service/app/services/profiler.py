@@ -0,0 +1,394 @@
+import asyncio
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import random
+import re
+import secrets
+import sys
+import sysconfig
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+MODES = ("sample", "cprofile")
+
+# The profile of the request being handled; copied into executor worker
+# threads so predictor calls join their request's profile
+active_profile: ContextVar[Optional["ProfileSession"]] = ContextVar("active_profile", default=None)
+
+# UTC start to the microsecond, so ids sort in the order profiles were taken
+_PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{12}-[0-9a-f]{6}$")
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_STDLIB_DIR = sysconfig.get_paths()["stdlib"] + os.sep
+
+
+@functools.lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    """Paths relative to the app, site-packages or the stdlib, so frames read like imports"""
+    if filename.startswith(_APP_DIR):
+        return filename[len(_APP_DIR):]
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(_STDLIB_DIR):
+        return filename[len(_STDLIB_DIR):]
+    return filename
+
+
+def _collapse(root: str, frame) -> str:
+    """One stack as a collapsed-stack line prefix, outermost frame first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(root)
+    return ";".join(reversed(names))
+
+
+class ProfileSession:
+    """
+    Profile of one request: the event loop thread that handles it, plus the
+    executor worker threads while they run its predictor calls.
+    
+    ``sample`` mode reads every profiled thread's stack each ``interval``
+    seconds (sys._current_frames) and counts collapsed stacks, ready for
+    flamegraph tools. ``cprofile`` mode runs cProfile on the event loop
+    thread and around each predictor call on a worker, merged when saved.
+    Either way the event loop thread may also be running other requests'
+    coroutines meanwhile. Predictor calls in process-mode workers are not
+    profiled; they appear as the loop waiting on their futures.
+    """
+    
+    def __init__(self, mode: str, method: str, path: str, interval: float = 0.005, max_seconds: float = 30.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Expected one of: {', '.join(MODES)}")
+        self.started_at = datetime.now(timezone.utc)
+        self.id = f"{self.started_at.strftime('%Y%m%dT%H%M%S%f')}-{secrets.token_hex(3)}"
+        self.mode = mode
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.duration = 0.0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._started = time.perf_counter()
+        self._loop_thread = threading.get_ident()
+        self._threads: Dict[int, str] = {self._loop_thread: "event_loop"}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._profiles: List[cProfile.Profile] = []
+    
+    def start(self) -> None:
+        if self.mode == "sample":
+            self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+            self._sampler.start()
+        else:
+            profile = cProfile.Profile()
+            self._profiles.append(profile)
+            profile.enable()
+    
+    def stop(self) -> None:
+        self.duration = time.perf_counter() - self._started
+        self._done.set()
+        if self.mode == "cprofile":
+            self._profiles[0].disable()
+        elif self._sampler is not None:
+            self._sampler.join()
+    
+    def run(self, function: Callable, args: tuple, kwargs: dict) -> Any:
+        """``function(*args, **kwargs)`` on an executor worker, inside this profile"""
+        ident = threading.get_ident()
+        if ident == self._loop_thread or self._done.is_set():
+            return function(*args, **kwargs)
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(function, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._profiles.append(profile)
+        with self._lock:
+            self._threads[ident] = threading.current_thread().name
+        try:
+            return function(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._threads.pop(ident, None)
+    
+    def _sample(self) -> None:
+        deadline = time.perf_counter() + self.max_seconds
+        while not self._done.wait(self.interval) and time.perf_counter() < deadline:
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for ident, name in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_collapse(name, frame)] += 1
+            self.samples += 1
+    
+    def collapsed(self) -> str:
+        """``frame;frame;frame count`` lines (Brendan Gregg's collapsed-stack format)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+    
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self._profiles[0], stream=io.StringIO())
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        return stats
+    
+    def hotspots(self, limit: int = 15) -> List[Dict]:
+        """The functions with the most self time (samples or cProfile seconds)"""
+        if self.mode == "sample":
+            leaves: Counter = Counter()
+            for stack, count in self.stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            return [
+                {"function": name, "samples": count, "share": round(count / max(self.samples, 1), 4)}
+                for name, count in leaves.most_common(limit)
+            ]
+        rows = sorted(self.stats().stats.items(), key=lambda item: -item[1][2])[:limit]
+        return [
+            {
+                "function": f"{function} ({_short_path(filename)}:{line})",
+                "calls": calls,
+                "self_seconds": round(own, 6),
+                "cumulative_seconds": round(cumulative, 6)
+            }
+            for (filename, line, function), (_, calls, own, cumulative, _) in rows
+        ]
+
+
+class ProfileStore:
+    """
+    Bounded ring of profile files in ``directory``: ``<id>.json`` with the
+    metadata and hotspots, plus ``<id>.collapsed`` (sample) or ``<id>.prof``
+    (cprofile, pstats format). Saving beyond ``capacity`` drops the oldest.
+    """
+    
+    EXTENSIONS = {"sample": ".collapsed", "cprofile": ".prof"}
+    
+    def __init__(self, directory: str, capacity: int = 50):
+        self.directory = directory
+        self.capacity = capacity
+        self._lock = threading.Lock()
+    
+    def save(self, session: ProfileSession, status: int) -> Dict:
+        os.makedirs(self.directory, exist_ok=True)
+        data_path = os.path.join(self.directory, session.id + self.EXTENSIONS[session.mode])
+        if session.mode == "sample":
+            with open(data_path, "w") as f:
+                f.write(session.collapsed())
+        else:
+            session.stats().dump_stats(data_path)
+        meta = {
+            "id": session.id,
+            "mode": session.mode,
+            "method": session.method,
+            "path": session.path,
+            "status": status,
+            "started_at": session.started_at.isoformat(),
+            "duration_ms": round(session.duration * 1000, 3),
+            "samples": session.samples if session.mode == "sample" else None,
+            "interval_ms": session.interval * 1000 if session.mode == "sample" else None,
+            "file": os.path.basename(data_path),
+            "bytes": os.path.getsize(data_path),
+            "hotspots": session.hotspots()
+        }
+        with open(os.path.join(self.directory, session.id + ".json"), "w") as f:
+            json.dump(meta, f)
+        self._prune()
+        return meta
+    
+    def _ids(self) -> List[str]:
+        """Stored profile ids, oldest first (ids start with their UTC time)"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json") and _PROFILE_ID.match(name[:-5]))
+    
+    def _prune(self) -> None:
+        with self._lock:
+            ids = self._ids()
+            for profile_id in ids[:max(len(ids) - self.capacity, 0)]:
+                for extension in (".json",) + tuple(self.EXTENSIONS.values()):
+                    try:
+                        os.remove(os.path.join(self.directory, profile_id + extension))
+                    except FileNotFoundError:
+                        pass
+    
+    def list(self) -> List[Dict]:
+        """Metadata of every stored profile, newest first"""
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                profiles.append(self.get(profile_id))
+            except KeyError:
+                pass  # pruned meanwhile
+        return profiles
+    
+    def get(self, profile_id: str) -> Dict:
+        if not _PROFILE_ID.match(profile_id):
+            raise KeyError(profile_id)
+        try:
+            with open(os.path.join(self.directory, profile_id + ".json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(profile_id)
+    
+    def data_path(self, profile_id: str) -> Tuple[str, str]:
+        """(path, mode) of a profile's data file; KeyError when it is gone"""
+        meta = self.get(profile_id)
+        path = os.path.join(self.directory, meta["file"])
+        if not os.path.exists(path):
+            raise KeyError(profile_id)
+        return path, meta["mode"]
+    
+    def collapsed(self, profile_id: str) -> str:
+        path, mode = self.data_path(profile_id)
+        if mode != "sample":
+            raise ValueError("Collapsed stacks are only recorded in sample mode; download the .prof instead")
+        with open(path) as f:
+            return f.read()
+
+
+class RequestProfiler:
+    """
+    Decides which requests are profiled and keeps their profiles.
+    
+    A request is profiled when it carries ``X-Profile: <token>`` matching
+    ``token`` (header triggering is off without a token; ``X-Profile-Mode``
+    picks ``sample`` or ``cprofile``), or at random with ``sample_rate``.
+    One request is profiled at a time; others pass through untouched, as do
+    paths starting with an ``exempt`` prefix.
+    """
+    
+    HEADER = b"x-profile"
+    MODE_HEADER = b"x-profile-mode"
+    
+    def __init__(
+        self,
+        store: ProfileStore,
+        token: Optional[str] = None,
+        sample_rate: float = 0.0,
+        mode: str = "sample",
+        interval: float = 0.005,
+        max_seconds: float = 30.0,
+        exempt: Iterable[str] = ()
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Expected one of: {', '.join(MODES)}")
+        self.store = store
+        self.token = token or None
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.exempt = tuple(exempt)
+        self.active: Optional[ProfileSession] = None
+        self.profiled = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None or self.sample_rate > 0
+    
+    def wants(self, scope) -> Optional[str]:
+        """The mode to profile this request in, or None"""
+        if self.active is not None or scope["path"].startswith(self.exempt):
+            return None
+        headers = dict(scope["headers"])
+        token = headers.get(self.HEADER)
+        if token is not None and self.token is not None and secrets.compare_digest(token, self.token.encode()):
+            mode = headers.get(self.MODE_HEADER, b"").decode("latin-1").lower()
+            return mode if mode in MODES else self.mode
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.mode
+        return None
+    
+    def begin(self, mode: str, scope) -> ProfileSession:
+        session = ProfileSession(mode, scope["method"], scope["path"], self.interval, self.max_seconds)
+        self.active = session
+        session.start()
+        return session
+    
+    def end(self, session: ProfileSession) -> None:
+        session.stop()
+        self.active = None
+        self.profiled += 1
+    
+    def describe(self) -> Dict:
+        return {
+            "header_trigger": self.token is not None,
+            "sample_rate": self.sample_rate,
+            "mode": self.mode,
+            "interval_ms": self.interval * 1000,
+            "max_seconds": self.max_seconds,
+            "directory": self.store.directory,
+            "capacity": self.store.capacity,
+            "profiled": self.profiled,
+            "active": self.active.id if self.active is not None else None
+        }
+
+
+class ProfileRequests:
+    """
+    ASGI middleware profiling the requests ``profiler`` picks. Profiled
+    responses carry ``X-Profile-Id``; the profile is written to the store
+    once the response is complete.
+    """
+    
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+    
+    async def __call__(self, scope, receive, send):
+        mode = self.profiler.wants(scope) if scope["type"] == "http" and self.profiler.enabled else None
+        if mode is None:
+            return await self.app(scope, receive, send)
+        
+        session = self.profiler.begin(mode, scope)
+        status = 500
+        
+        async def send_tagged(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", session.id.encode())]}
+            await send(message)
+        
+        token = active_profile.set(session)
+        try:
+            await self.app(scope, receive, send_tagged)
+        finally:
+            active_profile.reset(token)
+            self.profiler.end(session)
+            await asyncio.to_thread(self.profiler.store.save, session, status)
+
+
+def profiler_from_env(exempt: Iterable[str] = (), environ: Optional[Dict[str, str]] = None) -> RequestProfiler:
+    """Build a RequestProfiler from PROFILE_* settings"""
+    env = os.environ if environ is None else environ
+    return RequestProfiler(
+        ProfileStore(
+            env.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "prediction-profiles")),
+            capacity=int(env.get("PROFILE_RING_SIZE", "50"))
+        ),
+        token=env.get("PROFILE_TOKEN"),
+        sample_rate=float(env.get("PROFILE_SAMPLE_RATE", "0")),
+        mode=env.get("PROFILE_MODE", "sample"),
+        interval=float(env.get("PROFILE_INTERVAL_MS", "5")) / 1000,
+        max_seconds=float(env.get("PROFILE_MAX_SECONDS", "30")),
+        exempt=exempt
+    )
@@ -0,0 +1,256 @@
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .geo_index import distance_matrix_km
+from .transport import closed_costs, solve_transport
+
+
+class ResourceAllocator:
+    """
+    Minimum-cost redistribution of stock (beds, oxygen cylinders, ...)
+    between hospitals.
+    
+    A hospital's demand per resource is the sum of its explicit ``demand``,
+    the ``estimated_resources`` of any predictions passed with it, and a
+    pollution prediction at its ``aqi`` (all hospitals' AQIs are scored in
+    one ``predict_many`` call). Stock covers local demand first; what is left
+    above the hospital's ``reserve`` can be moved to hospitals short of that
+    resource, at the transfer cost per unit times the resource's weight.
+    Demand nobody covers costs the resource's ``unmet_cost`` per unit, so a
+    transfer only happens when it is cheaper than the shortage.
+    
+    Each resource type is one transportation block, solved by
+    ``transport.solve_transport``: identical blocks once, and each remaining
+    block as its own LP that starts from each short hospital's
+    ``CANDIDATE_SOURCES`` cheapest sources and adds the moves its dual prices
+    show could lower the cost. Transfer costs are a flat ``transfer_cost``
+    plus ``cost_per_km`` of great-circle distance between the hospitals'
+    coordinates (from the request or the geo sites), with per-pair overrides.
+    """
+    
+    RESOURCES = ("beds", "oxygen_cylinders", "nebulizers", "ventilators", "ambulances")
+    RESOURCE_ALIASES = {
+        "bed": "beds",
+        "beds": "beds",
+        "respiratory_beds": "beds",
+        "oxygen": "oxygen_cylinders",
+        "oxygen_cylinder": "oxygen_cylinders",
+        "oxygen_cylinders": "oxygen_cylinders",
+        "nebulizer": "nebulizers",
+        "nebulizers": "nebulizers",
+        "ventilator": "ventilators",
+        "ventilators": "ventilators",
+        "ambulance": "ambulances",
+        "ambulances": "ambulances"
+    }
+    
+    TRANSFER_COST = 1.0
+    UNMET_COST = 100.0
+    MAX_HOSPITALS = 2000
+    # Cheapest sources each short hospital starts with; dual pricing adds the rest as needed
+    CANDIDATE_SOURCES = 4
+    
+    def __init__(self, pollution_predictor, geo_index=None):
+        self._pollution = pollution_predictor
+        self._geo = geo_index
+    
+    def allocate(
+        self,
+        hospitals: List[Dict],
+        resources: Optional[List[str]] = None,
+        transfer_cost: float = TRANSFER_COST,
+        cost_per_km: float = 0.0,
+        transfer_costs: Optional[Dict[str, Dict[str, Optional[float]]]] = None,
+        resource_costs: Optional[Dict[str, float]] = None,
+        unmet_cost: float = UNMET_COST,
+        unmet_costs: Optional[Dict[str, float]] = None
+    ) -> Dict:
+        """
+        Plan transfers for ``hospitals``, each with ``location``, ``stock``,
+        optional ``demand`` and ``reserve`` (``{resource: units}``),
+        ``predictions`` (prediction results with ``estimated_resources``),
+        ``aqi`` and ``lat``/``lng``. ``resources`` defaults to every type
+        that appears in a stock or demand. ``resource_costs`` scales the
+        transfer cost and ``unmet_costs`` sets the shortage cost per resource.
+        """
+        started = time.perf_counter()
+        if not hospitals:
+            raise ValueError("hospitals is empty")
+        if len(hospitals) > self.MAX_HOSPITALS:
+            raise ValueError(f"at most {self.MAX_HOSPITALS} hospitals per plan")
+        if transfer_cost < 0 or cost_per_km < 0 or unmet_cost < 0:
+            raise ValueError("costs must not be negative")
+        locations = [item["location"] for item in hospitals]
+        if len(set(locations)) != len(locations):
+            raise ValueError("each location may appear only once")
+        
+        demand = self._demand(hospitals)
+        stock = self._units(hospitals, "stock")
+        reserve = self._units(hospitals, "reserve")
+        if resources is None:
+            present = {resource for table in (demand, stock) for resource in table}
+            resources = [resource for resource in self.RESOURCES if resource in present]
+        else:
+            resources = list(dict.fromkeys(self._resource(resource) for resource in resources))
+        if not resources:
+            raise ValueError("no resources to allocate")
+        
+        # (resource, hospital) arrays
+        def matrix(table: Dict[str, np.ndarray]) -> np.ndarray:
+            return np.array(
+                [table.get(resource, np.zeros(len(hospitals))) for resource in resources], dtype=np.int64
+            )
+        
+        demand, stock, reserve = matrix(demand), matrix(stock), matrix(reserve)
+        local = np.minimum(stock, demand)
+        surplus = np.maximum(stock - local - reserve, 0)
+        deficit = demand - local
+        
+        weights = self._per_resource(resource_costs, resources, 1.0, "resource_costs")
+        shortage_costs = self._per_resource(unmet_costs, resources, unmet_cost, "unmet_costs")
+        cost = closed_costs(
+            locations, transfer_cost, transfer_costs, self._base_costs(hospitals, transfer_cost, cost_per_km)
+        )
+        flows, unmet, solver = solve_transport(
+            surplus, deficit, cost, shortage_costs,
+            cost_scale=weights, candidates=self.CANDIDATE_SOURCES, name="allocation"
+        )
+        
+        received = np.zeros_like(demand)
+        sent = np.zeros_like(demand)
+        np.add.at(received, (flows[:, 0], flows[:, 2]), flows[:, 3])
+        np.add.at(sent, (flows[:, 0], flows[:, 1]), flows[:, 3])
+        unit_costs = cost[flows[:, 1], flows[:, 2]] * weights[flows[:, 0]] if len(flows) else np.zeros(0)
+        transfer_spend = np.bincount(flows[:, 0], unit_costs * flows[:, 3], minlength=len(resources))
+        unmet_spend = unmet.sum(axis=1) * shortage_costs
+        
+        def totals(r) -> Dict:
+            return {
+                "demand": int(demand[r].sum()),
+                "stock": int(stock[r].sum()),
+                "covered_locally": int(local[r].sum()),
+                "transferred": int(received[r].sum()),
+                "unmet": int(unmet[r].sum()),
+                "transfer_cost": round(float(np.sum(transfer_spend[r])), 2),
+                "unmet_cost": round(float(np.sum(unmet_spend[r])), 2)
+            }
+        
+        summary = totals(slice(None))
+        summary["total_cost"] = round(summary["transfer_cost"] + summary["unmet_cost"], 2)
+        return {
+            "resources": resources,
+            "summary": {**summary, "by_resource": {resource: totals(r) for r, resource in enumerate(resources)}},
+            "hospitals": [
+                {
+                    "location": location,
+                    "resources": {
+                        resource: {
+                            "demand": int(demand[r, h]),
+                            "stock": int(stock[r, h]),
+                            "covered_locally": int(local[r, h]),
+                            "received": int(received[r, h]),
+                            "sent": int(sent[r, h]),
+                            "unmet": int(unmet[r, h]),
+                            "remaining": int(stock[r, h] - local[r, h] - sent[r, h])
+                        }
+                        for r, resource in enumerate(resources)
+                    }
+                }
+                for h, location in enumerate(locations)
+            ],
+            "transfers": [
+                {
+                    "resource": resources[r],
+                    "from": locations[source],
+                    "to": locations[target],
+                    "units": units,
+                    "unit_cost": round(unit_cost, 4)
+                }
+                for r, source, target, units, unit_cost in zip(
+                    flows[:, 0].tolist(), flows[:, 1].tolist(), flows[:, 2].tolist(),
+                    flows[:, 3].tolist(), unit_costs.tolist()
+                )
+            ],
+            "shortages": [
+                {"location": locations[h], "resource": resources[r], "unmet": int(unmet[r, h])}
+                for r, h in zip(*np.nonzero(unmet))
+            ],
+            "solver": {**solver, "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+        }
+    
+    def _resource(self, name: str) -> str:
+        resource = self.RESOURCE_ALIASES.get(str(name).lower())
+        if resource is None:
+            raise ValueError(f"unknown resource {name!r}; expected one of {', '.join(self.RESOURCES)}")
+        return resource
+    
+    def _units(self, hospitals: List[Dict], field: str) -> Dict[str, np.ndarray]:
+        """``{resource: units per hospital}`` from each hospital's ``field`` mapping"""
+        table: Dict[str, np.ndarray] = {}
+        for h, item in enumerate(hospitals):
+            for name, units in (item.get(field) or {}).items():
+                if units < 0:
+                    raise ValueError(f"{field} for {item['location']}/{name} must not be negative")
+                resource = self._resource(name)
+                table.setdefault(resource, np.zeros(len(hospitals), dtype=np.int64))[h] += int(units)
+        return table
+    
+    def _demand(self, hospitals: List[Dict]) -> Dict[str, np.ndarray]:
+        """Explicit demand plus the resources of passed and AQI-driven predictions"""
+        demand = self._units(hospitals, "demand")
+        
+        def add(h: int, estimated: Dict) -> None:
+            for name, units in estimated.items():
+                # Staff and descriptive entries ("equipment", "respiratory_medications") are not stock
+                resource = self.RESOURCE_ALIASES.get(name)
+                if resource is not None and isinstance(units, (int, float)):
+                    demand.setdefault(resource, np.zeros(len(hospitals), dtype=np.int64))[h] += int(np.ceil(units))
+        
+        for h, item in enumerate(hospitals):
+            for prediction in item.get("predictions") or []:
+                add(h, prediction.get("estimated_resources") or {})
+        with_aqi = [h for h, item in enumerate(hospitals) if item.get("aqi") is not None]
+        if with_aqi:
+            results = self._pollution.predict_many([
+                {"aqi": hospitals[h]["aqi"], "location": hospitals[h]["location"]} for h in with_aqi
+            ])
+            for h, result in zip(with_aqi, results):
+                if "error" in result:
+                    raise ValueError(f"aqi for {hospitals[h]['location']}: {result['error']}")
+                add(h, result["estimated_resources"])
+        return demand
+    
+    def _per_resource(
+        self,
+        values: Optional[Dict[str, float]],
+        resources: List[str],
+        default: float,
+        field: str
+    ) -> np.ndarray:
+        result = np.full(len(resources), float(default))
+        for name, value in (values or {}).items():
+            resource = self._resource(name)
+            if value < 0:
+                raise ValueError(f"{field} must not be negative")
+            if resource in resources:
+                result[resources.index(resource)] = value
+        return result
+    
+    def _base_costs(self, hospitals: List[Dict], transfer_cost: float, cost_per_km: float) -> Optional[np.ndarray]:
+        """Flat cost plus distance cost between every pair, or None when distance is not priced"""
+        if not cost_per_km:
+            return None
+        lat = np.full(len(hospitals), np.nan)
+        lng = np.full(len(hospitals), np.nan)
+        for h, item in enumerate(hospitals):
+            if item.get("lat") is not None and item.get("lng") is not None:
+                lat[h], lng[h] = item["lat"], item["lng"]
+            elif self._geo is not None and self._geo.site(item["location"]) is not None:
+                site = self._geo.site(item["location"])
+                lat[h], lng[h] = site.lat, site.lng
+        missing = [hospitals[h]["location"] for h in np.flatnonzero(np.isnan(lat))]
+        if missing:
+            raise ValueError(f"cost_per_km needs coordinates for: {', '.join(missing[:10])}")
+        return transfer_cost + cost_per_km * distance_matrix_km(lat, lng)
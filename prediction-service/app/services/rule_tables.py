@@ -0,0 +1,502 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from .festival_predictor import FestivalPredictor
+from .pollution_predictor import PollutionPredictor
+from .staff_forecaster import StaffForecaster
+
+# Rule file keys and the predictor class constants they replace
+TABLES = {
+    "festival_base_surge": "FESTIVAL_BASE_SURGE",
+    "aqi_thresholds": "AQI_THRESHOLDS",
+    "staff_ratios": "STAFF_RATIOS",
+    "shift_multipliers": "SHIFT_MULTIPLIERS"
+}
+INTENSITIES = ("low", "medium", "high")
+AQI_FIELDS = ("max", "multiplier", "risk", "additional_patients")
+AQI_RISK_LEVELS = ("low", "medium", "high", "critical")
+STAFF_ROLES = ("doctors", "nurses", "support")
+# Tables each predictor reads; a predictor is only recompiled when they change
+PREDICTOR_TABLES = {
+    "festival": ("festival_base_surge",),
+    "pollution": ("aqi_thresholds",),
+    "staff": ("staff_ratios", "shift_multipliers")
+}
+
+# default.json applies to every location; without it the class constants do
+DEFAULT = "default"
+BUILTIN = "builtin"
+
+
+def builtin_tables() -> Dict[str, Mapping]:
+    """The rule tables the predictors define in code"""
+    return {
+        "festival_base_surge": FestivalPredictor.FESTIVAL_BASE_SURGE,
+        "aqi_thresholds": PollutionPredictor.AQI_THRESHOLDS,
+        "staff_ratios": StaffForecaster.STAFF_RATIOS,
+        "shift_multipliers": StaffForecaster.SHIFT_MULTIPLIERS
+    }
+
+
+def _key(name: Any) -> str:
+    # Same normalization the predictors apply to festival names and departments
+    return str(name).strip().lower().replace(" ", "_")
+
+
+def _check_number(value: Any, where: str, positive: bool = False) -> None:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+        raise ValueError(f"{where} must be a number")
+    if value < 0 or (positive and value == 0):
+        raise ValueError(f"{where} must be {'> 0' if positive else '>= 0'}")
+
+
+def _check_fields(entry: Any, fields: Tuple[str, ...], where: str) -> None:
+    if not isinstance(entry, Mapping):
+        raise ValueError(f"{where} must be an object")
+    missing = [field for field in fields if field not in entry]
+    unknown = [field for field in entry if field not in fields]
+    if missing or unknown:
+        raise ValueError(
+            f"{where} must have exactly {', '.join(fields)}"
+            + (f" (missing {', '.join(missing)})" if missing else "")
+            + (f" (unknown {', '.join(map(str, unknown))})" if unknown else "")
+        )
+
+
+def validate_tables(tables: Mapping[str, Mapping]) -> None:
+    """Raise ValueError naming the first entry the predictors could not use"""
+    festivals = tables["festival_base_surge"]
+    if DEFAULT not in festivals:
+        raise ValueError("festival_base_surge needs a 'default' festival")
+    for festival, multipliers in festivals.items():
+        _check_fields(multipliers, INTENSITIES, f"festival_base_surge.{festival}")
+        for intensity, multiplier in multipliers.items():
+            _check_number(multiplier, f"festival_base_surge.{festival}.{intensity}", positive=True)
+    
+    thresholds = tables["aqi_thresholds"]
+    if not thresholds:
+        raise ValueError("aqi_thresholds needs at least one category")
+    for category, data in thresholds.items():
+        where = f"aqi_thresholds.{category}"
+        _check_fields(data, AQI_FIELDS, where)
+        _check_number(data["max"], f"{where}.max", positive=True)
+        _check_number(data["multiplier"], f"{where}.multiplier", positive=True)
+        _check_number(data["additional_patients"], f"{where}.additional_patients")
+        if data["risk"] not in AQI_RISK_LEVELS:
+            raise ValueError(f"{where}.risk must be one of {', '.join(AQI_RISK_LEVELS)}")
+    bounds = sorted(data["max"] for data in thresholds.values())
+    if len(set(bounds)) != len(bounds):
+        raise ValueError("aqi_thresholds categories need distinct max values")
+    
+    ratios = tables["staff_ratios"]
+    if DEFAULT not in ratios:
+        raise ValueError("staff_ratios needs a 'default' department")
+    for department, roles in ratios.items():
+        _check_fields(roles, STAFF_ROLES, f"staff_ratios.{department}")
+        for role, ratio in roles.items():
+            _check_number(ratio, f"staff_ratios.{department}.{role}")
+    
+    for shift, multiplier in tables["shift_multipliers"].items():
+        _check_number(multiplier, f"shift_multipliers.{shift}", positive=True)
+
+
+def merge_tables(base: Mapping[str, Mapping], overrides: Mapping[str, Mapping]) -> Dict[str, Dict]:
+    """
+    ``base`` with the entries of ``overrides`` replaced, field by field for
+    nested entries (so a file may change one multiplier), then validated
+    """
+    merged = {
+        key: {
+            entry: dict(value) if isinstance(value, Mapping) else value
+            for entry, value in base[key].items()
+        }
+        for key in TABLES
+    }
+    for key, table in overrides.items():
+        for entry, value in table.items():
+            entry = _key(entry)
+            current = merged[key].get(entry)
+            if isinstance(value, Mapping) and isinstance(current, dict):
+                merged[key][entry] = {**current, **{_key(field): item for field, item in value.items()}}
+            elif isinstance(value, Mapping):
+                merged[key][entry] = {_key(field): item for field, item in value.items()}
+            else:
+                merged[key][entry] = value
+    validate_tables(merged)
+    return merged
+
+
+def parse_rule_file(data: Any) -> Tuple[str, Dict[str, Dict]]:
+    """(version, tables) of a rule file's JSON; tables are checked when merged"""
+    if not isinstance(data, dict):
+        raise ValueError("a rule file must hold a JSON object")
+    unknown = set(data) - set(TABLES) - {"version", "description"}
+    if unknown:
+        raise ValueError(f"unknown keys: {', '.join(sorted(unknown))}")
+    version = data.get("version")
+    if isinstance(version, bool) or not isinstance(version, (str, int)) or not str(version).strip():
+        raise ValueError("version is required (a string or integer)")
+    tables = {}
+    for key in TABLES:
+        if key in data:
+            if not isinstance(data[key], dict):
+                raise ValueError(f"{key} must be an object")
+            tables[key] = data[key]
+    return str(version).strip(), tables
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return MappingProxyType({entry: _freeze(item) for entry, item in value.items()})
+    return value
+
+
+class RuleLayer(NamedTuple):
+    """One loaded rule file"""
+    name: str  # "default" or a location key
+    version: str
+    tables: Dict[str, Dict]  # only the tables the file sets
+    identity: Tuple[int, int]  # (st_mtime_ns, st_size) of the file as loaded
+
+
+class RuleSet(NamedTuple):
+    """Predictors compiled from one location's merged tables"""
+    location: Optional[str]  # None for the default rules
+    version: str  # e.g. "default@3+kem@7", or "builtin"
+    festival: Any
+    pollution: Any
+    staff: Any
+
+
+class RuleBook(NamedTuple):
+    """Every location's rules at one point in time; replaced as a whole"""
+    default: RuleSet
+    locations: Mapping[str, RuleSet]
+    loaded_at: str
+    
+    def rules_for(self, location: Optional[str]) -> RuleSet:
+        if location and self.locations:
+            return self.locations.get(location.strip().lower(), self.default)
+        return self.default
+
+
+def with_tables(cls: type, tables: Mapping[str, Any]) -> type:
+    """Subclass of a predictor class whose rule-table constants are ``tables``"""
+    overrides = {attribute: value for attribute, value in tables.items() if hasattr(cls, attribute)}
+    return type(cls.__name__, (cls,), overrides) if overrides else cls
+
+
+class RuleTables:
+    """
+    Surge rule tables loaded from versioned JSON files, per location.
+    
+    Layout: ``<root>/default.json`` replaces entries of the tables the
+    predictors define in code for every location, and
+    ``<root>/<location>.json`` replaces entries for one hospital or location
+    on top of that. A file holds a ``version`` and any of
+    ``festival_base_surge``, ``aqi_thresholds``, ``staff_ratios`` and
+    ``shift_multipliers``; entries are merged field by field, so a file may
+    change a single multiplier. Each location's merged tables are validated
+    and compiled by ``build`` (``build(kind, tables)`` returns the festival,
+    pollution or staff predictor using those tables, read-only). Locations
+    with the same tables for a predictor share one compiled predictor.
+    
+    ``current()`` stats the files at most every ``check_interval`` seconds
+    and hands a change to a background thread, which compiles a new book
+    beside the old one (reusing the rules of unchanged locations) and
+    installs it with one assignment. Calls already holding the old book
+    finish on it. A file that fails to load or validate is reported by
+    ``describe`` and its last good version stays in use.
+    """
+    
+    SUFFIX = ".json"
+    
+    def __init__(
+        self,
+        root: str,
+        build: Callable[[str, Dict[str, Any]], Any],
+        check_interval: float = 5.0,
+        on_swap: Optional[Callable[[RuleBook], None]] = None
+    ):
+        self.root = root
+        self.build = build
+        self.check_interval = check_interval
+        self.on_swap = on_swap
+        self.reloads = 0
+        self._layers: Dict[str, RuleLayer] = {}
+        self._errors: Dict[str, str] = {}
+        self._compiled: Dict[Tuple[str, str], Any] = {}
+        self._identities: Optional[Dict[str, Tuple[int, int]]] = None
+        self._book: Optional[RuleBook] = None
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._next_check = time.monotonic() + check_interval
+        self.reload()
+    
+    def current(self) -> RuleBook:
+        """The installed book; starts a background reload when a file changed"""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            if not self._reloading and self._scan() != self._identities:
+                self._reloading = True
+                threading.Thread(target=self._reload_in_background, name="rule-tables-reload", daemon=True).start()
+        return self._book
+    
+    def _reload_in_background(self) -> None:
+        try:
+            self.reload()
+        finally:
+            self._reloading = False
+    
+    def reload(self) -> bool:
+        """Load changed files now and install a new book; False when nothing changed"""
+        with self._lock:
+            identities = self._scan()
+            if identities == self._identities and self._book is not None:
+                return False
+            # default.json first: location files are checked on top of it
+            for name in sorted(identities, key=lambda name: name != DEFAULT):
+                layer = self._layers.get(name)
+                if layer is None or layer.identity != identities[name]:
+                    self._load(name, identities[name])
+            for name in set(self._layers) - set(identities):
+                del self._layers[name]
+            for name in set(self._errors) - set(identities):
+                del self._errors[name]
+            self._identities = identities
+            
+            book = self._compile()
+            self._book = book
+            self.reloads += 1
+        if self.on_swap is not None and self.reloads > 1:
+            self.on_swap(book)
+        return True
+    
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """(mtime, size) per rule file name; empty when the directory does not exist"""
+        identities = {}
+        try:
+            entries = list(os.scandir(self.root))
+        except (FileNotFoundError, NotADirectoryError):
+            return identities
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            identities[entry.name[:-len(self.SUFFIX)].lower()] = (stat.st_mtime_ns, stat.st_size)
+        return identities
+    
+    def _load(self, name: str, identity: Tuple[int, int]) -> None:
+        path = os.path.join(self.root, name + self.SUFFIX)
+        try:
+            with open(path) as f:
+                version, tables = parse_rule_file(json.load(f))
+            merge_tables(self._default_tables() if name != DEFAULT else builtin_tables(), tables)
+        except (OSError, ValueError) as e:
+            self._errors[name] = f"{path}: {e}"
+            return
+        self._layers[name] = RuleLayer(name, version, tables, identity)
+        self._errors.pop(name, None)
+    
+    def _default_tables(self) -> Dict[str, Mapping]:
+        layer = self._layers.get(DEFAULT)
+        return builtin_tables() if layer is None else merge_tables(builtin_tables(), layer.tables)
+    
+    def _compile(self) -> RuleBook:
+        default_layer = self._layers.get(DEFAULT)
+        default_tables = self._default_tables()
+        compiled: Dict[Tuple[str, str], Any] = {}
+        default = self._rule_set(None, [default_layer] if default_layer else [], default_tables, compiled)
+        
+        locations = {}
+        for name, layer in sorted(self._layers.items()):
+            if name == DEFAULT:
+                continue
+            try:
+                tables = merge_tables(default_tables, layer.tables)
+            except ValueError as e:
+                # Valid on its own, but not on top of the new default.json
+                self._errors[name] = f"{os.path.join(self.root, name + self.SUFFIX)}: {e}"
+                continue
+            layers = [default_layer, layer] if default_layer else [layer]
+            locations[name] = self._rule_set(name, layers, tables, compiled)
+        
+        self._compiled = compiled
+        return RuleBook(
+            default=default,
+            locations=MappingProxyType(locations),
+            loaded_at=datetime.now(timezone.utc).isoformat()
+        )
+    
+    def _rule_set(
+        self,
+        location: Optional[str],
+        layers: List[RuleLayer],
+        tables: Mapping[str, Mapping],
+        compiled: Dict[Tuple[str, str], Any]
+    ) -> RuleSet:
+        predictors = {}
+        for kind, names in PREDICTOR_TABLES.items():
+            key = (kind, json.dumps([tables[name] for name in names], sort_keys=True))
+            predictor = compiled.get(key) or self._compiled.get(key)
+            if predictor is None:
+                predictor = self.build(kind, {TABLES[name]: _freeze(tables[name]) for name in names})
+            predictors[kind] = compiled[key] = predictor
+        return RuleSet(
+            location=location,
+            version="+".join(f"{layer.name}@{layer.version}" for layer in layers) or BUILTIN,
+            **predictors
+        )
+    
+    def describe(self) -> Dict:
+        book = self._book
+        names = sorted(set(self._layers) | set(self._errors), key=lambda name: (name != DEFAULT, name))
+        return {
+            "root": self.root,
+            "check_interval_seconds": self.check_interval,
+            "loaded_at": book.loaded_at,
+            "reloads": self.reloads,
+            "default_version": book.default.version,
+            "locations": {name: rules.version for name, rules in book.locations.items()},
+            "files": {
+                name: {
+                    "version": self._layers[name].version if name in self._layers else None,
+                    "error": self._errors.get(name)
+                }
+                for name in names
+            }
+        }
+
+
+def _tag(result: Dict, version: str) -> Dict:
+    if "error" not in result:
+        result["factors"] = {**(result.get("factors") or {}), "rules_version": version}
+    return result
+
+
+class _RuledPredictor:
+    """
+    Answers every call with the rules of the request's location in the
+    current RuleBook, and reports their version in ``factors["rules_version"]``.
+    Code reading the tables themselves takes them from ``rules_for``.
+    """
+    
+    KIND = ""
+    
+    def __init__(self, rule_tables: RuleTables):
+        self.rule_tables = rule_tables
+    
+    def rules_for(self, location: Optional[str] = None) -> Tuple[Any, str]:
+        """The compiled predictor holding the tables for ``location``, and their version"""
+        rules = self.rule_tables.current().rules_for(location)
+        return getattr(rules, self.KIND), rules.version
+    
+    def _one(self, method: str, location: Optional[str], kwargs: Dict) -> Dict:
+        rules = self.rule_tables.current().rules_for(location)
+        return _tag(getattr(getattr(rules, self.KIND), method)(**kwargs), rules.version)
+    
+    def _many(self, method: str, requests: List[Dict]) -> List[Dict]:
+        book = self.rule_tables.current()
+        groups: Dict[RuleSet, List[int]] = {}
+        for i, request in enumerate(requests):
+            groups.setdefault(book.rules_for(request.get("location")), []).append(i)
+        if len(groups) <= 1:
+            rules = next(iter(groups), book.default)
+            return [_tag(result, rules.version) for result in getattr(getattr(rules, self.KIND), method)(requests)]
+        
+        # One batch per location, answers put back in request order
+        results: List[Optional[Dict]] = [None] * len(requests)
+        for rules, rows in groups.items():
+            answered = getattr(getattr(rules, self.KIND), method)([requests[i] for i in rows])
+            for i, result in zip(rows, answered):
+                results[i] = _tag(result, rules.version)
+        return results
+
+
+class RuledFestivalPredictor(_RuledPredictor):
+    KIND = "festival"
+    
+    def predict(
+        self,
+        festival_name: str,
+        start_date: str,
+        end_date: str,
+        intensity: str,
+        historical_data: Optional[Dict] = None,
+        location: Optional[str] = None
+    ) -> Dict:
+        return self._one("predict", location, {
+            "festival_name": festival_name,
+            "start_date": start_date,
+            "end_date": end_date,
+            "intensity": intensity,
+            "historical_data": historical_data,
+            "location": location
+        })
+    
+    def predict_many(self, requests: List[Dict]) -> List[Dict]:
+        return self._many("predict_many", requests)
+    
+    def surge_multiplier(self, festival_name: str, intensity: str) -> float:
+        # Default rules of the current book: the festival calendar calls this on every
+        # timeline it is not given a location's lookup for, so it follows reloads
+        return self.rule_tables.current().default.festival.surge_multiplier(festival_name, intensity)
+
+
+class RuledPollutionPredictor(_RuledPredictor):
+    KIND = "pollution"
+    
+    def predict(
+        self,
+        aqi: float,
+        pm25: Optional[float] = None,
+        pm10: Optional[float] = None,
+        location: Optional[str] = None,
+        date: Optional[str] = None
+    ) -> Dict:
+        return self._one("predict", location, {
+            "aqi": aqi, "pm25": pm25, "pm10": pm10, "location": location, "date": date
+        })
+    
+    def predict_many(self, requests: List[Dict]) -> List[Dict]:
+        return self._many("predict_many", requests)
+
+
+class RuledStaffForecaster(_RuledPredictor):
+    KIND = "staff"
+    
+    def forecast(
+        self,
+        predicted_patients: int,
+        current_staff: Optional[int] = None,
+        department: Optional[str] = None,
+        shift_type: Optional[str] = None,
+        location: Optional[str] = None
+    ) -> Dict:
+        return self._one("forecast", location, {
+            "predicted_patients": predicted_patients,
+            "current_staff": current_staff,
+            "department": department,
+            "shift_type": shift_type
+        })
+    
+    def forecast_many(self, requests: List[Dict]) -> List[Dict]:
+        return self._many("forecast_many", requests)
+
+
+def ruled_predictors(rule_tables: RuleTables):
+    """(festival, pollution, staff) answering from ``rule_tables`` per location"""
+    return (
+        RuledFestivalPredictor(rule_tables),
+        RuledPollutionPredictor(rule_tables),
+        RuledStaffForecaster(rule_tables)
+    )
@@ -1,4 +1,6 @@
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
 
 
 class StaffForecaster:
@@ -42,15 +44,25 @@ class StaffForecaster:
         "night": 0.6
     }
     
+    # Hard staffing minimums per role
+    MINIMUM_STAFF = {
+        "doctors": 2,
+        "nurses": 4,
+        "support": 2
+    }
+    
     def forecast(
         self,
         predicted_patients: int,
         current_staff: Optional[int] = None,
         department: Optional[str] = None,
-        shift_type: Optional[str] = None
+        shift_type: Optional[str] = None,
+        location: Optional[str] = None
     ) -> Dict:
         """
-        Forecast staff requirements based on predicted patient inflow
+        Forecast staff requirements based on predicted patient inflow.
+        These tables serve every ``location``; per-location tables come from
+        the rule files (see rule_tables.RuledStaffForecaster).
         """
         # Get appropriate staff ratios
         department_key = (department or "default").lower()
@@ -69,9 +81,9 @@ class StaffForecaster:
             required_support = int(required_support * shift_mult)
         
         # Ensure minimum staffing
-        required_doctors = max(required_doctors, 2)
-        required_nurses = max(required_nurses, 4)
-        required_support = max(required_support, 2)
+        required_doctors = max(required_doctors, self.MINIMUM_STAFF["doctors"])
+        required_nurses = max(required_nurses, self.MINIMUM_STAFF["nurses"])
+        required_support = max(required_support, self.MINIMUM_STAFF["support"])
         
         # Calculate gap if current staff is provided
         current_gap = None
@@ -106,6 +118,108 @@ class StaffForecaster:
             "recommendations": recommendations
         }
     
+    def rules_for(self, location: Optional[str] = None) -> Tuple["StaffForecaster", Optional[str]]:
+        """
+        The predictor holding the rule tables for ``location`` and their
+        version: None here, these tables serve every location
+        """
+        return self, None
+    
+    def forecast_many(self, requests: List[Dict]) -> List[Dict]:
+        """
+        Forecast staff requirements for many departments/shifts in one pass.
+        
+        Each request holds the keyword arguments of ``forecast``, plus an
+        optional ``base_requirements`` (doctors, nurses, support) that replaces
+        the ratio and shift calculation before minimums are applied (used by
+        model-backed predictors). Results come back in request order; a request
+        that cannot be scored gets an ``{"error": ...}`` entry in its slot
+        instead of a forecast.
+        """
+        count = len(requests)
+        patients = np.zeros(count, dtype=np.float64)
+        ratios = np.zeros((count, 3), dtype=np.float64)
+        shift_mults = np.ones(count, dtype=np.float64)
+        current_staff = np.zeros(count, dtype=np.int64)
+        base_overrides: Dict[int, Tuple[int, int, int]] = {}
+        errors: Dict[int, str] = {}
+        
+        for i, request in enumerate(requests):
+            try:
+                patients[i] = request["predicted_patients"]
+                department_key = (request.get("department") or "default").lower()
+                department_ratios = self.STAFF_RATIOS.get(
+                    department_key, self.STAFF_RATIOS["default"]
+                )
+                ratios[i] = (
+                    department_ratios["doctors"],
+                    department_ratios["nurses"],
+                    department_ratios["support"]
+                )
+                shift_type = request.get("shift_type")
+                if shift_type:
+                    shift_mults[i] = self.SHIFT_MULTIPLIERS.get(shift_type.lower(), 1.0)
+                current_staff[i] = request.get("current_staff") or 0
+                if request.get("base_requirements") is not None:
+                    doctors, nurses, support = request["base_requirements"]
+                    base_overrides[i] = (int(doctors), int(nurses), int(support))
+            except Exception as e:
+                errors[i] = str(e) or type(e).__name__
+        
+        # Same truncation order as forecast(): ratio first, then shift multiplier
+        required = (patients[:, None] * ratios).astype(np.int64)
+        required = (required * shift_mults[:, None]).astype(np.int64)
+        if base_overrides:
+            required[list(base_overrides)] = list(base_overrides.values())
+        required = np.maximum(required, [
+            self.MINIMUM_STAFF["doctors"],
+            self.MINIMUM_STAFF["nurses"],
+            self.MINIMUM_STAFF["support"]
+        ])
+        
+        current_split = np.stack([
+            (current_staff * 0.3).astype(np.int64),
+            (current_staff * 0.5).astype(np.int64),
+            (current_staff * 0.2).astype(np.int64)
+        ], axis=1)
+        role_gaps = np.maximum(required - current_split, 0)
+        total_gaps = np.maximum(required.sum(axis=1) - current_staff, 0)
+        
+        results = []
+        for i, request in enumerate(requests):
+            if i in errors:
+                results.append({"error": errors[i]})
+                continue
+            
+            required_doctors, required_nurses, required_support = (
+                int(value) for value in required[i]
+            )
+            current_gap = None
+            if current_staff[i]:
+                current_gap = {
+                    "doctors": int(role_gaps[i, 0]),
+                    "nurses": int(role_gaps[i, 1]),
+                    "support": int(role_gaps[i, 2]),
+                    "total_gap": int(total_gaps[i])
+                }
+            
+            results.append({
+                "required_doctors": required_doctors,
+                "required_nurses": required_nurses,
+                "required_support_staff": required_support,
+                "current_gap": current_gap,
+                "recommendations": self._generate_recommendations(
+                    required_doctors,
+                    required_nurses,
+                    required_support,
+                    current_gap,
+                    request.get("department"),
+                    request.get("shift_type")
+                )
+            })
+        
+        return results
+    
     def _generate_recommendations(
         self,
         doctors: int,
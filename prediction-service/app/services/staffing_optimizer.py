@@ -0,0 +1,269 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .transport import closed_costs, solve_transport
+
+
+class StaffingOptimizer:
+    """
+    Minimum-cost staffing across departments, shifts, days and hospitals.
+    
+    Requirements per (location, department, role, day, shift) follow
+    ``StaffForecaster.forecast`` with the location's rules (ratio, then shift
+    multiplier, truncated, then minimums). Staff are available per (location, role) and shift and
+    can work in any department of their hospital, or move to another hospital
+    for ``transfer_cost`` per staff-shift. Requirements nobody covers cost
+    ``unmet_cost`` per staff-shift (agency or overtime), which keeps every
+    problem feasible.
+    
+    Each (role, day, shift) is an independent transportation problem between
+    hospitals. Transfer costs are closed under shortest paths, so with
+    metric costs a hospital never both sends and receives: local staff cover
+    local requirements first, and only surpluses and deficits enter the LP
+    (``transport.solve_transport``).
+    """
+    
+    ROLES = ("doctors", "nurses", "support")
+    ROLE_ALIASES = {
+        "doctor": "doctors",
+        "doctors": "doctors",
+        "nurse": "nurses",
+        "nurses": "nurses",
+        "support": "support",
+        "support_staff": "support"
+    }
+    
+    TRANSFER_COST = 1.0
+    UNMET_COST = 100.0
+    MAX_DAYS = 31
+    
+    # Covered staff go to these departments first; shortfalls land on the rest
+    DEPARTMENT_PRIORITY = ("icu", "emergency")
+    
+    def __init__(self, staff_forecaster):
+        self._staff = staff_forecaster
+    
+    def optimize(
+        self,
+        demand: List[Dict],
+        availability: List[Dict],
+        start_date: str,
+        days: int = 7,
+        transfer_cost: float = TRANSFER_COST,
+        transfer_costs: Optional[Dict[str, Dict[str, Optional[float]]]] = None,
+        unmet_cost: float = UNMET_COST
+    ) -> Dict:
+        """
+        Allocate staff for ``days`` days from ``start_date``.
+        
+        ``demand`` holds ``location``, ``department`` and ``predicted_patients``
+        (as ``forecast`` takes it): one number, one per day, or a days x shifts
+        matrix. ``availability`` holds ``location``, ``role`` and ``available``
+        staff per shift in the same shapes. ``transfer_costs`` overrides the
+        cost between specific hospitals (``{from: {to: cost}}``; None forbids
+        the move).
+        """
+        started = time.perf_counter()
+        if not 1 <= days <= self.MAX_DAYS:
+            raise ValueError(f"days must be between 1 and {self.MAX_DAYS}")
+        if transfer_cost < 0 or unmet_cost < 0:
+            raise ValueError("costs must not be negative")
+        window_start = np.datetime64(start_date[:10], "D")
+        shifts = tuple(self._staff.rules_for(None)[0].SHIFT_MULTIPLIERS)
+        
+        locations = list(dict.fromkeys(
+            [item.get("location") for item in demand]
+            + [item.get("location") for item in availability]
+        ))
+        location_index = {location: i for i, location in enumerate(locations)}
+        rules = [self._staff.rules_for(location) for location in locations]
+        
+        departments, required = self._required(demand, location_index, rules, days, shifts)
+        available = self._available(availability, location_index, days, shifts)
+        
+        # (location, role, day, shift) -> blocks of (role, day, shift) by location
+        hospital_required = required.sum(axis=1)
+        local = np.minimum(available, hospital_required)
+        surplus = np.moveaxis(available - local, 0, -1).reshape(-1, len(locations))
+        deficit = np.moveaxis(hospital_required - local, 0, -1).reshape(-1, len(locations))
+        
+        cost = closed_costs(locations, transfer_cost, transfer_costs)
+        flows, unmet, solver = solve_transport(surplus, deficit, cost, unmet_cost, name="staffing")
+        unmet = np.moveaxis(
+            unmet.reshape(len(self.ROLES), days, len(shifts), len(locations)), -1, 0
+        )
+        department_unmet = self._department_shortfall(
+            required, hospital_required - unmet, departments
+        )
+        
+        received = np.zeros_like(surplus)
+        sent = np.zeros_like(surplus)
+        np.add.at(received, (flows[:, 0], flows[:, 2]), flows[:, 3])
+        np.add.at(sent, (flows[:, 0], flows[:, 1]), flows[:, 3])
+        received = np.moveaxis(received.reshape(unmet.shape[1:] + (len(locations),)), -1, 0)
+        sent = np.moveaxis(sent.reshape(unmet.shape[1:] + (len(locations),)), -1, 0)
+        
+        total_transferred = int(flows[:, 3].sum())
+        total_unmet = int(unmet.sum())
+        transfer_spend = float((cost[flows[:, 1], flows[:, 2]] * flows[:, 3]).sum()) if len(flows) else 0.0
+        dates = (window_start + np.arange(days)).astype(str).tolist()
+        block_index = np.unravel_index(flows[:, 0], (len(self.ROLES), days, len(shifts)))
+        
+        return {
+            "start_date": dates[0],
+            "end_date": dates[-1],
+            "shifts": list(shifts),
+            "summary": {
+                "required_staff_shifts": int(required.sum()),
+                "available_staff_shifts": int(available.sum()),
+                "covered_locally": int(local.sum()),
+                "transferred": total_transferred,
+                "unmet": total_unmet,
+                "transfer_cost": round(transfer_spend, 2),
+                "unmet_cost": round(total_unmet * unmet_cost, 2),
+                "total_cost": round(transfer_spend + total_unmet * unmet_cost, 2)
+            },
+            "hospitals": [
+                {
+                    "location": location,
+                    **({"rules_version": rules[l][1]} if rules[l][1] is not None else {}),
+                    "roles": {
+                        role: {
+                            "required": int(hospital_required[l, r].sum()),
+                            "available": int(available[l, r].sum()),
+                            "covered_locally": int(local[l, r].sum()),
+                            "received": int(received[l, r].sum()),
+                            "sent": int(sent[l, r].sum()),
+                            "unmet": int(unmet[l, r].sum())
+                        }
+                        for r, role in enumerate(self.ROLES)
+                    },
+                    "departments": {
+                        department: {
+                            role: {
+                                "required": int(required[l, d, r].sum()),
+                                "unmet": int(department_unmet[l, d, r].sum())
+                            }
+                            for r, role in enumerate(self.ROLES)
+                        }
+                        for d, department in enumerate(departments)
+                        if required[l, d].any()
+                    }
+                }
+                for l, location in enumerate(locations)
+            ],
+            "transfers": [
+                {
+                    "date": dates[day],
+                    "shift": shifts[shift],
+                    "role": self.ROLES[role],
+                    "from": locations[source],
+                    "to": locations[target],
+                    "staff": staff
+                }
+                for role, day, shift, source, target, staff in zip(
+                    block_index[0].tolist(), block_index[1].tolist(), block_index[2].tolist(),
+                    flows[:, 1].tolist(), flows[:, 2].tolist(), flows[:, 3].tolist()
+                )
+            ],
+            "shortfalls": [
+                {
+                    "date": dates[day],
+                    "shift": shifts[shift],
+                    "location": locations[l],
+                    "department": departments[d],
+                    "role": self.ROLES[r],
+                    "unmet": int(department_unmet[l, d, r, day, shift])
+                }
+                for l, d, r, day, shift in zip(*np.nonzero(department_unmet))
+            ],
+            "solver": {**solver, "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+        }
+    
+    def _required(self, demand: List[Dict], location_index: Dict, rules: List[Tuple], days: int, shifts: tuple):
+        """
+        Departments and required staff shaped (location, department, role,
+        day, shift), with the (tables, version) of each location in ``rules``
+        """
+        departments = list(dict.fromkeys(
+            (item.get("department") or "default").lower() for item in demand
+        ))
+        department_index = {department: i for i, department in enumerate(departments)}
+        required = np.zeros(
+            (len(location_index), len(departments), len(self.ROLES), days, len(shifts)),
+            dtype=np.int64
+        )
+        seen = set()
+        
+        for item in demand:
+            department = (item.get("department") or "default").lower()
+            key = (item.get("location"), department)
+            if key in seen:
+                raise ValueError(f"duplicate demand for {key[0]}/{key[1]}")
+            seen.add(key)
+            patients = self._matrix(item["predicted_patients"], days, len(shifts), key)
+            tables = rules[location_index[key[0]]][0]
+            multipliers = np.array([tables.SHIFT_MULTIPLIERS[shift] for shift in shifts])
+            minimums = np.array([tables.MINIMUM_STAFF[role] for role in self.ROLES])
+            ratios = tables.STAFF_RATIOS.get(department, tables.STAFF_RATIOS["default"])
+            ratios = np.array([ratios[role] for role in self.ROLES])
+            # Same truncation order as forecast(): ratio first, then shift multiplier
+            base = (patients[None, :, :] * ratios[:, None, None]).astype(np.int64)
+            staff = (base * multipliers[None, None, :]).astype(np.int64)
+            required[location_index[key[0]], department_index[department]] = np.maximum(
+                staff, minimums[:, None, None]
+            )
+        return departments, required
+    
+    def _available(self, availability: List[Dict], location_index: Dict, days: int, shifts: tuple) -> np.ndarray:
+        """Available staff shaped (location, role, day, shift)"""
+        available = np.zeros((len(location_index), len(self.ROLES), days, len(shifts)), dtype=np.int64)
+        for item in availability:
+            role = self.ROLE_ALIASES.get(str(item.get("role") or "").lower())
+            if role is None:
+                raise ValueError(f"unknown role {item.get('role')!r}")
+            key = (item.get("location"), role)
+            available[location_index[key[0]], self.ROLES.index(role)] += self._matrix(
+                item["available"], days, len(shifts), key
+            ).astype(np.int64)
+        return available
+    
+    @staticmethod
+    def _matrix(values, days: int, shift_count: int, key: tuple) -> np.ndarray:
+        """A number, a per-day list or a days x shifts matrix as a days x shifts array"""
+        array = np.asarray(values, dtype=np.float64)
+        if array.ndim == 1:
+            array = array[:, None]
+        if array.ndim > 2 or (array.ndim == 2 and array.shape[0] != days) or (
+            array.ndim == 2 and array.shape[1] not in (1, shift_count)
+        ):
+            raise ValueError(
+                f"values for {key[0]}/{key[1]} must be a number, {days} days, or {days} x {shift_count}"
+            )
+        if (array < 0).any():
+            raise ValueError(f"values for {key[0]}/{key[1]} must not be negative")
+        return np.broadcast_to(array, (days, shift_count))
+    
+    def _department_shortfall(
+        self,
+        required: np.ndarray,
+        covered: np.ndarray,
+        departments: List[str]
+    ) -> np.ndarray:
+        """Spread each hospital's covered staff over departments, priority departments first"""
+        order = sorted(
+            range(len(departments)),
+            key=lambda d: (
+                self.DEPARTMENT_PRIORITY.index(departments[d])
+                if departments[d] in self.DEPARTMENT_PRIORITY else len(self.DEPARTMENT_PRIORITY)
+            )
+        )
+        remaining = covered.copy()
+        shortfall = np.zeros_like(required)
+        for d in order:
+            assigned = np.minimum(required[:, d], remaining)
+            remaining -= assigned
+            shortfall[:, d] = required[:, d] - assigned
+        return shortfall
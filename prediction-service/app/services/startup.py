@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from .lazy import LAZY_IMPORTS
+
+
+def _process_started_at() -> Optional[float]:
+    """Epoch seconds the process started (Linux /proc), or None"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/stat") as f:
+            boot = next(float(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+
+
+class StartupReport:
+    """
+    Timeline of one process from start to its first ready request.
+    
+    Created first thing when the app module is imported. Records how long
+    that import took, each named startup step, the libraries imported
+    lazily on first use, when the service became ready, and when the first
+    request after that was answered. All times are milliseconds from process
+    start (import start when the process start time is unknown).
+    """
+    
+    def __init__(self):
+        self.import_started = time.time()
+        self.process_started = _process_started_at() or self.import_started
+        self.imported: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+        self.ready_at: Optional[float] = None
+        self.failed_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.first_request: Optional[Dict] = None
+    
+    @property
+    def status(self) -> str:
+        if self.error is not None:
+            return "failed"
+        return "ready" if self.ready_at is not None else "starting"
+    
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+    
+    def mark_imported(self) -> None:
+        self.imported = time.time()
+    
+    def begin(self) -> None:
+        """Start a (re)start: an app served again in one process warms up anew"""
+        self.steps = {}
+        self.ready_at = self.failed_at = self.error = None
+    
+    @contextmanager
+    def step(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+    
+    def mark_ready(self) -> None:
+        self.ready_at = time.time()
+    
+    def mark_failed(self, error: BaseException) -> None:
+        self.failed_at = time.time()
+        self.error = f"{type(error).__name__}: {error}"
+    
+    async def wait_ready(self, timeout: float, poll: float = 0.02) -> bool:
+        """
+        Wait for startup to finish; True when the service is ready. Polls
+        rather than waiting on an event, which would be bound to one loop
+        """
+        deadline = time.monotonic() + timeout
+        while self.status == "starting" and time.monotonic() < deadline:
+            await asyncio.sleep(poll)
+        return self.ready
+    
+    def request_served(self, path: str, status: int) -> None:
+        if self.first_request is None:
+            self.first_request = {"path": path, "status": status, "ms": self._since_start(time.time())}
+    
+    def _since_start(self, moment: Optional[float]) -> Optional[float]:
+        return None if moment is None else round((moment - self.process_started) * 1000, 1)
+    
+    def describe(self) -> Dict:
+        return {
+            "status": self.status,
+            "error": self.error,
+            "process_started_at": datetime.fromtimestamp(self.process_started, timezone.utc).isoformat(),
+            "import_started_ms": self._since_start(self.import_started),
+            "import_ms": round((self.imported - self.import_started) * 1000, 1) if self.imported else None,
+            "steps_ms": dict(self.steps),
+            "ready_ms": self._since_start(self.ready_at),
+            "failed_ms": self._since_start(self.failed_at),
+            "first_request": self.first_request,
+            "lazy_imports": {
+                name: {"ms": round(entry["ms"], 1), "at_ms": self._since_start(entry["at"])}
+                for name, entry in sorted(LAZY_IMPORTS.items(), key=lambda item: item[1]["at"])
+            }
+        }
+
+
+class WaitUntilReady:
+    """
+    ASGI middleware that holds requests until startup has finished.
+    
+    Paths in ``exempt`` (health checks, the startup report) are answered
+    straight away. Other requests wait up to ``timeout`` seconds for the
+    service to become ready and get 503 with Retry-After if it does not (or
+    startup failed). The first request answered once ready is recorded on the
+    report.
+    """
+    
+    def __init__(self, app, report: StartupReport, exempt: Iterable[str] = (), timeout: float = 30.0):
+        self.app = app
+        self.report = report
+        self.exempt = frozenset(exempt)
+        self.timeout = timeout
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or scope["path"] in self.exempt:
+            return await self.app(scope, receive, send)
+        if not self.report.ready and not await self.report.wait_ready(self.timeout):
+            return await self._unavailable(scope, send)
+        if self.report.first_request is not None or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        async def send_recorded(message):
+            if message["type"] == "http.response.start":
+                self.report.request_served(scope["path"], message["status"])
+            await send(message)
+        
+        await self.app(scope, receive, send_recorded)
+    
+    async def _unavailable(self, scope, send) -> None:
+        if scope["type"] == "websocket":
+            # 1013: try again later
+            await send({"type": "websocket.close", "code": 1013})
+            return
+        detail = (
+            f"Service failed to start: {self.report.error}" if self.report.error
+            else "Service is still starting, retry shortly"
+        )
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [(b"content-type", b"application/json"), (b"retry-after", b"5")]
+        })
+        await send({"type": "http.response.body", "body": json.dumps({"detail": detail}).encode()})
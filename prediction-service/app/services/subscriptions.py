@@ -0,0 +1,208 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+def flatten(value: Dict, prefix: str = "") -> Dict[str, Any]:
+    """Nested dicts as ``{"a.b.c": leaf}``; lists and scalars are leaves"""
+    flat = {}
+    for key, item in value.items():
+        path = f"{prefix}{key}"
+        if isinstance(item, dict) and item:
+            flat.update(flatten(item, path + "."))
+        else:
+            flat[path] = item
+    return flat
+
+
+def diff(previous: Dict[str, Any], current: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """Changed or added paths with their new values, and removed paths"""
+    changed = {path: value for path, value in current.items() if path not in previous or previous[path] != value}
+    removed = [path for path in previous if path not in current]
+    return changed, removed
+
+
+class Subscriber:
+    """One connection's message queue; a client that falls behind is resynced with a snapshot"""
+    
+    QUEUE_SIZE = 16
+    
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self.topic: Optional["_Topic"] = None
+    
+    def deliver(self, message: Dict, snapshot: Callable[[], Dict]) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Deltas only apply in order, so replace the backlog with the full state
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(snapshot())
+
+
+class _Topic:
+    def __init__(self, key: Hashable, interest: Any):
+        self.key = key
+        self.interest = interest
+        self.subscribers: Set[Subscriber] = set()
+        self.inputs: Any = None
+        self.generation = -1
+        self.state: Optional[Dict] = None
+        self.flat: Dict[str, Any] = {}
+        self.version = 0
+        self.ready = asyncio.Event()
+        self.lock = asyncio.Lock()
+    
+    def snapshot(self) -> Dict:
+        return {"type": "snapshot", "version": self.version, "data": self.state}
+
+
+class SubscriptionHub:
+    """
+    Shared, push-based predictions for subscribers with the same interest.
+    
+    Subscribers with equal interest keys share one topic and one
+    computation. A topic is recomputed only when its inputs change:
+    ``resolve(interest)`` returns the inputs that vary over time (e.g. the
+    current AQI), and is re-checked whenever ``notify`` is called (a new
+    feed reading) and every ``check_interval`` seconds; ``invalidate``
+    forces every topic to recompute (a model swap, new history). After a
+    recompute, subscribers get only the flattened fields that changed.
+    """
+    
+    def __init__(
+        self,
+        compute: Callable[[Any], Awaitable[Dict]],
+        resolve: Callable[[Any], Hashable],
+        check_interval: float = 60.0
+    ):
+        self._compute = compute
+        self._resolve = resolve
+        self.check_interval = check_interval
+        self._topics: Dict[Hashable, _Topic] = {}
+        self._generation = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.computations = 0
+        self.skipped = 0
+        self.pushes = 0
+        self.errors = 0
+    
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def notify(self) -> None:
+        """Inputs may have changed; safe to call from any thread"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+    
+    def invalidate(self) -> None:
+        """Recompute every topic; safe to call from any thread"""
+        self._generation += 1
+        self.notify()
+    
+    async def subscribe(self, subscriber: Subscriber, key: Hashable, interest: Any) -> None:
+        """Attach to the topic for ``key`` (leaving any previous one) and queue its snapshot"""
+        self.unsubscribe(subscriber)
+        topic = self._topics.get(key)
+        created = topic is None
+        if created:
+            topic = self._topics[key] = _Topic(key, interest)
+        # Joined first, so a failed first computation reaches this subscriber too
+        topic.subscribers.add(subscriber)
+        subscriber.topic = topic
+        if created:
+            await self._refresh(topic)
+        else:
+            await topic.ready.wait()
+        if topic.state is not None:
+            subscriber.deliver(topic.snapshot(), topic.snapshot)
+    
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        topic = subscriber.topic
+        if topic is None:
+            return
+        topic.subscribers.discard(subscriber)
+        subscriber.topic = None
+        if not topic.subscribers and self._topics.get(topic.key) is topic:
+            del self._topics[topic.key]
+    
+    def stats(self) -> Dict:
+        return {
+            "topics": len(self._topics),
+            "subscribers": sum(len(topic.subscribers) for topic in self._topics.values()),
+            "computations": self.computations,
+            "skipped": self.skipped,
+            "pushes": self.pushes,
+            "errors": self.errors
+        }
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            for topic in list(self._topics.values()):
+                if topic.subscribers:
+                    await self._refresh(topic)
+    
+    async def _refresh(self, topic: _Topic) -> None:
+        async with topic.lock:
+            await self._recompute(topic)
+    
+    async def _recompute(self, topic: _Topic) -> None:
+        try:
+            inputs = self._resolve(topic.interest)
+            if topic.state is not None and inputs == topic.inputs and topic.generation == self._generation:
+                self.skipped += 1
+                return
+            generation = self._generation
+            state = await self._compute(topic.interest)
+            self.computations += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            message = {"type": "error", "detail": str(e)}
+            for subscriber in list(topic.subscribers):
+                subscriber.deliver(message, topic.snapshot)
+            topic.ready.set()
+            return
+        
+        flat = flatten(state)
+        changed, removed = diff(topic.flat, flat)
+        topic.inputs, topic.generation = inputs, generation
+        first = topic.state is None
+        topic.state, topic.flat = state, flat
+        if not first and not changed and not removed:
+            return
+        topic.version += 1
+        topic.ready.set()
+        if first:
+            # Subscribers start from the snapshot
+            return
+        message = {
+            "type": "delta",
+            "version": topic.version,
+            "changed": changed,
+            "removed": removed,
+            "at": time.time()
+        }
+        for subscriber in list(topic.subscribers):
+            subscriber.deliver(message, topic.snapshot)
+            self.pushes += 1
@@ -0,0 +1,358 @@
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class SurgeSimulator:
+    """
+    Monte Carlo surge scenarios drawn as NumPy arrays.
+    
+    Point estimates come from the predictors; the simulator puts
+    distributions around their inputs and reports percentiles instead of a
+    single inflow:
+    
+    - surge multiplier: lognormal with median at the predicted multiplier
+      (``multiplier_sigma``), never below 1.0
+    - base daily patients: gamma with mean at the predicted base and
+      coefficient of variation ``base_patients_cv``
+    - AQI: lognormal with median at the reading (``aqi_sigma``), clipped to
+      0-500 and scored through the AQI table of the location's rules; when
+      a model produced the point estimate, the model gives the samples'
+      inflow too (one call per distinct whole AQI)
+    - arrivals: Poisson around each scenario's expected inflow
+    
+    In combined runs ``correlation`` couples the festival multiplier and AQI
+    draws (fireworks and traffic raise both).
+    """
+    
+    DEFAULT_SAMPLES = 100_000
+    MAX_SAMPLES = 1_000_000
+    PERCENTILES = (50, 90, 99)
+    
+    MULTIPLIER_SIGMA = 0.15
+    BASE_PATIENTS_CV = 0.2
+    AQI_SIGMA = 0.2
+    
+    def __init__(self, festival_predictor, pollution_predictor):
+        self._festival = festival_predictor
+        self._pollution = pollution_predictor
+    
+    def festival(
+        self,
+        festival_name: str,
+        start_date: str,
+        end_date: str,
+        intensity: str,
+        historical_data: Optional[Dict] = None,
+        location: Optional[str] = None,
+        samples: int = DEFAULT_SAMPLES,
+        seed: Optional[int] = None,
+        multiplier_sigma: float = MULTIPLIER_SIGMA,
+        base_patients_cv: float = BASE_PATIENTS_CV
+    ) -> Dict:
+        """Simulate total festival inflow and per-day festival resources"""
+        started = time.perf_counter()
+        point = self._festival.predict(
+            festival_name=festival_name,
+            start_date=start_date,
+            end_date=end_date,
+            intensity=intensity,
+            historical_data=historical_data,
+            location=location
+        )
+        tables, version = self._festival.rules_for(location)
+        rng, seed = self._rng(seed)
+        z_multiplier = rng.standard_normal(self._check_samples(samples))
+        outcome = self._festival_outcome(
+            rng, tables, point, z_multiplier, multiplier_sigma, base_patients_cv
+        )
+        
+        return self._report(
+            "festival_surge",
+            samples,
+            seed,
+            point["predicted_inflow"],
+            outcome["inflow"],
+            {
+                "beds": outcome["beds"],
+                "doctors": outcome["doctors"],
+                "nurses": outcome["nurses"],
+                "ambulances": outcome["ambulances"]
+            },
+            {
+                "surge_multiplier": point["factors"]["surge_multiplier"],
+                "multiplier_sigma": multiplier_sigma,
+                "base_daily_patients": point["factors"]["base_daily_patients"],
+                "base_patients_cv": base_patients_cv,
+                "duration_days": point["factors"]["duration_days"]
+            },
+            started,
+            risk_levels=outcome["risk_level"],
+            risk_names=tables.RISK_LEVELS,
+            rules_version=version
+        )
+    
+    def pollution(
+        self,
+        aqi: float,
+        location: Optional[str] = None,
+        samples: int = DEFAULT_SAMPLES,
+        seed: Optional[int] = None,
+        aqi_sigma: float = AQI_SIGMA
+    ) -> Dict:
+        """Simulate daily pollution-driven inflow and respiratory resources"""
+        started = time.perf_counter()
+        tables, version = self._pollution.rules_for(location)
+        rng, seed = self._rng(seed)
+        z_aqi = rng.standard_normal(self._check_samples(samples))
+        point = self._pollution.predict(aqi=aqi, location=location)
+        outcome = self._pollution_outcome(rng, tables, point, location, z_aqi, aqi_sigma)
+        
+        return self._report(
+            "pollution_surge",
+            samples,
+            seed,
+            point["predicted_inflow"],
+            outcome["inflow"],
+            {
+                "respiratory_beds": outcome["respiratory_beds"],
+                "oxygen_cylinders": outcome["oxygen_cylinders"],
+                "nebulizers": outcome["nebulizers"],
+                "ventilators": outcome["ventilators"]
+            },
+            {"aqi": aqi, "aqi_sigma": aqi_sigma},
+            started,
+            risk_levels=outcome["risk_level"],
+            risk_names=self._pollution_risks(tables)[0],
+            rules_version=version
+        )
+    
+    def combined(
+        self,
+        festival: Optional[Dict] = None,
+        aqi: Optional[float] = None,
+        location: Optional[str] = None,
+        samples: int = DEFAULT_SAMPLES,
+        seed: Optional[int] = None,
+        multiplier_sigma: float = MULTIPLIER_SIGMA,
+        base_patients_cv: float = BASE_PATIENTS_CV,
+        aqi_sigma: float = AQI_SIGMA,
+        correlation: float = 0.0
+    ) -> Dict:
+        """
+        Simulate festival and pollution together. ``festival`` holds the
+        keyword arguments of ``FestivalPredictor.predict``. Inflow is summed
+        the same way as the combined prediction endpoint.
+        """
+        if festival is None and aqi is None:
+            raise ValueError("Provide a festival, an AQI reading, or both")
+        if not -1.0 <= correlation <= 1.0:
+            raise ValueError("correlation must be between -1 and 1")
+        started = time.perf_counter()
+        rng, seed = self._rng(seed)
+        count = self._check_samples(samples)
+        
+        z_multiplier = rng.standard_normal(count)
+        z_aqi = (
+            correlation * z_multiplier
+            + np.sqrt(1.0 - correlation ** 2) * rng.standard_normal(count)
+        )
+        
+        point_inflow = 0
+        inflow = np.zeros(count)
+        beds = np.zeros(count)
+        oxygen = np.zeros(count)
+        ventilators = np.zeros(count)
+        assumptions = {"correlation": correlation}
+        version = None
+        
+        if festival is not None:
+            tables, version = self._festival.rules_for(location)
+            point = self._festival.predict(location=location, **festival)
+            outcome = self._festival_outcome(
+                rng, tables, point, z_multiplier, multiplier_sigma, base_patients_cv
+            )
+            point_inflow += point["predicted_inflow"]
+            inflow += outcome["inflow"]
+            beds += outcome["beds"]
+            assumptions.update(
+                surge_multiplier=point["factors"]["surge_multiplier"],
+                multiplier_sigma=multiplier_sigma,
+                base_daily_patients=point["factors"]["base_daily_patients"],
+                base_patients_cv=base_patients_cv,
+                duration_days=point["factors"]["duration_days"]
+            )
+        
+        if aqi is not None:
+            tables, version = self._pollution.rules_for(location)
+            point = self._pollution.predict(aqi=aqi, location=location)
+            outcome = self._pollution_outcome(rng, tables, point, location, z_aqi, aqi_sigma)
+            point_inflow += point["predicted_inflow"]
+            inflow += outcome["inflow"]
+            beds += outcome["respiratory_beds"]
+            oxygen += outcome["oxygen_cylinders"]
+            ventilators += outcome["ventilators"]
+            assumptions.update(aqi=aqi, aqi_sigma=aqi_sigma)
+        
+        return self._report(
+            "combined_surge",
+            samples,
+            seed,
+            point_inflow,
+            inflow,
+            {"beds": beds, "oxygen_cylinders": oxygen, "ventilators": ventilators},
+            assumptions,
+            started,
+            rules_version=version
+        )
+    
+    def _festival_outcome(
+        self,
+        rng: np.random.Generator,
+        tables,
+        point: Dict,
+        z_multiplier: np.ndarray,
+        multiplier_sigma: float,
+        base_patients_cv: float
+    ) -> Dict[str, np.ndarray]:
+        factors = point["factors"]
+        duration = factors["duration_days"]
+        if duration <= 0:
+            raise ValueError("festival window spans zero days")
+        
+        multiplier = np.maximum(factors["surge_multiplier"] * np.exp(multiplier_sigma * z_multiplier), 1.0)
+        base = factors["base_daily_patients"]
+        if base_patients_cv > 0:
+            shape = 1.0 / base_patients_cv ** 2
+            base = rng.gamma(shape, base / shape, len(z_multiplier))
+        inflow = rng.poisson(base * multiplier * duration).astype(np.float64)
+        
+        # Same per-day resource ratios as FestivalPredictor
+        return {
+            "inflow": inflow,
+            "beds": np.floor(inflow * 0.3 / duration),
+            "doctors": np.floor(inflow * 0.05 / duration),
+            "nurses": np.floor(inflow * 0.1 / duration),
+            "ambulances": np.floor(inflow * 0.02 / duration),
+            "risk_level": np.searchsorted(tables.RISK_BREAKPOINTS, multiplier, side="right")
+        }
+    
+    def _pollution_outcome(
+        self,
+        rng: np.random.Generator,
+        tables,
+        point: Dict,
+        location: Optional[str],
+        z_aqi: np.ndarray,
+        aqi_sigma: float
+    ) -> Dict[str, np.ndarray]:
+        aqi_samples = np.clip(point["factors"]["aqi"] * np.exp(aqi_sigma * z_aqi), 0.0, 500.0)
+        scores = tables.score(aqi_samples, predicted_inflow=self._model_inflow(point, location, aqi_samples))
+        _, category_risk = self._pollution_risks(tables)
+        inflow = rng.poisson(scores["predicted_inflow"]).astype(np.float64)
+        
+        # Same resource ratios as PollutionPredictor, applied to simulated arrivals
+        return {
+            "inflow": inflow,
+            "respiratory_beds": np.floor(inflow * 0.4),
+            "oxygen_cylinders": np.floor(inflow * 0.6),
+            "nebulizers": np.floor(inflow * 0.3),
+            "ventilators": np.where(
+                aqi_samples > tables.VENTILATOR_AQI, np.floor(inflow * 0.1), 0.0
+            ),
+            "risk_level": category_risk[scores["category_index"]]
+        }
+    
+    def _model_inflow(self, point: Dict, location: Optional[str], aqi_samples: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Inflow of each AQI sample from the model that answered ``point``, or
+        None when the rules did. Samples are rounded to whole AQI values, so
+        the model sees at most 501 distinct readings.
+        """
+        if (point.get("factors") or {}).get("backend") != "model":
+            return None
+        readings, inverse = np.unique(np.rint(aqi_samples), return_inverse=True)
+        results = self._pollution.predict_many(
+            [{"aqi": float(value), "location": location} for value in readings]
+        )
+        inflow = np.array([result["predicted_inflow"] for result in results], dtype=np.float64)
+        return inflow[inverse.reshape(-1)]
+    
+    @staticmethod
+    def _pollution_risks(tables):
+        """Risk level names in severity order, and the risk index of each AQI category of ``tables``"""
+        ordered = sorted(tables.AQI_THRESHOLDS.values(), key=lambda data: data["max"])
+        names = tuple(dict.fromkeys(data["risk"] for data in ordered))
+        return names, np.array([names.index(data["risk"]) for data in ordered])
+    
+    def _report(
+        self,
+        prediction_type: str,
+        samples: int,
+        seed: int,
+        point_inflow: int,
+        inflow: np.ndarray,
+        resources: Dict[str, np.ndarray],
+        assumptions: Dict,
+        started: float,
+        risk_levels: Optional[np.ndarray] = None,
+        risk_names=None,
+        rules_version: Optional[str] = None
+    ) -> Dict:
+        summary = {
+            name: {
+                "mean": round(float(values.mean()), 2),
+                **{
+                    f"p{p}": value
+                    for p, value in zip(self.PERCENTILES, self._percentiles(values))
+                }
+            }
+            for name, values in [("inflow", inflow), *resources.items()]
+        }
+        
+        result = {
+            "prediction_type": prediction_type,
+            "samples": samples,
+            "seed": seed,
+            "point_estimate": point_inflow,
+            "inflow": summary["inflow"],
+            "probability_above_point_estimate": round(float((inflow > point_inflow).mean()), 4),
+            "resources": {name: summary[name] for name in resources},
+            "assumptions": assumptions
+        }
+        if risk_levels is not None:
+            counts = np.bincount(risk_levels, minlength=len(risk_names))
+            result["risk_probabilities"] = {
+                name: round(float(count) / samples, 4) for name, count in zip(risk_names, counts)
+            }
+        if rules_version is not None:
+            result["rules_version"] = rules_version
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+    
+    def _percentiles(self, values: np.ndarray) -> List[int]:
+        """
+        ``PERCENTILES`` of a sample of counts (the "lower" order statistic).
+        Simulated values are non-negative integers, so the order statistics
+        come from a histogram in O(n) instead of a partial sort.
+        """
+        counts = values.astype(np.int64)
+        ranks = [int((len(counts) - 1) * p // 100) for p in self.PERCENTILES]
+        if counts.max() > 4 * len(counts) + 1024:
+            # Too sparse for a histogram; fall back to selection
+            return [int(v) for v in np.partition(counts, ranks)[ranks]]
+        cumulative = np.cumsum(np.bincount(counts))
+        return [int(v) for v in np.searchsorted(cumulative, ranks, side="right")]
+    
+    def _check_samples(self, samples: int) -> int:
+        if not 1 <= samples <= self.MAX_SAMPLES:
+            raise ValueError(f"samples must be between 1 and {self.MAX_SAMPLES}")
+        return samples
+    
+    @staticmethod
+    def _rng(seed: Optional[int]):
+        """Generator for ``seed``; a fresh seed is drawn (and reported) when None"""
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        return np.random.default_rng(seed), seed
@@ -0,0 +1,66 @@
+from functools import partial
+from typing import Dict, Optional
+
+from .aqi_forecaster import AQIForecaster
+from .columnar import ColumnarScorer
+from .coverage import CoverageEngine
+from .geo_index import GeoIndex, PollutionGrid
+from .model_backed import with_models
+from .model_registry import ModelRegistry
+from .precompiled import build_predictor, build_predictors
+from .resource_allocator import ResourceAllocator
+from .rule_tables import RuleTables, ruled_predictors
+from .staffing_optimizer import StaffingOptimizer
+from .surge_simulator import SurgeSimulator
+
+
+def build_predictor_targets(
+    mode: str = "rules",
+    check_interval: float = 5.0,
+    model_dir: Optional[str] = None,
+    model_check_interval: float = 5.0,
+    geo_sites_path: Optional[str] = None,
+    rules_dir: Optional[str] = None,
+    rules_check_interval: float = 5.0
+) -> Dict[str, object]:
+    """
+    Predictors keyed by the target names the PredictionExecutor dispatches on.
+    With ``model_dir``, each predictor answers from its published model when
+    there is one and from the ``mode`` predictors otherwise; the registry is
+    included as the ``models`` target. ``simulator`` runs Monte Carlo
+    scenarios around the same predictors, ``coverage`` checks rosters
+    against the staff ratios, ``optimizer`` allocates staff across hospitals
+    and ``air_quality`` forecasts station AQI through the pollution rules.
+    With ``geo_sites_path``, ``geo`` scores hospitals and wards from
+    interpolated station readings. ``columnar`` scores Arrow/Parquet
+    tables with the same predictors. ``allocator`` redistributes resource
+    stock between hospitals, pricing distance from the geo sites.
+    With ``rules_dir``, the rule tables come from the files there, per
+    location, and are reloaded when they change (the ``rules`` target).
+    """
+    targets = {}
+    rules = None
+    if rules_dir:
+        # Tables of a compiled rule set never change, so its lookup tables are never rechecked
+        rule_tables = RuleTables(
+            rules_dir, partial(build_predictor, mode, float("inf")), rules_check_interval
+        )
+        festival, pollution, staff = rules = ruled_predictors(rule_tables)
+        targets["rules"] = rule_tables
+    else:
+        festival, pollution, staff = build_predictors(mode, check_interval)
+    if model_dir:
+        registry = ModelRegistry(model_dir, check_interval=model_check_interval)
+        festival, pollution, staff = with_models(registry, festival, pollution, staff, mode, rules)
+        targets["models"] = registry
+    targets.update(festival=festival, pollution=pollution, staff=staff)
+    targets["simulator"] = SurgeSimulator(festival, pollution)
+    targets["coverage"] = CoverageEngine(staff)
+    targets["optimizer"] = StaffingOptimizer(staff)
+    targets["air_quality"] = AQIForecaster(pollution)
+    targets["columnar"] = ColumnarScorer(festival, pollution, staff, mode)
+    geo = GeoIndex.from_file(geo_sites_path) if geo_sites_path else None
+    targets["allocator"] = ResourceAllocator(pollution, geo)
+    if geo is not None:
+        targets["geo"] = PollutionGrid(geo, pollution)
+    return targets
@@ -0,0 +1,233 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .lazy import lazy_import
+
+sparse = lazy_import("scipy.sparse")
+optimize = lazy_import("scipy.optimize")
+
+
+def closed_costs(
+    locations: List[str],
+    transfer_cost: float,
+    transfer_costs: Optional[Dict[str, Dict[str, Optional[float]]]] = None,
+    base: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Transfer cost between locations, closed under shortest paths (inf = not
+    allowed). Starts from ``base`` (default: ``transfer_cost`` everywhere),
+    which must already be metric, e.g. a constant plus distance;
+    ``transfer_costs`` overrides specific moves as ``{from: {to: cost}}``,
+    None forbidding the move.
+    """
+    index = {location: i for i, location in enumerate(locations)}
+    if base is None:
+        cost = np.full((len(locations), len(locations)), float(transfer_cost))
+    else:
+        cost = np.array(base, dtype=np.float64)
+    for source, targets in (transfer_costs or {}).items():
+        for target, value in targets.items():
+            if source not in index or target not in index:
+                raise ValueError(f"transfer_costs names an unknown location: {source} -> {target}")
+            if value is not None and value < 0:
+                raise ValueError("costs must not be negative")
+            cost[index[source], index[target]] = np.inf if value is None else value
+    np.fill_diagonal(cost, 0.0)
+    if not transfer_costs:
+        return cost
+    # Floyd-Warshall: moving along a cheaper chain is the same move
+    for k in range(len(locations)):
+        np.minimum(cost, cost[:, k, None] + cost[None, k, :], out=cost)
+    return cost
+
+
+def solve_transport(
+    surplus: np.ndarray,
+    deficit: np.ndarray,
+    cost: np.ndarray,
+    unmet_cost: Union[float, np.ndarray],
+    cost_scale: Optional[np.ndarray] = None,
+    candidates: Optional[int] = None,
+    name: str = "transport"
+) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    """
+    Min-cost transportation for many independent blocks in one LP.
+    
+    ``surplus`` and ``deficit`` are (blocks, locations). Each block moves
+    units from its surpluses to its deficits at ``cost`` (locations x
+    locations, times the block's ``cost_scale``); deficits left over cost the
+    block's ``unmet_cost`` per unit. Identical blocks are solved once and the
+    rest go to HiGHS as one block-diagonal sparse LP.
+    
+    With ``candidates``, each deficit starts with only its cheapest
+    ``candidates`` sources. The LP's dual prices then show which left-out
+    moves could lower the cost; those are added and the LP is solved again
+    until none can, so the plan is still optimal while the LPs stay a
+    fraction of the full size. Priced blocks are solved one LP each.
+    
+    Returns transfers as rows of (block, from, to, units), unmet units shaped
+    like ``deficit`` and solver statistics.
+    """
+    unmet = deficit.copy()
+    unmet_cost = np.broadcast_to(np.asarray(unmet_cost, dtype=np.float64), (len(surplus),))
+    cost_scale = np.ones(len(surplus)) if cost_scale is None else np.asarray(cost_scale, dtype=np.float64)
+    solvable = surplus.any(axis=1) & deficit.any(axis=1)
+    blocks = np.flatnonzero(solvable)
+    solver = {"blocks": len(surplus), "solved_blocks": 0, "variables": 0, "constraints": 0}
+    if not len(blocks):
+        return np.zeros((0, 4), dtype=np.int64), unmet, solver
+    
+    # Identical blocks (common across days) share one solution
+    _, first, inverse = np.unique(
+        np.hstack([surplus[blocks], deficit[blocks], cost_scale[blocks, None], unmet_cost[blocks, None]]),
+        axis=0, return_index=True, return_inverse=True
+    )
+    inverse = inverse.reshape(-1)
+    unique_blocks = blocks[first]
+    
+    # Per block: sources, targets, their (sources x targets) costs and the moves in the LP
+    problems = []
+    for block in unique_blocks:
+        sources = np.flatnonzero(surplus[block])
+        targets = np.flatnonzero(deficit[block])
+        block_cost = cost[np.ix_(sources, targets)] * cost_scale[block]
+        allowed = np.isfinite(block_cost)
+        active = allowed.copy()
+        if candidates is not None and len(sources) > candidates:
+            cheapest = np.argpartition(block_cost, candidates - 1, axis=0)[:candidates]
+            active = np.zeros_like(allowed)
+            np.put_along_axis(active, cheapest, True, axis=0)
+            active &= allowed
+        problems.append((block, sources, targets, block_cost, allowed, active))
+    
+    if candidates is None:
+        groups = [list(range(len(problems)))]
+    else:
+        # Priced blocks are solved one at a time: the smaller LPs are quicker than the combined one
+        groups = [[k] for k in range(len(problems))]
+    solution = np.zeros(0, dtype=np.int64)
+    layout = []
+    variable = constraints = rounds = 0
+    messages = set()
+    for group in groups:
+        members_problems = [problems[k] for k in group]
+        while True:
+            rounds += 1
+            result, group_layout, group_variables, ub_row, eq_row = _solve_blocks(
+                members_problems, surplus, deficit, unmet_cost, name
+            )
+            if candidates is None or not _price(members_problems, group_layout, result, candidates):
+                break
+        # Transportation problems with integer data have integral optimal vertices
+        solution = np.concatenate([solution, np.rint(result.x).astype(np.int64)])
+        offset = variable
+        layout.extend(
+            (flow_vars + offset, source_index, target_index, unmet_vars + offset)
+            for flow_vars, source_index, target_index, unmet_vars, _, _ in group_layout
+        )
+        variable += group_variables
+        constraints += ub_row + eq_row
+        messages.add(result.message)
+    
+    flows = []
+    members = [np.flatnonzero(inverse == k) for k in range(len(unique_blocks))]
+    for k, (flow_vars, source_index, target_index, unmet_vars) in enumerate(layout):
+        _, sources, targets = problems[k][:3]
+        units = solution[flow_vars]
+        moved = units > 0
+        for block in blocks[members[k]]:
+            unmet[block, targets] = solution[unmet_vars]
+            if moved.any():
+                flows.append(np.column_stack([
+                    np.full(moved.sum(), block), sources[source_index[moved]], targets[target_index[moved]],
+                    units[moved]
+                ]))
+    
+    solver.update(
+        solved_blocks=len(unique_blocks),
+        variables=variable,
+        constraints=constraints,
+        status="; ".join(sorted(messages))
+    )
+    if candidates is not None:
+        solver["rounds"] = rounds
+    flows = np.vstack(flows) if flows else np.zeros((0, 4), dtype=np.int64)
+    return flows[np.argsort(flows[:, 0], kind="stable")], unmet, solver
+
+
+def _price(problems: List, layout: List, result, candidates: int) -> int:
+    """Activate the left-out moves the LP's duals say would lower the cost; returns how many"""
+    # Reduced cost of a move: its cost less the dual prices of its source and target rows
+    source_prices = result.ineqlin.marginals
+    target_prices = result.eqlin.marginals
+    added = 0
+    for problem, (_, _, _, _, ub_offset, eq_offset) in zip(problems, layout):
+        _, sources, targets, block_cost, allowed, active = problem
+        reduced = (
+            block_cost
+            - source_prices[ub_offset:ub_offset + len(sources), None]
+            - target_prices[None, eq_offset:eq_offset + len(targets)]
+        )
+        reduced[~allowed | active] = np.inf
+        # At most ``candidates`` new moves per target and round, the most improving first
+        if len(sources) > candidates:
+            best = np.argpartition(reduced, candidates - 1, axis=0)[:candidates]
+            improving = np.zeros_like(active)
+            np.put_along_axis(improving, best, np.take_along_axis(reduced, best, axis=0) < -1e-9, axis=0)
+        else:
+            improving = reduced < -1e-9
+        active |= improving
+        added += int(improving.sum())
+    return added
+
+
+def _solve_blocks(problems: List, surplus: np.ndarray, deficit: np.ndarray, unmet_cost: np.ndarray, name: str):
+    """One block-diagonal LP over each problem's active moves"""
+    objective, rows = [], []
+    upper_bounds, equalities = [], []
+    layout = []
+    variable = 0
+    ub_row = 0
+    eq_row = 0
+    for block, sources, targets, block_cost, _, active in problems:
+        source_index, target_index = np.nonzero(active)
+        flow_count = len(source_index)
+        flow_vars = variable + np.arange(flow_count)
+        unmet_vars = variable + flow_count + np.arange(len(targets))
+        
+        # sum of flows out of each source <= its surplus
+        rows.append(("ub", ub_row + source_index, flow_vars))
+        upper_bounds.append(surplus[block, sources])
+        # flows into each target + unmet == its deficit
+        rows.append(("eq", eq_row + target_index, flow_vars))
+        rows.append(("eq", eq_row + np.arange(len(targets)), unmet_vars))
+        equalities.append(deficit[block, targets])
+        
+        objective.append(block_cost[source_index, target_index])
+        objective.append(np.full(len(targets), unmet_cost[block]))
+        layout.append((flow_vars, source_index, target_index, unmet_vars, ub_row, eq_row))
+        variable += flow_count + len(targets)
+        ub_row += len(sources)
+        eq_row += len(targets)
+    
+    def constraint_matrix(kind: str, row_count: int):
+        parts = [(r, c) for part, r, c in rows if part == kind]
+        row_index = np.concatenate([r for r, _ in parts])
+        column_index = np.concatenate([c for _, c in parts])
+        return sparse.csr_matrix(
+            (np.ones(len(row_index)), (row_index, column_index)), shape=(row_count, variable)
+        )
+    
+    result = optimize.linprog(
+        np.concatenate(objective),
+        A_ub=constraint_matrix("ub", ub_row),
+        b_ub=np.concatenate(upper_bounds),
+        A_eq=constraint_matrix("eq", eq_row),
+        b_eq=np.concatenate(equalities),
+        bounds=(0, None),
+        method="highs"
+    )
+    if not result.success:
+        raise RuntimeError(f"{name} LP failed: {result.message}")
+    return result, layout, variable, ub_row, eq_row
@@ -0,0 +1,229 @@
+"""
+A stand-in for the Node backend's ``PredictionService`` (backend/src/
+services/predictionService.js) and the traffic it sends.
+
+``BackendStandIn`` calls the prediction service the way the backend does:
+the same four routes, ``hospitalId`` merged into the body or query as the
+controllers do, and a fixed 5 s timeout per request. ``synthesize_trace``
+builds the request mix of dashboard users: the surge dashboard refreshing
+its combined prediction every 30 s, and the festival, pollution and staff
+widgets submitted now and then. Traces are JSON lines, one request each,
+so recorded traffic (``load_test.py record``) replays the same way.
+"""
+import json
+import random
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import httpx
+
+import workloads
+
+# predictionService.js: `{ timeout: 5000 }` on every call
+BACKEND_TIMEOUT = 5.0
+
+# Calls the backend makes, as (method, path)
+CALLS = {
+    "festival": ("POST", "/api/predict/festival"),
+    "pollution": ("POST", "/api/predict/pollution"),
+    "staff": ("POST", "/api/predict/staff"),
+    "combined": ("GET", "/api/predict/combined")
+}
+
+# Share of widget submissions per dashboard refresh cycle
+WIDGET_MIX = {"festival": 0.10, "pollution": 0.12, "staff": 0.08}
+# DashboardMain refreshes every 30 s; surgeController asks for a combined prediction each time
+REFRESH_SECONDS = 30.0
+
+# Festival names the FestivalPredictionWidget offers
+WIDGET_FESTIVALS = ["Diwali", "Holi", "Eid", "Christmas", "New Year", "Dussehra", "Ganesh Chaturthi", "Durga Puja"]
+
+
+class TraceRequest(NamedTuple):
+    at: float  # seconds from the start of the trace
+    user: int
+    call: str  # key of CALLS, or "other" for recorded requests to other routes
+    method: str
+    path: str
+    params: Optional[Dict] = None
+    json: Optional[Dict] = None
+
+
+class Outcome(NamedTuple):
+    call: str
+    status: Optional[int]  # None when no response arrived
+    seconds: float
+    error: Optional[str]  # "timeout", "connection", "http_4xx", "http_5xx" or None
+
+
+def _widget_request(rng: random.Random, call: str, hospital: str) -> Dict:
+    """Request body of one widget submission, as the frontend builds it"""
+    if call == "festival":
+        window = rng.choice(workloads.festival_calendar())
+        return {
+            "festival_name": rng.choice(WIDGET_FESTIVALS) if rng.random() < 0.3 else window["festival_name"],
+            "start_date": window["start_date"],
+            "end_date": window["end_date"],
+            "festival_intensity": rng.choice(workloads.INTENSITIES),
+            "location": hospital
+        }
+    if call == "pollution":
+        aqi = round(min(500.0, max(0.0, rng.gauss(170, 70))))
+        body = {"aqi": float(aqi), "location": hospital}
+        if rng.random() < 0.5:
+            body.update(pm25=round(aqi * 0.5, 1), pm10=round(aqi * 0.9, 1))
+        return body
+    department = rng.choice(workloads.DEPARTMENTS + [None])
+    load = workloads.DEPARTMENT_LOAD.get(department, 150)
+    body = {"predicted_patient_inflow": max(0, int(rng.gauss(load, load * 0.3)))}
+    if rng.random() < 0.6:
+        body["current_staff_count"] = max(1, body["predicted_patient_inflow"] // rng.randint(3, 12))
+    if department:
+        body["department"] = department
+    if rng.random() < 0.7:
+        body["shift_type"] = rng.choice(workloads.SHIFTS)
+    return body
+
+
+def _combined_params(rng: random.Random, hospital: str, aqi: float) -> Dict:
+    """surgeController's combined call, with the festival window on some dashboards"""
+    params = {"aqi": aqi, "location": hospital}
+    if rng.random() < 0.4:
+        window = rng.choice(workloads.festival_calendar())
+        params.update(
+            festival_name=window["festival_name"],
+            festival_start=window["start_date"],
+            festival_end=window["end_date"],
+            festival_intensity=window["festival_intensity"]
+        )
+    return params
+
+
+def synthesize_trace(
+    rng: random.Random,
+    users: int,
+    minutes: float,
+    mix: Optional[Dict[str, float]] = None
+) -> List[TraceRequest]:
+    """
+    ``users`` dashboards open for ``minutes``: each refreshes its combined
+    prediction every REFRESH_SECONDS for its hospital (at that hospital's
+    drifting AQI), and per refresh submits each widget with its ``mix``
+    probability. Sorted by time.
+    """
+    mix = WIDGET_MIX if mix is None else mix
+    hospitals = [site["id"] for site in workloads.geo_sites()["hospitals"]]
+    aqi = {hospital: rng.uniform(80, 260) for hospital in hospitals}
+    trace = []
+    for user in range(users):
+        hospital = rng.choice(hospitals)
+        at = rng.uniform(0, REFRESH_SECONDS)
+        while at < minutes * 60:
+            # AQI readings move slowly; dashboards of one hospital often repeat a value
+            aqi[hospital] = min(500.0, max(0.0, aqi[hospital] + rng.gauss(0, 4)))
+            method, path = CALLS["combined"]
+            trace.append(TraceRequest(
+                round(at, 3), user, "combined", method, path,
+                params=_combined_params(rng, hospital, float(round(aqi[hospital])))
+            ))
+            for call, probability in mix.items():
+                if rng.random() < probability:
+                    method, path = CALLS[call]
+                    trace.append(TraceRequest(
+                        round(at + rng.uniform(0, REFRESH_SECONDS), 3), user, call, method, path,
+                        json={**_widget_request(rng, call, hospital), "hospitalId": hospital}
+                    ))
+            at += REFRESH_SECONDS
+    trace.sort(key=lambda request: (request.at, request.user))
+    return trace
+
+
+def save_trace(trace: List[TraceRequest], path: str) -> None:
+    with open(path, "w") as f:
+        for request in trace:
+            f.write(json.dumps({key: value for key, value in request._asdict().items() if value is not None}) + "\n")
+
+
+def load_trace(path: str) -> List[TraceRequest]:
+    with open(path) as f:
+        return [TraceRequest(**json.loads(line)) for line in f if line.strip()]
+
+
+def mix_of(trace: List[TraceRequest]) -> Dict[str, float]:
+    """Share of each call in a trace"""
+    counts: Dict[str, int] = {}
+    for request in trace:
+        counts[request.call] = counts.get(request.call, 0) + 1
+    return {call: round(count / len(trace), 4) for call, count in sorted(counts.items())}
+
+
+def seconds_between_requests(trace: List[TraceRequest]) -> Optional[float]:
+    """Mean seconds between one user's requests (for Little's law); None for single-request users"""
+    spans: Dict[int, List[float]] = {}
+    for request in trace:
+        spans.setdefault(request.user, []).append(request.at)
+    gaps = [(max(times) - min(times)) / (len(times) - 1) for times in spans.values() if len(times) > 1]
+    return sum(gaps) / len(gaps) if gaps else None
+
+
+class BackendStandIn:
+    """
+    The Node backend's PredictionService in Python: one shared HTTP client
+    (axios keeps connections alive too), ``timeout`` per request, and every
+    outcome classified the way the backend would see it
+    """
+    
+    def __init__(self, base_url: str, timeout: float = BACKEND_TIMEOUT, connections: int = 100):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        )
+    
+    async def send(self, request: TraceRequest) -> Outcome:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(
+                request.method, request.path, params=request.params, json=request.json
+            )
+            await response.aread()
+        except httpx.TimeoutException:
+            return Outcome(request.call, None, time.perf_counter() - started, "timeout")
+        except httpx.TransportError:
+            return Outcome(request.call, None, time.perf_counter() - started, "connection")
+        elapsed = time.perf_counter() - started
+        error = None
+        if response.status_code >= 500:
+            error = "http_5xx"
+        elif response.status_code >= 400:
+            error = "http_4xx"
+        return Outcome(request.call, response.status_code, elapsed, error)
+    
+    # The backend's methods, for ad-hoc use
+    async def predict_festival_surge(self, data: Dict, hospital_id: Optional[str] = None) -> Outcome:
+        return await self._call("festival", data, hospital_id)
+    
+    async def predict_pollution_surge(self, data: Dict, hospital_id: Optional[str] = None) -> Outcome:
+        return await self._call("pollution", data, hospital_id)
+    
+    async def forecast_staff(self, data: Dict, hospital_id: Optional[str] = None) -> Outcome:
+        return await self._call("staff", data, hospital_id)
+    
+    async def get_combined_prediction(self, params: Dict, hospital_id: Optional[str] = None) -> Outcome:
+        return await self._call("combined", params, hospital_id)
+    
+    async def _call(self, call: str, data: Dict, hospital_id: Optional[str]) -> Outcome:
+        method, path = CALLS[call]
+        data = {**data, **({"hospitalId": hospital_id} if hospital_id else {})}
+        if method == "GET":
+            return await self.send(TraceRequest(0.0, 0, call, method, path, params=data))
+        return await self.send(TraceRequest(0.0, 0, call, method, path, json=data))
+    
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def cycle(trace: List[TraceRequest]) -> Iterator[TraceRequest]:
+    """The trace in order, over and over"""
+    while True:
+        yield from trace
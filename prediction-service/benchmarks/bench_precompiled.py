@@ -0,0 +1,88 @@
+"""
+Compare per-call latency of the rule-based predictors against the
+precompiled lookup-table mode.
+
+Usage (from prediction-service/):
+    python benchmarks/bench_precompiled.py [--calls 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Import the app package from the service root, as `uvicorn app.main:app` does
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.precompiled import build_predictors
+
+
+def _festival_calls(rng: random.Random, count: int):
+    festivals = ["Diwali", "Holi", "Eid", "Christmas", "New Year", "Dussehra",
+                 "Ganesh Chaturthi", "Durga Puja", "Onam"]
+    calls = []
+    for _ in range(count):
+        start = rng.randint(1, 20)
+        calls.append({
+            "festival_name": rng.choice(festivals),
+            "start_date": f"2025-10-{start:02d}",
+            "end_date": f"2025-10-{start + rng.randint(0, 10):02d}",
+            "intensity": rng.choice(["low", "medium", "high"]),
+            "location": "Mumbai"
+        })
+    return calls
+
+
+def _pollution_calls(rng: random.Random, count: int):
+    return [{"aqi": float(rng.randint(0, 500)), "location": "Mumbai"} for _ in range(count)]
+
+
+def _staff_calls(rng: random.Random, count: int):
+    return [{
+        "predicted_patients": rng.randint(0, 2000),
+        "current_staff": rng.choice([None, rng.randint(10, 200)]),
+        "department": rng.choice(["emergency", "general", "icu", "opd", None]),
+        "shift_type": rng.choice(["morning", "evening", "night", None])
+    } for _ in range(count)]
+
+
+def _time_calls(method, calls) -> float:
+    start = time.perf_counter()
+    for kwargs in calls:
+        method(**kwargs)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    workloads = {
+        "festival": ("predict", _festival_calls(rng, args.calls)),
+        "pollution": ("predict", _pollution_calls(rng, args.calls)),
+        "staff": ("forecast", _staff_calls(rng, args.calls))
+    }
+    
+    build_start = time.perf_counter()
+    precompiled = build_predictors("precompiled")
+    build_ms = (time.perf_counter() - build_start) * 1000
+    rules = build_predictors("rules")
+    
+    print(f"Precompiled tables built in {build_ms:.1f} ms\n")
+    print(f"{'predictor':<12}{'rules (us/call)':>18}{'precompiled (us/call)':>24}{'speedup':>10}")
+    for (name, (method, calls)), rule_predictor, table_predictor in zip(
+        workloads.items(), rules, precompiled
+    ):
+        # Warm up both paths before timing
+        _time_calls(getattr(rule_predictor, method), calls[:100])
+        _time_calls(getattr(table_predictor, method), calls[:100])
+        rule_us = _time_calls(getattr(rule_predictor, method), calls)
+        table_us = _time_calls(getattr(table_predictor, method), calls)
+        print(f"{name:<12}{rule_us:>18.2f}{table_us:>24.2f}{rule_us / table_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+"""
+Benchmark suite for the prediction service, with JSON baselines and a
+regression gate.
+
+``run`` measures per-call and per-row throughput of the predictors in every
+mode, the app's cold start in fresh interpreters (import, readiness, first
+request), then the latency of every FastAPI route, called in-process
+through httpx.ASGITransport (no network, no server). Results go to a JSON
+file.
+``compare`` checks a run against a baseline and exits non-zero when any
+metric got slower than the threshold allows.
+
+Usage (from prediction-service/):
+    python benchmarks/bench_suite.py run [--output benchmarks/results/current.json]
+        [--quick] [--only route. predictor.pollution] [--compare benchmarks/baselines/main.json]
+    python benchmarks/bench_suite.py compare benchmarks/baselines/main.json
+        benchmarks/results/current.json [--threshold 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+# Import the app package from the service root, as `uvicorn app.main:app` does
+SERVICE_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.append(SERVICE_DIR)
+sys.path.append(BENCH_DIR)
+
+import workloads
+from routes import UNTIMED_ROUTES, route_cases
+
+FORMAT_VERSION = 1
+
+# X-Profile token the benchmarked app accepts
+PROFILE_TOKEN = "bench"
+# X-Admin-Token for the model activation and rule reload routes
+ADMIN_TOKEN = "bench"
+
+# Single-call and batch methods, workload generator and column builder per kind
+PREDICTOR_WORKLOADS = {
+    "festival": ("predict", "predict_many", workloads.festival_season, workloads.festival_columns),
+    "pollution": ("predict", "predict_many", workloads.aqi_sweep, workloads.pollution_columns),
+    "staff": ("forecast", "forecast_many", workloads.department_shift_grid, workloads.staff_columns)
+}
+
+SIZES = {
+    "full": {
+        "calls": 5000, "rows": 50000, "batch_rows": 1000, "columnar_rows": 100000,
+        "requests": 30, "repeat": 5, "startups": 5
+    },
+    "quick": {
+        "calls": 1000, "rows": 10000, "batch_rows": 200, "columnar_rows": 20000,
+        "requests": 10, "repeat": 3, "startups": 3
+    }
+}
+
+# Cold-start timings from startup_probe.py, ms from interpreter start
+STARTUP_TIMINGS = {
+    "startup.import": "import_ms",
+    "startup.health": "health_ms",
+    "startup.ready": "ready_ms",
+    "startup.first_request": "first_request_ms"
+}
+
+
+def _metric(unit: str, better: str, samples: List[float], **extra) -> Dict:
+    return {
+        "value": round(statistics.median(samples), 4),
+        "unit": unit,
+        "better": better,
+        "samples": [round(sample, 4) for sample in samples],
+        **extra
+    }
+
+
+def _selected(name: str, only: Optional[List[str]]) -> bool:
+    return not only or any(name.startswith(prefix) for prefix in only)
+
+
+def _repeat(function: Callable[[], float], repeat: int) -> List[float]:
+    function()  # warm-up
+    return [function() for _ in range(repeat)]
+
+
+def bench_predictors(sizes: Dict, modes: List[str], seed: int, only: Optional[List[str]]) -> Dict[str, Dict]:
+    """
+    Per-call latency of predict/forecast, and rows/s through the batch
+    method (``*_many``) and the columnar scorer, for each mode
+    """
+    from app.services.columnar import ColumnarScorer
+    from app.services.precompiled import build_predictors
+    
+    metrics = {}
+    for mode in modes:
+        predictors = dict(zip(PREDICTOR_WORKLOADS, build_predictors(mode)))
+        scorer = ColumnarScorer(predictors["festival"], predictors["pollution"], predictors["staff"], backend=mode)
+        for kind, (single, many, generate, columns) in PREDICTOR_WORKLOADS.items():
+            prefix = f"predictor.{kind}.{mode}"
+            predictor = predictors[kind]
+            calls = generate(random.Random(seed), sizes["calls"])
+            rows = generate(random.Random(seed + 1), sizes["rows"])
+            
+            if _selected(f"{prefix}.per_call", only):
+                method = getattr(predictor, single)
+                
+                def per_call() -> float:
+                    started = time.perf_counter()
+                    for kwargs in calls:
+                        method(**kwargs)
+                    return (time.perf_counter() - started) / len(calls) * 1e6
+                
+                metrics[f"{prefix}.per_call"] = _metric(
+                    "us/call", "lower", _repeat(per_call, sizes["repeat"]), calls=len(calls)
+                )
+            
+            if _selected(f"{prefix}.per_row", only):
+                method = getattr(predictor, many)
+                
+                def per_row() -> float:
+                    started = time.perf_counter()
+                    method(rows)
+                    return len(rows) / (time.perf_counter() - started)
+                
+                metrics[f"{prefix}.per_row"] = _metric(
+                    "rows/s", "higher", _repeat(per_row, sizes["repeat"]), rows=len(rows)
+                )
+            
+            if _selected(f"{prefix}.columnar", only):
+                table = pa.table(columns(rows))
+                
+                def columnar() -> float:
+                    started = time.perf_counter()
+                    scorer.score_table(kind, table)
+                    return table.num_rows / (time.perf_counter() - started)
+                
+                metrics[f"{prefix}.columnar"] = _metric(
+                    "rows/s", "higher", _repeat(columnar, sizes["repeat"]), rows=table.num_rows
+                )
+    return metrics
+
+
+def _import_times(stderr: str) -> Dict[str, float]:
+    """Import ms per top-level package (own modules only) from ``python -X importtime`` output"""
+    packages: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue  # the header
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(own) / 1000
+    return packages
+
+
+def bench_startup(args, sizes: Dict, only: Optional[List[str]]) -> Dict[str, Dict]:
+    """
+    Cold start, each time in a fresh interpreter with fresh scratch stores:
+    time to import the app, to the first /health, to ready and to the first
+    prediction answered, plus each startup step the app reports
+    """
+    runs = []
+    for _ in range(sizes["startups"]):
+        with tempfile.TemporaryDirectory(prefix="bench-startup-") as workdir:
+            env = dict(os.environ)
+            _configure_app_environment(args, workdir, env)
+            completed = subprocess.run(
+                [sys.executable, "-X", "importtime", os.path.join(BENCH_DIR, "startup_probe.py")],
+                env=env, capture_output=True, text=True
+            )
+        if completed.returncode != 0:
+            raise SystemExit(f"startup probe failed:\n{completed.stderr[-2000:]}")
+        runs.append((json.loads(completed.stdout.strip().splitlines()[-1]), _import_times(completed.stderr)))
+    
+    metrics = {}
+    for name, key in STARTUP_TIMINGS.items():
+        if _selected(name, only):
+            metrics[name] = _metric("ms", "lower", [timings[key] for timings, _ in runs])
+    if "startup.import" in metrics:
+        packages = {package for _, imports in runs for package in imports}
+        slowest = sorted(
+            ((package, statistics.median(imports.get(package, 0.0) for _, imports in runs)) for package in packages),
+            key=lambda item: -item[1]
+        )[:15]
+        metrics["startup.import"]["packages_ms"] = {package: round(ms, 1) for package, ms in slowest}
+    for step in runs[0][0]["report"]["steps_ms"]:
+        name = f"startup.step.{step}"
+        if _selected(name, only):
+            metrics[name] = _metric("ms", "lower", [timings["report"]["steps_ms"][step] for timings, _ in runs])
+    for name, metric in metrics.items():
+        print(f"  {name:<58}{metric['value']:>10.2f} ms", file=sys.stderr)
+    return metrics
+
+
+def _configure_app_environment(args, workdir: str, env: Optional[Dict[str, str]] = None) -> None:
+    """
+    Point the app at scratch stores before it is imported, so benchmarks
+    never touch real data, and make its background work predictable.
+    Sets ``os.environ`` unless another ``env`` (for a subprocess) is given.
+    """
+    env = os.environ if env is None else env
+    env["PREDICTION_MODE"] = args.app_mode
+    env["PREDICTION_MODEL_DIR"] = args.model_dir or os.path.join(workdir, "models")
+    env["BASELINE_STORE_PATH"] = os.path.join(workdir, "baselines")
+    env["FORECAST_STORE_PATH"] = os.path.join(workdir, "forecast_store.bin")
+    env["FORECAST_STORE_INTERVAL"] = "0"
+    env["PREDICTION_RULES_DIR"] = os.path.join(workdir, "rules")
+    env["PREDICTION_CACHE_ENABLED"] = "true" if args.cache else "false"
+    env.setdefault("AQI_FEED_PROVIDER", "fake")
+    env.setdefault("AQI_FEED_INTERVAL", "3600")
+    # Only the request _prepare profiles on purpose; no random sampling
+    env["PROFILE_TOKEN"] = PROFILE_TOKEN
+    env["PROFILE_SAMPLE_RATE"] = "0"
+    env["PROFILE_DIR"] = os.path.join(workdir, "profiles")
+    env["PREDICTION_ADMIN_TOKEN"] = ADMIN_TOKEN
+
+
+async def bench_routes(args, sizes: Dict, only: Optional[List[str]]) -> Dict[str, Dict]:
+    """Latency of every route through httpx.ASGITransport, after the app's own startup"""
+    import httpx
+    from fastapi.routing import APIRoute, APIWebSocketRoute
+    from app import main
+    
+    cases = route_cases(sizes["batch_rows"], sizes["columnar_rows"])
+    registered = {
+        f"{method} {route.path}"
+        for route in main.app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    } | {f"WEBSOCKET {route.path}" for route in main.app.routes if isinstance(route, APIWebSocketRoute)}
+    uncovered = registered - {case.route for case in cases.values()} - set(UNTIMED_ROUTES)
+    if uncovered:
+        raise SystemExit(f"No benchmark case for: {', '.join(sorted(uncovered))} (add one to benchmarks/routes.py)")
+    
+    rng = random.Random(args.seed)
+    metrics = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            context = await _prepare(client, main, rng)
+            for case in cases.values():
+                name = f"route.{case.name}"
+                if not _selected(name, only):
+                    continue
+                samples = []
+                for i in range(args.warmup + sizes["requests"]):
+                    request = case.build(rng, context)
+                    expect = request.pop("expect", case.expect)
+                    started = time.perf_counter()
+                    response = await client.request(**request)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    if response.status_code != expect:
+                        raise SystemExit(
+                            f"{case.name}: expected {expect}, got {response.status_code}: {response.text[:300]}"
+                        )
+                    if i >= args.warmup:
+                        samples.append(elapsed)
+                samples.sort()
+                extra = {
+                    "requests": len(samples),
+                    "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+                    "mean": round(statistics.fmean(samples), 4),
+                    "status": expect
+                }
+                if case.rows:
+                    extra.update(rows=case.rows, rows_per_s=round(case.rows / (statistics.median(samples) / 1000)))
+                metrics[name] = _metric("ms", "lower", samples, **extra)
+                print(f"  {name:<58}{metrics[name]['value']:>10.2f} ms", file=sys.stderr)
+    return metrics
+
+
+async def _prepare(client, main, rng: random.Random) -> Dict:
+    """Load history, fill the forecast store, profile one request and read back what the cases need"""
+    if not await main.startup_report.wait_ready(timeout=120):
+        raise SystemExit(f"app did not start: {main.startup_report.describe()}")
+    response = await client.post(
+        "/api/history/ingest",
+        files={"file": ("admissions.csv", workloads.admissions_csv(rng), "text/csv")}
+    )
+    response.raise_for_status()
+    if main.aqi_feed is not None:
+        await main.aqi_feed.refresh()
+    await asyncio.to_thread(main.forecast_materializer.materialize)
+    profiled = await client.post(
+        "/api/predict/pollution/batch",
+        json={"requests": workloads.aqi_sweep(rng, 200)},
+        headers={"X-Profile": PROFILE_TOKEN}
+    )
+    profiled.raise_for_status()
+    store = main.forecast_store.describe()
+    first = date.fromisoformat(store["start_date"])
+    
+    model = None
+    for name in main.model_registry.names():
+        version = main.model_registry.active_version(name)
+        if version:
+            model = (name, version)
+            break
+    return {
+        "store_days": [(first + timedelta(days=day)).isoformat() for day in range(store["horizon_days"])],
+        "store_locations": store["locations"],
+        "store_departments": [department for department in store["departments"] if department],
+        "model": model,
+        "admin_headers": {"X-Admin-Token": ADMIN_TOKEN},
+        "profile": profiled.headers["X-Profile-Id"]
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> int:
+    sizes = dict(SIZES["quick" if args.quick else "full"])
+    for key in sizes:
+        if getattr(args, key, None) is not None:
+            sizes[key] = getattr(args, key)
+    
+    results = {
+        "format": FORMAT_VERSION,
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "app_mode": args.app_mode,
+            "executor_mode": os.getenv("PREDICTION_EXECUTOR_MODE", "thread"),
+            "cache": args.cache,
+            "seed": args.seed,
+            "sizes": sizes
+        },
+        "metrics": {},
+        "untimed_routes": UNTIMED_ROUTES
+    }
+    if not args.skip_predictors:
+        print("Predictors", file=sys.stderr)
+        results["metrics"].update(bench_predictors(sizes, args.modes, args.seed, args.only))
+    if not args.skip_startup and (not args.only or any(
+        prefix.startswith("startup.") or "startup.".startswith(prefix) for prefix in args.only
+    )):
+        print("Startup", file=sys.stderr)
+        results["metrics"].update(bench_startup(args, sizes, args.only))
+    if not args.skip_routes:
+        print("Routes", file=sys.stderr)
+        with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+            _configure_app_environment(args, workdir)
+            results["metrics"].update(asyncio.run(bench_routes(args, sizes, args.only)))
+    
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    _print_metrics(results["metrics"])
+    print(f"\nWrote {len(results['metrics'])} metrics to {args.output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return compare_results(baseline, results, args.threshold, args.min_delta_ms)
+    return 0
+
+
+def _print_metrics(metrics: Dict[str, Dict]) -> None:
+    print(f"\n{'metric':<62}{'value':>14}  unit")
+    for name, metric in metrics.items():
+        print(f"{name:<62}{metric['value']:>14.2f}  {metric['unit']}")
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float, min_delta_ms: float = 0.0) -> int:
+    """
+    Print each metric's change against the baseline; returns 1 when any got
+    slower by more than ``threshold`` (0.2 = 20%), else 0. Millisecond
+    metrics that moved by less than ``min_delta_ms`` never fail.
+    """
+    for key in ("app_mode", "executor_mode", "cache", "sizes", "cpu_count", "python"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(
+                f"warning: {key} differs (baseline {baseline['meta'].get(key)!r}, "
+                f"current {current['meta'].get(key)!r}); numbers may not be comparable"
+            )
+    
+    regressions = []
+    print(f"\n{'metric':<62}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name in sorted(set(baseline["metrics"]) | set(current["metrics"])):
+        before = baseline["metrics"].get(name)
+        after = current["metrics"].get(name)
+        if before is None or after is None:
+            print(f"{name:<62}{'-' if before is None else before['value']:>12}"
+                  f"{'-' if after is None else after['value']:>12}{'new' if before is None else 'missing':>10}")
+            continue
+        # Positive = slower, whichever direction the metric improves in
+        if after["better"] == "lower":
+            slowdown = after["value"] / before["value"] - 1 if before["value"] else 0.0
+        else:
+            slowdown = before["value"] / after["value"] - 1 if after["value"] else float("inf")
+        regressed = slowdown > threshold and not (
+            after["unit"] == "ms" and abs(after["value"] - before["value"]) < min_delta_ms
+        )
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<62}{before['value']:>12.2f}{after['value']:>12.2f}{slowdown:>+9.1%}"
+              + ("  REGRESSION" if regressed else ""))
+    
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) slower than the {threshold:.0%} threshold: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo metric slower than the {threshold:.0%} threshold")
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return compare_results(baseline, current, args.threshold, args.min_delta_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    def gate_options(command: argparse.ArgumentParser) -> None:
+        command.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", "0.2")),
+                             help="fail when a metric is slower by more than this fraction (default 0.2)")
+        command.add_argument("--min-delta-ms", type=float, default=float(os.getenv("BENCH_MIN_DELTA_MS", "0.5")),
+                             help="route latency changes smaller than this never fail (default 0.5)")
+    
+    run_parser = commands.add_parser("run", help="run the benchmarks and write a results file")
+    run_parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results", "current.json"))
+    run_parser.add_argument("--quick", action="store_true", help="smaller workloads and fewer repeats")
+    run_parser.add_argument("--only", nargs="+", default=None, metavar="PREFIX",
+                            help="metric name prefixes, e.g. predictor.staff route.POST")
+    run_parser.add_argument("--modes", nargs="+", default=["rules", "precompiled"],
+                            help="predictor modes to benchmark (default: rules precompiled)")
+    run_parser.add_argument("--app-mode", default=os.getenv("PREDICTION_MODE", "rules"),
+                            help="PREDICTION_MODE for the route benchmarks")
+    run_parser.add_argument("--model-dir", default=None,
+                            help="published models for the app (default: none, a scratch directory)")
+    run_parser.add_argument("--cache", action="store_true", help="keep the prediction cache enabled")
+    run_parser.add_argument("--skip-predictors", action="store_true")
+    run_parser.add_argument("--skip-startup", action="store_true")
+    run_parser.add_argument("--skip-routes", action="store_true")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--warmup", type=int, default=3, help="untimed requests per route")
+    for key in SIZES["full"]:
+        run_parser.add_argument(f"--{key.replace('_', '-')}", type=int, default=None)
+    run_parser.add_argument("--compare", default=None, metavar="BASELINE",
+                            help="compare against a baseline when done; exit 1 on regressions")
+    gate_options(run_parser)
+    run_parser.set_defaults(handler=run)
+    
+    compare_parser = commands.add_parser("compare", help="compare a results file with a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    gate_options(compare_parser)
+    compare_parser.set_defaults(handler=compare)
+    
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Load test for the prediction service: replays the Node backend's request
+mix against a locally started service and reports a saturation curve.
+
+``synthesize`` writes a trace of dashboard users (combined predictions
+every 30 s plus festival, pollution and staff widget calls), seeded so the
+same seed gives the same requests. ``record`` runs a logging proxy in front
+of a service: point the backend's PREDICTION_SERVICE_URL at it and it
+writes the traffic it forwards as a trace. ``run`` starts uvicorn with each
+``--workers`` count, replays a trace at each ``--concurrency`` (closed loop:
+every simulated client sends its next request when the last one returns,
+with the backend's 5 s timeout), and reports throughput, p50/p95/p99 latency
+and error rates per point. Results use the bench_suite.py format, so
+``bench_suite.py compare`` gates them like any other run.
+
+Usage (from prediction-service/):
+    python benchmarks/load_test.py synthesize --users 200 --minutes 10 --output trace.jsonl
+    python benchmarks/load_test.py record --upstream http://localhost:8001 --port 8002 --output trace.jsonl
+    python benchmarks/load_test.py run [--trace trace.jsonl] --workers 1 2 4
+        --concurrency 1 4 16 64 [--duration 20] [--output benchmarks/results/load.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BENCH_DIR)
+
+from backend_standin import (
+    BACKEND_TIMEOUT,
+    CALLS,
+    BackendStandIn,
+    Outcome,
+    TraceRequest,
+    cycle,
+    load_trace,
+    mix_of,
+    save_trace,
+    seconds_between_requests,
+    synthesize_trace
+)
+from bench_suite import SERVICE_DIR, FORMAT_VERSION, _configure_app_environment, _git_revision, _metric, compare_results
+
+ERRORS = ("timeout", "connection", "http_4xx", "http_5xx")
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def _trace(args) -> List[TraceRequest]:
+    if args.trace:
+        return load_trace(args.trace)
+    return synthesize_trace(random.Random(args.seed), args.users, args.minutes)
+
+
+def synthesize(args) -> int:
+    trace = synthesize_trace(random.Random(args.seed), args.users, args.minutes)
+    save_trace(trace, args.output)
+    print(f"Wrote {len(trace)} requests to {args.output}: {mix_of(trace)}")
+    return 0
+
+
+def record(args) -> int:
+    """Forward every request to ``--upstream`` and append it to the trace"""
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import Response
+    from starlette.routing import Route
+    
+    routes = {(method, path): call for call, (method, path) in CALLS.items()}
+    users: Dict[str, int] = {}
+    started = time.monotonic()
+    client = httpx.AsyncClient(base_url=args.upstream, timeout=None)
+    output = open(args.output, "a")
+    
+    async def forward(request: Request) -> Response:
+        body = await request.body()
+        # One backend process is one "user": it has one client address
+        host = request.client.host if request.client else "unknown"
+        user = users.setdefault(host, len(users))
+        params = dict(request.query_params) or None
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            payload = None
+        entry = TraceRequest(
+            round(time.monotonic() - started, 3), user, routes.get((request.method, request.url.path), "other"),
+            request.method, request.url.path, params=params, json=payload
+        )
+        output.write(json.dumps({key: value for key, value in entry._asdict().items() if value is not None}) + "\n")
+        output.flush()
+        upstream = await client.request(
+            request.method, request.url.path, params=request.query_params, content=body,
+            headers={key: value for key, value in request.headers.items() if key.lower() not in ("host", "content-length")}
+        )
+        return Response(upstream.content, upstream.status_code, {
+            key: value for key, value in upstream.headers.items()
+            if key.lower() not in ("content-length", "content-encoding", "transfer-encoding", "connection")
+        })
+    
+    proxy = Starlette(routes=[Route("/{path:path}", forward, methods=["GET", "POST", "PUT", "DELETE", "PATCH"])])
+    print(f"Recording {args.upstream} on :{args.port} to {args.output}", file=sys.stderr)
+    try:
+        uvicorn.run(proxy, host=args.host, port=args.port, log_level="warning")
+    finally:
+        output.close()
+    return 0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(args, workers: int, workdir: str) -> Tuple[subprocess.Popen, str]:
+    """uvicorn with ``workers`` processes on a free port, pointed at scratch stores"""
+    port = _free_port()
+    env = dict(os.environ)
+    _configure_app_environment(args, workdir, env)
+    env["PROFILE_TOKEN"] = ""
+    log = open(os.path.join(workdir, f"uvicorn-{workers}.log"), "w")
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", SERVICE_DIR,
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"
+        ],
+        env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(base_url: str, workers: int, process: subprocess.Popen, timeout: float = 120.0) -> None:
+    """
+    Wait until /health/ready answers 200 enough times in a row that every
+    worker has most likely finished its own startup
+    """
+    deadline = time.monotonic() + timeout
+    streak = 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=5.0) as client:
+        while streak < workers * 4:
+            if process.poll() is not None:
+                raise SystemExit(f"service exited with {process.returncode} before it was ready")
+            if time.monotonic() > deadline:
+                raise SystemExit(f"service not ready after {timeout:.0f} s")
+            try:
+                response = await client.get("/health/ready", headers={"Connection": "close"})
+                streak = streak + 1 if response.status_code == 200 else 0
+            except httpx.TransportError:
+                streak = 0
+            await asyncio.sleep(0.05)
+
+
+def stop_service(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def replay(
+    base_url: str,
+    trace: List[TraceRequest],
+    concurrency: int,
+    warmup: float,
+    duration: float,
+    timeout: float
+) -> Dict:
+    """
+    ``concurrency`` clients send the trace's requests in order, each the
+    next one as soon as its last returns. Outcomes of the first ``warmup``
+    seconds are dropped.
+    """
+    requests = cycle(trace)
+    outcomes: List[Outcome] = []
+    standin = BackendStandIn(base_url, timeout=timeout, connections=concurrency)
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup
+    stop_at = measure_from + duration
+    
+    async def client():
+        while loop.time() < stop_at:
+            outcome = await standin.send(next(requests))
+            if loop.time() >= measure_from:
+                outcomes.append(outcome)
+    
+    try:
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+    finally:
+        await standin.close()
+    elapsed = loop.time() - measure_from
+    
+    latencies = sorted(outcome.seconds * 1000 for outcome in outcomes)
+    errors = {kind: sum(1 for outcome in outcomes if outcome.error == kind) for kind in ERRORS}
+    per_call = {}
+    for call in sorted({outcome.call for outcome in outcomes}):
+        ms = sorted(outcome.seconds * 1000 for outcome in outcomes if outcome.call == call)
+        per_call[call] = {"requests": len(ms), "p50": round(_percentile(ms, 0.5), 2), "p95": round(_percentile(ms, 0.95), 2)}
+    return {
+        "concurrency": concurrency,
+        "requests": len(outcomes),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(outcomes) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50": round(_percentile(latencies, 0.5), 2),
+        "p95": round(_percentile(latencies, 0.95), 2),
+        "p99": round(_percentile(latencies, 0.99), 2),
+        "mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "error_rate": round(sum(errors.values()) / len(outcomes), 4) if outcomes else 0.0,
+        "errors": errors,
+        "calls": per_call
+    }
+
+
+def knee(points: List[Dict], budget_ms: float) -> Optional[Dict]:
+    """
+    Highest-throughput point whose p95 stays within ``budget_ms`` and that
+    has no errors: the most the service sustains before latency runs away
+    """
+    within = [point for point in points if point["p95"] <= budget_ms and point["error_rate"] == 0]
+    return max(within, key=lambda point: point["throughput"]) if within else None
+
+
+def _print_curve(workers: int, points: List[Dict]) -> None:
+    print(f"\nworkers={workers}")
+    print(f"{'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}  by kind")
+    for point in points:
+        kinds = ", ".join(f"{kind} {count}" for kind, count in point["errors"].items() if count) or "-"
+        print(f"{point['concurrency']:>12}{point['throughput']:>10.1f}{point['p50']:>10.1f}"
+              f"{point['p95']:>10.1f}{point['p99']:>10.1f}{point['error_rate']:>9.2%}  {kinds}")
+
+
+async def _sweep(args, trace: List[TraceRequest], workdir: str) -> Dict[int, List[Dict]]:
+    curves = {}
+    for workers in args.workers:
+        process, base_url = start_service(args, workers, workdir)
+        try:
+            await wait_ready(base_url, workers, process)
+            curves[workers] = []
+            for concurrency in args.concurrency:
+                point = await replay(base_url, trace, concurrency, args.warmup, args.duration, args.timeout)
+                curves[workers].append(point)
+                print(f"  w={workers} c={concurrency}: {point['throughput']:.1f} req/s, "
+                      f"p95 {point['p95']:.1f} ms, errors {point['error_rate']:.2%}", file=sys.stderr)
+        finally:
+            stop_service(process)
+    return curves
+
+
+def run(args) -> int:
+    trace = _trace(args)
+    if not trace:
+        raise SystemExit("the trace has no requests")
+    think = seconds_between_requests(trace)
+    with tempfile.TemporaryDirectory(prefix="load-") as workdir:
+        curves = asyncio.run(_sweep(args, trace, workdir))
+    
+    results = {
+        "format": FORMAT_VERSION,
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "app_mode": args.app_mode,
+            "executor_mode": os.getenv("PREDICTION_EXECUTOR_MODE", "thread"),
+            "cache": args.cache,
+            "seed": args.seed,
+            "trace": args.trace or {"users": args.users, "minutes": args.minutes},
+            "trace_requests": len(trace),
+            "mix": mix_of(trace),
+            "sizes": {"duration": args.duration, "warmup": args.warmup, "timeout": args.timeout}
+        },
+        "metrics": {},
+        "curves": {},
+        "capacity": {}
+    }
+    for workers, points in curves.items():
+        _print_curve(workers, points)
+        results["curves"][str(workers)] = points
+        for point in points:
+            name = f"load.w{workers}.c{point['concurrency']}"
+            results["metrics"][f"{name}.throughput"] = _metric("req/s", "higher", [point["throughput"]])
+            for key in ("p50", "p95", "p99"):
+                results["metrics"][f"{name}.{key}"] = _metric("ms", "lower", [point[key]])
+        best = knee(points, args.latency_budget_ms)
+        if best is None:
+            print(f"  no point within p95 {args.latency_budget_ms:.0f} ms without errors")
+            continue
+        # Little's law: users = arrival rate x seconds between one user's requests
+        users = int(best["throughput"] * think) if think else None
+        results["capacity"][str(workers)] = {
+            "concurrency": best["concurrency"], "throughput": best["throughput"], "p95": best["p95"],
+            "dashboard_users": users
+        }
+        results["metrics"][f"load.w{workers}.capacity"] = _metric("req/s", "higher", [best["throughput"]])
+        print(f"  capacity: {best['throughput']:.1f} req/s at concurrency {best['concurrency']} "
+              f"(p95 {best['p95']:.1f} ms)" + (f", about {users} dashboard users" if users else ""))
+    
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {len(results['metrics'])} metrics to {args.output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return compare_results(baseline, results, args.threshold, args.min_delta_ms)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    def trace_options(command: argparse.ArgumentParser) -> None:
+        command.add_argument("--seed", type=int, default=42)
+        command.add_argument("--users", type=int, default=200, help="dashboards open at once (default 200)")
+        command.add_argument("--minutes", type=float, default=10.0, help="trace length (default 10)")
+    
+    synthesize_parser = commands.add_parser("synthesize", help="write a synthetic backend trace")
+    trace_options(synthesize_parser)
+    synthesize_parser.add_argument("--output", required=True)
+    synthesize_parser.set_defaults(handler=synthesize)
+    
+    record_parser = commands.add_parser("record", help="record backend traffic through a logging proxy")
+    record_parser.add_argument("--upstream", default=os.getenv("PREDICTION_SERVICE_URL", "http://localhost:8001"))
+    record_parser.add_argument("--host", default="127.0.0.1")
+    record_parser.add_argument("--port", type=int, default=8002)
+    record_parser.add_argument("--output", required=True, help="trace file (appended to)")
+    record_parser.set_defaults(handler=record)
+    
+    run_parser = commands.add_parser("run", help="sweep workers and concurrency and report the saturation curve")
+    trace_options(run_parser)
+    run_parser.add_argument("--trace", default=None, help="trace to replay (default: synthesize one from --seed)")
+    run_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    run_parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per point")
+    run_parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each point")
+    run_parser.add_argument("--timeout", type=float, default=BACKEND_TIMEOUT,
+                            help="per-request timeout, as the backend's (default 5 s)")
+    run_parser.add_argument("--latency-budget-ms", type=float, default=500.0,
+                            help="p95 a point may reach and still count toward capacity (default 500)")
+    run_parser.add_argument("--app-mode", default=os.getenv("PREDICTION_MODE", "rules"))
+    run_parser.add_argument("--model-dir", default=None)
+    run_parser.add_argument("--cache", action="store_true", help="keep the prediction cache enabled")
+    run_parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results", "load.json"))
+    run_parser.add_argument("--compare", default=None, metavar="BASELINE",
+                            help="compare against a baseline when done; exit 1 on regressions")
+    run_parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", "0.2")))
+    run_parser.add_argument("--min-delta-ms", type=float, default=float(os.getenv("BENCH_MIN_DELTA_MS", "0.5")))
+    run_parser.set_defaults(handler=run)
+    
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+One benchmark case per FastAPI route (several for the batch routes, whose
+JSON and Arrow paths differ). ``build`` returns the keyword arguments of
+``httpx.AsyncClient.request`` for one call; cases draw fresh inputs from
+the rng on every call so the prediction cache is not measured by accident.
+"""
+import io
+import random
+from typing import Callable, Dict, NamedTuple, Optional
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import workloads
+
+ARROW = "application/vnd.apache.arrow.stream"
+
+# Routes an in-process request/response client cannot time: the WebSocket and
+# the SSE stream never finish a response
+UNTIMED_ROUTES = {
+    "WEBSOCKET /api/subscribe/combined": "WebSocket; not supported by httpx.ASGITransport",
+    "GET /api/subscribe/combined/sse": "open-ended event stream"
+}
+
+
+class RouteCase(NamedTuple):
+    name: str  # metric key, "<METHOD> <path>" plus a variant suffix
+    route: str  # "<METHOD> <path template>" as registered on the app
+    build: Callable[[random.Random, Dict], Dict]  # may set "expect" to override the status below
+    expect: int = 200
+    rows: Optional[int] = None  # rows per request, for rows/s on batch routes
+
+
+def _arrow(columns: Dict[str, list]) -> bytes:
+    sink = io.BytesIO()
+    table = pa.table(columns)
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _combined_params(rng: random.Random, context: Dict) -> Dict:
+    call = workloads.festival_season(rng, 1)[0]
+    return {
+        "festival_name": call["festival_name"],
+        "festival_start": call["start_date"],
+        "festival_end": call["end_date"],
+        "festival_intensity": call["intensity"],
+        "aqi": round(rng.uniform(0, 500), 1),
+        "location": call["location"]
+    }
+
+
+def route_cases(batch_rows: int, columnar_rows: int) -> Dict[str, RouteCase]:
+    """Every case by name; ``batch_rows`` / ``columnar_rows`` size the JSON and Arrow batches"""
+    hospitals = [site["id"] for site in workloads.geo_sites()["hospitals"]]
+    
+    def post(path: str, body: Callable[[random.Random, Dict], Dict]) -> Callable:
+        return lambda rng, context: {"method": "POST", "url": path, "json": body(rng, context)}
+    
+    def get(path: str, params: Callable[[random.Random, Dict], Dict] = lambda rng, context: {}) -> Callable:
+        return lambda rng, context: {"method": "GET", "url": path, "params": params(rng, context)}
+    
+    def arrow_batch(path: str, columns: Callable[[random.Random], Dict[str, list]]) -> Callable:
+        return lambda rng, context: {
+            "method": "POST",
+            "url": path,
+            "content": _arrow(columns(rng)),
+            "headers": {"Content-Type": ARROW, "Accept": ARROW}
+        }
+    
+    cases = [
+        RouteCase("GET /", "GET /", get("/")),
+        RouteCase("GET /health", "GET /health", get("/health")),
+        RouteCase("GET /health/ready", "GET /health/ready", get("/health/ready")),
+        RouteCase("GET /api/startup", "GET /api/startup", get("/api/startup")),
+        RouteCase(
+            "POST /api/predict/festival", "POST /api/predict/festival",
+            post("/api/predict/festival", lambda rng, context: workloads.festival_request(
+                workloads.festival_season(rng, 1)[0]
+            ))
+        ),
+        RouteCase(
+            "POST /api/predict/pollution", "POST /api/predict/pollution",
+            post("/api/predict/pollution", lambda rng, context: rng.choice(workloads.aqi_sweep(rng, 50)))
+        ),
+        RouteCase(
+            "POST /api/predict/staff", "POST /api/predict/staff",
+            post("/api/predict/staff", lambda rng, context: workloads.staff_request(
+                rng.choice(workloads.department_shift_grid(rng, 20))
+            ))
+        ),
+        RouteCase(
+            "POST /api/predict/festival/batch", "POST /api/predict/festival/batch",
+            post("/api/predict/festival/batch", lambda rng, context: {"requests": [
+                workloads.festival_request(call) for call in workloads.festival_season(rng, batch_rows)
+            ]}),
+            rows=batch_rows
+        ),
+        RouteCase(
+            "POST /api/predict/festival/batch [arrow]", "POST /api/predict/festival/batch",
+            arrow_batch("/api/predict/festival/batch", lambda rng: workloads.festival_columns(
+                workloads.festival_season(rng, columnar_rows)
+            )),
+            rows=columnar_rows
+        ),
+        RouteCase(
+            "POST /api/predict/pollution/batch", "POST /api/predict/pollution/batch",
+            post("/api/predict/pollution/batch", lambda rng, context: {
+                "requests": workloads.aqi_sweep(rng, batch_rows)
+            }),
+            rows=batch_rows
+        ),
+        RouteCase(
+            "POST /api/predict/pollution/batch [arrow]", "POST /api/predict/pollution/batch",
+            arrow_batch("/api/predict/pollution/batch", lambda rng: workloads.pollution_columns(
+                workloads.aqi_sweep(rng, columnar_rows)
+            )),
+            rows=columnar_rows
+        ),
+        RouteCase(
+            "POST /api/predict/staff/batch", "POST /api/predict/staff/batch",
+            post("/api/predict/staff/batch", lambda rng, context: {"requests": [
+                workloads.staff_request(call) for call in workloads.department_shift_grid(rng, batch_rows)
+            ]}),
+            rows=batch_rows
+        ),
+        RouteCase(
+            "POST /api/predict/staff/batch [arrow]", "POST /api/predict/staff/batch",
+            arrow_batch("/api/predict/staff/batch", lambda rng: workloads.staff_columns(
+                workloads.department_shift_grid(rng, columnar_rows)
+            )),
+            rows=columnar_rows
+        ),
+        RouteCase(
+            "POST /api/predict/festival/timeline", "POST /api/predict/festival/timeline",
+            post("/api/predict/festival/timeline", lambda rng, context: {
+                "start_date": "2025-01-01",
+                "end_date": "2025-12-31",
+                "location": rng.choice(hospitals)
+            })
+        ),
+        RouteCase(
+            "POST /api/predict/staff/coverage", "POST /api/predict/staff/coverage",
+            post("/api/predict/staff/coverage", lambda rng, context: workloads.coverage_request(rng))
+        ),
+        RouteCase(
+            "POST /api/predict/staff/optimize", "POST /api/predict/staff/optimize",
+            post("/api/predict/staff/optimize", lambda rng, context: workloads.optimization_request(rng))
+        ),
+        RouteCase(
+            "POST /api/resources/allocate", "POST /api/resources/allocate",
+            post("/api/resources/allocate", lambda rng, context: workloads.allocation_request(rng))
+        ),
+        RouteCase(
+            "POST /api/predict/pollution/forecast", "POST /api/predict/pollution/forecast",
+            post("/api/predict/pollution/forecast", lambda rng, context: {
+                "stations": workloads.station_history(rng, 60),
+                "horizon_days": 7
+            })
+        ),
+        RouteCase(
+            "POST /api/predict/pollution/forecast/upload", "POST /api/predict/pollution/forecast/upload",
+            lambda rng, context: {
+                "method": "POST",
+                "url": "/api/predict/pollution/forecast/upload",
+                "params": {"horizon_days": 7},
+                "files": {"file": ("stations.csv", workloads.station_history_csv(rng, 90), "text/csv")}
+            }
+        ),
+        RouteCase(
+            "POST /api/predict/pollution/grid", "POST /api/predict/pollution/grid",
+            post("/api/predict/pollution/grid", lambda rng, context: {
+                "readings": workloads.station_readings(rng),
+                "targets": "all"
+            })
+        ),
+        RouteCase("GET /api/geo/sites", "GET /api/geo/sites", get("/api/geo/sites")),
+        RouteCase(
+            "POST /api/predict/festival/simulate", "POST /api/predict/festival/simulate",
+            post("/api/predict/festival/simulate", lambda rng, context: {
+                **workloads.festival_request(workloads.festival_season(rng, 1)[0]),
+                "seed": rng.randrange(1 << 30)
+            })
+        ),
+        RouteCase(
+            "POST /api/predict/pollution/simulate", "POST /api/predict/pollution/simulate",
+            post("/api/predict/pollution/simulate", lambda rng, context: {
+                "aqi": round(rng.uniform(0, 500), 1),
+                "location": rng.choice(hospitals),
+                "seed": rng.randrange(1 << 30)
+            })
+        ),
+        RouteCase(
+            "POST /api/predict/combined/simulate", "POST /api/predict/combined/simulate",
+            post("/api/predict/combined/simulate", lambda rng, context: {
+                "festival": {
+                    key: value for key, value in workloads.festival_request(
+                        workloads.festival_season(rng, 1)[0]
+                    ).items() if key in ("festival_name", "start_date", "end_date", "festival_intensity")
+                },
+                "aqi": round(rng.uniform(0, 500), 1),
+                "location": rng.choice(hospitals),
+                "seed": rng.randrange(1 << 30),
+                "correlation": 0.3
+            })
+        ),
+        RouteCase(
+            "POST /api/predict/stream", "POST /api/predict/stream",
+            post("/api/predict/stream", lambda rng, context: {
+                "start_date": "2025-10-01",
+                "horizon_days": 90,
+                "locations": hospitals,
+                "departments": workloads.DEPARTMENTS,
+                "aqi": {hospital: round(rng.uniform(50, 400), 1) for hospital in hospitals}
+            })
+        ),
+        RouteCase("GET /api/predict/combined", "GET /api/predict/combined", get("/api/predict/combined", _combined_params)),
+        RouteCase(
+            "GET /api/aqi/current", "GET /api/aqi/current",
+            get("/api/aqi/current", lambda rng, context: {"location": rng.choice(hospitals)})
+        ),
+        RouteCase("GET /api/subscribe/stats", "GET /api/subscribe/stats", get("/api/subscribe/stats")),
+        RouteCase(
+            "GET /api/predict/materialized", "GET /api/predict/materialized",
+            get("/api/predict/materialized", lambda rng, context: {
+                "date": rng.choice(context["store_days"]),
+                "location": rng.choice(context["store_locations"]),
+                "department": rng.choice(context["store_departments"])
+            })
+        ),
+        RouteCase("GET /api/predict/materialized/stats", "GET /api/predict/materialized/stats",
+                  get("/api/predict/materialized/stats")),
+        RouteCase("GET /api/cache/stats", "GET /api/cache/stats", get("/api/cache/stats")),
+        RouteCase(
+            "POST /api/cache/invalidate", "POST /api/cache/invalidate",
+            lambda rng, context: {"method": "POST", "url": "/api/cache/invalidate"}
+        ),
+        RouteCase("GET /api/executor/stats", "GET /api/executor/stats", get("/api/executor/stats")),
+        RouteCase("GET /metrics", "GET /metrics", get("/metrics")),
+        RouteCase(
+            "POST /api/history/ingest", "POST /api/history/ingest",
+            lambda rng, context: {
+                "method": "POST",
+                "url": "/api/history/ingest",
+                "files": {"file": ("admissions.csv", workloads.admissions_csv(rng, days=120), "text/csv")}
+            }
+        ),
+        RouteCase(
+            "GET /api/history/baselines", "GET /api/history/baselines",
+            get("/api/history/baselines", lambda rng, context: {
+                "location": rng.choice(hospitals),
+                "department": rng.choice(workloads.DEPARTMENTS)
+            })
+        ),
+        RouteCase("GET /api/history", "GET /api/history", get("/api/history")),
+        RouteCase("GET /api/models", "GET /api/models", get("/api/models")),
+        RouteCase("GET /api/rules", "GET /api/rules", get("/api/rules")),
+        RouteCase(
+            "POST /api/rules/reload", "POST /api/rules/reload",
+            lambda rng, context: {"method": "POST", "url": "/api/rules/reload", "headers": context["admin_headers"]}
+        ),
+        RouteCase("GET /api/profiles", "GET /api/profiles", get("/api/profiles")),
+        RouteCase(
+            "GET /api/profiles/{profile_id}", "GET /api/profiles/{profile_id}",
+            lambda rng, context: {"method": "GET", "url": f"/api/profiles/{context['profile']}"}
+        ),
+        RouteCase(
+            "GET /api/profiles/{profile_id}/download", "GET /api/profiles/{profile_id}/download",
+            lambda rng, context: {"method": "GET", "url": f"/api/profiles/{context['profile']}/download"}
+        ),
+        RouteCase(
+            "GET /api/profiles/{profile_id}/collapsed", "GET /api/profiles/{profile_id}/collapsed",
+            lambda rng, context: {"method": "GET", "url": f"/api/profiles/{context['profile']}/collapsed"}
+        ),
+    ]
+    
+    # Re-activating the active version when models are published, else the 404 path
+    def activate(rng: random.Random, context: Dict) -> Dict:
+        if context["model"] is None:
+            return {
+                "method": "POST", "url": "/api/models/pollution/activate", "params": {"version": "none"},
+                "headers": context["admin_headers"], "expect": 404
+            }
+        name, version = context["model"]
+        return {
+            "method": "POST", "url": f"/api/models/{name}/activate", "params": {"version": version},
+            "headers": context["admin_headers"]
+        }
+    
+    cases.append(RouteCase("POST /api/models/{name}/activate", "POST /api/models/{name}/activate", activate))
+    return {case.name: case for case in cases}
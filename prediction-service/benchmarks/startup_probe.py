@@ -0,0 +1,60 @@
+"""
+Cold start of the app in this (fresh) interpreter: import ``app.main``, run its
+lifespan, poll /health and /health/ready, then send the first prediction.
+Prints one JSON object with the timings and the app's /api/startup report.
+
+Run by ``bench_suite.py`` (``startup.*`` metrics) with the environment
+already pointing at scratch stores; not meant to be called directly.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+started = time.perf_counter()
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, ".."))
+
+import httpx  # noqa: E402  (the client, not the app, so not timed as app import)
+
+FIRST_REQUEST = {"method": "POST", "url": "/api/predict/pollution", "json": {"aqi": 180, "location": "kem"}}
+
+
+def _since(moment: float) -> float:
+    return round((moment - started) * 1000, 2)
+
+
+async def probe(poll: float = 0.005) -> dict:
+    import_started = time.perf_counter()
+    from app import main
+    imported = time.perf_counter()
+    
+    timings = {"import_ms": round((imported - import_started) * 1000, 2)}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://probe", timeout=None) as client:
+            response = await client.get("/health")
+            timings["health_ms"] = _since(time.perf_counter())
+            timings["health_status"] = response.status_code
+            while True:
+                response = await client.get("/health/ready")
+                if response.status_code == 200:
+                    break
+                if response.json().get("status") == "failed":
+                    raise SystemExit(f"startup failed: {response.json().get('error')}")
+                await asyncio.sleep(poll)
+            timings["ready_ms"] = _since(time.perf_counter())
+            
+            request_started = time.perf_counter()
+            response = await client.request(**FIRST_REQUEST)
+            response.raise_for_status()
+            timings["first_request_ms"] = _since(time.perf_counter())
+            timings["first_request_latency_ms"] = round((time.perf_counter() - request_started) * 1000, 2)
+            timings["report"] = (await client.get("/api/startup")).json()
+    return timings
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(probe())))
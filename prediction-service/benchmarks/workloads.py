@@ -0,0 +1,302 @@
+"""
+Generated workloads shaped like production traffic: festival seasons,
+city-wide AQI sweeps and department x shift grids, plus the request bodies
+the route benchmarks send.
+
+Every generator takes a ``random.Random`` so a seed reproduces a workload.
+"""
+import io
+import json
+import os
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+DEPARTMENTS = ["emergency", "general", "icu", "opd"]
+SHIFTS = ["morning", "evening", "night"]
+ROLES = ["doctors", "nurses", "support"]
+RESOURCES = ["beds", "oxygen_cylinders", "nebulizers", "ventilators", "ambulances"]
+INTENSITIES = ["low", "medium", "high"]
+
+# Daily admissions by department for a mid-sized city hospital
+DEPARTMENT_LOAD = {"emergency": 180, "general": 120, "icu": 25, "opd": 400}
+
+
+def _load(name: str) -> Dict:
+    with open(os.path.join(APP_DIR, "data", name)) as f:
+        return json.load(f)
+
+
+def festival_calendar() -> List[Dict]:
+    """Festival windows of the shipped season"""
+    return _load("festival_calendar.json")["festivals"]
+
+
+def geo_sites() -> Dict[str, List[Dict]]:
+    """Hospitals, wards and monitoring stations of the shipped city"""
+    return _load("geo_sites.json")
+
+
+def festival_season(rng: random.Random, count: int, years: int = 3) -> List[Dict]:
+    """
+    ``FestivalPredictor.predict`` calls for the calendar's windows, shifted
+    into one of ``years`` seasons, at every hospital, some with history
+    """
+    windows = festival_calendar()
+    hospitals = [site["id"] for site in geo_sites()["hospitals"]]
+    calls = []
+    for _ in range(count):
+        window = rng.choice(windows)
+        offset = timedelta(days=365 * rng.randrange(years))
+        start = date.fromisoformat(window["start_date"]) + offset
+        end = date.fromisoformat(window["end_date"]) + offset
+        history = rng.choice([
+            None,
+            {"average_daily_patients": rng.randint(60, 400)},
+            {"previous_year_cases": rng.randint(200, 4000)}
+        ])
+        calls.append({
+            "festival_name": window["festival_name"],
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            # Most windows keep their calendar intensity
+            "intensity": window["festival_intensity"] if rng.random() < 0.8 else rng.choice(INTENSITIES),
+            "historical_data": history,
+            "location": rng.choice(hospitals)
+        })
+    return calls
+
+
+def aqi_sweep(rng: random.Random, count: int, start: str = "2025-10-01") -> List[Dict]:
+    """
+    ``PollutionPredictor.predict`` calls sweeping AQI 0-500 across every
+    hospital, ward and station, day by day, with PM readings to match
+    """
+    sites = geo_sites()
+    locations = [site["id"] for kind in ("hospitals", "wards", "stations") for site in sites[kind]]
+    first = date.fromisoformat(start)
+    calls = []
+    for i in range(count):
+        aqi = round(min(500.0, max(0.0, 500.0 * i / max(count - 1, 1) + rng.gauss(0, 15))), 1)
+        calls.append({
+            "aqi": aqi,
+            "pm25": round(aqi * rng.uniform(0.4, 0.6), 1),
+            "pm10": round(aqi * rng.uniform(0.8, 1.1), 1),
+            "location": locations[i % len(locations)],
+            "date": (first + timedelta(days=i // len(locations))).isoformat()
+        })
+    return calls
+
+
+def department_shift_grid(rng: random.Random, count: int) -> List[Dict]:
+    """
+    ``StaffForecaster.forecast`` calls cycling through departments x shifts,
+    with patient loads around each department's usual volume
+    """
+    grid = [(department, shift) for department in DEPARTMENTS + [None] for shift in SHIFTS + [None]]
+    calls = []
+    for i in range(count):
+        department, shift = grid[i % len(grid)]
+        load = DEPARTMENT_LOAD.get(department, 150)
+        patients = max(0, int(rng.gauss(load, load * 0.3)))
+        calls.append({
+            "predicted_patients": patients,
+            "current_staff": rng.choice([None, max(1, patients // rng.randint(3, 12))]),
+            "department": department,
+            "shift_type": shift
+        })
+    return calls
+
+
+def festival_request(call: Dict) -> Dict:
+    """A festival call as the JSON body of /api/predict/festival"""
+    return {
+        "festival_name": call["festival_name"],
+        "start_date": call["start_date"],
+        "end_date": call["end_date"],
+        "festival_intensity": call["intensity"],
+        "historical_data": call["historical_data"],
+        "location": call["location"]
+    }
+
+
+def staff_request(call: Dict) -> Dict:
+    """A staff call as the JSON body of /api/predict/staff"""
+    return {
+        "predicted_patient_inflow": call["predicted_patients"],
+        "current_staff_count": call["current_staff"],
+        "department": call["department"],
+        "shift_type": call["shift_type"]
+    }
+
+
+def festival_columns(calls: List[Dict]) -> Dict[str, list]:
+    """Festival calls as columns for the columnar scorer"""
+    return {
+        "festival_name": [call["festival_name"] for call in calls],
+        "start_date": [call["start_date"] for call in calls],
+        "end_date": [call["end_date"] for call in calls],
+        "festival_intensity": [call["intensity"] for call in calls],
+        "base_daily_patients": [
+            (call["historical_data"] or {}).get("average_daily_patients") for call in calls
+        ]
+    }
+
+
+def pollution_columns(calls: List[Dict]) -> Dict[str, list]:
+    return {name: [call[name] for call in calls] for name in ("aqi", "pm25", "pm10", "date")}
+
+
+def staff_columns(calls: List[Dict]) -> Dict[str, list]:
+    return {
+        name: [call[name] for call in calls]
+        for name in ("predicted_patients", "current_staff", "department", "shift_type")
+    }
+
+
+def shift_roster(rng: random.Random, start: str, days: int, per_day: int) -> List[Dict]:
+    """Backend DoctorShift-style rows for every hospital and department"""
+    hospitals = [site["id"] for site in geo_sites()["hospitals"]]
+    windows = [("08:00", "16:00"), ("16:00", "00:00"), ("00:00", "08:00"), ("09:00", "21:00")]
+    first = date.fromisoformat(start)
+    shifts = []
+    for day in range(days):
+        for _ in range(per_day):
+            start_time, end_time = rng.choice(windows)
+            shifts.append({
+                "hospitalId": rng.choice(hospitals),
+                "specialization": rng.choice(DEPARTMENTS),
+                "role": rng.choice(ROLES),
+                "shiftDate": (first + timedelta(days=day)).isoformat(),
+                "startTime": start_time,
+                "endTime": end_time,
+                "status": "cancelled" if rng.random() < 0.03 else "scheduled"
+            })
+    return shifts
+
+
+def coverage_request(rng: random.Random, days: int = 7, per_day: int = 400) -> Dict:
+    start = "2025-10-20"
+    hospitals = [site["id"] for site in geo_sites()["hospitals"]]
+    return {
+        "start_date": start,
+        "days": days,
+        "shifts": shift_roster(rng, start, days, per_day),
+        "demand": [
+            {
+                "location": hospital,
+                "department": department,
+                "predicted_patients": [
+                    max(0, int(rng.gauss(DEPARTMENT_LOAD[department], 20))) for _ in range(days)
+                ]
+            }
+            for hospital in hospitals for department in DEPARTMENTS
+        ]
+    }
+
+
+def optimization_request(rng: random.Random, days: int = 14) -> Dict:
+    hospitals = [site["id"] for site in geo_sites()["hospitals"]]
+    return {
+        "start_date": "2025-10-20",
+        "days": days,
+        "demand": [
+            {
+                "location": hospital,
+                "department": department,
+                "predicted_patients": [
+                    [max(0, int(rng.gauss(DEPARTMENT_LOAD[department] * share, 15))) for share in (0.45, 0.35, 0.2)]
+                    for _ in range(days)
+                ]
+            }
+            for hospital in hospitals for department in DEPARTMENTS
+        ],
+        "availability": [
+            {"location": hospital, "role": role, "available": rng.randint(20, 120)}
+            for hospital in hospitals for role in ROLES
+        ],
+        "transfer_cost": 1.0,
+        "unmet_cost": 100.0
+    }
+
+
+def allocation_request(rng: random.Random, hospitals: int = 200) -> Dict:
+    """Stock and demand for ``hospitals`` synthetic hospitals around the city, half with an AQI"""
+    return {
+        "hospitals": [
+            {
+                "location": f"H{i:04d}",
+                "lat": 18.9 + rng.uniform(0, 0.35),
+                "lng": 72.8 + rng.uniform(0, 0.15),
+                "stock": {resource: rng.randint(0, 60) for resource in RESOURCES},
+                "demand": {resource: rng.randint(0, 50) for resource in RESOURCES},
+                "reserve": {"beds": rng.randint(0, 5)},
+                "aqi": round(rng.uniform(50, 450), 1) if i % 2 else None
+            }
+            for i in range(hospitals)
+        ],
+        "cost_per_km": 0.5
+    }
+
+
+def station_history(rng: random.Random, days: int, interval_hours: float = 1.0) -> List[Dict]:
+    """Hourly AQI for every monitoring station with a few gaps"""
+    stations = geo_sites()["stations"]
+    steps = int(days * 24 / interval_hours)
+    history = []
+    for station in stations:
+        level = rng.uniform(80, 250)
+        aqi, pm25 = [], []
+        for step in range(steps):
+            level = min(500.0, max(5.0, level + rng.gauss(0, 6)))
+            value = None if rng.random() < 0.02 else round(level, 1)
+            aqi.append(value)
+            pm25.append(None if value is None else round(value * 0.5, 1))
+        history.append({
+            "station": station["id"],
+            "location": station["id"],
+            "start": "2025-09-01T00:00:00Z",
+            "interval_hours": interval_hours,
+            "aqi": aqi,
+            "pm25": pm25
+        })
+    return history
+
+
+def station_history_csv(rng: random.Random, days: int) -> bytes:
+    """``station_history`` as the long CSV /api/predict/pollution/forecast/upload reads"""
+    out = io.StringIO()
+    out.write("station,timestamp,aqi,pm25\n")
+    for series in station_history(rng, days):
+        for step, (aqi, pm25) in enumerate(zip(series["aqi"], series["pm25"])):
+            hour = date(2025, 9, 1) + timedelta(days=step // 24)
+            out.write(
+                f"{series['station']},{hour.isoformat()}T{step % 24:02d}:00:00Z,"
+                f"{'' if aqi is None else aqi},{'' if pm25 is None else pm25}\n"
+            )
+    return out.getvalue().encode()
+
+
+def station_readings(rng: random.Random, level: Optional[float] = None) -> List[Dict]:
+    """One current reading per monitoring station"""
+    level = rng.uniform(60, 400) if level is None else level
+    return [
+        {"station": station["id"], "aqi": round(max(0.0, level + rng.gauss(0, 25)), 1)}
+        for station in geo_sites()["stations"]
+    ]
+
+
+def admissions_csv(rng: random.Random, days: int = 400, start: str = "2024-09-01") -> bytes:
+    """Daily admissions per hospital and department, for /api/history/ingest"""
+    hospitals = [site["id"] for site in geo_sites()["hospitals"]]
+    first = date.fromisoformat(start)
+    out = io.StringIO()
+    out.write("date,location,department,admissions\n")
+    for day in range(days):
+        current = (first + timedelta(days=day)).isoformat()
+        for hospital in hospitals:
+            for department in DEPARTMENTS:
+                out.write(f"{current},{hospital},{department},{max(0, int(rng.gauss(DEPARTMENT_LOAD[department], 20)))}\n")
+    return out.getvalue().encode()
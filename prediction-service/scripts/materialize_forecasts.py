@@ -0,0 +1,99 @@
+"""
+Precompute combined festival + pollution + staff forecasts into the
+forecast store served by GET /api/predict/materialized.
+
+One record is written per (date, location, department) over the horizon.
+The new file replaces the old one atomically; running workers switch to it
+within FORECAST_STORE_CHECK_INTERVAL seconds. Locations get a pollution
+component only when an AQI is passed for them with ``--aqi``.
+
+Usage (from prediction-service/):
+    python scripts/materialize_forecasts.py [--start-date 2026-10-17]
+        [--horizon-days 90] [--locations kem ltmg-sion ...]
+        [--departments emergency icu ...] [--aqi kem=180 ...]
+        [--shift-type night] [--path app/data/forecast_store.bin]
+"""
+import argparse
+import json
+import os
+import sys
+
+# Import the app package from the service root, as `uvicorn app.main:app` does
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.append(os.path.join(APP_DIR, ".."))
+
+from app.services.baseline_store import BaselineStore
+from app.services.festival_calendar import FestivalCalendar
+from app.services.forecast_store import ForecastMaterializer, ForecastStore
+from app.services.geo_index import GeoIndex
+from app.services.model_backed import with_models
+from app.services.model_registry import ModelRegistry
+from app.services.precompiled import build_predictors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default=os.getenv(
+        "FORECAST_STORE_PATH", os.path.join(APP_DIR, "data", "forecast_store.bin")
+    ))
+    parser.add_argument("--start-date", default=None, help="first day (default: today, UTC)")
+    parser.add_argument("--horizon-days", type=int, default=int(os.getenv("FORECAST_STORE_HORIZON_DAYS", "90")))
+    parser.add_argument("--locations", nargs="+", default=None,
+                        help="default: FORECAST_STORE_LOCATIONS, else every hospital in GEO_SITES_PATH")
+    parser.add_argument("--departments", nargs="+", default=None,
+                        help="default: FORECAST_STORE_DEPARTMENTS, else emergency general icu opd")
+    parser.add_argument("--aqi", nargs="*", default=[], metavar="LOCATION=AQI")
+    parser.add_argument("--shift-type", default=None)
+    parser.add_argument("--mode", default=os.getenv("PREDICTION_MODE", "rules"))
+    parser.add_argument("--model-dir", default=os.getenv("PREDICTION_MODEL_DIR", os.path.join(APP_DIR, "models")))
+    parser.add_argument("--calendar", default=os.getenv(
+        "FESTIVAL_CALENDAR_PATH", os.path.join(APP_DIR, "data", "festival_calendar.json")
+    ))
+    parser.add_argument("--baselines", default=os.getenv(
+        "BASELINE_STORE_PATH", os.path.join(APP_DIR, "data", "baselines")
+    ))
+    parser.add_argument("--geo-sites", default=os.getenv(
+        "GEO_SITES_PATH", os.path.join(APP_DIR, "data", "geo_sites.json")
+    ))
+    args = parser.parse_args()
+    
+    festival, pollution, staff = build_predictors(args.mode)
+    festival, pollution, staff = with_models(ModelRegistry(args.model_dir), festival, pollution, staff, args.mode)
+    
+    locations = args.locations or [
+        location.strip() for location in os.getenv("FORECAST_STORE_LOCATIONS", "").split(",") if location.strip()
+    ] or [site.id for site in GeoIndex.from_file(args.geo_sites).sites["hospital"]]
+    departments = args.departments or [
+        department.strip()
+        for department in os.getenv("FORECAST_STORE_DEPARTMENTS", "emergency,general,icu,opd").split(",")
+        if department.strip()
+    ]
+    aqi_by_location = {}
+    for item in args.aqi:
+        location, value = item.split("=", 1)
+        aqi_by_location[location] = float(value)
+    
+    materializer = ForecastMaterializer(
+        ForecastStore(args.path),
+        FestivalCalendar.from_file(args.calendar, festival.surge_multiplier),
+        pollution,
+        staff,
+        festival.rules_for(None)[0].BASE_DAILY_PATIENTS,
+        baseline_store=BaselineStore(
+            args.baselines, window_days=int(os.getenv("BASELINE_WINDOW_DAYS", "28"))
+        ),
+        locations=locations,
+        departments=departments,
+        horizon_days=args.horizon_days,
+        shift_type=args.shift_type,
+        festival_predictor=festival
+    )
+    with materializer.store.exclusive() as acquired:
+        if not acquired:
+            sys.exit(f"Another process is building {args.path}")
+        summary = materializer.materialize(start_date=args.start_date, aqi_by_location=aqi_by_location)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Train estimators for the model-backed predictors and publish them to the
+model registry.
+
+Without ``--history`` the models are bootstrapped from the rule tables with
+multiplicative noise, which gives a working artifact to deploy and swap;
+pass a CSV with the feature columns of ``services/model_backed.py`` plus the
+target column(s) to train on real outcomes instead:
+
+    festival:  surge_multiplier
+    pollution: predicted_inflow
+    staff:     doctors, nurses, support
+
+Usage (from prediction-service/):
+    python scripts/train_models.py [--models festival pollution staff]
+        [--model-dir app/models] [--history festival=path.csv ...]
+        [--samples 20000] [--noise 0.05] [--seed 7]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.multioutput import MultiOutputRegressor
+
+# Import the app package from the service root, as `uvicorn app.main:app` does
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.festival_predictor import FestivalPredictor
+from app.services.model_backed import (
+    DEPARTMENT_CODES,
+    FESTIVAL_CODES,
+    FESTIVAL_FEATURES,
+    INTENSITY_CODES,
+    POLLUTION_FEATURES,
+    SHIFT_CODES,
+    STAFF_FEATURES
+)
+from app.services.model_registry import ModelRegistry
+from app.services.pollution_predictor import PollutionPredictor
+from app.services.staff_forecaster import StaffForecaster
+
+TARGETS = {
+    "festival": ["surge_multiplier"],
+    "pollution": ["predicted_inflow"],
+    "staff": ["doctors", "nurses", "support"]
+}
+FEATURES = {
+    "festival": FESTIVAL_FEATURES,
+    "pollution": POLLUTION_FEATURES,
+    "staff": STAFF_FEATURES
+}
+
+
+def _festival_samples(rng: np.random.Generator, count: int) -> pd.DataFrame:
+    surge = FestivalPredictor.FESTIVAL_BASE_SURGE
+    names = list(FESTIVAL_CODES)
+    intensities = list(INTENSITY_CODES)
+    festival = rng.integers(0, len(names), count)
+    intensity = rng.integers(0, len(intensities), count)
+    multiplier = np.array([
+        surge[names[f]][intensities[i]] for f, i in zip(festival, intensity)
+    ])
+    return pd.DataFrame({
+        "festival_code": festival,
+        "intensity_code": intensity,
+        "duration_days": rng.integers(1, 15, count),
+        "start_month": rng.integers(1, 13, count),
+        "surge_multiplier": multiplier
+    })
+
+
+def _pollution_samples(rng: np.random.Generator, count: int) -> pd.DataFrame:
+    predictor = PollutionPredictor()
+    aqi = rng.uniform(0, 500, count)
+    pm25 = np.where(rng.random(count) < 0.3, np.nan, aqi * rng.uniform(0.3, 0.6, count))
+    pm10 = np.where(rng.random(count) < 0.3, np.nan, aqi * rng.uniform(0.6, 1.0, count))
+    return pd.DataFrame({
+        "aqi": aqi,
+        "pm25": pm25,
+        "pm10": pm10,
+        "month": rng.integers(1, 13, count).astype(np.float64),
+        "predicted_inflow": predictor.score(aqi)["predicted_inflow"].astype(np.float64)
+    })
+
+
+def _staff_samples(rng: np.random.Generator, count: int) -> pd.DataFrame:
+    departments = list(DEPARTMENT_CODES)
+    shifts = list(SHIFT_CODES)
+    patients = rng.integers(0, 3000, count).astype(np.float64)
+    department = rng.integers(0, len(departments), count)
+    shift = rng.integers(-1, len(shifts), count)  # -1: no shift given
+    ratios = np.array([
+        [StaffForecaster.STAFF_RATIOS[departments[d]][role] for role in ("doctors", "nurses", "support")]
+        for d in department
+    ])
+    shift_mult = np.array([
+        StaffForecaster.SHIFT_MULTIPLIERS[shifts[s]] if s >= 0 else 1.0 for s in shift
+    ])
+    required = patients[:, None] * ratios * shift_mult[:, None]
+    return pd.DataFrame({
+        "predicted_patients": patients,
+        "department_code": department,
+        "shift_code": np.where(shift >= 0, shift, np.nan),
+        "doctors": required[:, 0],
+        "nurses": required[:, 1],
+        "support": required[:, 2]
+    })
+
+
+SAMPLERS = {
+    "festival": _festival_samples,
+    "pollution": _pollution_samples,
+    "staff": _staff_samples
+}
+
+
+def train(name: str, frame: pd.DataFrame, max_iter: int):
+    X = frame[FEATURES[name]].to_numpy(dtype=np.float64)
+    y = frame[TARGETS[name]].to_numpy(dtype=np.float64)
+    estimator = HistGradientBoostingRegressor(max_iter=max_iter, random_state=0)
+    if y.shape[1] > 1:
+        model = MultiOutputRegressor(estimator).fit(X, y)
+    else:
+        model = estimator.fit(X, y[:, 0])
+    predictions = model.predict(X).reshape(len(X), -1)
+    return model, float(np.abs(predictions - y).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--models", nargs="+", choices=sorted(SAMPLERS), default=sorted(SAMPLERS))
+    parser.add_argument("--model-dir", default=os.getenv(
+        "PREDICTION_MODEL_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "models")
+    ))
+    parser.add_argument("--history", nargs="*", default=[], metavar="NAME=CSV")
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--max-iter", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    history = dict(item.split("=", 1) for item in args.history)
+    registry = ModelRegistry(args.model_dir)
+    rng = np.random.default_rng(args.seed)
+
+    for name in args.models:
+        if name in history:
+            frame = pd.read_csv(history[name])
+            source = history[name]
+        else:
+            frame = SAMPLERS[name](rng, args.samples)
+            for target in TARGETS[name]:
+                frame[target] *= rng.normal(1.0, args.noise, len(frame))
+            source = f"rules+noise({args.noise})"
+
+        started = time.perf_counter()
+        model, mae = train(name, frame, args.max_iter)
+        version = registry.publish(
+            name,
+            model,
+            FEATURES[name],
+            metadata={
+                "source": source,
+                "rows": len(frame),
+                "targets": TARGETS[name],
+                "train_mae": round(mae, 4),
+                "seed": args.seed
+            }
+        )
+        print(f"{name:<10} {version}  rows={len(frame)}  mae={mae:.4f}  "
+              f"({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
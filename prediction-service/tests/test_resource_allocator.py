@@ -0,0 +1,46 @@
+from app.services.pollution_predictor import PollutionPredictor
+from app.services.resource_allocator import ResourceAllocator
+
+
+def _allocate(hospitals, **kwargs):
+    return ResourceAllocator(PollutionPredictor()).allocate(hospitals, **kwargs)
+
+
+def test_stock_goes_to_the_cheaper_shortage_first():
+    plan = _allocate(
+        [
+            {"location": "H1", "stock": {"beds": 10}},
+            {"location": "H2", "stock": {"beds": 0}, "demand": {"beds": 6}},
+            {"location": "H3", "stock": {"beds": 0}, "demand": {"beds": 6}}
+        ],
+        transfer_costs={"H1": {"H3": 3.0}}
+    )
+    moves = {(move["from"], move["to"], move["units"]) for move in plan["transfers"]}
+    assert moves == {("H1", "H2", 6), ("H1", "H3", 4)}
+    assert plan["shortages"] == [{"location": "H3", "resource": "beds", "unmet": 2}]
+    # H1 -> H3 is priced through H2 (1 + 1), cheaper than its override of 3
+    assert {move["to"]: move["unit_cost"] for move in plan["transfers"]} == {"H2": 1.0, "H3": 2.0}
+    assert plan["summary"]["total_cost"] == 6 * 1.0 + 4 * 2.0 + 2 * 100.0
+
+
+def test_reserve_is_not_moved():
+    plan = _allocate([
+        {"location": "H1", "stock": {"oxygen": 10}, "reserve": {"oxygen": 7}},
+        {"location": "H2", "demand": {"oxygen": 5}}
+    ])
+    assert [(move["from"], move["to"], move["units"]) for move in plan["transfers"]] == [("H1", "H2", 3)]
+    assert plan["summary"]["unmet"] == 2
+    assert plan["hospitals"][0]["resources"]["oxygen_cylinders"]["remaining"] == 7
+
+
+def test_nearest_sources_win_beyond_the_candidate_list():
+    # Six hospitals with one spare bed each, 1..6 degrees east of the one short of 5
+    hospitals = [{"location": "short", "lat": 0.0, "lng": 0.0, "demand": {"beds": 5}}] + [
+        {"location": f"s{east}", "lat": 0.0, "lng": float(east), "stock": {"beds": 1}}
+        for east in range(1, 7)
+    ]
+    plan = _allocate(hospitals, transfer_cost=0.0, cost_per_km=1.0, unmet_cost=1e6)
+    assert sorted(move["from"] for move in plan["transfers"]) == ["s1", "s2", "s3", "s4", "s5"]
+    assert plan["summary"]["unmet"] == 0
+    # Only CANDIDATE_SOURCES (4) sources start in the LP; pricing adds the fifth
+    assert plan["solver"]["rounds"] > 1
@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+
+from app.services.targets import build_predictor_targets
+
+# AQI 180 is "unhealthy": 20 respiratory patients x multiplier + additional
+AQI = 180
+
+
+def _write_rules(directory, name: str, rules: dict) -> None:
+    path = os.path.join(directory, name + ".json")
+    stat = os.stat(path) if os.path.exists(path) else None
+    with open(path, "w") as f:
+        json.dump(rules, f)
+    if stat is not None:
+        # Rewrites are noticed by (mtime, size); make sure the mtime moves
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def _unhealthy(version: str, multiplier: float, **fields) -> dict:
+    return {"version": version, "aqi_thresholds": {"unhealthy": {"multiplier": multiplier, **fields}}}
+
+
+@pytest.fixture(params=["rules", "precompiled"])
+def targets(request, tmp_path):
+    _write_rules(tmp_path, "kem", _unhealthy("1", 2.0))
+    swaps = []
+    targets = build_predictor_targets(mode=request.param, rules_dir=str(tmp_path))
+    targets["rules"].on_swap = swaps.append
+    targets["swaps"] = swaps
+    targets["dir"] = tmp_path
+    return targets
+
+
+def _inflow(targets, location):
+    result = targets["pollution"].predict(aqi=AQI, location=location)
+    return result["predicted_inflow"], result["factors"]["rules_version"]
+
+
+def test_locations_answer_from_their_own_rules(targets):
+    assert _inflow(targets, "kem") == (70, "kem@1")
+    assert _inflow(targets, "Andheri") == (62, "builtin")
+
+
+def test_reload_swaps_values_and_version(targets):
+    held, _ = targets["pollution"].rules_for("kem")
+    _write_rules(targets["dir"], "kem", _unhealthy("2", 3.0))
+    assert targets["rules"].reload()
+    
+    assert _inflow(targets, "kem") == (90, "kem@2")
+    assert _inflow(targets, "Andheri") == (62, "builtin")
+    assert len(targets["swaps"]) == 1
+    # Tables already handed out keep answering from the rules they were built with
+    assert held.predict(aqi=AQI)["predicted_inflow"] == 70
+    # Nothing changed since: no second swap
+    assert not targets["rules"].reload()
+
+
+def test_default_rules_apply_under_location_rules(targets):
+    _write_rules(targets["dir"], "default", _unhealthy("7", 1.6, additional_patients=40))
+    targets["rules"].reload()
+    
+    assert _inflow(targets, "kem") == (80, "default@7+kem@1")
+    assert _inflow(targets, "Andheri") == (72, "default@7")
+    results = targets["pollution"].predict_many([
+        {"aqi": AQI, "location": "kem"}, {"aqi": AQI, "location": "Andheri"}
+    ])
+    assert [result["factors"]["rules_version"] for result in results] == ["default@7+kem@1", "default@7"]
+
+
+def test_invalid_file_keeps_the_last_good_rules(targets):
+    _write_rules(targets["dir"], "kem", {"version": "2", "aqi_thresholds": {"unhealthy": {"multiplier": -1}}})
+    targets["rules"].reload()
+    
+    assert _inflow(targets, "kem") == (70, "kem@1")
+    assert targets["rules"].describe()["files"]["kem"]["error"]
+
+
+def test_staff_and_festival_follow_the_reload(targets):
+    _write_rules(targets["dir"], "kem", {
+        "version": "3",
+        "festival_base_surge": {"diwali": {"high": 3.0}},
+        "staff_ratios": {"icu": {"nurses": 1.0}}
+    })
+    targets["rules"].reload()
+    
+    staff = targets["staff"].forecast(predicted_patients=10, department="icu", location="kem")
+    assert staff["required_nurses"] == 10
+    assert staff["factors"]["rules_version"] == "kem@3"
+    festival = targets["festival"].predict(
+        festival_name="Diwali", start_date="2025-10-20", end_date="2025-10-24", intensity="high", location="kem"
+    )
+    assert festival["factors"]["surge_multiplier"] == 3.0
+    assert festival["factors"]["rules_version"] == "kem@3"
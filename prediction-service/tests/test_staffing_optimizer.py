@@ -0,0 +1,76 @@
+import pytest
+
+from app.services.staff_forecaster import StaffForecaster
+from app.services.staffing_optimizer import StaffingOptimizer
+
+# 100 emergency patients need 10/8/6 doctors, 20/16/12 nurses and 5/4/3
+# support staff (morning/evening/night); 0 patients need the minimums
+DEMAND = [
+    {"location": "A", "department": "emergency", "predicted_patients": 100},
+    {"location": "B", "department": "emergency", "predicted_patients": 0}
+]
+
+
+def _availability(b_doctors: int):
+    return [
+        {"location": "A", "role": "doctors", "available": 4},
+        {"location": "A", "role": "nurses", "available": [[20, 16, 12]]},
+        {"location": "A", "role": "support", "available": [[5, 4, 3]]},
+        {"location": "B", "role": "doctors", "available": b_doctors},
+        {"location": "B", "role": "nurses", "available": 4},
+        {"location": "B", "role": "support", "available": 2}
+    ]
+
+
+def _optimize(b_doctors: int, **kwargs):
+    return StaffingOptimizer(StaffForecaster()).optimize(
+        DEMAND, _availability(b_doctors), "2025-10-20", days=1, **kwargs
+    )
+
+
+def test_surplus_doctors_cover_the_other_hospital():
+    plan = _optimize(20, transfer_cost=1.0)
+    summary = plan["summary"]
+    # A is short 6/4/2 doctors; B has 18 spare each shift
+    assert summary["transferred"] == 12
+    assert summary["unmet"] == 0
+    assert summary["total_cost"] == 12.0
+    moves = {(move["shift"], move["from"], move["to"], move["role"], move["staff"]) for move in plan["transfers"]}
+    assert moves == {
+        ("morning", "B", "A", "doctors", 6),
+        ("evening", "B", "A", "doctors", 4),
+        ("night", "B", "A", "doctors", 2)
+    }
+    hospitals = {hospital["location"]: hospital for hospital in plan["hospitals"]}
+    assert hospitals["A"]["roles"]["doctors"]["received"] == 12
+    assert hospitals["B"]["roles"]["doctors"]["sent"] == 12
+
+
+def test_limited_surplus_leaves_the_rest_unmet():
+    plan = _optimize(5, transfer_cost=1.0)
+    # B keeps 2 doctors per shift and can spare 3
+    assert plan["summary"]["transferred"] == 8
+    assert plan["summary"]["unmet"] == 4
+    assert plan["summary"]["total_cost"] == 8.0 + 4 * 100.0
+    shortfalls = {(item["shift"], item["location"], item["role"], item["unmet"]) for item in plan["shortfalls"]}
+    assert shortfalls == {("morning", "A", "doctors", 3), ("evening", "A", "doctors", 1)}
+
+
+def test_forbidden_moves_are_unmet():
+    plan = _optimize(20, transfer_costs={"B": {"A": None}})
+    assert plan["transfers"] == []
+    assert plan["summary"]["unmet"] == 12
+    assert plan["summary"]["unmet_cost"] == 1200.0
+
+
+def test_transfers_dearer_than_the_shortage_are_not_made():
+    plan = _optimize(20, transfer_cost=5.0, unmet_cost=4.0)
+    assert plan["summary"]["transferred"] == 0
+    assert plan["summary"]["total_cost"] == 12 * 4.0
+
+
+def test_unknown_role_is_rejected():
+    with pytest.raises(ValueError):
+        StaffingOptimizer(StaffForecaster()).optimize(
+            DEMAND, [{"location": "A", "role": "surgeons", "available": 1}], "2025-10-20", days=1
+        )
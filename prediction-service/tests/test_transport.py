@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from app.services.transport import closed_costs, solve_transport
+
+
+def _flows(flows: np.ndarray) -> set:
+    return {tuple(row) for row in flows.tolist()}
+
+
+def test_closed_costs_follow_cheaper_chains():
+    cost = closed_costs(
+        ["a", "b", "c"], 10.0, {"a": {"b": 1.0}, "b": {"c": 1.0}, "c": {"a": None}}
+    )
+    # a -> c through b; c -> a is forbidden directly but allowed through b
+    np.testing.assert_array_equal(cost, [[0, 1, 2], [10, 0, 1], [20, 10, 0]])
+
+
+def test_closed_costs_forbid_moves_without_a_path():
+    cost = closed_costs(["a", "b"], 5.0, {"a": {"b": None}})
+    assert cost[0, 1] == np.inf
+    assert cost[1, 0] == 5.0
+
+
+@pytest.mark.parametrize("overrides", [{"a": {"x": 1.0}}, {"a": {"b": -1.0}}])
+def test_closed_costs_reject_bad_overrides(overrides):
+    with pytest.raises(ValueError):
+        closed_costs(["a", "b"], 1.0, overrides)
+
+
+def test_cheapest_deficit_is_filled_first():
+    # a has 5 units; b needs 3 at cost 1, c needs 4 at cost 2
+    cost = closed_costs(["a", "b", "c"], 10.0, {"a": {"b": 1.0, "c": 2.0}})
+    flows, unmet, solver = solve_transport(
+        np.array([[5, 0, 0]]), np.array([[0, 3, 4]]), cost, 100.0
+    )
+    assert _flows(flows) == {(0, 0, 1, 3), (0, 0, 2, 2)}
+    np.testing.assert_array_equal(unmet, [[0, 0, 2]])
+    assert solver["solved_blocks"] == 1
+
+
+def test_no_transfer_costs_more_than_the_shortage():
+    cost = closed_costs(["a", "b", "c"], 10.0, {"a": {"b": 1.0, "c": 2.0}})
+    flows, unmet, _ = solve_transport(
+        np.array([[5, 0, 0]]), np.array([[0, 3, 4]]), cost, 1.5
+    )
+    assert _flows(flows) == {(0, 0, 1, 3)}
+    np.testing.assert_array_equal(unmet, [[0, 0, 4]])
+
+
+def test_blocks_keep_their_own_unmet_cost_and_scale():
+    cost = closed_costs(["a", "b"], 2.0)
+    flows, unmet, _ = solve_transport(
+        np.array([[4, 0], [4, 0]]),
+        np.array([[0, 3], [0, 3]]),
+        cost,
+        np.array([10.0, 10.0]),
+        cost_scale=np.array([1.0, 6.0])
+    )
+    # Block 1 pays 12 per unit to move, more than its shortage cost
+    assert _flows(flows) == {(0, 0, 1, 3)}
+    np.testing.assert_array_equal(unmet, [[0, 0], [0, 3]])
+
+
+def test_identical_blocks_are_solved_once():
+    cost = closed_costs(["a", "b"], 1.0)
+    surplus = np.array([[2, 0], [2, 0], [0, 0]])
+    deficit = np.array([[0, 3], [0, 3], [0, 1]])
+    flows, unmet, solver = solve_transport(surplus, deficit, cost, 100.0)
+    assert solver["blocks"] == 3
+    assert solver["solved_blocks"] == 1
+    assert _flows(flows) == {(0, 0, 1, 2), (1, 0, 1, 2)}
+    # Block 2 has nothing to move and keeps its whole deficit
+    np.testing.assert_array_equal(unmet, [[0, 1], [0, 1], [0, 1]])
+
+
+def test_pricing_adds_sources_until_the_plan_is_optimal():
+    # Three sources of 2 units at costs 1, 2 and 3 to a target needing 5
+    cost = np.full((4, 4), 10.0)
+    np.fill_diagonal(cost, 0.0)
+    cost[[0, 1, 2], 3] = [1.0, 2.0, 3.0]
+    surplus = np.array([[2, 2, 2, 0]])
+    deficit = np.array([[0, 0, 0, 5]])
+    
+    full, full_unmet, _ = solve_transport(surplus, deficit, cost, 100.0)
+    priced, priced_unmet, solver = solve_transport(surplus, deficit, cost, 100.0, candidates=1)
+    expected = {(0, 0, 3, 2), (0, 1, 3, 2), (0, 2, 3, 1)}
+    assert _flows(full) == _flows(priced) == expected
+    assert not full_unmet.any() and not priced_unmet.any()
+    # The first LP only has the cheapest source; duals bring in the others
+    assert solver["rounds"] > 1
+
+
+def test_flows_are_whole_units():
+    # Two equally cheap targets: any split is optimal, but it must be integral
+    cost = closed_costs(["a", "b", "c"], 1.0)
+    flows, unmet, _ = solve_transport(
+        np.array([[7, 0, 0]]), np.array([[0, 5, 5]]), cost, 100.0
+    )
+    assert flows.dtype.kind == "i" and unmet.dtype.kind == "i"
+    assert flows[:, 3].sum() == 7
+    assert unmet.sum() == 3
+
+
+def test_blocks_without_surplus_or_deficit_skip_the_solver():
+    flows, unmet, solver = solve_transport(
+        np.array([[0, 0]]), np.array([[0, 4]]), closed_costs(["a", "b"], 1.0), 100.0
+    )
+    assert flows.shape == (0, 4)
+    np.testing.assert_array_equal(unmet, [[0, 4]])
+    assert solver["solved_blocks"] == 0